@@ -0,0 +1,118 @@
+"""Benchmark of the import time of the library.
+
+Every module is imported in a new interpreter, so nothing is cached between the runs. Besides the time, the benchmark
+checks that the heavy dependencies (`LAZY_MODULES`) are not imported with the module; they are only imported when they
+are used. The benchmark fails if a module needs more than the budget (p95) or if it imports a lazy module.
+
+Usage::
+
+    PYTHONPATH=src python3 -m benchmarks.bench_imports --runs 20 --budget-ms 150
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+from benchmarks.stats import summarize, write_results, compare
+
+BASELINE_KEYS = ("module",)
+
+MODULES = (
+    "lab_orchestrator_lib.controller.controller",
+    "lab_orchestrator_lib.controller.controller_collection",
+    "lab_orchestrator_lib.kubernetes.api",
+    "lab_orchestrator_lib.template_engine",
+    "lab_orchestrator_lib.token_service",
+)
+
+LAZY_MODULES = ("requests", "yaml", "lab_orchestrator_lib_auth", "jwt", "numpy", "http.server", "httpx")
+
+_SCRIPT = """
+import importlib, json, sys, time
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+print(json.dumps({"seconds": seconds, "loaded": [name for name in sys.argv[2:] if name in sys.modules]}))
+"""
+
+
+def import_once(module: str, lazy_modules: Sequence[str] = LAZY_MODULES) -> Dict[str, Any]:
+    """Imports a module in a new interpreter.
+
+    :param module: Name of the module.
+    :param lazy_modules: Modules that are checked if they were imported with the module.
+    :return: The import time in seconds ("seconds") and the lazy modules that were imported ("loaded").
+    """
+    output = subprocess.run([sys.executable, "-c", _SCRIPT, module, *lazy_modules], check=True,
+                            stdout=subprocess.PIPE, env=os.environ.copy()).stdout
+    return json.loads(output)
+
+
+def bench_module(module: str, runs: int) -> Dict[str, Any]:
+    """Measures the import time of a module.
+
+    :param module: Name of the module.
+    :param runs: Amount of new interpreters the module is imported in.
+    :return: The summary of the measurements with the lazy modules that were imported.
+    """
+    start = time.perf_counter()
+    measurements = [import_once(module) for _ in range(runs)]
+    wall_time = time.perf_counter() - start
+    loaded = sorted({name for measurement in measurements for name in measurement["loaded"]})
+    return {"module": module, "eager_imports": loaded,
+            **summarize([measurement["seconds"] for measurement in measurements], wall_time, len(loaded))}
+
+
+def check_budget(results: List[Dict[str, Any]], budget_ms: float) -> List[str]:
+    """Checks the results against the import time budget.
+
+    :param results: The benchmark results.
+    :param budget_ms: Maximal p95 import time of every module in milliseconds.
+    :return: A list of messages that describe the violations. Empty if the budget is kept.
+    """
+    violations = []
+    for result in results:
+        if result["p95_ms"] > budget_ms:
+            violations.append(f"module={result['module']}: p95_ms {result['p95_ms']:.2f} > budget {budget_ms:.2f}")
+        if result["eager_imports"]:
+            violations.append(f"module={result['module']}: imports {', '.join(result['eager_imports'])}")
+    return violations
+
+
+def _str_list(value: str) -> List[str]:
+    return [v for v in value.split(",") if v]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modules", type=_str_list, default=list(MODULES), help="comma separated module names")
+    parser.add_argument("--runs", type=int, default=20, help="new interpreters per module")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="maximal p95 import time per module")
+    parser.add_argument("--output", help="file to write the JSON results to (default: stdout)")
+    parser.add_argument("--baseline", help="JSON file with baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 increase")
+    args = parser.parse_args(argv)
+
+    results = [bench_module(module, args.runs) for module in args.modules]
+    text = write_results(results, args.output)
+    if args.output is None:
+        print(text)
+    problems = check_budget(results, args.budget_ms)
+    if args.baseline is not None:
+        if args.save_baseline:
+            write_results(results, args.baseline)
+        else:
+            problems.extend(f"regression: {regression}"
+                            for regression in compare(results, args.baseline, BASELINE_KEYS, tolerance=args.tolerance))
+    for problem in problems:
+        print(problem, file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
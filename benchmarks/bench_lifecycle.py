@@ -0,0 +1,144 @@
+"""End-to-end benchmark of the lab lifecycle.
+
+Drives a controller collection with in-memory adapters against the fake API server and measures the latency and
+throughput of creating lab instances, listing the lab instances of users, looking up VMIs and deleting lab instances.
+The baseline contains latencies of one machine, record it with ``--save-baseline`` on the machine that compares with
+it.
+
+Usage::
+
+    PYTHONPATH=src python3 -m benchmarks.bench_lifecycle --vms 1,4 --concurrency 1,8 --output results.json \\
+        --baseline benchmarks/baseline_lifecycle.json
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Sequence
+
+from benchmarks.stats import summarize, write_results, compare
+from lab_orchestrator_lib.controller.controller_collection import ControllerCollection, create_controller_collection
+from lab_orchestrator_lib.database.memory_adapter import MemoryUserAdapter, MemoryDockerImageAdapter, \
+    MemoryLabDockerImageAdapter, MemoryLabAdapter, MemoryLabInstanceAdapter
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+from lab_orchestrator_lib.model.model import User, DockerImage, LabDockerImage, Lab
+
+BASELINE_KEYS = ("operation", "vms", "concurrency")
+
+
+def run_operation(operation: Callable[[Any], Any], items: Sequence[Any], concurrency: int) -> Dict[str, float]:
+    """Runs an operation for every item with the given concurrency and measures it.
+
+    :param operation: The operation to measure.
+    :param items: The arguments of the operation.
+    :param concurrency: Amount of threads.
+    :return: The summary of the measurements.
+    """
+    def timed(item):
+        start = time.perf_counter()
+        try:
+            operation(item)
+            failed = False
+        except Exception:
+            failed = True
+        return time.perf_counter() - start, failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        measurements = list(executor.map(timed, items))
+    wall_time = time.perf_counter() - start
+    latencies = [latency for latency, _ in measurements]
+    errors = sum(failed for _, failed in measurements)
+    return summarize(latencies, wall_time, errors)
+
+
+def create_collection(server: FakeApiServer, vms: int, users: int) -> ControllerCollection:
+    """Creates a controller collection with one lab that has the given amount of VMs.
+
+    :param server: The running fake API server.
+    :param vms: Amount of VMs in the lab.
+    :param users: Amount of users.
+    :return: The controller collection.
+    """
+    return create_controller_collection(
+        registry=APIRegistry(Proxy(server.base_uri, "token")),
+        user_adapter=MemoryUserAdapter([User(i) for i in range(1, users + 1)]),
+        docker_image_adapter=MemoryDockerImageAdapter([DockerImage(1, "ubuntu", "desc", "ubuntu:latest")]),
+        lab_docker_image_adapter=MemoryLabDockerImageAdapter(
+            [LabDockerImage(i, 1, 1, f"vm{i}") for i in range(1, vms + 1)]),
+        lab_adapter=MemoryLabAdapter([Lab(1, "lab", "lab", "desc")]),
+        lab_instance_adapter=MemoryLabInstanceAdapter(),
+        secret_key="secret",
+    )
+
+
+def bench_lifecycle(vms: int, concurrency: int, iterations: int, latency: float) -> List[Dict[str, Any]]:
+    """Benchmarks the lifecycle of lab instances with one configuration.
+
+    :param vms: Amount of VMs per lab.
+    :param concurrency: Amount of threads.
+    :param iterations: Amount of lab instances.
+    :param latency: Latency of the fake API server in seconds.
+    :return: One result per operation.
+    """
+    results = []
+    with FakeApiServer(latency=latency) as server:
+        collection = create_collection(server, vms, iterations)
+        users = collection.user_ctrl.get_all()
+        lab_instance_ctrl = collection.lab_instance_ctrl
+        vmi_ctrl = collection.virtual_machine_instance_ctrl
+        lab_ctrl = collection.lab_ctrl
+        measured = {"create": run_operation(lambda user: lab_instance_ctrl.create(1, user.primary_key),
+                                            users, concurrency)}
+        lab_instances = lab_instance_ctrl.get_all()
+        measured["get_list_of_user"] = run_operation(lab_instance_ctrl.get_list_of_user, users, concurrency)
+        measured["vmi_list"] = run_operation(
+            lambda lab_instance: vmi_ctrl.get_list_of_lab_instance(lab_instance, lab_ctrl),
+            lab_instances, concurrency)
+        measured["vmi_get"] = run_operation(
+            lambda lab_instance: vmi_ctrl.get_of_lab_instance(lab_instance, "vm1", lab_ctrl),
+            lab_instances, concurrency)
+        measured["delete"] = run_operation(lab_instance_ctrl.delete, lab_instances, concurrency)
+    for operation, summary in measured.items():
+        results.append({"operation": operation, "vms": vms, "concurrency": concurrency, **summary})
+    return results
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vms", type=_int_list, default=[1, 4], help="comma separated VM counts per lab")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8], help="comma separated thread counts")
+    parser.add_argument("--iterations", type=int, default=50, help="lab instances per configuration")
+    parser.add_argument("--latency", type=float, default=0.0, help="latency of the fake API server in seconds")
+    parser.add_argument("--output", help="file to write the JSON results to (default: stdout)")
+    parser.add_argument("--baseline", help="JSON file with baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 increase")
+    args = parser.parse_args(argv)
+
+    results = []
+    for vms in args.vms:
+        for concurrency in args.concurrency:
+            results.extend(bench_lifecycle(vms, concurrency, args.iterations, args.latency))
+    text = write_results(results, args.output)
+    if args.output is None:
+        print(text)
+    if args.baseline is None:
+        return 0
+    if args.save_baseline:
+        write_results(results, args.baseline)
+        return 0
+    regressions = compare(results, args.baseline, BASELINE_KEYS, tolerance=args.tolerance)
+    for regression in regressions:
+        print(f"regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
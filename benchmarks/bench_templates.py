@@ -0,0 +1,209 @@
+"""Micro-benchmark of the template engine.
+
+Measures `TemplateEngine.replace_template`, `load`, `dump` and the constructor of `_path_constructor_factory` with the
+bundled templates, `load_file` with large generated templates, strict and non-strict mode and multithreaded rendering.
+Multithreaded renderings are compared with a single threaded rendering and mismatches are counted as errors.
+
+cProfile and tracemalloc can be enabled to find out where the time and memory is spent.
+
+Usage::
+
+    PYTHONPATH=src python3 -m benchmarks.bench_templates --threads 1,8 --profile templates.prof --tracemalloc
+"""
+
+import argparse
+import cProfile
+import os
+import pstats
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import yaml
+
+from benchmarks.stats import summarize, write_results, compare
+from lab_orchestrator_lib.template_engine import TemplateEngine, _path_constructor_factory
+
+BASELINE_KEYS = ("case", "operation", "strict", "threads")
+
+TEMPLATES = {
+    "namespace_template.yaml": lambda i: {"namespace": f"lab-{i}"},
+    "network_policy_template.yaml": lambda i: {"namespace": f"lab-{i}", "network_policy_name": "allow-same-namespace"},
+    "vmi_template.yaml": lambda i: {"namespace": f"lab-{i}", "vmi_name": f"vm-{i}", "api_version": "kubevirt.io/v1",
+                                    "cores": 3, "memory": "3G", "resource_limits": {"cpu": "4", "memory": "4G"},
+                                    "vm_image": "ubuntu:latest"},
+}
+
+LARGE_ITEM = """- metadata:
+    namespace: ${namespace}
+    name: ${vmi_name}-%(index)d
+    labels:
+      index: "%(index)d"
+  spec:
+    domain:
+      cpu:
+        cores: ${cores}
+      resources:
+        requests:
+          memory: ${memory}
+    volumes:
+      - name: containerdisk
+        containerDisk:
+          image: ${vm_image}
+"""
+
+
+def large_template(items: int) -> str:
+    """Generates a yaml template with a list of the given amount of VMI-like objects.
+
+    :param items: Amount of objects in the list.
+    :return: The template.
+    """
+    return "".join(LARGE_ITEM % {"index": index} for index in range(items))
+
+
+def measure(operation: Callable[[int], Any], iterations: int, threads: int,
+            expected: Optional[Callable[[int], Any]] = None) -> Dict[str, float]:
+    """Runs an operation with the given amount of threads and measures it.
+
+    :param operation: The operation, that gets the number of the iteration.
+    :param iterations: How often the operation is run.
+    :param threads: Amount of threads.
+    :param expected: Gives the expected result for an iteration. Other results are counted as errors.
+    :return: The summary of the measurements.
+    """
+    def timed(index):
+        start = time.perf_counter()
+        try:
+            result = operation(index)
+            failed = expected is not None and result != expected(index)
+        except Exception:
+            failed = True
+        return time.perf_counter() - start, failed
+
+    start = time.perf_counter()
+    if threads == 1:
+        measurements = [timed(index) for index in range(iterations)]
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            measurements = list(executor.map(timed, range(iterations)))
+    wall_time = time.perf_counter() - start
+    return summarize([latency for latency, _ in measurements], wall_time,
+                     sum(failed for _, failed in measurements))
+
+
+class _Node:
+    """Minimal stand-in for a yaml scalar node."""
+
+    def __init__(self, value: str):
+        self.value = value
+
+
+def bench_templates(engine: TemplateEngine, iterations: int, threads: int, strict: bool,
+                    large_items: int) -> List[Dict[str, Any]]:
+    """Benchmarks all template engine operations with one configuration.
+
+    :param engine: The template engine.
+    :param iterations: How often every operation is run.
+    :param threads: Amount of threads.
+    :param strict: Strict mode of the template engine.
+    :param large_items: Amount of objects in the generated template for `load_file`.
+    :return: One result per case and operation.
+    """
+    cases = []
+    for template, data in TEMPLATES.items():
+        def replace(index, template=template, data=data):
+            return engine.replace_template(template, data(index), strict)
+
+        # reference results are rendered single threaded
+        reference = {index: replace(index) for index in range(iterations)} if threads > 1 else None
+        loaded = engine.load_template(template, data(0), strict)
+        cases.append((template, "replace_template", replace, reference.get if reference else None))
+        cases.append((template, "load_template",
+                      lambda index, template=template, data=data: engine.load_template(template, data(index), strict),
+                      None))
+        cases.append((template, "dump", lambda index, loaded=loaded: engine.dump(loaded), None))
+
+    constructor = _path_constructor_factory(TEMPLATES["vmi_template.yaml"](0), strict)
+    node = _Node("${vmi_name}-suffix")
+    cases.append(("constructor", "path_constructor", lambda index: constructor(None, node), None))
+
+    with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as file:
+        file.write(large_template(large_items))
+    try:
+        data = TEMPLATES["vmi_template.yaml"](0)
+        cases.append((f"large_{large_items}", "load_file",
+                      lambda index: engine.load_file(file.name, data, strict), None))
+        results = []
+        for case, operation, function, expected in cases:
+            # large templates are expensive, so they are run less often
+            runs = max(1, iterations // 20) if operation == "load_file" else iterations
+            summary = measure(function, runs, threads, expected)
+            results.append({"case": case, "operation": operation, "strict": strict, "threads": threads, **summary})
+    finally:
+        os.unlink(file.name)
+    return results
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=_int_list, default=[1, 8], help="comma separated thread counts")
+    parser.add_argument("--iterations", type=int, default=200, help="runs per operation")
+    parser.add_argument("--large-items", type=int, default=200, help="objects in the generated large template")
+    parser.add_argument("--output", help="file to write the JSON results to (default: stdout)")
+    parser.add_argument("--baseline", help="JSON file with baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 increase")
+    parser.add_argument("--profile", help="write cProfile stats to this file and print the top functions")
+    parser.add_argument("--tracemalloc", action="store_true", help="record peak memory and top allocations")
+    args = parser.parse_args(argv)
+
+    engine = TemplateEngine(yaml)
+    profiler = cProfile.Profile() if args.profile else None
+    results = []
+    for threads in args.threads:
+        for strict in [False, True]:
+            if args.tracemalloc:
+                tracemalloc.start()
+            if profiler is not None:
+                profiler.enable()
+            configuration = bench_templates(engine, args.iterations, threads, strict, args.large_items)
+            if profiler is not None:
+                profiler.disable()
+            if args.tracemalloc:
+                _, peak = tracemalloc.get_traced_memory()
+                snapshot = tracemalloc.take_snapshot()
+                tracemalloc.stop()
+                for result in configuration:
+                    result["peak_kb"] = peak / 1024
+                print(f"top allocations (threads={threads}, strict={strict}):", file=sys.stderr)
+                for stat in snapshot.statistics("lineno")[:5]:
+                    print(f"  {stat}", file=sys.stderr)
+            results.extend(configuration)
+
+    if profiler is not None:
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(20)
+    text = write_results(results, args.output)
+    if args.output is None:
+        print(text)
+    if args.baseline is None:
+        return 0
+    if args.save_baseline:
+        write_results(results, args.baseline)
+        return 0
+    regressions = compare(results, args.baseline, BASELINE_KEYS, tolerance=args.tolerance)
+    for regression in regressions:
+        print(f"regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
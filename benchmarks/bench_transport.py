@@ -0,0 +1,152 @@
+"""Benchmark of the transports of the proxy under bursty concurrent requests.
+
+Creates, gets and deletes network policies in bursts with the default transport (the requests library, a new connection
+per request), the `SessionTransport` (pooled HTTP/1.1 connections) and the `Http2Transport` (one multiplexed HTTP/2
+connection, only if httpx and h2 are installed). Besides the latency of the single requests it reports the amount of
+connections that were opened. By default the fake API server is used without TLS. It serves the `Http2Transport` with
+HTTP/2 over the plain connection (prior knowledge, h2c). To measure a cluster run the benchmark with an https
+`--base-uri` and `--token`, there HTTP/2 is negotiated with TLS.
+
+Usage::
+
+    PYTHONPATH=src python3 -m benchmarks.bench_transport --requests 200 --concurrency 1,32 --latency 0.005
+    PYTHONPATH=src python3 -m benchmarks.bench_transport --base-uri https://cluster:6443 --token ... --cacert ca.crt
+"""
+
+import argparse
+import sys
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.bench_lifecycle import run_operation
+from benchmarks.stats import write_results, compare
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+from lab_orchestrator_lib.kubernetes.transport import Http2Transport, SessionTransport, Transport
+
+BASELINE_KEYS = ("transport", "operation", "concurrency")
+
+NAMESPACE = "kind: Namespace\napiVersion: v1\nmetadata:\n  name: {name}\n"
+NETWORK_POLICY = "kind: NetworkPolicy\napiVersion: networking.k8s.io/v1\nmetadata:\n  name: {name}\n" \
+                 "spec:\n  podSelector: {{}}\n"
+
+
+def _transports() -> Dict[str, Callable[[], Optional[Transport]]]:
+    """Gives the factories of the transports that can be used. The default transport is None."""
+    transports: Dict[str, Callable[[], Optional[Transport]]] = {"requests": lambda: None, "session": SessionTransport}
+    try:
+        Http2Transport().close()
+        transports["http2"] = Http2Transport
+    except ImportError:
+        pass
+    return transports
+
+
+def bench_transport(name: str, transport: Optional[Transport], proxy_args: Dict[str, Any], concurrency: int,
+                    requests: int, server: Optional[FakeApiServer]) -> List[Dict[str, Any]]:
+    """Benchmarks one transport with one concurrency.
+
+    :param name: The name of the transport in the results.
+    :param transport: The transport. If None: the requests library.
+    :param proxy_args: The arguments of the proxy.
+    :param concurrency: Amount of threads.
+    :param requests: Amount of requests per operation.
+    :param server: The fake API server to count the connections. If None: the transport counts them.
+    :return: One result per operation.
+    """
+    registry = APIRegistry(Proxy(**proxy_args, transport=transport, coalesce=False))
+    namespace = f"bench-transport-{uuid.uuid4().hex[:8]}"
+    registry.namespace.create(NAMESPACE.format(name=namespace))
+    names = [f"policy-{i}" for i in range(requests)]
+    operations = {
+        "create": lambda policy: registry.network_policy.create(namespace, NETWORK_POLICY.format(name=policy)),
+        "get": lambda policy: registry.network_policy.get(namespace, policy),
+        "delete": lambda policy: registry.network_policy.delete(namespace, policy),
+    }
+    results = []
+    try:
+        for operation, function in operations.items():
+            connections = server.connection_count if server is not None else transport.connections if transport else 0
+            summary = run_operation(function, names, concurrency)
+            if server is not None:
+                connections = server.connection_count - connections
+            elif transport is not None:
+                connections = transport.connections - connections
+            else:
+                # the requests library opens a new connection for every request
+                connections = len(names)
+            results.append({"transport": name, "operation": operation, "concurrency": concurrency,
+                            "connections": connections, **summary})
+    finally:
+        registry.namespace.delete(namespace)
+        if transport is not None:
+            transport.close()
+    return results
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+def _str_list(value: str) -> List[str]:
+    return [v for v in value.split(",") if v]
+
+
+def main(argv=None) -> int:
+    transports = _transports()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transports", type=_str_list, default=list(transports),
+                        help=f"comma separated transports (available: {', '.join(transports)})")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 32], help="comma separated thread counts")
+    parser.add_argument("--requests", type=int, default=200, help="requests per operation")
+    parser.add_argument("--latency", type=float, default=0.0, help="latency of the fake API server in seconds")
+    parser.add_argument("--base-uri", help="uri of a Kubernetes API server instead of the fake API server")
+    parser.add_argument("--token", help="bearer token for --base-uri")
+    parser.add_argument("--cacert", help="ca cert file for --base-uri")
+    parser.add_argument("--insecure", action="store_true", help="don't check the certificate of --base-uri")
+    parser.add_argument("--output", help="file to write the JSON results to (default: stdout)")
+    parser.add_argument("--baseline", help="JSON file with baseline results to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results to the baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative p95 increase")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.transports if name not in transports]
+    if unknown:
+        parser.error(f"unknown or unavailable transports: {', '.join(unknown)}")
+
+    server = None
+    if args.base_uri is None:
+        http2 = "http2" in args.transports
+        if http2:
+            transports["http2"] = lambda: Http2Transport(prior_knowledge=True)
+        server = FakeApiServer(latency=args.latency, http2=http2).start()
+        proxy_args = {"base_uri": server.base_uri, "service_account_token": "token"}
+    else:
+        if "http2" in args.transports and not args.base_uri.startswith("https:"):
+            print("note: http2 uses HTTP/1.1 without TLS, use an https --base-uri to measure HTTP/2", file=sys.stderr)
+        proxy_args = {"base_uri": args.base_uri, "service_account_token": args.token, "cacert": args.cacert,
+                      "insecure_ssl": args.insecure}
+    results = []
+    try:
+        for name in args.transports:
+            for concurrency in args.concurrency:
+                results.extend(bench_transport(name, transports[name](), proxy_args, concurrency, args.requests,
+                                               server))
+    finally:
+        if server is not None:
+            server.stop()
+    text = write_results(results, args.output)
+    if args.output is None:
+        print(text)
+    if args.baseline is None:
+        return 0
+    if args.save_baseline:
+        write_results(results, args.baseline)
+        return 0
+    regressions = compare(results, args.baseline, BASELINE_KEYS, tolerance=args.tolerance)
+    for regression in regressions:
+        print(f"regression: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
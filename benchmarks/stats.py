@@ -0,0 +1,100 @@
+"""Contains helpers to summarize benchmark measurements and compare them to a baseline."""
+
+import json
+import platform
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """Gives the p-th percentile of the values with linear interpolation.
+
+    :param values: The measured values.
+    :param p: The percentile between 0 and 100.
+    :return: The percentile or 0 if there are no values.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(latencies: Sequence[float], wall_time: float, errors: int = 0) -> Dict[str, float]:
+    """Summarizes the latencies of one benchmark.
+
+    :param latencies: Latencies of the single operations in seconds.
+    :param wall_time: Seconds that were needed for all operations.
+    :param errors: Amount of operations that failed.
+    :return: A dictionary with count, errors, percentiles and mean in milliseconds and throughput in ops per second.
+    """
+    count = len(latencies)
+    return {
+        "count": count,
+        "errors": errors,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "mean_ms": sum(latencies) / count * 1000 if count else 0.0,
+        "throughput_ops": count / wall_time if wall_time > 0 else 0.0,
+    }
+
+
+def metadata() -> Dict[str, Any]:
+    """Gives information about the machine the benchmark runs on."""
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def write_results(results: List[Dict[str, Any]], filename: Optional[str]) -> str:
+    """Writes the results as JSON.
+
+    :param results: The benchmark results.
+    :param filename: File to write to. If None: only the JSON string is returned.
+    :return: The JSON string.
+    """
+    text = json.dumps({"meta": metadata(), "results": results}, indent=2, sort_keys=True)
+    if filename is not None:
+        with open(filename, "w") as file:
+            file.write(text + "\n")
+    return text
+
+
+def compare(results: List[Dict[str, Any]], baseline_file: str, keys: Tuple[str, ...], metric: str = "p95_ms",
+            tolerance: float = 0.25) -> List[str]:
+    """Compares results with a stored baseline. A result is a regression if its metric increased by more than the
+    tolerance or if it has more errors than the baseline, so failing operations can't pass as fast ones. Results that
+    are not in the baseline are only checked for errors.
+
+    :param results: The benchmark results.
+    :param baseline_file: JSON file that was written by `write_results`.
+    :param keys: Names of the fields that identify a benchmark, for example ("operation", "concurrency").
+    :param metric: The field that is compared. Higher values are regressions.
+    :param tolerance: Allowed relative increase of the metric.
+    :return: A list of messages that describe the regressions. Empty if there are no regressions.
+    """
+    with open(baseline_file) as file:
+        baseline = json.load(file)["results"]
+    baseline_by_key = {tuple(result[key] for key in keys): result for result in baseline}
+    regressions = []
+    for result in results:
+        key = tuple(result[k] for k in keys)
+        old = baseline_by_key.get(key)
+        description = ", ".join(f"{k}={v}" for k, v in zip(keys, key))
+        errors = result.get("errors", 0)
+        old_errors = old.get("errors", 0) if old is not None else 0
+        if errors > old_errors:
+            regressions.append(f"{description}: errors {errors} > baseline {old_errors}")
+            continue
+        if old is None or old[metric] <= 0:
+            continue
+        if result[metric] > old[metric] * (1 + tolerance):
+            regressions.append(f"{description}: {metric} {result[metric]:.2f} > baseline {old[metric]:.2f} "
+                               f"(+{(result[metric] / old[metric] - 1) * 100:.0f}%)")
+    return regressions
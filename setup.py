@@ -35,5 +35,10 @@ setup(
     include_package_data = True,  # MANIFEST.in
     python_requires=">=3.8",
     install_requires=REQUIREMENTS,
+    extras_require={
+        "opentelemetry": ["opentelemetry-api"],
+        "msgpack": ["msgpack"],
+        "http2": ["httpx[http2]"],
+    },
     zip_safe=True,
 )
@@ -1,6 +1,8 @@
 """Contains a generic controller that can be used for adapters."""
+import time
 from typing import Generic, List, TypeVar, Any
 
+from lab_orchestrator_lib import metrics, tracing
 from lab_orchestrator_lib.model.model import DockerImage, Lab, LabInstance
 
 Adapter = TypeVar('Adapter')
@@ -26,7 +28,7 @@ class AdapterController(Generic[Adapter, LibModelType]):
 
         :return: A list of all objects of the adapter.
         """
-        return self.adapter.get_all()
+        return self._call("get_all")
 
     def get(self, identifier) -> LibModelType:
         """Gives a specific object of the adapter.
@@ -34,7 +36,7 @@ class AdapterController(Generic[Adapter, LibModelType]):
         :param identifier: The identifier of the object.
         :return: The specific object.
         """
-        return self.adapter.get(identifier)
+        return self._call("get", identifier)
 
     def delete(self, identifier) -> None:
         """Deletes a specific object of the adapter.
@@ -42,7 +44,7 @@ class AdapterController(Generic[Adapter, LibModelType]):
         :param identifier: The identifier of the object.
         :return: None
         """
-        return self.adapter.delete(identifier)
+        return self._call("delete", identifier)
 
     def save(self, obj: LibModelType) -> LibModelType:
         """Saves changes of the object to the database.
@@ -50,7 +52,7 @@ class AdapterController(Generic[Adapter, LibModelType]):
         :param obj: The object object that contains changes.
         :return: The object.
         """
-        return self.adapter.save(obj)
+        return self._call("save", obj)
 
     def filter(self, **kwargs) -> List[LibModelType]:
         """Filters the objects of the adapter and returns all objects that matches the filter criteria.
@@ -60,4 +62,40 @@ class AdapterController(Generic[Adapter, LibModelType]):
         :param kwargs: A dictionary with filters.
         :return: All objects that matches the filters.
         """
-        return self.adapter.filter(**kwargs)
+        return self._call("filter", **kwargs)
+
+    def _call(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        """Calls a method of the adapter, records the latency of the call and creates a span for it.
+
+        :param method: Name of the adapter method.
+        :param args: Arguments of the adapter method.
+        :param kwargs: Keyword arguments of the adapter method.
+        :return: The return value of the adapter method.
+        """
+        return call_adapter(self.adapter, method, *args, **kwargs)
+
+
+def call_adapter(adapter: Any, method: str, *args: Any, **kwargs: Any) -> Any:
+    """Calls a method of an adapter, records the latency of the call and creates a span for it.
+
+    Every call of an adapter by a controller should use this function, so all adapter calls are in the
+    `lab_orchestrator_adapter_call_duration_seconds` metric.
+
+    :param adapter: The adapter.
+    :param method: Name of the adapter method.
+    :param args: Arguments of the adapter method.
+    :param kwargs: Keyword arguments of the adapter method.
+    :return: The return value of the adapter method.
+    """
+    recorder = metrics.get_recorder()
+    tracer = tracing.get_tracer()
+    if not recorder.enabled and not tracer.enabled:
+        return getattr(adapter, method)(*args, **kwargs)
+    adapter_name = type(adapter).__name__
+    with tracer.start_span(f"adapter {method}", {"adapter": adapter_name}):
+        start = time.perf_counter()
+        try:
+            return getattr(adapter, method)(*args, **kwargs)
+        finally:
+            recorder.observe(metrics.ADAPTER_CALL_DURATION, time.perf_counter() - start,
+                             {"adapter": adapter_name, "method": method})
@@ -0,0 +1,344 @@
+"""Contains an admission controller that only starts lab instances when the cluster has enough capacity.
+
+Requests that don't fit into the free capacity are queued. The queue is ordered by priority and inside of the same
+priority by a fair share per group (for example the user or the course), so one group can't starve the others by
+starting many labs at once.
+"""
+
+import heapq
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from lab_orchestrator_lib.controller.controller import LabInstanceController, LabDockerImageController, \
+    VirtualMachineInstanceController
+from lab_orchestrator_lib.custom_exceptions import AdmissionError
+from lab_orchestrator_lib.model.model import Identifier, LabInstance, LabInstanceKubernetes
+from lab_orchestrator_lib.quantity import parse_cpu_quantity, parse_memory_quantity
+
+
+class AdmissionTicket:
+    """A request to start a lab instance.
+
+    The ticket is returned by `AdmissionController.submit` and can be used to get the queue position, the estimated
+    time until admission and the started lab instance.
+    """
+
+    QUEUED = "queued"
+    ADMITTED = "admitted"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(self, admission_ctrl: 'AdmissionController', lab_id: Identifier, user_id: Identifier,
+                 group: Hashable, priority: int, cores: float, memory: int):
+        self.admission_ctrl = admission_ctrl
+        self.lab_id = lab_id
+        self.user_id = user_id
+        self.group = group
+        self.priority = priority
+        self.cores = cores
+        self.memory = memory
+        self.state = AdmissionTicket.QUEUED
+        self.lab_instance_kubernetes: Optional[LabInstanceKubernetes] = None
+        self.error: Optional[BaseException] = None
+        self._done = threading.Event()
+
+    @property
+    def position(self) -> Optional[int]:
+        """Position in the queue starting with 0 or None if the ticket is not queued anymore."""
+        return self.admission_ctrl.position(self)
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated seconds until the ticket is admitted or None if there is no estimation."""
+        return self.admission_ctrl.eta(self)
+
+    def done(self) -> bool:
+        """Gives whether the ticket was admitted, failed or cancelled."""
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> LabInstanceKubernetes:
+        """Waits until the lab instance is started.
+
+        :param timeout: Maximum amount of seconds to wait. If None: wait forever.
+        :return: The started lab instance.
+        :raise TimeoutError: if the ticket is still queued after the timeout.
+        :raise AdmissionError: if the ticket was cancelled.
+        :raise Exception: the exception of the lab instance creation if it failed.
+        """
+        if not self._done.wait(timeout):
+            raise TimeoutError("lab instance is still queued.")
+        if self.error is not None:
+            raise self.error
+        return self.lab_instance_kubernetes
+
+    def _finish(self, state: str, lab_instance_kubernetes: Optional[LabInstanceKubernetes] = None,
+                error: Optional[BaseException] = None) -> None:
+        self.state = state
+        self.lab_instance_kubernetes = lab_instance_kubernetes
+        self.error = error
+        self._done.set()
+
+
+class AdmissionController:
+    """Admission controller in front of `LabInstanceController.create`.
+
+    The admission controller keeps track of the cpu cores and memory the virtual machine instances request. A lab
+    instance is only started when its virtual machine instances fit into the free capacity. Otherwise the request is
+    queued and started when capacity is freed by `delete` or `release`. Queued requests are started by a background
+    thread, so a slow lab instance creation doesn't block the thread that freed the capacity.
+    """
+
+    def __init__(self, lab_instance_ctrl: LabInstanceController, lab_docker_image_ctrl: LabDockerImageController,
+                 virtual_machine_instance_ctrl: VirtualMachineInstanceController, cores: float, memory,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initializes an admission controller.
+
+        :param lab_instance_ctrl: The lab instance controller that creates and deletes lab instances.
+        :param lab_docker_image_ctrl: The lab docker image controller that is used to get the VMs of a lab.
+        :param virtual_machine_instance_ctrl: The virtual machine instance controller that is used to get the
+                                              requested resources of the VMs.
+        :param cores: Amount of cpu cores that are available for lab instances.
+        :param memory: Memory that is available for lab instances. Either bytes or a quantity like "64Gi".
+        :param clock: Monotonic clock in seconds. Can be changed for tests.
+        """
+        self.lab_instance_ctrl = lab_instance_ctrl
+        self.lab_docker_image_ctrl = lab_docker_image_ctrl
+        self.virtual_machine_instance_ctrl = virtual_machine_instance_ctrl
+        self.clock = clock
+        self.capacity_cores = parse_cpu_quantity(cores)
+        self.capacity_memory = parse_memory_quantity(memory)
+        self.used_cores = 0.0
+        self.used_memory = 0
+        self._reservations: Dict[Identifier, Tuple[float, int]] = {}
+        self._queue: List[Tuple[int, int, int, AdmissionTicket]] = []
+        self._group_virtual_time: Dict[Hashable, int] = {}
+        self._virtual_time = 0
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._last_release: Optional[float] = None
+        self._release_interval: Optional[float] = None
+        self._dispatch_requested = False
+        self._dispatching = False
+
+    def get_lab_demand(self, lab_id: Identifier) -> Tuple[float, int]:
+        """Gives the resources that all virtual machine instances of a lab request together.
+
+        :param lab_id: The id of the lab.
+        :return: A tuple of cpu cores and memory in bytes.
+        """
+        cores = 0.0
+        memory = 0
+        for lab_docker_image in self.lab_docker_image_ctrl.filter(lab_id=lab_id):
+            vmi_cores, vmi_memory = self.virtual_machine_instance_ctrl.get_resource_requests(lab_docker_image)
+            cores += parse_cpu_quantity(vmi_cores)
+            memory += parse_memory_quantity(vmi_memory)
+        return cores, memory
+
+    def set_capacity(self, cores: float, memory) -> None:
+        """Changes the capacity, for example when nodes are added to the cluster.
+
+        :param cores: Amount of cpu cores that are available for lab instances.
+        :param memory: Memory that is available for lab instances. Either bytes or a quantity like "64Gi".
+        """
+        with self._lock:
+            self.capacity_cores = parse_cpu_quantity(cores)
+            self.capacity_memory = parse_memory_quantity(memory)
+        self._dispatch_in_background()
+
+    def rebuild(self) -> None:
+        """Calculates the used capacity from the lab instances that are in the database.
+
+        This should be called after a restart.
+        """
+        demands: Dict[Identifier, Tuple[float, int]] = {}
+        reservations = {}
+        for lab_instance in self.lab_instance_ctrl.get_all():
+            if lab_instance.lab_id not in demands:
+                demands[lab_instance.lab_id] = self.get_lab_demand(lab_instance.lab_id)
+            reservations[lab_instance.primary_key] = demands[lab_instance.lab_id]
+        with self._lock:
+            self._reservations = reservations
+            self.used_cores = sum(cores for cores, _ in reservations.values())
+            self.used_memory = sum(memory for _, memory in reservations.values())
+
+    def _fits(self, ticket: AdmissionTicket) -> bool:
+        return self.used_cores + ticket.cores <= self.capacity_cores and \
+            self.used_memory + ticket.memory <= self.capacity_memory
+
+    def submit(self, lab_id: Identifier, user_id: Identifier, group: Optional[Hashable] = None,
+               priority: int = 0) -> AdmissionTicket:
+        """Requests the start of a lab instance.
+
+        If there is enough free capacity and no other request is queued, the lab instance is started immediately in
+        the calling thread. Otherwise the request is queued and started by a background thread.
+
+        :param lab_id: The id of the lab.
+        :param user_id: The id of the user.
+        :param group: The group that is used for the fair share. If None: the user id is used.
+        :param priority: Requests with higher priorities are started first.
+        :return: A ticket of the request.
+        :raise AdmissionError: if the lab requests more resources than the whole capacity.
+        """
+        cores, memory = self.get_lab_demand(lab_id)
+        if cores > self.capacity_cores or memory > self.capacity_memory:
+            raise AdmissionError(f"lab {lab_id} requests more resources than available.")
+        ticket = AdmissionTicket(self, lab_id, user_id, user_id if group is None else group, priority, cores,
+                                 memory)
+        with self._lock:
+            virtual_time = max(self._group_virtual_time.get(ticket.group, 0), self._virtual_time) + 1
+            self._group_virtual_time[ticket.group] = virtual_time
+            self._counter += 1
+            heapq.heappush(self._queue, (-priority, virtual_time, self._counter, ticket))
+            admitted = self._pop_next(ticket)
+        if admitted is None:
+            self._dispatch_in_background()
+        else:
+            self._start(admitted)
+        return ticket
+
+    def _pop_next(self, expected: Optional[AdmissionTicket] = None) -> Optional[AdmissionTicket]:
+        """Removes the first ticket from the queue and reserves its resources if it fits into the free capacity.
+
+        Needs to be called with the lock acquired.
+
+        :param expected: If given, the first ticket is only removed if it's this ticket.
+        :return: The admitted ticket or None.
+        """
+        while self._queue and self._queue[0][3].state != AdmissionTicket.QUEUED:
+            heapq.heappop(self._queue)
+        if not self._queue or not self._fits(self._queue[0][3]):
+            return None
+        if expected is not None and self._queue[0][3] is not expected:
+            return None
+        _, virtual_time, _, ticket = heapq.heappop(self._queue)
+        self._virtual_time = max(self._virtual_time, virtual_time)
+        self.used_cores += ticket.cores
+        self.used_memory += ticket.memory
+        ticket.state = AdmissionTicket.ADMITTED
+        return ticket
+
+    def _start(self, ticket: AdmissionTicket) -> None:
+        """Creates the lab instance of an admitted ticket. The resources are freed again if the creation fails."""
+        try:
+            lab_instance_kubernetes = self.lab_instance_ctrl.create(ticket.lab_id, ticket.user_id)
+        except Exception as e:
+            with self._lock:
+                self.used_cores -= ticket.cores
+                self.used_memory -= ticket.memory
+            ticket._finish(AdmissionTicket.FAILED, error=e)
+            # the freed resources could admit the next ticket
+            self._dispatch_in_background()
+            return
+        with self._lock:
+            self._reservations[lab_instance_kubernetes.primary_key] = (ticket.cores, ticket.memory)
+        ticket._finish(AdmissionTicket.ADMITTED, lab_instance_kubernetes)
+
+    def _dispatch_in_background(self) -> None:
+        """Starts queued lab instances in a background thread. Only one of these threads runs at the same time."""
+        with self._lock:
+            self._dispatch_requested = True
+            if self._dispatching:
+                return
+            self._dispatching = True
+        threading.Thread(target=self._dispatch, daemon=True, name="lab-admission").start()
+
+    def _dispatch(self) -> None:
+        """Starts queued lab instances as long as the first one in the queue fits into the free capacity.
+
+        Runs until no more dispatch was requested by `_dispatch_in_background`.
+        """
+        while True:
+            with self._lock:
+                ticket = self._pop_next()
+                if ticket is None:
+                    if not self._dispatch_requested:
+                        self._dispatching = False
+                        return
+                    self._dispatch_requested = False
+                    continue
+            self._start(ticket)
+
+    def cancel(self, ticket: AdmissionTicket) -> bool:
+        """Removes a queued request from the queue.
+
+        :param ticket: The ticket of the request.
+        :return: True if the ticket was queued.
+        """
+        with self._lock:
+            if ticket.state != AdmissionTicket.QUEUED:
+                return False
+            ticket._finish(AdmissionTicket.CANCELLED, error=AdmissionError("request was cancelled."))
+        # the cancelled ticket could have blocked the queue
+        self._dispatch_in_background()
+        return True
+
+    def release(self, lab_instance_id: Identifier) -> None:
+        """Frees the capacity of a lab instance and starts queued lab instances.
+
+        Use this if you delete a lab instance without this controller.
+
+        :param lab_instance_id: The id of the deleted lab instance.
+        """
+        with self._lock:
+            cores, memory = self._reservations.pop(lab_instance_id, (0.0, 0))
+            self.used_cores -= cores
+            self.used_memory -= memory
+            now = self.clock()
+            if self._last_release is not None:
+                interval = now - self._last_release
+                if self._release_interval is None:
+                    self._release_interval = interval
+                else:
+                    self._release_interval = 0.8 * self._release_interval + 0.2 * interval
+            self._last_release = now
+        self._dispatch_in_background()
+
+    def delete(self, lab_instance: LabInstance) -> None:
+        """Deletes a lab instance through the lab instance controller and frees its capacity.
+
+        :param lab_instance: The lab instance that should be deleted.
+        :return: None
+        """
+        self.lab_instance_ctrl.delete(lab_instance)
+        self.release(lab_instance.primary_key)
+
+    def position(self, ticket: AdmissionTicket) -> Optional[int]:
+        """Gives the position of a ticket in the queue.
+
+        :param ticket: The ticket of the request.
+        :return: The position starting with 0 or None if the ticket is not queued.
+        """
+        with self._lock:
+            return self._position(ticket)
+
+    def _position(self, ticket: AdmissionTicket) -> Optional[int]:
+        """Gives the position of a ticket in the queue. Needs to be called with the lock acquired."""
+        if ticket.state != AdmissionTicket.QUEUED:
+            return None
+        key = next((item[:3] for item in self._queue if item[3] is ticket), None)
+        if key is None:
+            return None
+        return sum(1 for item in self._queue if item[:3] < key and item[3].state == AdmissionTicket.QUEUED)
+
+    def eta(self, ticket: AdmissionTicket) -> Optional[float]:
+        """Estimates the seconds until a ticket is admitted.
+
+        The estimation assumes that every freed lab instance admits one queued request and uses the moving average of
+        the time between two releases.
+
+        :param ticket: The ticket of the request.
+        :return: Estimated seconds, 0 if it's not queued or None if there is no estimation yet.
+        """
+        with self._lock:
+            position = self._position(ticket)
+            if position is None:
+                return 0.0
+            if self._release_interval is None:
+                return None
+            return (position + 1) * self._release_interval
+
+    def __len__(self) -> int:
+        """Gives the amount of queued requests."""
+        with self._lock:
+            return sum(1 for item in self._queue if item[3].state == AdmissionTicket.QUEUED)
@@ -0,0 +1,267 @@
+"""Contains a router that distributes lab instances over multiple Kubernetes clusters.
+
+Every cluster gets its own controller collection with its own APIRegistry, while the adapters are shared. New lab
+instances are placed either by consistent hashing of the user id or on the least loaded cluster. The chosen cluster is
+saved in the lab instance, so all later requests are routed to the same cluster.
+"""
+
+import bisect
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+from lab_orchestrator_lib.controller.controller import LabInstanceStatus
+from lab_orchestrator_lib.controller.controller_collection import ControllerCollection, create_controller_collection
+from lab_orchestrator_lib.database.adapter import UserAdapterInterface, DockerImageAdapterInterface, \
+    LabDockerImageAdapterInterface, LabAdapterInterface, LabInstanceAdapterInterface
+from lab_orchestrator_lib.kubernetes.config import KubernetesConfig, get_registry
+from lab_orchestrator_lib.model.model import Identifier, LabInstance, LabInstanceKubernetes
+
+
+def _hash(key: str) -> int:
+    """Gives a stable hash of a string that doesn't change between processes."""
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class ConsistentHashRing:
+    """Consistent hash ring.
+
+    Every node is added multiple times to the ring, so the keys are distributed evenly. Adding or removing a node only
+    moves the keys of that node.
+    """
+
+    def __init__(self, nodes: List[str], replicas: int = 100):
+        """Initializes a consistent hash ring.
+
+        :param nodes: The names of the nodes.
+        :param replicas: How often every node is added to the ring.
+        """
+        self.replicas = replicas
+        self._hashes: List[int] = []
+        self._nodes: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str) -> None:
+        """Adds a node to the ring.
+
+        :param node: The name of the node.
+        """
+        for replica in range(self.replicas):
+            point = _hash(f"{node}#{replica}")
+            index = bisect.bisect(self._hashes, point)
+            self._hashes.insert(index, point)
+            self._nodes.insert(index, node)
+
+    def remove(self, node: str) -> None:
+        """Removes a node from the ring.
+
+        :param node: The name of the node.
+        """
+        points = [(point, n) for point, n in zip(self._hashes, self._nodes) if n != node]
+        self._hashes = [point for point, _ in points]
+        self._nodes = [n for _, n in points]
+
+    def get(self, key: str) -> str:
+        """Gives the node of a key.
+
+        :param key: The key.
+        :return: The name of the node.
+        :raise ValueError: if the ring is empty.
+        """
+        if not self._hashes:
+            raise ValueError("hash ring is empty.")
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._nodes[index]
+
+
+class ClusterRouter:
+    """Routes lab instances to one of multiple Kubernetes clusters.
+
+    Lab instances without a cluster (for example lab instances that were created before multiple clusters were used)
+    are routed to the default cluster.
+
+    :param CONSISTENT_HASH: Places all lab instances of a user in the same cluster.
+    :param LEAST_LOADED: Places new lab instances in the cluster with the least lab instances per capacity.
+    """
+
+    CONSISTENT_HASH = "consistent_hash"
+    LEAST_LOADED = "least_loaded"
+
+    def __init__(self, collections: Dict[str, ControllerCollection], placement: str = CONSISTENT_HASH,
+                 capacities: Optional[Dict[str, float]] = None, default_cluster: Optional[str] = None):
+        """Initializes a cluster router.
+
+        :param collections: A controller collection for every cluster. All collections should use the same adapters.
+        :param placement: Either `ClusterRouter.CONSISTENT_HASH` or `ClusterRouter.LEAST_LOADED`.
+        :param capacities: Relative capacity of every cluster, used by the least loaded placement. Default: 1.
+        :param default_cluster: Cluster of lab instances without a cluster. If None: the first cluster.
+        :raise ValueError: if there are no clusters or the placement is unknown.
+        """
+        if len(collections) == 0:
+            raise ValueError("at least one cluster is needed.")
+        if placement not in (ClusterRouter.CONSISTENT_HASH, ClusterRouter.LEAST_LOADED):
+            raise ValueError(f"unknown placement {placement}.")
+        self.collections = collections
+        self.placement = placement
+        self.capacities = {cluster: 1.0 for cluster in collections}
+        if capacities is not None:
+            self.capacities.update(capacities)
+        self.default_cluster = next(iter(collections)) if default_cluster is None else default_cluster
+        self.ring = ConsistentHashRing(list(collections))
+        self.loads: Dict[str, int] = {cluster: 0 for cluster in collections}
+        self._lock = threading.Lock()
+
+    @property
+    def _default_collection(self) -> ControllerCollection:
+        return self.collections[self.default_cluster]
+
+    def rebuild(self) -> None:
+        """Counts the lab instances per cluster from the database. Used by the least loaded placement."""
+        loads = {cluster: 0 for cluster in self.collections}
+        for lab_instance in self._default_collection.lab_instance_ctrl.get_all():
+            cluster = self.cluster_of(lab_instance)
+            loads[cluster] = loads.get(cluster, 0) + 1
+        with self._lock:
+            self.loads = loads
+
+    def place(self, lab_id: Identifier, user_id: Identifier) -> str:
+        """Chooses the cluster for a new lab instance.
+
+        :param lab_id: The id of the lab.
+        :param user_id: The id of the user.
+        :return: The name of the cluster.
+        """
+        with self._lock:
+            return self._place_locked(lab_id, user_id)
+
+    def _place_locked(self, lab_id: Identifier, user_id: Identifier) -> str:
+        """Chooses the cluster for a new lab instance. Needs to be called with the lock acquired."""
+        if self.placement == ClusterRouter.CONSISTENT_HASH:
+            return self.ring.get(str(user_id))
+        return min(self.collections, key=lambda cluster: self.loads[cluster] / self.capacities[cluster])
+
+    def cluster_of(self, lab_instance: LabInstance) -> str:
+        """Gives the cluster of a lab instance.
+
+        :param lab_instance: The lab instance.
+        :return: The name of the cluster.
+        """
+        if lab_instance.cluster is None:
+            return self.default_cluster
+        return lab_instance.cluster
+
+    def collection_of(self, lab_instance: LabInstance) -> ControllerCollection:
+        """Gives the controller collection of the cluster of a lab instance.
+
+        :param lab_instance: The lab instance.
+        :return: The controller collection.
+        :raise KeyError: if the cluster of the lab instance is unknown.
+        """
+        return self.collections[self.cluster_of(lab_instance)]
+
+    def create(self, lab_id: Identifier, user_id: Identifier) -> LabInstanceKubernetes:
+        """Places and creates a lab instance.
+
+        The cluster is chosen and its load is increased at once, so concurrent creations see the lab instances of each
+        other.
+
+        :param lab_id: The id of the lab.
+        :param user_id: The id of the user.
+        :return: The created lab instance with the chosen cluster.
+        """
+        with self._lock:
+            cluster = self._place_locked(lab_id, user_id)
+            self.loads[cluster] += 1
+        try:
+            return self.collections[cluster].lab_instance_ctrl.create(lab_id, user_id, cluster=cluster)
+        except Exception:
+            with self._lock:
+                self.loads[cluster] -= 1
+            raise
+
+    def get(self, identifier: Identifier) -> LabInstance:
+        """Gives a specific lab instance.
+
+        :param identifier: The identifier of the lab instance.
+        :return: The lab instance.
+        """
+        return self._default_collection.lab_instance_ctrl.get(identifier)
+
+    def delete(self, lab_instance: LabInstance) -> None:
+        """Deletes a lab instance in its cluster.
+
+        :param lab_instance: The lab instance that should be deleted.
+        :return: None
+        """
+        cluster = self.cluster_of(lab_instance)
+        self.collections[cluster].lab_instance_ctrl.delete(lab_instance)
+        with self._lock:
+            self.loads[cluster] = max(self.loads.get(cluster, 0) - 1, 0)
+
+    def get_vmi_list_of_lab_instance(self, lab_instance: LabInstance):
+        """Gives a list of virtual machine instances of a lab instance from its cluster.
+
+        :param lab_instance: The lab instance.
+        :return: A list of VMIs that belong to this lab instance.
+        """
+        collection = self.collection_of(lab_instance)
+        return collection.virtual_machine_instance_ctrl.get_list_of_lab_instance(lab_instance, collection.lab_ctrl)
+
+    def get_vmi_of_lab_instance(self, lab_instance: LabInstance, virtual_machine_instance_id):
+        """Gives a specific virtual machine instance of a lab instance from its cluster.
+
+        :param lab_instance: The lab instance.
+        :param virtual_machine_instance_id: The id of the vmi.
+        :return: The specific VMI.
+        """
+        collection = self.collection_of(lab_instance)
+        return collection.virtual_machine_instance_ctrl.get_of_lab_instance(lab_instance, virtual_machine_instance_id,
+                                                                             collection.lab_ctrl)
+
+    def get_status_of_lab_instance(self, lab_instance: LabInstance) -> LabInstanceStatus:
+        """Gives the namespace and the VMIs of a lab instance from its cluster.
+
+        :param lab_instance: The lab instance.
+        :return: The namespace and the VMIs of the lab instance.
+        """
+        collection = self.collection_of(lab_instance)
+        return collection.virtual_machine_instance_ctrl.get_status_of_lab_instance(lab_instance, collection.lab_ctrl)
+
+
+def create_cluster_router(
+        kubernetes_configs: Dict[str, KubernetesConfig],
+        user_adapter: UserAdapterInterface,
+        docker_image_adapter: DockerImageAdapterInterface,
+        lab_docker_image_adapter: LabDockerImageAdapterInterface,
+        lab_adapter: LabAdapterInterface,
+        lab_instance_adapter: LabInstanceAdapterInterface,
+        secret_key: str,
+        placement: str = ClusterRouter.CONSISTENT_HASH,
+        capacities: Optional[Dict[str, float]] = None) -> ClusterRouter:
+    """Creates a cluster router with one controller collection for every Kubernetes config.
+
+    :param kubernetes_configs: The Kubernetes config of every cluster by the name of the cluster.
+    :param user_adapter: User adapter that should be injected into the controllers.
+    :param docker_image_adapter: Docker image adapter that should be injected into the controllers.
+    :param lab_docker_image_adapter: Lab docker image adapter that should be injected into the controllers.
+    :param lab_adapter: Lab adapter that should be injected into the controllers.
+    :param lab_instance_adapter: Lab instance adapter that should be injected into the controllers.
+    :param secret_key: Secret key that should be used to create JWT tokens.
+    :param placement: Either `ClusterRouter.CONSISTENT_HASH` or `ClusterRouter.LEAST_LOADED`.
+    :param capacities: Relative capacity of every cluster, used by the least loaded placement.
+    :return: A cluster router.
+    """
+    collections = {
+        cluster: create_controller_collection(
+            registry=get_registry(kubernetes_config),
+            user_adapter=user_adapter,
+            docker_image_adapter=docker_image_adapter,
+            lab_docker_image_adapter=lab_docker_image_adapter,
+            lab_adapter=lab_adapter,
+            lab_instance_adapter=lab_instance_adapter,
+            secret_key=secret_key,
+        )
+        for cluster, kubernetes_config in kubernetes_configs.items()
+    }
+    return ClusterRouter(collections, placement=placement, capacities=capacities)
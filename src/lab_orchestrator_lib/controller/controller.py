@@ -7,18 +7,58 @@ When you use this library there are some controllers that you need to use to cre
 need to use. The documentation of the controllers gives you specific information about this.
 """
 
-from typing import List, Optional
-
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+from lab_orchestrator_lib import metrics, tracing
 from lab_orchestrator_lib.template_engine import TemplateEngine
-from lab_orchestrator_lib_auth.auth import generate_auth_token, LabInstanceTokenParams
-from lab_orchestrator_lib.controller.adapter_controller import AdapterController
+from lab_orchestrator_lib.controller.adapter_controller import AdapterController, call_adapter
 from lab_orchestrator_lib.controller.kubernetes_controller import NamespacedController, NotNamespacedController
 from lab_orchestrator_lib.database.adapter import DockerImageAdapterInterface, LabAdapterInterface, \
     LabInstanceAdapterInterface, UserAdapterInterface, LabDockerImageAdapterInterface
 from lab_orchestrator_lib.kubernetes.api import NotNamespacedApi, NamespacedApi, APIRegistry
+from lab_orchestrator_lib.kubernetes.patch import PATCH_MERGE
+from lab_orchestrator_lib.model.columnar import LabInstanceColumns
+from lab_orchestrator_lib.token_service import TokenService
 from lab_orchestrator_lib.model.model import DockerImage, Lab, LabInstance, Identifier, User, LabInstanceKubernetes, \
     LabDockerImage
 
+if TYPE_CHECKING:  # pragma: no cover - the expiry scheduler module imports this module
+    from lab_orchestrator_lib.controller.expiry_scheduler import ExpiryScheduler
+
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Gives the thread pool that is used to make requests concurrently. It's created on the first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(thread_name_prefix="lab_orchestrator_lib")
+    return _executor
+
+
+@dataclass
+class LabInstanceStatus:
+    """Status of a lab instance in Kubernetes.
+
+    :param namespace: The namespace of the lab instance as YAML str. If the namespace doesn't exist, it's a Kubernetes
+                      status object with code 404.
+    :param virtual_machine_instances: The list of VMIs in the namespace as YAML str.
+    """
+    namespace: str
+    virtual_machine_instances: str
+
 
 class UserController:
     """User controller.
@@ -40,7 +80,7 @@ class UserController:
 
         :return: A list of all objects of the adapter.
         """
-        return self.adapter.get_all()
+        return call_adapter(self.adapter, "get_all")
 
     def get(self, identifier: Identifier) -> User:
         """Gives a specific object of the adapter.
@@ -48,7 +88,7 @@ class UserController:
         :param identifier: The identifier of the object.
         :return: The specific object.
         """
-        return self.adapter.get(identifier)
+        return call_adapter(self.adapter, "get", identifier)
 
 
 class NamespaceController(NotNamespacedController):
@@ -136,7 +176,7 @@ class DockerImageController(AdapterController):
         :param url: Url of the docker image.
         :return: The created docker image.
         """
-        return self.adapter.create(name, description, url)
+        return self._call("create", name, description, url)
 
 
 class LabDockerImageController(AdapterController):
@@ -153,15 +193,23 @@ class LabDockerImageController(AdapterController):
         """
         super().__init__(adapter)
 
-    def create(self, lab_id: Identifier, docker_image_id: Identifier, docker_image_name: str) -> LabDockerImage:
+    def create(self, lab_id: Identifier, docker_image_id: Identifier, docker_image_name: str,
+               cores: Optional[int] = None, memory: Optional[str] = None, cpu_limit: Optional[str] = None,
+               memory_limit: Optional[str] = None) -> LabDockerImage:
         """Creates a new lab docker image.
 
         :param lab_id: Id of the lab.
         :param docker_image_id: Id of the docker image.
         :param docker_image_name: Name of the VM.
+        :param cores: Amount of cpu cores of the VM. If None: the default is used.
+        :param memory: Memory that is requested by the VM. If None: the default is used.
+        :param cpu_limit: Maximum cpu usage of the VM. If None: no limit.
+        :param memory_limit: Maximum memory usage of the VM. If None: no limit.
         :return: The created lab docker image.
         """
-        return self.adapter.create(lab_id, docker_image_id, docker_image_name)
+        sizing = {key: value for key, value in (("cores", cores), ("memory", memory), ("cpu_limit", cpu_limit),
+                                                ("memory_limit", memory_limit)) if value is not None}
+        return self._call("create", lab_id, docker_image_id, docker_image_name, **sizing)
 
 
 class LabController(AdapterController):
@@ -178,15 +226,20 @@ class LabController(AdapterController):
         """
         super().__init__(adapter)
 
-    def create(self, name: str, namespace_prefix: str, description: str) -> Lab:
+    def create(self, name: str, namespace_prefix: str, description: str, ttl: Optional[int] = None,
+               idle_timeout: Optional[int] = None) -> Lab:
         """Creates a new lab.
 
         :param name: The name of the lab.
         :param namespace_prefix: The namespace prefix of the lab.
         :param description: The description of the lab
+        :param ttl: Seconds after that a lab instance of this lab is deleted. If None: forever.
+        :param idle_timeout: Seconds without activity after that a lab instance of this lab is deleted. If None:
+                             forever.
         :return: The created docker image.
         """
-        return self.adapter.create(name=name, namespace_prefix=namespace_prefix, description=description)
+        expiry = {key: value for key, value in (("ttl", ttl), ("idle_timeout", idle_timeout)) if value is not None}
+        return self._call("create", name=name, namespace_prefix=namespace_prefix, description=description, **expiry)
 
 
 class VirtualMachineInstanceController(NamespacedController):
@@ -197,6 +250,8 @@ class VirtualMachineInstanceController(NamespacedController):
     """
 
     template_file = 'vmi_template.yaml'
+    default_cores = 3
+    default_memory = "3G"
 
     def __init__(self, registry: APIRegistry, namespace_ctrl: NamespaceController,
                  docker_image_ctrl: DockerImageController, lab_docker_image_ctrl: LabDockerImageController,
@@ -221,6 +276,30 @@ class VirtualMachineInstanceController(NamespacedController):
         """
         return self.registry.virtual_machine_instance
 
+    def get_resource_requests(self, lab_docker_image: LabDockerImage) -> Tuple[int, str]:
+        """Gives the resources that a virtual machine instance of the lab docker image requests.
+
+        :param lab_docker_image: The lab docker image.
+        :return: A tuple of the amount of cores and the memory quantity.
+        """
+        cores = self.default_cores if lab_docker_image.cores is None else lab_docker_image.cores
+        memory = self.default_memory if lab_docker_image.memory is None else lab_docker_image.memory
+        return cores, memory
+
+    @staticmethod
+    def get_resource_limits(lab_docker_image: LabDockerImage) -> Optional[Dict[str, str]]:
+        """Gives the resource limits of a virtual machine instance of the lab docker image.
+
+        :param lab_docker_image: The lab docker image.
+        :return: A dictionary with the limits or None if the VM has no limits.
+        """
+        limits = {}
+        if lab_docker_image.cpu_limit is not None:
+            limits["cpu"] = lab_docker_image.cpu_limit
+        if lab_docker_image.memory_limit is not None:
+            limits["memory"] = lab_docker_image.memory_limit
+        return limits or None
+
     def create(self, namespace, lab_docker_image: LabDockerImage):
         """Creates a new virtual machine instance.
 
@@ -228,22 +307,53 @@ class VirtualMachineInstanceController(NamespacedController):
         :param lab_docker_image: Lab docker image that should be started.
         :return: YAML str of the created virtual machine instance.
         """
-        docker_image = self.docker_image_ctrl.get(lab_docker_image.docker_image_id)
-        template_data = {"cores": 3, "memory": "3G",
-                         "vm_image": docker_image.url, "vmi_name": lab_docker_image.docker_image_name,
-                         "namespace": namespace}
+        template_data = self._template_data(namespace, lab_docker_image)
         data = self._get_template(template_data)
         return self._api().create(namespace, data)
 
+    def _template_data(self, namespace: str, lab_docker_image: LabDockerImage) -> Dict[str, Any]:
+        """Gives the data that is inserted into the template of a VMI.
+
+        :param namespace: Namespace of the VMI.
+        :param lab_docker_image: Lab docker image of the VMI.
+        :return: The template data.
+        """
+        docker_image = self.docker_image_ctrl.get(lab_docker_image.docker_image_id)
+        cores, memory = self.get_resource_requests(lab_docker_image)
+        return {"cores": cores, "memory": memory, "resource_limits": self.get_resource_limits(lab_docker_image),
+                "vm_image": docker_image.url, "vmi_name": lab_docker_image.docker_image_name, "namespace": namespace,
+                "api_version": self._api().api_version}
+
+    def update_vmi(self, namespace: str, current: LabDockerImage, lab_docker_image: LabDockerImage,
+                   patch_type: str = PATCH_MERGE, force: bool = False) -> Optional[str]:
+        """Changes a running virtual machine instance after its lab docker image was changed.
+
+        The patch only contains the fields of the VMI that differ between the two lab docker images, for example the
+        resource limits. If nothing changed, no request is made. Note that Kubernetes rejects changes of fields that
+        can't be changed on a running VMI.
+
+        :param namespace: Namespace of the VMI.
+        :param current: The lab docker image that was used to create the VMI.
+        :param lab_docker_image: The changed lab docker image. The name of the VM needs to be the same.
+        :param patch_type: One of `PATCH_MERGE`, `PATCH_STRATEGIC` and `PATCH_APPLY`.
+        :param force: If True, server-side apply takes the fields of other field managers that conflict.
+        :return: YAML str of the patched VMI or None if nothing changed.
+        """
+        return self.update(namespace, lab_docker_image.docker_image_name,
+                           self._template_data(namespace, current), self._template_data(namespace, lab_docker_image),
+                           patch_type=patch_type, force=force)
+
     def get_list_of_lab_instance(self, lab_instance: LabInstance, lab_ctrl: LabController):
         """Gives a list of virtual machine instances that belongs to a specific lab instance.
 
+        If the namespace of the lab instance was deleted, the list is empty. Use `get_status_of_lab_instance` to find
+        out if the namespace still exists.
+
         :param lab_instance: The lab instance.
         :param lab_ctrl: The lab controller that is used to get the namespace.
         :return: A list of VMIs that belong to this lab instance.
         """
         namespace_name = LabInstanceController.get_namespace_name(lab_instance, lab_ctrl)
-        namespace = self.namespace_ctrl.get(namespace_name)
         return self.get_list(namespace_name)
 
     def get_of_lab_instance(self, lab_instance: LabInstance, virtual_machine_instance_id,
@@ -256,9 +366,25 @@ class VirtualMachineInstanceController(NamespacedController):
         :return: The specific VMI.
         """
         namespace_name = LabInstanceController.get_namespace_name(lab_instance, lab_ctrl)
-        namespace = self.namespace_ctrl.get(namespace_name)
         return self.get(namespace_name, virtual_machine_instance_id)
 
+    def get_status_of_lab_instance(self, lab_instance: LabInstance, lab_ctrl: LabController) -> LabInstanceStatus:
+        """Gives the namespace and the VMIs of a lab instance.
+
+        Both requests are made at the same time, so this takes about as long as one request. Use this only if you need
+        the namespace, for example to show if it's terminating or was deleted. The VMI list of a deleted namespace is
+        just empty, so only the namespace response tells if the namespace exists.
+
+        :param lab_instance: The lab instance.
+        :param lab_ctrl: The lab controller that is used to get the namespace.
+        :return: The namespace and the VMIs of the lab instance.
+        """
+        namespace_name = LabInstanceController.get_namespace_name(lab_instance, lab_ctrl)
+        # the context is copied so that spans of the namespace request have the right parent
+        namespace = _get_executor().submit(contextvars.copy_context().run, self.namespace_ctrl.get, namespace_name)
+        virtual_machine_instances = self.get_list(namespace_name)
+        return LabInstanceStatus(namespace=namespace.result(), virtual_machine_instances=virtual_machine_instances)
+
 
 class LabInstanceController(AdapterController):
     """Controller of lab instances.
@@ -277,7 +403,9 @@ class LabInstanceController(AdapterController):
                  lab_ctrl: LabController,
                  network_policy_ctrl: NetworkPolicyController,
                  user_ctrl: UserController,
-                 secret_key: str):
+                 secret_key: str,
+                 token_service: Optional[TokenService] = None,
+                 expiry_scheduler: Optional["ExpiryScheduler"] = None):
         """Initializes a lab instance controller.
 
         :param adapter: The lab instance adapter that is used to connect to the database.
@@ -288,6 +416,11 @@ class LabInstanceController(AdapterController):
         :param network_policy_ctrl: The network policy controller that should be used.
         :param user_ctrl: The user controller that should be used.
         :param secret_key: The secret key that should be used to create JWT tokens.
+        :param token_service: The token service that issues and caches the JWT tokens. None: a new token service with
+                              the secret key is used.
+        :param expiry_scheduler: The expiry scheduler that created lab instances are scheduled in and deleted lab
+                                 instances are removed from. None: lab instances don't expire. It can be set later
+                                 with the attribute `expiry_scheduler`, for example by `ExpiryScheduler(attach=True)`.
         """
         super().__init__(adapter)
         self.virtual_machine_instance_ctrl = virtual_machine_instance_ctrl
@@ -297,20 +430,27 @@ class LabInstanceController(AdapterController):
         self.network_policy_ctrl = network_policy_ctrl
         self.user_ctrl = user_ctrl
         self.secret_key = secret_key
+        self.token_service = token_service if token_service is not None else TokenService(secret_key)
+        self.expiry_scheduler = expiry_scheduler
 
     @staticmethod
     def get_namespace_name(lab_instance: LabInstance, lab_ctrl: LabController) -> str:
         """Returns the namespace name where the resources of a lab instances are created.
 
         The namespace name is generated by a combination of the labs namespace prefix, the user id and the lab instance
-        id. This namespace name is unique for every lab instance.
+        id. This namespace name is unique for every lab instance. It's saved in the lab instance when the lab instance
+        is created, then no lab needs to be loaded. Lab instances that were saved without namespace name get it from
+        the lab and keep it in the object.
 
         :param lab_instance: The lab instance from which you want the namespace name.
         :param lab_ctrl: The lab controller that should be used.
         :return: The name of the namespace.
         """
-        lab = lab_ctrl.get(lab_instance.lab_id)
-        return LabInstanceController.gen_namespace_name(lab, lab_instance.user_id, lab_instance.primary_key)
+        if lab_instance.namespace_name is None:
+            lab = lab_ctrl.get(lab_instance.lab_id)
+            lab_instance.namespace_name = LabInstanceController.gen_namespace_name(lab, lab_instance.user_id,
+                                                                                   lab_instance.primary_key)
+        return lab_instance.namespace_name
 
     @staticmethod
     def gen_namespace_name(lab: Lab, user_id, lab_instance_id) -> str:
@@ -327,7 +467,7 @@ class LabInstanceController(AdapterController):
 
         return f"{lab.namespace_prefix}-{user_id}-{lab_instance_id}"
 
-    def create(self, lab_id: Identifier, user_id: Identifier) -> LabInstanceKubernetes:
+    def create(self, lab_id: Identifier, user_id: Identifier, cluster: Optional[str] = None) -> LabInstanceKubernetes:
         """Creates a lab instance.
 
         Creating a lab instance is equivalent to starting a lab for a user. This contains creating a namespace, a
@@ -336,36 +476,63 @@ class LabInstanceController(AdapterController):
 
         :param lab_id: The id of the lab.
         :param user_id: The id of the user.
+        :param cluster: Name of the cluster the registry of this controller belongs to. It's saved in the lab instance.
+                        Only needed if multiple clusters are used.
         :return: Returns a lab instance kubernetes object.
         :raise Exception: if parameters are invalid.
         """
+        with tracing.get_tracer().start_span("LabInstanceController.create",
+                                             {"lab_id": lab_id, "user_id": user_id}) as span:
+            lab_instance_kubernetes = self._create(lab_id, user_id, cluster)
+            span.set_attribute("lab_instance_id", lab_instance_kubernetes.primary_key)
+            return lab_instance_kubernetes
+
+    def _create(self, lab_id: Identifier, user_id: Identifier, cluster: Optional[str]) -> LabInstanceKubernetes:
+        """Creates a lab instance. See `create`."""
+        recorder = metrics.get_recorder()
+        start = time.perf_counter() if recorder.enabled else 0.0
         lab = self.lab_ctrl.get(lab_id)
         if lab is None:
-            print("lab not found")
+            logger.warning("Lab %s not found.", lab_id, extra={"lab_id": lab_id, "user_id": user_id})
             # TODO sinnvolle exception werfen
             raise Exception
         user = self.user_ctrl.get(user_id)
         if user is None:
-            print("user not found")
+            logger.warning("User %s not found.", user_id, extra={"lab_id": lab_id, "user_id": user_id})
             # TODO sinnvolle exception werfen
             raise Exception
-        lab_instance = self.adapter.create(lab_id=lab_id, user_id=user_id)
-        print("lab_instance")
-        print(lab_instance)
+        with recorder.time(metrics.LAB_START_STEP_DURATION, {"step": "lab_instance"}):
+            if cluster is None:
+                lab_instance = self._call("create", lab_id=lab_id, user_id=user_id)
+            else:
+                lab_instance = self._call("create", lab_id=lab_id, user_id=user_id, cluster=cluster)
         # create namespace
         namespace_name = LabInstanceController.gen_namespace_name(lab, user_id, lab_instance.primary_key)
-        print("namespace_name")
-        print(namespace_name)
-        namespace = self.namespace_ctrl.create(namespace_name)
-        print("namespace")
-        print(namespace)
+        lab_instance.namespace_name = namespace_name
+        try:
+            self._call("set_namespace_name", lab_instance.primary_key, namespace_name)
+        except NotImplementedError:
+            # the namespace name is calculated from the lab when it's needed
+            logger.debug("Adapter can't save the namespace name of lab instance %s.", lab_instance.primary_key,
+                         extra={"lab_instance_id": lab_instance.primary_key, "namespace": namespace_name})
+        # checked once, so the log records are only built if debug logging is enabled
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            logger.debug("Created lab instance %s.", lab_instance.primary_key,
+                         extra={"lab_instance_id": lab_instance.primary_key, "namespace": namespace_name})
+        with recorder.time(metrics.LAB_START_STEP_DURATION, {"step": "namespace"}):
+            namespace = self.namespace_ctrl.create(namespace_name)
+        if debug:
+            logger.debug("Created namespace %s: %s", namespace_name, namespace,
+                         extra={"lab_instance_id": lab_instance.primary_key, "namespace": namespace_name})
         # TODO fix response code
         # TODO log if deletion doesn't work
         #if namespace.response_code != 0:
         #    self.adapter.delete(lab_instance.primary_key)
         #    raise Exception
         # create network policy
-        network_policy = self.network_policy_ctrl.create(namespace_name)
+        with recorder.time(metrics.LAB_START_STEP_DURATION, {"step": "network_policy"}):
+            network_policy = self.network_policy_ctrl.create(namespace_name)
         #if network_policy.response_code != 0:
         #    self.adapter.delete(lab_instance.primary_key)
         #    self.namespace_ctrl.delete(namespace_name)
@@ -373,44 +540,164 @@ class LabInstanceController(AdapterController):
         # create vmi
         lab_docker_images = self.lab_docker_image_ctrl.filter(lab_id=lab_id)
         for lab_docker_image in lab_docker_images:
-            print(f"Starting VMI: {lab_docker_image.docker_image_name} - {lab_docker_image.docker_image_id}")
-            vmi = self.virtual_machine_instance_ctrl.create(namespace_name, lab_docker_image)
+            if debug:
+                logger.debug("Starting VMI %s of docker image %s.", lab_docker_image.docker_image_name,
+                             lab_docker_image.docker_image_id,
+                             extra={"lab_instance_id": lab_instance.primary_key, "namespace": namespace_name,
+                                    "vmi": lab_docker_image.docker_image_name})
+            with recorder.time(metrics.LAB_START_STEP_DURATION, {"step": "vmi"}):
+                vmi = self.virtual_machine_instance_ctrl.create(namespace_name, lab_docker_image)
             #if vmi.response_code != 0:
             #    self.adapter.delete(lab_instance.primary_key)
             #    self.namespace_ctrl.delete(namespace_name)
             #    raise Exception
         allowed_vmis = [lab_docker_image.docker_image_name for lab_docker_image in lab_docker_images]
+        from lab_orchestrator_lib_auth.auth import LabInstanceTokenParams
         lab_instance_token_params = LabInstanceTokenParams(lab_id, lab_instance.primary_key, namespace_name,
                                                            allowed_vmis)
-        token = generate_auth_token(user_id=user_id, lab_instance_token_params=lab_instance_token_params,
-                                    secret_key=self.secret_key)
+        with recorder.time(metrics.LAB_START_STEP_DURATION, {"step": "token"}):
+            token = self.token_service.issue(user_id, lab_instance_token_params)
+        if self.expiry_scheduler is not None:
+            self.expiry_scheduler.schedule(lab_instance, lab)
+        if recorder.enabled:
+            recorder.observe(metrics.LAB_START_DURATION, time.perf_counter() - start)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Started lab instance %s of lab %s for user %s.", lab_instance.primary_key, lab_id, user_id,
+                        extra={"lab_instance_id": lab_instance.primary_key, "lab_id": lab_id, "user_id": user_id,
+                               "namespace": namespace_name})
         return LabInstanceKubernetes(primary_key=lab_instance.primary_key, lab_id=lab_id, user_id=user_id,
-                                     jwt_token=token, allowed_vmis=allowed_vmis)
+                                     jwt_token=token, allowed_vmis=allowed_vmis, cluster=cluster)
 
     def delete(self, lab_instance: LabInstance) -> None:
         """Deletes a lab instance.
 
-        This also deletes the created namespace with all resources that are contained in this namespace.
+        This also deletes the created namespace with all resources that are contained in this namespace and removes the
+        lab instance from the expiry scheduler.
 
         :param lab_instance: The lab instance that should be deleted.
         :return: None
         """
-        lab = self.lab_ctrl.get(lab_instance.lab_id)
-        namespace_name = LabInstanceController.gen_namespace_name(lab, lab_instance.user_id, lab_instance.primary_key)
-        # this also deletes VMIs and all other resources in the namespace
-        self.namespace_ctrl.delete(namespace_name)
-        # now delete local object
-        super().delete(lab_instance.primary_key)
+        with tracing.get_tracer().start_span("LabInstanceController.delete",
+                                             {"lab_instance_id": lab_instance.primary_key}):
+            namespace_name = LabInstanceController.get_namespace_name(lab_instance, self.lab_ctrl)
+            # this also deletes VMIs and all other resources in the namespace
+            self.namespace_ctrl.delete(namespace_name)
+            # now delete local object
+            super().delete(lab_instance.primary_key)
+            self.token_service.invalidate(lab_instance.primary_key)
+            if self.expiry_scheduler is not None:
+                self.expiry_scheduler.cancel(lab_instance.primary_key)
+
+    def get_token(self, lab_instance: LabInstance, refresh: bool = False) -> LabInstanceKubernetes:
+        """Gives a token for a lab instance that already exists, for example when the user opens the lab again.
+
+        The cached token is given if it's still valid long enough, else a new token is issued.
+
+        :param lab_instance: The lab instance.
+        :param refresh: If True, a new token is issued even if the cached token is still valid.
+        :return: A lab instance kubernetes object with the token.
+        """
+        return self.get_tokens([lab_instance], refresh=refresh)[0]
+
+    def get_tokens(self, lab_instances: Iterable[LabInstance], refresh: bool = False) -> List[LabInstanceKubernetes]:
+        """Gives tokens for many lab instances at once, for example after many labs were started.
+
+        The lab and its lab docker images are loaded once per lab and all tokens are issued together.
+
+        :param lab_instances: The lab instances.
+        :param refresh: If True, new tokens are issued even if cached tokens are still valid.
+        :return: A lab instance kubernetes object with the token for every lab instance, in the same order.
+        """
+        from lab_orchestrator_lib_auth.auth import LabInstanceTokenParams
+        lab_instances = list(lab_instances)
+        self._add_namespace_names(lab_instances)
+        allowed_vmis_of_lab: Dict[Identifier, List[str]] = {}
+        requests = []
+        for lab_instance in lab_instances:
+            if lab_instance.lab_id not in allowed_vmis_of_lab:
+                lab_docker_images = self.lab_docker_image_ctrl.filter(lab_id=lab_instance.lab_id)
+                allowed_vmis_of_lab[lab_instance.lab_id] = [lab_docker_image.docker_image_name
+                                                            for lab_docker_image in lab_docker_images]
+            allowed_vmis = allowed_vmis_of_lab[lab_instance.lab_id]
+            namespace_name = lab_instance.namespace_name
+            requests.append((lab_instance.user_id, LabInstanceTokenParams(
+                lab_instance.lab_id, lab_instance.primary_key, namespace_name, allowed_vmis)))
+        tokens = self.token_service.issue_many(requests, refresh=refresh)
+        return [LabInstanceKubernetes(primary_key=lab_instance.primary_key, lab_id=lab_instance.lab_id,
+                                      user_id=lab_instance.user_id, jwt_token=token,
+                                      allowed_vmis=params.allowed_vmi_names, cluster=lab_instance.cluster)
+                for lab_instance, (_, params), token in zip(lab_instances, requests, tokens)]
+
+    def get(self, identifier) -> LabInstance:
+        """Gives a specific lab instance.
+
+        If the lab instance was saved without namespace name, the namespace name is added to the object.
+
+        :param identifier: The identifier of the lab instance.
+        :return: The specific lab instance.
+        """
+        lab_instance = self._call("get", identifier)
+        if lab_instance is not None:
+            self._add_namespace_names([lab_instance])
+        return lab_instance
 
     def get_list_of_user(self, user: User) -> List[LabInstance]:
         """Gives a list of lab instances that belong to a specific user.
 
+        If lab instances were saved without namespace name, the namespace names are added to the objects.
+
         :param user: The user that belongs to the lab instances.
         :return: A list of lab instances that belongs to the user.
         """
-        lab_instances = self.adapter.filter(user_id=user.primary_key)
+        lab_instances = self._call("filter", user_id=user.primary_key)
+        self._add_namespace_names(lab_instances)
         return lab_instances
 
+    def _add_namespace_names(self, lab_instances: Iterable[LabInstance]) -> None:
+        """Adds the namespace names to lab instances that were saved without them. Nothing is saved.
+
+        Every lab is only loaded once. Columnar collections are skipped, because their objects are created on access.
+
+        :param lab_instances: The lab instances.
+        :return: None
+        """
+        if isinstance(lab_instances, LabInstanceColumns):
+            return
+        labs: Dict[Identifier, Lab] = {}
+        for lab_instance in lab_instances:
+            if lab_instance.namespace_name is not None:
+                continue
+            if lab_instance.lab_id not in labs:
+                labs[lab_instance.lab_id] = self.lab_ctrl.get(lab_instance.lab_id)
+            lab_instance.namespace_name = LabInstanceController.gen_namespace_name(
+                labs[lab_instance.lab_id], lab_instance.user_id, lab_instance.primary_key)
+
+    def migrate_namespace_names(self) -> int:
+        """Saves the namespace names of all lab instances that were saved without them.
+
+        Call this once after the namespace name column was added to your database. Every lab is only loaded once.
+
+        :return: The amount of lab instances whose namespace name was saved.
+        :raise NotImplementedError: if the adapter doesn't implement `set_namespace_name`.
+        """
+        lab_instances = [lab_instance for lab_instance in self._call("get_all")
+                         if lab_instance.namespace_name is None]
+        self._add_namespace_names(lab_instances)
+        for lab_instance in lab_instances:
+            self._call("set_namespace_name", lab_instance.primary_key, lab_instance.namespace_name)
+        return len(lab_instances)
+
+    def get_columns(self, **kwargs) -> LabInstanceColumns:
+        """Gives the lab instances as columnar collection, for example to count them per lab or user.
+
+        If the adapter already returns a `LabInstanceColumns` object, it is used directly.
+
+        :param kwargs: Filters like in `filter`. If empty, all lab instances are given.
+        :return: The lab instances as columnar collection.
+        """
+        lab_instances = self._call("filter", **kwargs) if kwargs else self._call("get_all")
+        return LabInstanceColumns.from_lab_instances(lab_instances)
+
     def save(self, obj: LabInstance) -> LabInstance:
         """Removes the inherited save method, because lab instances can't be changed.
 
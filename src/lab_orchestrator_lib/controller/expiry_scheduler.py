@@ -0,0 +1,257 @@
+"""Contains a scheduler that deletes lab instances when their time to live or idle timeout is over.
+
+The deadlines of all lab instances are held in a min-heap, so finding the next lab instance that expires doesn't need
+to scan all lab instances. The time to live and idle timeout are configured per lab with the attributes `ttl` and
+`idle_timeout`. The activity of lab instances is only held in memory: after a restart the idle timeout of every lab
+instance starts again, so lab instances that are still used are not deleted.
+"""
+
+import heapq
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from lab_orchestrator_lib.controller.controller import LabInstanceController, LabController
+from lab_orchestrator_lib.model.model import Identifier, Lab, LabInstance
+
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    """Expiry information of a single lab instance."""
+
+    def __init__(self, lab_instance: LabInstance, started_at: float, last_activity: float, ttl: Optional[int],
+                 idle_timeout: Optional[int]):
+        self.lab_instance = lab_instance
+        self.started_at = started_at
+        self.last_activity = last_activity
+        self.ttl = ttl
+        self.idle_timeout = idle_timeout
+        self.version = 0
+
+    def deadline(self) -> Optional[float]:
+        """Gives the point in time when the lab instance expires.
+
+        :return: Unix timestamp of the expiry or None if the lab instance never expires.
+        """
+        deadlines = []
+        if self.ttl is not None:
+            deadlines.append(self.started_at + self.ttl)
+        if self.idle_timeout is not None:
+            deadlines.append(self.last_activity + self.idle_timeout)
+        if len(deadlines) == 0:
+            return None
+        return min(deadlines)
+
+
+class ExpiryScheduler:
+    """Deletes lab instances after their time to live or idle timeout is over.
+
+    Lab instances need to be registered with `schedule` after they are created and removed with `cancel` when they are
+    deleted. With `attach=True` the lab instance controller does both. After a restart `rebuild` registers all lab
+    instances from the database again. Expired lab instances are deleted in batches through
+    `LabInstanceController.delete`, so their namespaces are removed from Kubernetes too. Either call `run_pending`
+    periodically by your own or use `start` to run the scheduler in a background thread.
+    """
+
+    def __init__(self, lab_instance_ctrl: LabInstanceController, lab_ctrl: LabController,
+                 clock: Callable[[], float] = time.time, batch_size: int = 50, retry_delay: float = 60,
+                 attach: bool = False):
+        """Initializes an expiry scheduler.
+
+        :param lab_instance_ctrl: The lab instance controller that is used to delete lab instances.
+        :param lab_ctrl: The lab controller that is used to get the ttl and idle timeout of labs.
+        :param clock: Function that gives the current unix timestamp. Can be changed for tests.
+        :param batch_size: Maximum amount of lab instances that are deleted in one run.
+        :param retry_delay: Seconds to wait before the deletion of a lab instance is retried when it failed.
+        :param attach: If True, the scheduler is set as `expiry_scheduler` of the lab instance controller, which
+                       schedules created lab instances and cancels deleted ones.
+        """
+        self.lab_instance_ctrl = lab_instance_ctrl
+        self.lab_ctrl = lab_ctrl
+        self.clock = clock
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self._heap: List[Tuple[float, int, Identifier, int]] = []
+        self._entries: Dict[Identifier, _Entry] = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        if attach:
+            lab_instance_ctrl.expiry_scheduler = self
+
+    def __len__(self) -> int:
+        """Gives the amount of scheduled lab instances."""
+        return len(self._entries)
+
+    def _push(self, entry: _Entry, deadline: Optional[float] = None) -> None:
+        """Adds the deadline of an entry to the heap. Old heap items of the entry get invalid.
+
+        Needs to be called with the lock acquired.
+        """
+        entry.version += 1
+        if deadline is None:
+            deadline = entry.deadline()
+        if deadline is None:
+            return
+        self._counter += 1
+        heapq.heappush(self._heap, (deadline, self._counter, entry.lab_instance.primary_key, entry.version))
+        # invalid items are removed lazily, compact the heap if there are too many of them
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [item for item in self._heap
+                          if (e := self._entries.get(item[2])) is not None and e.version == item[3]]
+            heapq.heapify(self._heap)
+        self._wakeup.set()
+
+    def schedule(self, lab_instance: LabInstance, lab: Optional[Lab] = None,
+                 last_activity: Optional[float] = None) -> Optional[float]:
+        """Registers a lab instance in the scheduler.
+
+        :param lab_instance: The lab instance that should expire.
+        :param lab: The lab of the lab instance. If None: the lab is received from the lab controller.
+        :param last_activity: Unix timestamp of the last activity that starts the idle timeout. If None: the creation
+                              time of the lab instance.
+        :return: Unix timestamp when the lab instance expires or None if its lab has no ttl and no idle timeout.
+        """
+        if lab is None:
+            lab = self.lab_ctrl.get(lab_instance.lab_id)
+        started_at = lab_instance.created_at if lab_instance.created_at is not None else self.clock()
+        if last_activity is None:
+            last_activity = started_at
+        entry = _Entry(lab_instance, started_at, last_activity, lab.ttl, lab.idle_timeout)
+        deadline = entry.deadline()
+        if deadline is None:
+            return None
+        with self._lock:
+            self._entries[lab_instance.primary_key] = entry
+            self._push(entry, deadline)
+        return deadline
+
+    def touch(self, lab_instance_id: Identifier) -> Optional[float]:
+        """Marks a lab instance as active, which resets its idle timeout.
+
+        :param lab_instance_id: The id of the lab instance.
+        :return: The new expiry unix timestamp or None if the lab instance is not scheduled.
+        """
+        with self._lock:
+            entry = self._entries.get(lab_instance_id)
+            if entry is None:
+                return None
+            entry.last_activity = self.clock()
+            if entry.idle_timeout is not None:
+                self._push(entry)
+            return entry.deadline()
+
+    def cancel(self, lab_instance_id: Identifier) -> bool:
+        """Removes a lab instance from the scheduler. Use this if you delete a lab instance by your own.
+
+        :param lab_instance_id: The id of the lab instance.
+        :return: True if the lab instance was scheduled.
+        """
+        with self._lock:
+            return self._entries.pop(lab_instance_id, None) is not None
+
+    def rebuild(self) -> int:
+        """Registers all lab instances from the database again.
+
+        This should be called after a restart. It needs one call to get all labs and one call to get all lab
+        instances. The time to live is calculated from the creation time of the lab instances. The activity before the
+        restart is not known, so the idle timeout of every lab instance starts again now.
+
+        :return: The amount of scheduled lab instances.
+        """
+        labs = {lab.primary_key: lab for lab in self.lab_ctrl.get_all()}
+        now = self.clock()
+        with self._lock:
+            self._entries.clear()
+            self._heap.clear()
+        for lab_instance in self.lab_instance_ctrl.get_all():
+            lab = labs.get(lab_instance.lab_id)
+            if lab is None:
+                logger.warning("Lab %s of lab instance %s not found.", lab_instance.lab_id, lab_instance.primary_key)
+                continue
+            self.schedule(lab_instance, lab, last_activity=now)
+        return len(self._entries)
+
+    def next_deadline(self) -> Optional[float]:
+        """Gives the unix timestamp of the next expiry or None if nothing is scheduled."""
+        with self._lock:
+            while self._heap:
+                deadline, _, lab_instance_id, version = self._heap[0]
+                entry = self._entries.get(lab_instance_id)
+                if entry is not None and entry.version == version:
+                    return deadline
+                heapq.heappop(self._heap)
+            return None
+
+    def _pop_expired(self, now: float) -> List[_Entry]:
+        """Removes up to `batch_size` expired entries from the scheduler."""
+        expired = []
+        with self._lock:
+            while self._heap and len(expired) < self.batch_size:
+                deadline, _, lab_instance_id, version = self._heap[0]
+                if deadline > now:
+                    break
+                heapq.heappop(self._heap)
+                entry = self._entries.get(lab_instance_id)
+                if entry is None or entry.version != version:
+                    continue
+                del self._entries[lab_instance_id]
+                expired.append(entry)
+        return expired
+
+    def run_pending(self) -> List[LabInstance]:
+        """Deletes one batch of expired lab instances.
+
+        If the deletion of a lab instance fails it is retried after `retry_delay` seconds.
+
+        :return: The deleted lab instances.
+        """
+        deleted = []
+        for entry in self._pop_expired(self.clock()):
+            try:
+                self.lab_instance_ctrl.delete(entry.lab_instance)
+                deleted.append(entry.lab_instance)
+            except Exception:
+                logger.exception("Deleting expired lab instance %s failed.", entry.lab_instance.primary_key)
+                with self._lock:
+                    self._entries.setdefault(entry.lab_instance.primary_key, entry)
+                    self._push(entry, self.clock() + self.retry_delay)
+        return deleted
+
+    def _run(self, max_interval: float) -> None:
+        """Loop of the background thread."""
+        while not self._stopped.is_set():
+            while self.run_pending():
+                pass
+            self._wakeup.clear()
+            next_deadline = self.next_deadline()
+            timeout = max_interval
+            if next_deadline is not None:
+                timeout = min(max(next_deadline - self.clock(), 0), max_interval)
+            self._wakeup.wait(timeout)
+
+    def start(self, max_interval: float = 60) -> None:
+        """Starts a background thread that deletes expired lab instances.
+
+        :param max_interval: Maximum amount of seconds the thread sleeps between two runs.
+        """
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(max_interval,), daemon=True,
+                                        name="lab-instance-expiry")
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background thread."""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._wakeup.set()
+        self._thread.join()
+        self._thread = None
@@ -1,7 +1,9 @@
 """Contains generic controllers that can be used for Kubernetes controllers."""
+import json
 from typing import Optional
 
 from lab_orchestrator_lib.kubernetes.api import APIRegistry, NamespacedApi, NotNamespacedApi
+from lab_orchestrator_lib.kubernetes.patch import PATCH_MERGE, PATCH_APPLY, create_merge_patch
 from lab_orchestrator_lib.template_engine import TemplateEngine
 
 
@@ -38,6 +40,25 @@ class KubernetesController:
         """
         return self.template_engine.replace_template(template=self.template_file, data=template_data)
 
+    def _get_patch(self, current_template_data, template_data, patch_type: str = PATCH_MERGE) -> Optional[str]:
+        """Returns a patch that changes an object that was created with the current template data to the object of the
+        new template data.
+
+        Merge and strategic patches only contain the changed fields. Server-side apply needs the complete object, so
+        the patch is the whole rendered template.
+
+        :param current_template_data: Data that was inserted into the template of the existing object.
+        :param template_data: Data that should be inserted into the template now.
+        :param patch_type: One of `PATCH_MERGE`, `PATCH_STRATEGIC` and `PATCH_APPLY`.
+        :return: The patch as JSON str or None if nothing changed.
+        """
+        current = self.template_engine.load_template(self.template_file, current_template_data)
+        desired = self.template_engine.load_template(self.template_file, template_data)
+        patch = create_merge_patch(current, desired)
+        if not patch:
+            return None
+        return json.dumps(desired if patch_type == PATCH_APPLY else patch)
+
 
 class NamespacedController(KubernetesController):
     """Abstract base controller for namespaced resources.
@@ -79,6 +100,37 @@ class NamespacedController(KubernetesController):
         """
         return self._api().delete(namespace, identifier)
 
+    def patch(self, namespace, identifier, data: str, patch_type: str = PATCH_MERGE, force: bool = False) -> str:
+        """Patches a specific object in the namespace.
+
+        :param namespace: Namespace of the object.
+        :param identifier: Identifier of the object.
+        :param data: The patch.
+        :param patch_type: One of `PATCH_MERGE`, `PATCH_STRATEGIC` and `PATCH_APPLY`.
+        :param force: If True, server-side apply takes the fields of other field managers that conflict.
+        :return: A YAML string that contains the patched object.
+        """
+        return self._api().patch(namespace, identifier, data, patch_type=patch_type, force=force)
+
+    def update(self, namespace, identifier, current_template_data, template_data, patch_type: str = PATCH_MERGE,
+               force: bool = False) -> Optional[str]:
+        """Changes an object that was created from the template to the object of new template data.
+
+        Only the difference between the two rendered templates is sent. If nothing changed, no request is made.
+
+        :param namespace: Namespace of the object.
+        :param identifier: Identifier of the object.
+        :param current_template_data: Data that was inserted into the template of the existing object.
+        :param template_data: Data that should be inserted into the template now.
+        :param patch_type: One of `PATCH_MERGE`, `PATCH_STRATEGIC` and `PATCH_APPLY`.
+        :param force: If True, server-side apply takes the fields of other field managers that conflict.
+        :return: A YAML string that contains the patched object or None if nothing changed.
+        """
+        data = self._get_patch(current_template_data, template_data, patch_type)
+        if data is None:
+            return None
+        return self.patch(namespace, identifier, data, patch_type=patch_type, force=force)
+
 
 class NotNamespacedController(KubernetesController):
     """Abstract base controller for not namespaced resources.
@@ -116,3 +168,32 @@ class NotNamespacedController(KubernetesController):
         :return: A string that contains the deletion status.
         """
         return self._api().delete(identifier)
+
+    def patch(self, identifier, data: str, patch_type: str = PATCH_MERGE, force: bool = False):
+        """Patches a specific object.
+
+        :param identifier: Identifier of the object.
+        :param data: The patch.
+        :param patch_type: One of `PATCH_MERGE`, `PATCH_STRATEGIC` and `PATCH_APPLY`.
+        :param force: If True, server-side apply takes the fields of other field managers that conflict.
+        :return: A YAML string that contains the patched object.
+        """
+        return self._api().patch(identifier, data, patch_type=patch_type, force=force)
+
+    def update(self, identifier, current_template_data, template_data, patch_type: str = PATCH_MERGE,
+               force: bool = False) -> Optional[str]:
+        """Changes an object that was created from the template to the object of new template data.
+
+        Only the difference between the two rendered templates is sent. If nothing changed, no request is made.
+
+        :param identifier: Identifier of the object.
+        :param current_template_data: Data that was inserted into the template of the existing object.
+        :param template_data: Data that should be inserted into the template now.
+        :param patch_type: One of `PATCH_MERGE`, `PATCH_STRATEGIC` and `PATCH_APPLY`.
+        :param force: If True, server-side apply takes the fields of other field managers that conflict.
+        :return: A YAML string that contains the patched object or None if nothing changed.
+        """
+        data = self._get_patch(current_template_data, template_data, patch_type)
+        if data is None:
+            return None
+        return self.patch(identifier, data, patch_type=patch_type, force=force)
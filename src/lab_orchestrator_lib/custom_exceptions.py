@@ -4,3 +4,21 @@
 class ValidationError(Exception):
     """Error that is raised if a model should be created with invalid inputs."""
     pass
+
+
+class AdmissionError(Exception):
+    """Error that is raised if a lab instance can't be admitted to the cluster."""
+    pass
+
+
+class KubernetesApiError(Exception):
+    """Error that is raised if the Kubernetes API answers with an error where no response text can be returned.
+
+    :param status_code: The HTTP status code of the response.
+    :param text: The text body of the response, usually a Kubernetes Status object.
+    """
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"The Kubernetes API answered with {status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
@@ -1,5 +1,5 @@
 """Contains all adapters that needs to be implemented to use the lab orchestrator lib."""
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Optional, Sequence
 
 from lab_orchestrator_lib.model.model import DockerImage, Lab, LabInstance, Identifier, User, LabDockerImage
 
@@ -92,12 +92,15 @@ class DockerImageAdapterInterface:
 class LabDockerImageAdapterInterface:
     """Adapter that is used to connect the lab docker image model to the database."""
 
-    def create(self, lab_id: Identifier, docker_image_id: Identifier, docker_image_name: str) -> LabDockerImage:
+    def create(self, lab_id: Identifier, docker_image_id: Identifier, docker_image_name: str,
+               **sizing: Any) -> LabDockerImage:
         """Creates a lab docker image and saves it to the database.
 
         :param lab_id: Id of the lab.
         :param docker_image_id: Id of the docker image.
         :param docker_image_name: Name of the VM.
+        :param sizing: Optional sizing of the VM. Can contain `cores`, `memory`, `cpu_limit` and `memory_limit`. Only
+                       the values that are set are passed.
         :return: A newly added lab docker image.
         :raise NotImplementedError: Method needs to be implemented.
         """
@@ -151,14 +154,22 @@ class LabDockerImageAdapterInterface:
 
 
 class LabAdapterInterface:
-    """Adapter that is used to connect the lab model to the database."""
+    """Adapter that is used to connect the lab model to the database.
 
-    def create(self, name: str, namespace_prefix: str, description: str) -> Lab:
+    The optional `ttl` and `idle_timeout` attributes of labs are given to `create` and should be saved too, because
+    they are needed to expire lab instances.
+    """
+
+    def create(self, name: str, namespace_prefix: str, description: str, ttl: Optional[int] = None,
+               idle_timeout: Optional[int] = None) -> Lab:
         """Creates a lab and saves it to the database.
 
         :param name: Name of the lab.
         :param namespace_prefix: Namespace prefix of the lab.
         :param description: Description of the lab.
+        :param ttl: Seconds after that a lab instance of this lab is deleted. None means forever.
+        :param idle_timeout: Seconds without activity after that a lab instance of this lab is deleted. None means
+                             forever.
         :return: A newly added lab.
         :raise NotImplementedError: Method needs to be implemented.
         """
@@ -214,19 +225,26 @@ class LabAdapterInterface:
 class LabInstanceAdapterInterface:
     """Adapter that is used to connect the lab instance model to the database."""
 
-    def create(self, lab_id: Identifier, user_id: Identifier) -> LabInstance:
+    def create(self, lab_id: Identifier, user_id: Identifier, **kwargs: Any) -> LabInstance:
         """Creates a lab instance and saves it to the database.
 
+        The adapter should set `created_at` of the lab instance to the current unix timestamp, so the expiry of the
+        lab instance can be calculated after a restart.
+
         :param lab_id: Lab id of the lab instance.
         :param user_id: User id of the lab instance.
+        :param kwargs: Optional attributes of the lab instance. Contains `cluster` if multiple clusters are used.
         :return: A newly added lab instance.
         :raise NotImplementedError: Method needs to be implemented.
         """
         raise NotImplementedError()
 
-    def get_all(self) -> List[LabInstance]:
+    def get_all(self) -> Sequence[LabInstance]:
         """Gives all lab instances.
 
+        Instead of a list, the adapter can return a `LabInstanceColumns` object, which needs less memory for many lab
+        instances. It can be created with `LabInstanceColumns.from_rows(...)`.
+
         :return: A list of all lab instances.
         :raise NotImplementedError: Method needs to be implemented.
         """
@@ -259,10 +277,25 @@ class LabInstanceAdapterInterface:
         """
         raise NotImplementedError()
 
-    def filter(self, **kwargs: Dict[str, Any]) -> List[LabInstance]:
+    def set_namespace_name(self, identifier: Identifier, namespace_name: str) -> None:
+        """Saves the namespace name of a lab instance to the database.
+
+        The namespace name contains the primary key, so the lab instance controller calls this right after `create`.
+        It's also used by `LabInstanceController.migrate_namespace_names` for lab instances that were saved without
+        namespace name. If it's not implemented, the namespace names are calculated from the labs when they are needed.
+
+        :param identifier: The identifier of the lab instance.
+        :param namespace_name: The name of the namespace of the lab instance.
+        :return: None
+        :raise NotImplementedError: Method needs to be implemented.
+        """
+        raise NotImplementedError()
+
+    def filter(self, **kwargs: Dict[str, Any]) -> Sequence[LabInstance]:
         """Filters the lab instances and returns all lab instances that matches the filter criteria.
 
         The database should be filtered by the attributes and belonging values that are given in the kwargs dictionary.
+        Like in `get_all`, the adapter can return a `LabInstanceColumns` object instead of a list.
 
         :param kwargs: A dictionary with filters.
         :return: All lab instances that matches the filters.
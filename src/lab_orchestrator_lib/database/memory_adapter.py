@@ -0,0 +1,129 @@
+"""Contains adapters that keep all objects in memory.
+
+These adapters are not persistent. They are meant for tests, benchmarks and trying out the library without a database.
+"""
+import threading
+import time
+from typing import Any, Dict, Generic, Iterable, List, Optional, Sequence, Type, TypeVar
+
+from lab_orchestrator_lib.database.adapter import UserAdapterInterface, DockerImageAdapterInterface, \
+    LabDockerImageAdapterInterface, LabAdapterInterface, LabInstanceAdapterInterface
+from lab_orchestrator_lib.model.columnar import LabInstanceColumns
+from lab_orchestrator_lib.model.model import Model, Identifier, User, DockerImage, LabDockerImage, Lab, LabInstance
+
+ModelType = TypeVar('ModelType', bound=Model)
+
+
+class MemoryAdapter(Generic[ModelType]):
+    """Generic adapter that saves the objects in a dictionary.
+
+    New objects get ascending integer primary keys.
+
+    :param model: The model class of the adapter. Should be overwritten by the class.
+    """
+
+    model: Type[ModelType] = None
+
+    def __init__(self, objects: Iterable[ModelType] = ()):
+        """Initializes a memory adapter.
+
+        :param objects: Objects that should be added to the adapter.
+        """
+        self.objects: Dict[Identifier, ModelType] = {obj.primary_key: obj for obj in objects}
+        self._counter = max([0] + [key for key in self.objects if isinstance(key, int)])
+        self._lock = threading.Lock()
+
+    def _create(self, *args: Any, **kwargs: Any) -> ModelType:
+        """Creates a new object with the next primary key and saves it.
+
+        :return: The created object.
+        """
+        with self._lock:
+            self._counter += 1
+            obj = self.model(self._counter, *args, **kwargs)
+            self.objects[obj.primary_key] = obj
+        return obj
+
+    def get_all(self) -> List[ModelType]:
+        return list(self.objects.values())
+
+    def get(self, identifier: Identifier) -> Optional[ModelType]:
+        return self.objects.get(identifier)
+
+    def delete(self, identifier: Identifier) -> None:
+        with self._lock:
+            self.objects.pop(identifier, None)
+
+    def save(self, obj: ModelType) -> ModelType:
+        with self._lock:
+            self.objects[obj.primary_key] = obj
+        return obj
+
+    def filter(self, **kwargs: Any) -> List[ModelType]:
+        return [obj for obj in list(self.objects.values())
+                if all(getattr(obj, key) == value for key, value in kwargs.items())]
+
+
+class MemoryUserAdapter(MemoryAdapter[User], UserAdapterInterface):
+    """User adapter that keeps the users in memory."""
+
+    model = User
+
+
+class MemoryDockerImageAdapter(MemoryAdapter[DockerImage], DockerImageAdapterInterface):
+    """Docker image adapter that keeps the docker images in memory."""
+
+    model = DockerImage
+
+    def create(self, name: str, description: str, url: str) -> DockerImage:
+        return self._create(name, description, url)
+
+
+class MemoryLabDockerImageAdapter(MemoryAdapter[LabDockerImage], LabDockerImageAdapterInterface):
+    """Lab docker image adapter that keeps the lab docker images in memory."""
+
+    model = LabDockerImage
+
+    def create(self, lab_id: Identifier, docker_image_id: Identifier, docker_image_name: str,
+               **sizing: Any) -> LabDockerImage:
+        return self._create(lab_id, docker_image_id, docker_image_name, **sizing)
+
+
+class MemoryLabAdapter(MemoryAdapter[Lab], LabAdapterInterface):
+    """Lab adapter that keeps the labs in memory."""
+
+    model = Lab
+
+    def create(self, name: str, namespace_prefix: str, description: str, ttl: Optional[int] = None,
+               idle_timeout: Optional[int] = None) -> Lab:
+        return self._create(name, namespace_prefix, description, ttl, idle_timeout)
+
+
+class MemoryLabInstanceAdapter(MemoryAdapter[LabInstance], LabInstanceAdapterInterface):
+    """Lab instance adapter that keeps the lab instances in memory."""
+
+    model = LabInstance
+
+    def __init__(self, objects: Iterable[LabInstance] = (), columnar: bool = False):
+        """Initializes a memory lab instance adapter.
+
+        :param objects: Lab instances that should be added to the adapter.
+        :param columnar: If True, `get_all` and `filter` return `LabInstanceColumns` instead of lists.
+        """
+        super().__init__(objects)
+        self.columnar = columnar
+
+    def get_all(self) -> Sequence[LabInstance]:
+        lab_instances = super().get_all()
+        return LabInstanceColumns.from_lab_instances(lab_instances) if self.columnar else lab_instances
+
+    def filter(self, **kwargs: Any) -> Sequence[LabInstance]:
+        lab_instances = super().filter(**kwargs)
+        return LabInstanceColumns.from_lab_instances(lab_instances) if self.columnar else lab_instances
+
+    def create(self, lab_id: Identifier, user_id: Identifier, **kwargs: Any) -> LabInstance:
+        return self._create(lab_id, user_id, created_at=time.time(), **kwargs)
+
+    def set_namespace_name(self, identifier: Identifier, namespace_name: str) -> None:
+        with self._lock:
+            self.objects[identifier].namespace_name = namespace_name
@@ -1,10 +1,23 @@
 """Maps the Kubernetes API."""
 
 import logging
+import threading
+import time
 from abc import ABC
-from typing import Dict, Type, Callable, Union, Optional, Any
+from typing import Dict, Type, Callable, Union, Optional, Any, Tuple, Iterator
 
-import requests
+from lab_orchestrator_lib import metrics, tracing
+from lab_orchestrator_lib.custom_exceptions import KubernetesApiError
+from lab_orchestrator_lib.kubernetes.list_stream import CHUNK_SIZE, iter_list_items
+from lab_orchestrator_lib.kubernetes.patch import PATCH_MERGE, PATCH_APPLY, PATCH_CONTENT_TYPES, \
+    DEFAULT_FIELD_MANAGER
+from lab_orchestrator_lib.kubernetes.response_cache import ResponseCache, validation_address, \
+    validated_resource_version
+from lab_orchestrator_lib.kubernetes.single_flight import SingleFlight
+from lab_orchestrator_lib.kubernetes.token_source import TokenSource, StaticTokenSource
+from lab_orchestrator_lib.kubernetes.transport import Transport
+
+logger = logging.getLogger(__name__)
 
 _API_EXTENSIONS_NAMESPACED: Dict[str, Type['NamespacedApi']] = {}
 _API_EXTENSIONS_NOT_NAMESPACED: Dict[str, Type['NotNamespacedApi']] = {}
@@ -45,14 +58,54 @@ def add_api_not_namespaced(name: str) -> NotNamespacedApiDecorator:
     return inner
 
 
+def _endpoint_label(address: str) -> str:
+    """Replaces the namespace and the resource name in an API path with placeholders.
+
+    This keeps the amount of different labels in the request metrics small.
+
+    :param address: API path without base_uri, for example "/api/v1/namespaces/lab-1".
+    :return: The path with placeholders, for example "/api/v1/namespaces/{name}".
+    """
+    parts = address.split("?", 1)[0].strip("/").split("/")
+    if parts[0] == "api":
+        prefix = 2
+    elif parts[0] == "apis":
+        prefix = 3
+    else:
+        return address
+    rest = parts[prefix:]
+    resource = 0
+    if len(rest) >= 3 and rest[0] == "namespaces":
+        rest[1] = "{namespace}"
+        resource = 2
+    if len(rest) > resource + 1:
+        rest[resource + 1] = "{name}"
+    return "/" + "/".join(parts[:prefix] + rest)
+
+
 class Proxy:
     """This proxy is used to make requests to the Kubernetes API.
 
-    This proxy adds authentication headers and checks the SSL certificates.
+    This proxy adds authentication headers and checks the SSL certificates. The token is taken from a token source for
+    every request. If the API answers with 401, the token source is refreshed and the request is retried once.
+
+    Identical GET requests that run at the same time are coalesced: only the first one is sent and the others get its
+    result. After a POST, DELETE or PATCH request, GET requests don't join requests that were started before.
+
+    GET requests accept gzip compressed responses. `iter_list` streams a list and parses its items while they arrive.
+
+    With a `ResponseCache` the responses of GET requests are kept for a short time. Expired objects are revalidated with
+    their resource version. POST, DELETE and PATCH requests invalidate the cached responses of the resources they change.
+
+    The requests are sent by a `Transport`. By default the functions of the requests library are used, which open a new
+    connection for every request. `SessionTransport` keeps a pool of HTTP/1.1 connections and `Http2Transport`
+    multiplexes concurrent requests over one HTTP/2 connection.
     """
 
     def __init__(self, base_uri: str, service_account_token: Optional[str] = None,
-                 cacert: Optional[str] = None, insecure_ssl: bool = False, requests_lib=requests):
+                 cacert: Optional[str] = None, insecure_ssl: bool = False, requests_lib=None,
+                 token_source: Optional[TokenSource] = None, coalesce: bool = True,
+                 cache: Optional[ResponseCache] = None, transport: Optional[Transport] = None):
         """Initializes a proxy object.
 
         :param base_uri: The base uri that is added before every api address. (For example: "https://localhost:8000/")
@@ -60,20 +113,48 @@ class Proxy:
         :param cacert: The file path to the file containing the ca cert that should verify the ssl connection.
         :param insecure_ssl: If this is true, ssl will be deactivated.
         :param requests_lib: The requests library wich makes the requests. Default: requests, but can be changed for mockups.
+        :param token_source: Gives the token, for example a `FileTokenSource` that reloads rotated tokens. If given, the
+                             service_account_token is not used.
+        :param coalesce: If True, identical GET requests that run at the same time share one request.
+        :param cache: Optional cache of the responses of GET requests. If None: every GET request is sent.
+        :param transport: The transport that sends the requests, for example a `SessionTransport` or `Http2Transport`.
+                          Can't be combined with requests_lib.
+        :raise ValueError: If requests_lib and transport are both given.
         """
+        if transport is not None:
+            if requests_lib is not None:
+                raise ValueError("Only one of requests_lib and transport can be given.")
+            requests_lib = transport
+        elif requests_lib is None:
+            # imported here, because requests takes longer to import than the whole library
+            import requests as requests_lib
         self.requests = requests_lib
-        if service_account_token is None:
-            logging.warning("No service account token.")
+        if token_source is None:
+            token_source = StaticTokenSource(service_account_token)
+        self.token_source = token_source
+        if token_source.get_token() is None:
+            logger.warning("No service account token.")
         if cacert is None:
-            logging.warning("No cacert.")
+            logger.warning("No cacert.")
         self.base_uri = base_uri
-        self.service_account_token = service_account_token
         if insecure_ssl:
             self.verify = False
         elif cacert is None:
             self.verify = True
         else:
             self.verify = cacert
+        self.single_flight = SingleFlight() if coalesce else None
+        self.cache = cache
+
+    @property
+    def transport(self) -> Any:
+        """The transport or requests library that sends the requests."""
+        return self.requests
+
+    @property
+    def service_account_token(self) -> Optional[str]:
+        """The current token of the token source."""
+        return self.token_source.get_token()
 
     def get(self, address: str) -> str:
         """Makes a get request.
@@ -84,11 +165,119 @@ class Proxy:
         :param address: API path without base_uri. The address is put together with the base_uri.
         :return: The text body of the response. Should be in the YAML format.
         """
-        headers = {"Authorization": f"Bearer {self.service_account_token}"}
-        response = self.requests.get(self.base_uri + address,
-                                     headers=headers, verify=self.verify)
+        if self.cache is not None:
+            text = self.cache.get(address)
+            if text is not None:
+                self._record_cache(address, "hit")
+                return text
+        if self.single_flight is None:
+            return self._get(address)
+        text, shared = self.single_flight.do(address, lambda: self._get(address))
+        if shared:
+            self._record_coalesced(address)
+        return text
+
+    async def get_async(self, address: str) -> str:
+        """Makes a get request from a coroutine.
+
+        The request is sent in the default executor of the running event loop. Identical requests of coroutines and
+        threads are coalesced like in `get`.
+
+        :param address: API path without base_uri. The address is put together with the base_uri.
+        :return: The text body of the response. Should be in the YAML format.
+        """
+        if self.cache is not None:
+            text = self.cache.get(address)
+            if text is not None:
+                self._record_cache(address, "hit")
+                return text
+        if self.single_flight is None:
+            import asyncio
+            return await asyncio.get_running_loop().run_in_executor(None, self._get, address)
+        text, shared = await self.single_flight.do_async(address, lambda: self._get(address))
+        if shared:
+            self._record_coalesced(address)
+        return text
+
+    def _get(self, address: str) -> str:
+        """Sends a get request. With a cache, expired responses are revalidated and new responses are cached."""
+        cache = self.cache
+        if cache is None:
+            return self._send_get(address).text
+        generation = cache.generation
+        entry = cache.get_entry(address)
+        if entry is not None:
+            if cache.is_fresh(entry):
+                # another request cached it while this one waited
+                cache.count_hit()
+                self._record_cache(address, "hit")
+                return entry.text
+            validation = validation_address(address, entry.resource_version)
+            if validation is not None:
+                response = self._send_get(validation)
+                if getattr(response, "status_code", 200) == 200 and \
+                        validated_resource_version(address, response.text) == entry.resource_version:
+                    cache.revalidated(address, entry, generation)
+                    self._record_cache(address, "revalidated")
+                    return entry.text
+        response = self._send_get(address)
+        if getattr(response, "status_code", 200) == 200:
+            cache.put(address, response.text, generation)
+            self._record_cache(address, "miss")
         return response.text
 
+    def _send_get(self, address: str) -> Any:
+        """Sends a get request and gives the response."""
+        headers = {"Authorization": f"Bearer {self.token_source.get_token()}", "Accept-Encoding": "gzip"}
+        return self._send("GET", self.requests.get, address, headers=headers, verify=self.verify)
+
+    def iter_list(self, address: str, metadata: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Makes a get request of a list and yields the items while the response arrives.
+
+        The response is requested gzip compressed and decompressed and parsed in chunks, so the first items can be
+        used before the whole list was transferred. The request is sent when the first item is requested. It's not
+        coalesced and not cached.
+
+        :param address: API path of a list without base_uri. The address is put together with the base_uri.
+        :param metadata: Optional dict that is updated with the metadata of the list, for example the resourceVersion.
+        :return: Iterator over the items of the list as dicts.
+        :raise KubernetesApiError: If the API answers with an error.
+        :raise ValueError: If the response is no JSON list.
+        """
+        headers = {"Authorization": f"Bearer {self.token_source.get_token()}", "Accept": "application/json",
+                   "Accept-Encoding": "gzip"}
+        response = self._send("GET", self.requests.get, address, headers=headers, verify=self.verify, stream=True)
+        try:
+            status_code = getattr(response, "status_code", 200)
+            if status_code != 200:
+                raise KubernetesApiError(status_code, response.text)
+            yield from iter_list_items(response.iter_content(CHUNK_SIZE), metadata)
+        finally:
+            response.close()
+
+    @staticmethod
+    def _record_coalesced(address: str) -> None:
+        """Counts a get request that got the result of another request."""
+        recorder = metrics.get_recorder()
+        if recorder.enabled:
+            recorder.inc(metrics.KUBERNETES_COALESCED_REQUESTS, {"endpoint": _endpoint_label(address)})
+
+    @staticmethod
+    def _record_cache(address: str, result: str) -> None:
+        """Counts a lookup in the response cache."""
+        recorder = metrics.get_recorder()
+        if recorder.enabled:
+            recorder.inc(metrics.KUBERNETES_CACHE_REQUESTS, {"endpoint": _endpoint_label(address), "result": result})
+
+    def _changed(self, address: str) -> None:
+        """Lets the following get requests not join the requests that were started before a change and removes the
+        changed resources from the cache. Called even if the change failed, because the API could have made it
+        anyway."""
+        if self.single_flight is not None:
+            self.single_flight.forget()
+        if self.cache is not None:
+            self.cache.invalidate(address)
+
     def post(self, address: str, data: str) -> str:
         """Makes a post request.
 
@@ -99,10 +288,12 @@ class Proxy:
         :param data: POST body data. Should be a YAML string.
         :return: The text body of the response. Should be in the YAML format.
         """
-        headers = {"Authorization": f"Bearer {self.service_account_token}",
+        headers = {"Authorization": f"Bearer {self.token_source.get_token()}",
                    "Content-Type": "application/yaml"}
-        response = self.requests.post(self.base_uri + address,
-                                      data=data, headers=headers, verify=self.verify)
+        try:
+            response = self._send("POST", self.requests.post, address, data=data, headers=headers, verify=self.verify)
+        finally:
+            self._changed(address)
         return response.text
 
     def delete(self, address) -> str:
@@ -114,11 +305,91 @@ class Proxy:
         :param address: API path without base_uri. The address is put together with the base_uri.
         :return: The text body of the response. Should be in the YAML format.
         """
-        headers = {"Authorization": f"Bearer {self.service_account_token}"}
-        response = self.requests.delete(self.base_uri + address,
-                                        headers=headers, verify=self.verify)
+        headers = {"Authorization": f"Bearer {self.token_source.get_token()}"}
+        try:
+            response = self._send("DELETE", self.requests.delete, address, headers=headers, verify=self.verify)
+        finally:
+            self._changed(address)
+        return response.text
+
+    def patch(self, address: str, data: str, patch_type: str = PATCH_MERGE,
+              field_manager: str = DEFAULT_FIELD_MANAGER, force: bool = False) -> str:
+        """Makes a patch request.
+
+        This method makes a patch request to the Kubernetes API with authorization added and the SSL certificates
+        checked.
+
+        :param address: API path without base_uri. The address is put together with the base_uri.
+        :param data: The patch. JSON for merge and strategic patches, YAML or JSON for server-side apply.
+        :param patch_type: One of `PATCH_MERGE`, `PATCH_STRATEGIC` and `PATCH_APPLY`.
+        :param field_manager: The field manager of server-side apply.
+        :param force: If True, server-side apply takes the fields of other field managers that conflict.
+        :return: The text body of the response. Should be in the YAML format.
+        :raise ValueError: If the patch type is unknown.
+        """
+        content_type = PATCH_CONTENT_TYPES.get(patch_type)
+        if content_type is None:
+            raise ValueError(f"Unknown patch type {patch_type}.")
+        if patch_type == PATCH_APPLY:
+            address = f"{address}?fieldManager={field_manager}" + ("&force=true" if force else "")
+        headers = {"Authorization": f"Bearer {self.token_source.get_token()}",
+                   "Content-Type": content_type}
+        try:
+            response = self._send("PATCH", self.requests.patch, address, data=data, headers=headers, verify=self.verify)
+        finally:
+            self._changed(address)
         return response.text
 
+    def _send(self, method: str, send: Callable[..., Any], address: str, **kwargs: Any) -> Any:
+        """Sends a request, records the request metrics and creates a span for it.
+
+        :param method: The http method, used as metric label.
+        :param send: The function of the transport that sends the request.
+        :param address: API path without base_uri.
+        :param kwargs: Arguments of the send function.
+        :return: The response.
+        """
+        recorder = metrics.get_recorder()
+        tracer = tracing.get_tracer()
+        if not recorder.enabled and not tracer.enabled:
+            return self._request(send, address, kwargs)
+        endpoint = _endpoint_label(address)
+        with tracer.start_span(f"kubernetes {method}", {"http.method": method, "endpoint": endpoint,
+                                                        "address": address}) as span:
+            status = "error"
+            start = time.perf_counter()
+            try:
+                response = self._request(send, address, kwargs)
+                status = str(getattr(response, "status_code", ""))
+                span.set_attribute("http.status_code", status)
+                return response
+            finally:
+                recorder.observe(metrics.KUBERNETES_REQUEST_DURATION, time.perf_counter() - start,
+                                 {"method": method, "endpoint": endpoint})
+                recorder.inc(metrics.KUBERNETES_REQUESTS, {"method": method, "endpoint": endpoint, "status": status})
+
+    def _request(self, send: Callable[..., Any], address: str, kwargs: Dict[str, Any]) -> Any:
+        """Sends a request and retries it once with a refreshed token if the token was rejected.
+
+        :param send: The function of the transport that sends the request.
+        :param address: API path without base_uri.
+        :param kwargs: Arguments of the send function. The headers need to contain the authorization.
+        :return: The response.
+        """
+        response = send(self.base_uri + address, **kwargs)
+        if getattr(response, "status_code", None) != 401:
+            return response
+        authorization = f"Bearer {self.token_source.refresh()}"
+        if authorization == kwargs["headers"].get("Authorization"):
+            return response
+        if hasattr(response, "close"):
+            # a streamed response needs to be read, so its connection can be used for the retry
+            getattr(response, "text", None)
+            response.close()
+        logger.info("Retrying the request with a refreshed token.")
+        kwargs = dict(kwargs, headers=dict(kwargs["headers"], Authorization=authorization))
+        return send(self.base_uri + address, **kwargs)
+
 
 class APIRegistry:
     """This class is a container of Kubernetes API endpoints.
@@ -127,15 +398,76 @@ class APIRegistry:
     `add_api_not_namespaced` with a given name. After registering them they are available through their given name
     as attribute of this class. For example you register the Blahaj-API as "blahaj" then you can access it like this:
     `APIRegistry(proxy).blahaj`. This gives us a convenient way to add and access the needed Kubernetes APIs.
+
+    With an `ApiDiscovery` the extensions use the api versions that are served by the cluster instead of their default
+    versions. The versions are resolved on the first access and the urls of all extensions are prepared then. They are
+    resolved again when the discovered groups expire. If the discovery fails, the default versions are used until a
+    later discovery succeeds.
     """
 
-    def __init__(self, proxy: Proxy):
+    def __init__(self, proxy: Proxy, discovery=None):
         """Initializes an APIRegistry object.
 
         :param proxy: The proxy that should be used to make requests. The proxy already contains all information about
                       the Kubernetes API addresses.
+        :param discovery: Optional `lab_orchestrator_lib.kubernetes.discovery.ApiDiscovery` that resolves the api
+                          versions of the extensions. If None: the default versions of the extensions are used.
         """
         self.proxy = proxy
+        self.discovery = discovery
+        self._endpoints: Optional[Dict[str, Optional[Tuple[str, str, str]]]] = None
+        self._endpoints_expires = 0.0
+        self._endpoints_lock = threading.Lock()
+
+    def _get_endpoints(self) -> Optional[Dict[str, Optional[Tuple[str, str, str]]]]:
+        """Resolves the api versions of all extensions and prepares their urls.
+
+        The urls are kept until the discovered groups expire. Extensions that are added later are resolved when they
+        are used the first time.
+
+        :return: The api version, the list url and the detail url of the extensions by name. None for an extension if
+                 it couldn't be resolved and uses its defaults. None if the discovery failed.
+        """
+        now = self.discovery.clock()
+        if self._endpoints is None or now >= self._endpoints_expires:
+            with self._endpoints_lock:
+                if self._endpoints is None or now >= self._endpoints_expires:
+                    self._endpoints = None
+                    self.discovery.get_groups()
+                    expires = self.discovery.expires
+                    if now >= expires:
+                        # nothing is kept, so the next access tries the discovery again
+                        return None
+                    endpoints: Dict[str, Optional[Tuple[str, str, str]]] = {}
+                    for extensions in (_API_EXTENSIONS_NAMESPACED, _API_EXTENSIONS_NOT_NAMESPACED):
+                        for name, cls in extensions.items():
+                            self._resolve(endpoints, name, cls)
+                    self._endpoints = endpoints
+                    self._endpoints_expires = expires
+                return self._endpoints
+        return self._endpoints
+
+    def _resolve(self, endpoints: Dict[str, Optional[Tuple[str, str, str]]], name: str,
+                 cls: Type['ApiExtension']) -> None:
+        """Resolves the api version of one extension and adds its urls to the endpoints."""
+        api_version = self.discovery.resolve(cls)
+        endpoints[name] = None if api_version is None else (api_version,) + cls.url_templates(api_version)
+
+    def _create(self, name: str, cls: Type['ApiExtension']) -> 'ApiExtension':
+        """Creates an instance of an extension that uses the resolved api version."""
+        api = cls(self.proxy)
+        if self.discovery is None:
+            return api
+        endpoints = self._get_endpoints()
+        if endpoints is None:
+            return api
+        if name not in endpoints:
+            with self._endpoints_lock:
+                self._resolve(endpoints, name, cls)
+        endpoint = endpoints[name]
+        if endpoint is not None:
+            api.api_version, api.list_url, api.detail_url = endpoint
+        return api
 
     def __dir__(self):
         """This method is used to make the dynamic attributes of this class available to autocompletion.
@@ -159,9 +491,9 @@ class APIRegistry:
         """
         cls: Union[Optional[Type['NamespacedApi']], Optional[Type['NotNamespacedApi']]]
         if cls := _API_EXTENSIONS_NAMESPACED.get(name):
-            return cls(self.proxy)
+            return self._create(name, cls)
         if cls := _API_EXTENSIONS_NOT_NAMESPACED.get(name):
-            return cls(self.proxy)
+            return self._create(name, cls)
         raise AttributeError(f'{name} not found')
 
 
@@ -176,10 +508,17 @@ class ApiExtension(ABC):
 
     :param list_url: Will be formatted. Which variables will be inserted depends on the ApiExtension type.
     :param details_url: Will be formatted. Which variables will be inserted depends on the ApiExtension type.
+    :param api_version: The api version with group of the default urls, for example "kubevirt.io/v1alpha3".
+    :param api_versions: The versions of the group the extension supports in the order of preference. If empty, the
+                         version isn't resolved by the API discovery.
+    :param resource: Name of the resource in the urls, for example "virtualmachineinstances".
     """
 
     list_url = None
     detail_url = None
+    api_version: Optional[str] = None
+    api_versions: Tuple[str, ...] = ()
+    resource: Optional[str] = None
 
     def __init__(self, proxy: Proxy):
         """Initializes an ApiExtension object.
@@ -188,6 +527,21 @@ class ApiExtension(ABC):
         """
         self.proxy = proxy
 
+    @staticmethod
+    def _api_prefix(api_version: str) -> str:
+        """Gives the path prefix of an api version. The core group is below /api, all other groups below /apis."""
+        return f"/apis/{api_version}" if "/" in api_version else f"/api/{api_version}"
+
+    @classmethod
+    def url_templates(cls, api_version: str) -> Tuple[str, str]:
+        """Gives the list url and the detail url of the resource in an api version.
+
+        :param api_version: The api version with group, for example "kubevirt.io/v1".
+        :return: The list url and the detail url.
+        :raise NotImplementedError: Needs to be implemented by the extension type.
+        """
+        raise NotImplementedError()
+
 
 class NamespacedApi(ApiExtension):
     """Abstract base class extension for resource object that are namespaced.
@@ -196,6 +550,16 @@ class NamespacedApi(ApiExtension):
     :detail_url: Will be formated with the variable "namespace" and "identifier".
     """
 
+    @classmethod
+    def url_templates(cls, api_version: str) -> Tuple[str, str]:
+        """Gives the list url and the detail url of the resource in an api version.
+
+        :param api_version: The api version with group, for example "kubevirt.io/v1".
+        :return: The list url and the detail url.
+        """
+        list_url = f"{cls._api_prefix(api_version)}/namespaces/{{namespace}}/{cls.resource}"
+        return list_url, list_url + "/{identifier}"
+
     def get_list(self, namespace: str) -> str:
         """Will get a list of all resource object in the namespace.
 
@@ -204,6 +568,16 @@ class NamespacedApi(ApiExtension):
         """
         return self.proxy.get(self.list_url.format(namespace=namespace))
 
+    def iter_list(self, namespace: str, metadata: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Iterates over all resource objects in the namespace while the list is transferred.
+
+        :param namespace: The namespace where to get the resource objects from.
+        :param metadata: Optional dict that is updated with the metadata of the list, for example the resourceVersion.
+        :return: Iterator over the resource objects as dicts.
+        :raise KubernetesApiError: If the API answers with an error.
+        """
+        return self.proxy.iter_list(self.list_url.format(namespace=namespace), metadata)
+
     def create(self, namespace: str, data: str) -> str:
         """Creates a new resource object in the namespace.
 
@@ -231,6 +605,20 @@ class NamespacedApi(ApiExtension):
         """
         return self.proxy.delete(self.detail_url.format(namespace=namespace, identifier=identifier))
 
+    def patch(self, namespace: str, identifier: str, data: str, patch_type: str = PATCH_MERGE,
+              force: bool = False) -> str:
+        """Patches a specific resource object in a namespace.
+
+        :param namespace: The namespace of the resource object.
+        :param identifier: The identifier of the resource object.
+        :param data: The patch.
+        :param patch_type: One of `PATCH_MERGE`, `PATCH_STRATEGIC` and `PATCH_APPLY`.
+        :param force: If True, server-side apply takes the fields of other field managers that conflict.
+        :return: The patched resource object as YAML str.
+        """
+        return self.proxy.patch(self.detail_url.format(namespace=namespace, identifier=identifier), data,
+                                patch_type=patch_type, force=force)
+
 
 class NotNamespacedApi(ApiExtension):
     """Abstract base class extension for resource object that are not namespaced.
@@ -239,6 +627,16 @@ class NotNamespacedApi(ApiExtension):
     :detail_url: Will be formated with the variable "identifier".
     """
 
+    @classmethod
+    def url_templates(cls, api_version: str) -> Tuple[str, str]:
+        """Gives the list url and the detail url of the resource in an api version.
+
+        :param api_version: The api version with group, for example "v1".
+        :return: The list url and the detail url.
+        """
+        list_url = f"{cls._api_prefix(api_version)}/{cls.resource}"
+        return list_url, list_url + "/{identifier}"
+
     def get_list(self) -> str:
         """Will get a list of all resource object.
 
@@ -246,6 +644,15 @@ class NotNamespacedApi(ApiExtension):
         """
         return self.proxy.get(self.list_url)
 
+    def iter_list(self, metadata: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Iterates over all resource objects while the list is transferred.
+
+        :param metadata: Optional dict that is updated with the metadata of the list, for example the resourceVersion.
+        :return: Iterator over the resource objects as dicts.
+        :raise KubernetesApiError: If the API answers with an error.
+        """
+        return self.proxy.iter_list(self.list_url, metadata)
+
     def create(self, data: str) -> str:
         """Creates a new resource object.
 
@@ -270,6 +677,18 @@ class NotNamespacedApi(ApiExtension):
         """
         return self.proxy.delete(self.detail_url.format(identifier=identifier))
 
+    def patch(self, identifier: str, data: str, patch_type: str = PATCH_MERGE, force: bool = False) -> str:
+        """Patches a specific resource object.
+
+        :param identifier: The identifier of the resource object.
+        :param data: The patch.
+        :param patch_type: One of `PATCH_MERGE`, `PATCH_STRATEGIC` and `PATCH_APPLY`.
+        :param force: If True, server-side apply takes the fields of other field managers that conflict.
+        :return: The patched resource object as YAML str.
+        """
+        return self.proxy.patch(self.detail_url.format(identifier=identifier), data, patch_type=patch_type,
+                                force=force)
+
 
 @add_api_not_namespaced("namespace")
 class Namespace(NotNamespacedApi):
@@ -279,6 +698,8 @@ class Namespace(NotNamespacedApi):
     """
     list_url = "/api/v1/namespaces"
     detail_url = "/api/v1/namespaces/{identifier}"
+    api_version = "v1"
+    resource = "namespaces"
 
 
 @add_api_namespaced("virtual_machine_instance")
@@ -290,6 +711,9 @@ class VirtualMachineInstance(NamespacedApi):
     """
     list_url = "/apis/kubevirt.io/v1alpha3/namespaces/{namespace}/virtualmachineinstances/"
     detail_url = "/apis/kubevirt.io/v1alpha3/namespaces/{namespace}/virtualmachineinstances/{identifier}"
+    api_version = "kubevirt.io/v1alpha3"
+    api_versions = ("v1", "v1alpha3")
+    resource = "virtualmachineinstances"
 
 
 @add_api_namespaced("network_policy")
@@ -301,3 +725,6 @@ class NetworkPolicy(NamespacedApi):
     """
     list_url = "/apis/networking.k8s.io/v1/namespaces/{namespace}/networkpolicies"
     detail_url = "/apis/networking.k8s.io/v1/namespaces/{namespace}/networkpolicies/{identifier}"
+    api_version = "networking.k8s.io/v1"
+    api_versions = ("v1",)
+    resource = "networkpolicies"
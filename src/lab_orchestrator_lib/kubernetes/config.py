@@ -5,6 +5,10 @@ from dataclasses import dataclass
 from typing import Optional
 
 from lab_orchestrator_lib.kubernetes.api import Proxy, APIRegistry
+from lab_orchestrator_lib.kubernetes.discovery import ApiDiscovery
+from lab_orchestrator_lib.kubernetes.response_cache import ResponseCache, DEFAULT_MAX_BYTES
+from lab_orchestrator_lib.kubernetes.token_source import TokenSource, FileTokenSource, DEFAULT_TOKEN_FILE
+from lab_orchestrator_lib.kubernetes.transport import Transport
 
 
 @dataclass
@@ -18,6 +22,8 @@ class KubernetesConfig:
     :arg service_host: Host address of the Kubernetes API.
     :arg service_port: Port of the Kubernetes API.
     :arg base_uri: The base url that is used to connect to the Kubernetes API. (Combination of protocol, service_host and service_port)
+    :arg token_source: Optional source of the token that is used instead of service_account_token, for example to
+                       reload rotated tokens.
     """
     service_account_token: Optional[str]
     cacert: Optional[str]
@@ -25,23 +31,24 @@ class KubernetesConfig:
     service_host: str
     service_port: str
     base_uri: str
+    token_source: Optional[TokenSource] = None
 
 
 def get_kubernetes_config():
     """Use this if you run the lib inside of Kubernetes.
 
     :return: A Kubernetes config that reads the token and ca cert from Kubernetes standard directories and it
-    creates the other variables from Kubernetes variables.
+    creates the other variables from Kubernetes variables. The token is reloaded when the kubelet rotates it.
     """
-    with open('/var/run/secrets/kubernetes.io/serviceaccount/token', 'r') as file:
-        service_account_token = file.read()
+    token_source = FileTokenSource(DEFAULT_TOKEN_FILE)
+    service_account_token = token_source.get_token()
     cacert = '/var/run/secrets/kubernetes.io/serviceaccount/ca.crt'
     protocol = "https"
     kubernetes_service_host = os.environ["KUBERNETES_SERVICE_HOST"]
     kubernetes_service_port = os.environ["KUBERNETES_SERVICE_PORT"]
     base_uri = f"{protocol}://{kubernetes_service_host}:{kubernetes_service_port}"
     kubernetes_config = KubernetesConfig(service_account_token, cacert, protocol, kubernetes_service_host,
-                                         kubernetes_service_port, base_uri)
+                                         kubernetes_service_port, base_uri, token_source)
     return kubernetes_config
 
 
@@ -63,11 +70,25 @@ def get_development_config():
     return kubernetes_config
 
 
-def get_registry(kubernetes_config: KubernetesConfig):
+def get_registry(kubernetes_config: KubernetesConfig, discover: bool = False, discovery_cache_file: Optional[str] = None,
+                 discovery_ttl: float = 3600, cache_ttl: float = 0, cache_max_bytes: int = DEFAULT_MAX_BYTES,
+                 transport: Optional[Transport] = None):
     """Creates a Proxy and APIRegistry from the given Kuberntes_config.
 
     :param kubernetes_config: The Kubernetes config that should be used to create the proxy and api registry.
+    :param discover: If True, the api versions that are served by the cluster are used instead of the default versions.
+    :param discovery_cache_file: File where the discovered api versions are saved for restarts. If None: they are only
+                                 kept in memory.
+    :param discovery_ttl: Amount of seconds the discovered api versions are used.
+    :param cache_ttl: Amount of seconds the responses of GET requests are used without revalidation. If 0: responses
+                      are not cached.
+    :param cache_max_bytes: Maximal size of the cached responses in bytes.
+    :param transport: The transport that sends the requests, for example a `SessionTransport` or `Http2Transport`. If
+                      None: the requests library opens a new connection for every request.
     :return: A APIRegistry that can be injected into Kubernetes controllers.
     """
-    proxy = Proxy(kubernetes_config.base_uri, kubernetes_config.service_account_token, kubernetes_config.cacert)
-    return APIRegistry(proxy)
+    proxy = Proxy(kubernetes_config.base_uri, kubernetes_config.service_account_token, kubernetes_config.cacert,
+                  token_source=kubernetes_config.token_source,
+                  cache=ResponseCache(cache_ttl, cache_max_bytes) if cache_ttl > 0 else None, transport=transport)
+    discovery = ApiDiscovery(proxy, discovery_cache_file, discovery_ttl) if discover else None
+    return APIRegistry(proxy, discovery=discovery)
@@ -0,0 +1,191 @@
+"""Contains the discovery of the API groups and versions that are served by a Kubernetes cluster.
+
+The API extensions of the APIRegistry declare the versions they support. The discovery asks `/apis` of the cluster once
+which versions are served and resolves every extension to the version that is preferred by the cluster, or to the
+first supported version that is served. The result can be saved in a cache file, so restarted workers don't need to ask
+the cluster again until the cache is expired.
+
+Example::
+
+    discovery = ApiDiscovery(proxy, cache_file="/tmp/lab-orchestrator-discovery.json", ttl=3600)
+    registry = APIRegistry(proxy, discovery=discovery)
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Type
+
+from lab_orchestrator_lib.kubernetes.api import Proxy, ApiExtension
+
+logger = logging.getLogger(__name__)
+
+_CACHE_FORMAT = 1
+
+
+@dataclass
+class ApiGroup:
+    """A group of the Kubernetes API that is served by the cluster.
+
+    :arg name: Name of the group, for example "kubevirt.io".
+    :arg versions: The served versions, for example ["v1", "v1alpha3"].
+    :arg preferred_version: The version the cluster prefers.
+    """
+    name: str
+    versions: List[str]
+    preferred_version: Optional[str]
+
+
+class ApiDiscovery:
+    """Discovers the API groups of a cluster and resolves the versions of API extensions."""
+
+    def __init__(self, proxy: Proxy, cache_file: Optional[str] = None, ttl: float = 3600,
+                 clock: Callable[[], float] = time.time):
+        """Initializes an API discovery. No request is made until the groups are needed.
+
+        :param proxy: The proxy that is used to get `/apis`.
+        :param cache_file: File where the discovered groups are saved. If None: the groups are only kept in memory.
+        :param ttl: Amount of seconds the discovered groups are used before the cluster is asked again.
+        :param clock: Function that gives the current unix time. Only needed in tests.
+        """
+        self.proxy = proxy
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.clock = clock
+        self._groups: Optional[Dict[str, ApiGroup]] = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def expires(self) -> float:
+        """Unix time when the discovered groups expire. 0 if no groups were discovered or the discovery failed."""
+        return self._expires
+
+    def get_groups(self, refresh: bool = False) -> Dict[str, ApiGroup]:
+        """Gives the API groups that are served by the cluster.
+
+        The groups are taken from memory, then from the cache file and only if both are expired from the cluster.
+
+        :param refresh: If True, the cluster is asked even if the cached groups are not expired.
+        :return: The groups by name. Empty if the discovery failed.
+        """
+        with self._lock:
+            now = self.clock()
+            if not refresh and self._groups is not None and now < self._expires:
+                return self._groups
+            created = None if refresh else self._load_cache(now)
+            if created is None:
+                groups = self._discover()
+                if groups is None:
+                    return {}
+                created = now
+                self._groups = groups
+                self._save_cache(now)
+            self._expires = created + self.ttl
+            return self._groups
+
+    def resolve(self, extension: Type[ApiExtension]) -> Optional[str]:
+        """Resolves the api version an extension should use in this cluster.
+
+        :param extension: The API extension class. It needs `api_version`, `api_versions` and `resource`.
+        :return: The api version with group, for example "kubevirt.io/v1" or None if the extension can't be resolved.
+                 Then the default urls of the extension should be used.
+        """
+        if not extension.api_versions or extension.resource is None or "/" not in (extension.api_version or ""):
+            return None
+        group_name = extension.api_version.rsplit("/", 1)[0]
+        group = self.get_groups().get(group_name)
+        if group is None:
+            logger.warning(f"API group {group_name} is not served by the cluster.")
+            return None
+        if group.preferred_version in extension.api_versions:
+            version = group.preferred_version
+        else:
+            version = next((v for v in extension.api_versions if v in group.versions), None)
+        if version is None:
+            logger.warning(f"None of the versions {extension.api_versions} of {group_name} is served by the cluster.")
+            return None
+        return f"{group_name}/{version}"
+
+    def invalidate(self) -> None:
+        """Removes the discovered groups from memory and the cache file.
+
+        :return: None
+        """
+        with self._lock:
+            self._groups = None
+            self._expires = 0.0
+            if self.cache_file is not None:
+                try:
+                    os.remove(self.cache_file)
+                except FileNotFoundError:
+                    pass
+
+    def _discover(self) -> Optional[Dict[str, ApiGroup]]:
+        """Asks the cluster for the served groups.
+
+        :return: The groups or None if the response is no APIGroupList.
+        """
+        response = self.proxy.get("/apis")
+        try:
+            data = json.loads(response)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or data.get("kind") != "APIGroupList":
+            logger.warning("API discovery failed, the default api versions are used.")
+            return None
+        groups = {}
+        for group in data.get("groups") or []:
+            preferred = (group.get("preferredVersion") or {}).get("version")
+            versions = [version["version"] for version in group.get("versions") or []]
+            groups[group["name"]] = ApiGroup(group["name"], versions, preferred)
+        return groups
+
+    def _load_cache(self, now: float) -> Optional[float]:
+        """Loads the groups from the cache file. Needs to be called with the lock.
+
+        :param now: The current time.
+        :return: The time the cached groups were discovered or None if there is no valid cache.
+        """
+        if self.cache_file is None:
+            return None
+        try:
+            with open(self.cache_file, "r") as file:
+                data = json.load(file)
+            if data["format"] != _CACHE_FORMAT or data["base_uri"] != self.proxy.base_uri:
+                return None
+            created = float(data["created"])
+            if now >= created + self.ttl:
+                return None
+            self._groups = {name: ApiGroup(name, group["versions"], group["preferred_version"])
+                            for name, group in data["groups"].items()}
+            return created
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_cache(self, now: float) -> None:
+        """Saves the groups into the cache file. Needs to be called with the lock.
+
+        The file is replaced atomically, so other processes never read a partial file.
+
+        :param now: The time the groups were discovered.
+        """
+        if self.cache_file is None:
+            return
+        data = {"format": _CACHE_FORMAT, "base_uri": self.proxy.base_uri, "created": now,
+                "groups": {name: {"versions": group.versions, "preferred_version": group.preferred_version}
+                           for name, group in self._groups.items()}}
+        path = None
+        try:
+            fd, path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.cache_file)), suffix=".tmp")
+            with os.fdopen(fd, "w") as file:
+                json.dump(data, file)
+            os.replace(path, self.cache_file)
+        except OSError as e:
+            logger.warning(f"Can't save the API discovery cache: {e}")
+            if path is not None and os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,693 @@
+"""Contains an in-process fake of the Kubernetes API server.
+
+The fake API server implements the endpoints that are used by the APIRegistry: namespaces and namespaced resources like
+network policies and KubeVirt virtual machine instances. The state is kept in memory. Objects can be patched with merge
+patches, strategic merge patches and server-side apply. Strategic merge patches are applied like merge patches, so lists
+are replaced. Lists can be watched with `?watch=true` and filtered by name with a field selector. Like the Kubernetes API
+server, a watch fails with 410 Gone if its resource version is older than the kept event history. The served API groups
+are listed at `/apis` for the API discovery, but every group and version can be used. Large responses are gzip
+compressed if the client accepts it. If a token is set, requests without it are rejected with 401. Latency and errors
+can be injected to test and benchmark the library without a Kubernetes cluster.
+
+The server speaks HTTP/1.1 without TLS. With `http2=True` it also serves HTTP/2 without TLS (h2c) to clients that start
+the connection with the HTTP/2 preface ("prior knowledge"), so the multiplexing of HTTP/2 can be measured without
+certificates. This needs the package h2.
+
+Example::
+
+    with FakeApiServer(latency=0.005) as server:
+        registry = APIRegistry(Proxy(server.base_uri))
+        registry.namespace.create("kind: Namespace\\napiVersion: v1\\nmetadata:\\n  name: lab-1\\n")
+"""
+
+import collections
+import gzip
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, Iterator, List, Mapping, Optional, Tuple, Union
+from urllib.parse import urlsplit, parse_qs
+
+import yaml
+
+from lab_orchestrator_lib.kubernetes.patch import PATCH_CONTENT_TYPES, PATCH_APPLY, apply_merge_patch
+
+_core_matcher = re.compile(r'/api/(?P<version>[^/]+)(?:/namespaces/(?P<namespace>[^/]+)/(?P<resource>[^/]+)'
+                           r'|/(?P<cluster_resource>[^/]+))(?:/(?P<name>[^/]+))?/?')
+_group_matcher = re.compile(r'/apis/(?P<group>[^/]+)/(?P<version>[^/]+)(?:/namespaces/(?P<namespace>[^/]+)'
+                            r'/(?P<resource>[^/]+)|/(?P<cluster_resource>[^/]+))(?:/(?P<name>[^/]+))?/?')
+
+Latency = Union[float, Callable[[], float]]
+
+DEFAULT_API_GROUPS: Dict[str, List[str]] = {"kubevirt.io": ["v1", "v1alpha3"], "networking.k8s.io": ["v1"]}
+
+# first line of the connection preface of HTTP/2 clients with prior knowledge
+_HTTP2_PREFACE_LINE = b"PRI * HTTP/2.0\r\n"
+_HTTP2_PREFACE_REST = b"\r\nSM\r\n\r\n"
+
+
+class FakeApiError(Exception):
+    """Error that is converted into a Kubernetes Status response."""
+
+    def __init__(self, code: int, reason: str, message: str):
+        super().__init__(message)
+        self.code = code
+        self.reason = reason
+        self.message = message
+
+    def status(self) -> Dict[str, Any]:
+        """Gives the Kubernetes Status object of the error."""
+        return {"kind": "Status", "apiVersion": "v1", "metadata": {}, "status": "Failure", "message": self.message,
+                "reason": self.reason, "code": self.code}
+
+
+class _Route:
+    """Parsed api path."""
+
+    def __init__(self, api_version: str, resource: str, namespace: Optional[str], name: Optional[str]):
+        self.api_version = api_version
+        self.resource = resource
+        self.namespace = namespace
+        self.name = name
+
+    @property
+    def collection(self) -> Tuple[str, str, Optional[str]]:
+        """Key of the collection the resource belongs to."""
+        return self.api_version, self.resource, self.namespace
+
+
+def _parse_path(path: str) -> _Route:
+    """Parses an api path.
+
+    :param path: Path of the request without query.
+    :return: The parsed route.
+    :raise FakeApiError: if the path is not an api path.
+    """
+    if match := _core_matcher.fullmatch(path):
+        api_version = match.group("version")
+    elif match := _group_matcher.fullmatch(path):
+        api_version = f"{match.group('group')}/{match.group('version')}"
+    else:
+        raise FakeApiError(404, "NotFound", f"the server could not find the requested resource ({path})")
+    if match.group("cluster_resource") is not None:
+        return _Route(api_version, match.group("cluster_resource"), None, match.group("name"))
+    return _Route(api_version, match.group("resource"), match.group("namespace"), match.group("name"))
+
+
+class FakeApiServer:
+    """In-process fake of the Kubernetes API server.
+
+    :param objects: The stored objects by collection (api version, resource, namespace) and name.
+    :param request_count: Amount of handled requests.
+    :param connection_count: Amount of accepted connections.
+    :param bytes_sent: Amount of bytes of the response bodies that were sent, after compression. Watches are not
+                       counted.
+
+    Stored objects are never changed, changes replace them with new objects. Responses are serialized while the lock is
+    held, so they show one consistent state.
+    """
+
+    def __init__(self, latency: Latency = 0.0, error_rate: float = 0.0, error_code: int = 500,
+                 seed: Optional[int] = None, host: str = "127.0.0.1", port: int = 0, event_history: int = 10000,
+                 api_groups: Optional[Dict[str, List[str]]] = None, token: Optional[str] = None,
+                 gzip_min_size: Optional[int] = 128 * 1024, http2: bool = False):
+        """Initializes a fake API server. The server is not started.
+
+        :param latency: Seconds every request is delayed. Can be a function to simulate a distribution.
+        :param error_rate: Probability between 0 and 1 that a request fails with the error code.
+        :param error_code: HTTP status code of injected errors.
+        :param seed: Seed of the random generator that is used for the error injection.
+        :param host: Host to listen on.
+        :param port: Port to listen on. If 0: a free port is chosen.
+        :param event_history: Amount of events that are kept for watches.
+        :param api_groups: The versions of every API group that are listed at `/apis`, the first version is the
+                           preferred one. If None: `DEFAULT_API_GROUPS`.
+        :param token: The bearer token every request needs. If None: the authorization is not checked. Can be changed
+                      while the server runs to simulate a token rotation.
+        :param gzip_min_size: Responses with at least this amount of bytes are gzip compressed if the client accepts
+                              gzip, like the Kubernetes API server does. If None: responses are never compressed.
+        :param http2: If True, clients that start with the HTTP/2 preface are served with HTTP/2 without TLS (h2c).
+        :raise ImportError: If http2 is True and h2 is not installed.
+        """
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.host = host
+        self.port = port
+        self.api_groups = DEFAULT_API_GROUPS if api_groups is None else api_groups
+        self.token = token
+        self.gzip_min_size = gzip_min_size
+        if http2:
+            try:
+                import h2  # noqa: F401 - imported by the HTTP/2 connections
+            except ImportError as e:
+                raise ImportError("h2 is not installed. Install it with: pip install lab_orchestrator_lib[http2]") from e
+        self.http2 = http2
+        self.objects: Dict[Tuple[str, str, Optional[str]], Dict[str, Dict[str, Any]]] = {}
+        self.request_count = 0
+        self.connection_count = 0
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._fail_next: Deque[int] = collections.deque()
+        self._resource_version = 0
+        self._events: Deque[Tuple[int, Tuple[str, str, Optional[str]], str, Dict[str, Any]]] = \
+            collections.deque(maxlen=event_history)
+        # resource version of the newest event that was dropped from the history
+        self._compacted_resource_version = 0
+        self._condition = threading.Condition()
+        self._server: Optional[_HTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def base_uri(self) -> str:
+        """The base uri of the running server that can be used for the Proxy."""
+        if self._server is None:
+            raise RuntimeError("server is not running.")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> 'FakeApiServer':
+        """Starts the server in a background thread.
+
+        :return: The server itself.
+        """
+        self._stopped.clear()
+        self._server = _HTTPServer((self.host, self.port), _make_handler(self))
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True,
+                                        name="fake-apiserver")
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops the server and ends all watches."""
+        if self._server is None:
+            return
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self) -> 'FakeApiServer':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
+
+    def fail_next(self, code: int = 500, count: int = 1) -> None:
+        """Lets the next requests fail.
+
+        :param code: HTTP status code of the errors.
+        :param count: Amount of requests that should fail.
+        """
+        with self._condition:
+            self._fail_next.extend([code] * count)
+
+    def get_objects(self, api_version: str, resource: str, namespace: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Gives the stored objects of a collection.
+
+        :param api_version: For example "v1" or "kubevirt.io/v1alpha3".
+        :param resource: For example "namespaces" or "virtualmachineinstances".
+        :param namespace: The namespace or None for not namespaced resources.
+        :return: A list of the stored objects.
+        """
+        with self._condition:
+            return list(self.objects.get((api_version, resource, namespace), {}).values())
+
+    # request handling
+
+    def handle_request(self, method: str, target: str, headers: Mapping[str, str],
+                       body: bytes) -> Tuple[int, Union[Dict[str, Any], Iterator[Dict[str, Any]]]]:
+        """Handles a request independent of the HTTP version.
+
+        :param method: The HTTP method.
+        :param target: The path with query.
+        :param headers: The request headers with lowercase names.
+        :param body: The request body.
+        :return: The status code and the response object or, for watches, an iterator over the events.
+        """
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        try:
+            self._delay_and_inject()
+            if self.token is not None and headers.get("authorization") != f"Bearer {self.token}":
+                raise FakeApiError(401, "Unauthorized", "Unauthorized")
+            if method == "GET" and url.path.rstrip("/") == "/apis":
+                return 200, self.handle_discovery()
+            route = _parse_path(url.path)
+            if method == "GET" and route.name is None and query.get("watch", ["false"])[0] in ("true", "1"):
+                resource_version = query.get("resourceVersion", [None])[0]
+                timeout = float(query.get("timeoutSeconds", ["30"])[0])
+                return 200, self.watch(route, resource_version, timeout)
+            if method == "GET":
+                return 200, self.handle_list(route, query) if route.name is None else self.handle_get(route)
+            if method == "POST" and route.name is None:
+                return 201, self.handle_create(route, body)
+            if method == "DELETE" and route.name is not None:
+                return 200, self.handle_delete(route)
+            if method == "PATCH" and route.name is not None:
+                content_type = (headers.get("content-type") or "").split(";", 1)[0].strip()
+                return self.handle_patch(route, body, content_type, query.get("fieldManager", [None])[0])
+            raise FakeApiError(405, "MethodNotAllowed", f"method {method} is not allowed on {url.path}")
+        except FakeApiError as e:
+            return e.code, e.status()
+
+    def _response_body(self, obj: Dict[str, Any], accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Serializes a response object and compresses it if it's large and the client accepts gzip.
+
+        :param obj: The response object.
+        :param accept_encoding: The Accept-Encoding header of the request.
+        :return: The body and its content encoding or None if it's not compressed.
+        """
+        # the objects of the response can be replaced by other requests while they are serialized
+        with self._condition:
+            body = json.dumps(obj).encode("utf-8")
+        accepted = [encoding.split(";", 1)[0].strip() for encoding in (accept_encoding or "").split(",")]
+        encoding = None
+        if self.gzip_min_size is not None and len(body) >= self.gzip_min_size and "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=1)
+            encoding = "gzip"
+        with self._condition:
+            self.bytes_sent += len(body)
+        return body, encoding
+
+    def _event_line(self, event: Dict[str, Any]) -> bytes:
+        """Serializes a watch event as one line."""
+        with self._condition:
+            return json.dumps(event).encode("utf-8") + b"\n"
+
+    def _delay_and_inject(self) -> None:
+        """Simulates latency and raises injected errors."""
+        latency = self.latency() if callable(self.latency) else self.latency
+        if latency > 0:
+            time.sleep(latency)
+        with self._condition:
+            self.request_count += 1
+            code = self._fail_next.popleft() if self._fail_next else None
+            if code is None and self.error_rate > 0 and self._random.random() < self.error_rate:
+                code = self.error_code
+        if code is not None:
+            raise FakeApiError(code, "InternalError" if code >= 500 else "Injected", "injected error")
+
+    def _record(self, collection, event_type: str, obj: Dict[str, Any]) -> None:
+        """Saves an event and wakes up watches. Needs to be called with the condition acquired."""
+        if len(self._events) == self._events.maxlen:
+            self._compacted_resource_version = self._events[0][0] if self._events else self._resource_version
+        self._events.append((self._resource_version, collection, event_type, obj))
+        self._condition.notify_all()
+
+    def _next_resource_version(self) -> str:
+        """Increments the resource version. Needs to be called with the condition acquired."""
+        self._resource_version += 1
+        return str(self._resource_version)
+
+    def handle_discovery(self) -> Dict[str, Any]:
+        """Gives the list of the served API groups.
+
+        :return: The APIGroupList object.
+        """
+        groups = []
+        for name, versions in self.api_groups.items():
+            group_versions = [{"groupVersion": f"{name}/{version}", "version": version} for version in versions]
+            groups.append({"name": name, "versions": group_versions, "preferredVersion": group_versions[0]})
+        return {"kind": "APIGroupList", "apiVersion": "v1", "groups": groups}
+
+    def handle_list(self, route: _Route, query: Optional[Dict[str, List[str]]] = None) -> Dict[str, Any]:
+        """Gives a list object of a collection.
+
+        The query can contain `limit`, a `fieldSelector` for `metadata.name` and a `resourceVersion` with
+        `resourceVersionMatch=NotOlderThan`. The list is always served from the current state.
+
+        :param route: The route of the collection.
+        :param query: The parsed query of the request.
+        :return: The list object.
+        :raise FakeApiError: if the query is invalid or the resource version is newer than the state.
+        """
+        query = query or {}
+        match = query.get("resourceVersionMatch", [None])[0]
+        if match not in (None, "NotOlderThan"):
+            raise FakeApiError(400, "BadRequest", f"unsupported resourceVersionMatch {match}")
+        name = None
+        field_selector = query.get("fieldSelector", [None])[0]
+        if field_selector is not None:
+            field, _, name = field_selector.partition("=")
+            if field != "metadata.name":
+                raise FakeApiError(400, "BadRequest", f"unsupported field selector {field_selector}")
+        limit = int(query.get("limit", ["0"])[0])
+        with self._condition:
+            resource_version = query.get("resourceVersion", [None])[0]
+            if resource_version and int(resource_version) > self._resource_version:
+                raise FakeApiError(504, "Timeout", "Too large resource version")
+            collection = self.objects.get(route.collection, {})
+            if name is not None:
+                items = [collection[name]] if name in collection else []
+            else:
+                items = list(collection.values())
+            resource_version = str(self._resource_version)
+        if limit > 0:
+            items = items[:limit]
+        kind = items[0].get("kind", "") + "List" if items else "List"
+        return {"kind": kind, "apiVersion": route.api_version, "metadata": {"resourceVersion": resource_version},
+                "items": items}
+
+    def handle_get(self, route: _Route) -> Dict[str, Any]:
+        """Gives a stored object.
+
+        :param route: The route of the object.
+        :return: The object.
+        :raise FakeApiError: if the object doesn't exist.
+        """
+        with self._condition:
+            obj = self.objects.get(route.collection, {}).get(route.name)
+        if obj is None:
+            raise FakeApiError(404, "NotFound", f'{route.resource} "{route.name}" not found')
+        return obj
+
+    @staticmethod
+    def _parse_body(body: bytes) -> Any:
+        try:
+            return yaml.safe_load(body)
+        except yaml.YAMLError as e:
+            raise FakeApiError(400, "BadRequest", str(e))
+
+    def handle_create(self, route: _Route, body: bytes) -> Dict[str, Any]:
+        """Stores a new object in a collection.
+
+        :param route: The route of the collection.
+        :param body: YAML or JSON of the object.
+        :return: The stored object.
+        :raise FakeApiError: if the object is invalid, already exists or the namespace doesn't exist.
+        """
+        obj = self._parse_body(body)
+        if not isinstance(obj, dict) or not isinstance(obj.get("metadata"), dict) or \
+                not obj["metadata"].get("name"):
+            raise FakeApiError(422, "Invalid", "metadata.name: Required value")
+        with self._condition:
+            return self._create(route, obj)
+
+    def _create(self, route: _Route, obj: Dict[str, Any]) -> Dict[str, Any]:
+        """Stores a new object. Needs to be called with the condition acquired."""
+        name = obj["metadata"]["name"]
+        if route.namespace is not None:
+            if route.namespace not in self.objects.get(("v1", "namespaces", None), {}):
+                raise FakeApiError(404, "NotFound", f'namespaces "{route.namespace}" not found')
+            obj["metadata"]["namespace"] = route.namespace
+        collection = self.objects.setdefault(route.collection, {})
+        if name in collection:
+            raise FakeApiError(409, "AlreadyExists", f'{route.resource} "{name}" already exists')
+        obj["metadata"]["uid"] = str(uuid.uuid4())
+        obj["metadata"]["resourceVersion"] = self._next_resource_version()
+        obj["metadata"]["creationTimestamp"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        if route.resource == "namespaces":
+            obj["status"] = {"phase": "Active"}
+        elif route.resource == "virtualmachineinstances":
+            obj["status"] = {"phase": "Running"}
+        collection[name] = obj
+        self._record(route.collection, "ADDED", obj)
+        return obj
+
+    def handle_patch(self, route: _Route, body: bytes, content_type: str,
+                     field_manager: Optional[str]) -> Tuple[int, Dict[str, Any]]:
+        """Patches a stored object. Server-side apply creates the object if it doesn't exist.
+
+        :param route: The route of the object.
+        :param body: The patch.
+        :param content_type: The content type of the patch, it contains the patch type.
+        :param field_manager: The field manager, needed for server-side apply.
+        :return: The status code and the patched object.
+        :raise FakeApiError: if the patch is invalid or the object doesn't exist.
+        """
+        if content_type not in PATCH_CONTENT_TYPES.values():
+            raise FakeApiError(415, "UnsupportedMediaType", f"the body of the request was in an unknown format: "
+                                                            f"{content_type}")
+        apply = content_type == PATCH_CONTENT_TYPES[PATCH_APPLY]
+        if apply and not field_manager:
+            raise FakeApiError(400, "BadRequest", "PatchOptions.meta.k8s.io \"\" is invalid: fieldManager: Required "
+                                                  "value: is required for apply patch")
+        patch = self._parse_body(body)
+        if not isinstance(patch, dict):
+            raise FakeApiError(400, "BadRequest", "the patch needs to be an object")
+        with self._condition:
+            obj = self.objects.get(route.collection, {}).get(route.name)
+            if obj is None:
+                if not apply:
+                    raise FakeApiError(404, "NotFound", f'{route.resource} "{route.name}" not found')
+                patch.setdefault("metadata", {})["name"] = route.name
+                return 201, self._create(route, patch)
+            patched = apply_merge_patch(obj, patch)
+            metadata = dict(patched.get("metadata") or {})
+            # fields of the server can't be changed by patches
+            for key in ("name", "namespace", "uid", "creationTimestamp"):
+                if key in obj["metadata"]:
+                    metadata[key] = obj["metadata"][key]
+            metadata["resourceVersion"] = self._next_resource_version()
+            patched["metadata"] = metadata
+            self.objects[route.collection][route.name] = patched
+            self._record(route.collection, "MODIFIED", patched)
+        return 200, patched
+
+    def handle_delete(self, route: _Route) -> Dict[str, Any]:
+        """Deletes a stored object. Deleting a namespace deletes all objects in the namespace too.
+
+        :param route: The route of the object.
+        :return: The deleted object.
+        :raise FakeApiError: if the object doesn't exist.
+        """
+        with self._condition:
+            obj = self.objects.get(route.collection, {}).pop(route.name, None)
+            if obj is None:
+                raise FakeApiError(404, "NotFound", f'{route.resource} "{route.name}" not found')
+            obj = self._deleted(obj)
+            self._record(route.collection, "DELETED", obj)
+            if route.resource == "namespaces" and route.namespace is None:
+                # deleting a namespace deletes all resources in it
+                for collection in [key for key in self.objects if key[2] == route.name]:
+                    for child in self.objects.pop(collection).values():
+                        self._record(collection, "DELETED", self._deleted(child))
+        return obj
+
+    def _deleted(self, obj: Dict[str, Any]) -> Dict[str, Any]:
+        """Copies a deleted object with a new resource version. Needs to be called with the condition acquired."""
+        return {**obj, "metadata": {**obj["metadata"], "resourceVersion": self._next_resource_version()}}
+
+    def watch(self, route: _Route, resource_version: Optional[str], timeout: float) -> Iterator[Dict[str, Any]]:
+        """Gives the events of a collection that are newer than the resource version.
+
+        :param route: The route of the collection.
+        :param resource_version: Only events after this resource version are yielded. If None: from now on.
+        :param timeout: Seconds after that the watch ends.
+        :return: Iterator over the events. The objects of the events must not be changed.
+        :raise FakeApiError: if events after the resource version were already dropped from the history.
+        """
+        with self._condition:
+            if not resource_version:
+                last = self._resource_version
+            else:
+                last = int(resource_version)
+                if last < self._compacted_resource_version:
+                    raise FakeApiError(410, "Expired", f"too old resource version: {last} "
+                                                       f"({self._compacted_resource_version})")
+        return self._watch_events(route, last, time.monotonic() + timeout)
+
+    def _watch_events(self, route: _Route, last: int, deadline: float) -> Iterator[Dict[str, Any]]:
+        """Yields the events of a collection after the resource version `last` until the deadline."""
+        while not self._stopped.is_set():
+            with self._condition:
+                events = [(rv, event_type, obj) for rv, collection, event_type, obj in self._events
+                          if rv > last and collection == route.collection]
+                if not events:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    self._condition.wait(remaining)
+                    continue
+            for rv, event_type, obj in events:
+                last = rv
+                yield {"type": event_type, "object": obj}
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    """HTTP server that doesn't refuse connections when many clients connect at once."""
+
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class _Http2Connection:
+    """Serves one connection with HTTP/2 without TLS (h2c).
+
+    Every request is handled in its own thread, so the requests of the streams are answered concurrently.
+    """
+
+    def __init__(self, server: FakeApiServer, rfile, connection):
+        import h2.config
+        import h2.connection
+        self.server = server
+        self.rfile = rfile
+        self.connection = connection
+        self.h2 = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False, header_encoding="utf-8"))
+        # guards the h2 connection and the socket, notified when the flow control window grows
+        self._condition = threading.Condition()
+        self._requests: Dict[int, Tuple[Dict[str, str], List[bytes]]] = {}
+
+    def _flush(self) -> None:
+        """Sends the pending frames. Needs to be called with the condition acquired."""
+        data = self.h2.data_to_send()
+        if data:
+            self.connection.sendall(data)
+
+    def serve(self) -> None:
+        """Reads frames until the client closes the connection.
+
+        The first line of the preface was already read by the HTTP/1.1 handler.
+        """
+        import h2.events
+        with self._condition:
+            self.h2.initiate_connection()
+            self.h2.receive_data(_HTTP2_PREFACE_LINE + self.rfile.read(len(_HTTP2_PREFACE_REST)))
+            self._flush()
+        while not self.server._stopped.is_set():
+            try:
+                data = self.rfile.read1(65536)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            with self._condition:
+                events = self.h2.receive_data(data)
+                for event in events:
+                    if isinstance(event, h2.events.RequestReceived):
+                        self._requests[event.stream_id] = (dict(event.headers), [])
+                    elif isinstance(event, h2.events.DataReceived):
+                        if event.stream_id in self._requests:
+                            self._requests[event.stream_id][1].append(event.data)
+                        self.h2.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+                    elif isinstance(event, h2.events.StreamEnded) and event.stream_id in self._requests:
+                        headers, body = self._requests.pop(event.stream_id)
+                        threading.Thread(target=self._handle, args=(event.stream_id, headers, b"".join(body)),
+                                         daemon=True, name="fake-apiserver-stream").start()
+                    elif isinstance(event, h2.events.StreamReset):
+                        self._requests.pop(event.stream_id, None)
+                    elif isinstance(event, h2.events.ConnectionTerminated):
+                        self._flush()
+                        return
+                self._condition.notify_all()
+                self._flush()
+
+    def _handle(self, stream_id: int, headers: Dict[str, str], body: bytes) -> None:
+        """Handles one request and sends the response on its stream."""
+        import h2.exceptions
+        code, response = self.server.handle_request(headers[":method"], headers[":path"], headers, body)
+        try:
+            if isinstance(response, dict):
+                body, encoding = self.server._response_body(response, headers.get("accept-encoding"))
+                response_headers = [(":status", str(code)), ("content-type", "application/json"),
+                                    ("content-length", str(len(body)))]
+                if encoding is not None:
+                    response_headers.append(("content-encoding", encoding))
+                with self._condition:
+                    self.h2.send_headers(stream_id, response_headers)
+                    self._flush()
+                self._send_data(stream_id, body, end_stream=True)
+            else:
+                with self._condition:
+                    self.h2.send_headers(stream_id, [(":status", str(code)), ("content-type", "application/json")])
+                    self._flush()
+                for event in response:
+                    self._send_data(stream_id, self.server._event_line(event))
+                self._send_data(stream_id, b"", end_stream=True)
+        except (h2.exceptions.StreamClosedError, OSError):
+            # the client reset the stream or closed the connection
+            pass
+
+    def _send_data(self, stream_id: int, data: bytes, end_stream: bool = False) -> None:
+        """Sends data on a stream. Waits if the flow control window of the client is full."""
+        with self._condition:
+            while True:
+                size = min(len(data), self.h2.local_flow_control_window(stream_id), self.h2.max_outbound_frame_size)
+                if size == 0 and data:
+                    if self.server._stopped.is_set():
+                        return
+                    self._condition.wait(1)
+                    continue
+                self.h2.send_data(stream_id, data[:size], end_stream=end_stream and size == len(data))
+                self._flush()
+                data = data[size:]
+                if not data:
+                    return
+
+
+def _make_handler(server: FakeApiServer):
+    """Creates a request handler class that is bound to the fake API server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # the headers and the body are written separately, which waits for delayed ACKs on kept-alive connections
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def setup(self):
+            super().setup()
+            with server._condition:
+                server.connection_count += 1
+
+        def parse_request(self):
+            if server.http2 and self.raw_requestline == _HTTP2_PREFACE_LINE:
+                # the client starts with HTTP/2, the rest of the connection is served by h2
+                _Http2Connection(server, self.rfile, self.connection).serve()
+                self.close_connection = True
+                return False
+            return super().parse_request()
+
+        def _send(self, code: int, obj: Dict[str, Any]) -> None:
+            body, encoding = server._response_body(obj, self.headers.get("Accept-Encoding"))
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            if encoding is not None:
+                self.send_header("Content-Encoding", encoding)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _read_body(self) -> bytes:
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length > 0 else b""
+
+        def _handle(self, method: str) -> None:
+            code, response = server.handle_request(method, self.path, self.headers, self._read_body())
+            if isinstance(response, dict):
+                self._send(code, response)
+                return
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for event in response:
+                line = server._event_line(event)
+                self.wfile.write(f"{len(line):x}\r\n".encode("ascii") + line + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+
+        def do_GET(self):
+            self._handle("GET")
+
+        def do_POST(self):
+            self._handle("POST")
+
+        def do_DELETE(self):
+            self._handle("DELETE")
+
+        def do_PATCH(self):
+            self._handle("PATCH")
+
+    return Handler
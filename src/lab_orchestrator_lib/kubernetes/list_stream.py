@@ -0,0 +1,139 @@
+"""Contains an incremental parser of Kubernetes list responses.
+
+Lists of all namespaces or virtual machine instances can be large. `iter_list_items` parses the JSON body of a list
+while it arrives and yields every item as soon as it is complete, so a caller can start working on the first items
+before the whole body was transferred and the whole body is never kept in memory. The body is read in chunks that are
+already decompressed, for example by `requests.Response.iter_content`, which decompresses gzip bodies while they
+arrive.
+"""
+
+import codecs
+import json
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """Reads JSON values from a stream of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.text = ""
+        self.position = 0
+        self.finished = False
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+
+    def fill(self) -> bool:
+        """Reads the next chunk into the buffer and drops the part that was read already.
+
+        :return: False if there are no more chunks.
+        """
+        for chunk in self.chunks:
+            if not chunk:
+                continue
+            self.text = self.text[self.position:] + self._utf8.decode(chunk)
+            self.position = 0
+            return True
+        if not self.finished:
+            self.finished = True
+            self.text = self.text[self.position:] + self._utf8.decode(b"", final=True)
+            self.position = 0
+        return False
+
+    def next_char(self) -> str:
+        """Skips whitespace and reads one character.
+
+        :return: The character.
+        :raise ValueError: If the body ended.
+        """
+        char = self.peek()
+        self.position += 1
+        return char
+
+    def peek(self) -> str:
+        """Skips whitespace and gives the next character without reading it.
+
+        :return: The character.
+        :raise ValueError: If the body ended.
+        """
+        while True:
+            while self.position < len(self.text) and self.text[self.position] in _WHITESPACE:
+                self.position += 1
+            if self.position < len(self.text):
+                return self.text[self.position]
+            if not self.fill():
+                raise ValueError("Unexpected end of the JSON body.")
+
+    def expect(self, expected: str) -> None:
+        """Reads one character that needs to be the expected one.
+
+        :param expected: The expected character.
+        :return: None
+        :raise ValueError: If the character is another one.
+        """
+        char = self.next_char()
+        if char != expected:
+            raise ValueError(f"Expected {expected!r} but got {char!r} in the JSON body.")
+
+    def value(self) -> Any:
+        """Reads a JSON value. More chunks are read until the value is complete.
+
+        :return: The value.
+        :raise ValueError: If the value is invalid or the body ended.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.text, self.position)
+            except ValueError:
+                if self.fill():
+                    continue
+                raise
+            # a number at the end of the buffer could continue in the next chunk
+            if end == len(self.text) and self.fill():
+                continue
+            self.position = end
+            return value
+
+
+def iter_list_items(chunks: Iterable[bytes], metadata: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+    """Parses a JSON list object and yields its items while the body is read.
+
+    :param chunks: The body in chunks of bytes.
+    :param metadata: Optional dict that is updated with the metadata of the list, for example the resourceVersion.
+                     Kubernetes sends the metadata before the items, so it's complete when the first item is yielded.
+    :return: Iterator over the items of the list.
+    :raise ValueError: If the body is no valid JSON object.
+    """
+    reader = _Reader(chunks)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        reader.expect(":")
+        if key == "items" and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                while True:
+                    yield reader.value()
+                    char = reader.next_char()
+                    if char == "]":
+                        break
+                    if char != ",":
+                        raise ValueError(f"Expected ',' or ']' but got {char!r} in the JSON body.")
+        else:
+            value = reader.value()
+            if key == "metadata" and metadata is not None and isinstance(value, dict):
+                metadata.update(value)
+        char = reader.next_char()
+        if char == "}":
+            return
+        if char != ",":
+            raise ValueError(f"Expected ',' or '}}' but got {char!r} in the JSON body.")
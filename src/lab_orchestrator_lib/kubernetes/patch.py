@@ -0,0 +1,66 @@
+"""Contains the patch types of the Kubernetes API and functions to create and apply merge patches.
+
+Kubernetes supports three patch types that are used by this library:
+
+* `PATCH_MERGE`: JSON merge patch (RFC 7386). Dictionaries are merged, lists are replaced and `null` removes a key.
+* `PATCH_STRATEGIC`: Strategic merge patch. Like a merge patch, but lists of some resources are merged by a key.
+* `PATCH_APPLY`: Server-side apply. The patch is the complete object as it should be and Kubernetes merges it with the
+  fields that are owned by other field managers.
+
+Merge patches are computed as the difference between two rendered templates, so only the changed fields are sent.
+"""
+
+from typing import Any, Dict
+
+PATCH_MERGE = "merge"
+PATCH_STRATEGIC = "strategic"
+PATCH_APPLY = "apply"
+
+PATCH_CONTENT_TYPES = {
+    PATCH_MERGE: "application/merge-patch+json",
+    PATCH_STRATEGIC: "application/strategic-merge-patch+json",
+    PATCH_APPLY: "application/apply-patch+yaml",
+}
+
+DEFAULT_FIELD_MANAGER = "lab-orchestrator-lib"
+
+
+def create_merge_patch(current: Dict[str, Any], desired: Dict[str, Any]) -> Dict[str, Any]:
+    """Creates a merge patch that changes the current object to the desired object.
+
+    :param current: The current object.
+    :param desired: The desired object.
+    :return: The patch. Contains only the changed fields, removed fields are None. Empty if nothing changed.
+    """
+    patch: Dict[str, Any] = {}
+    for key, value in desired.items():
+        if key not in current:
+            patch[key] = value
+        elif isinstance(value, dict) and isinstance(current[key], dict):
+            nested = create_merge_patch(current[key], value)
+            if nested:
+                patch[key] = nested
+        elif value != current[key]:
+            patch[key] = value
+    for key in current:
+        if key not in desired:
+            patch[key] = None
+    return patch
+
+
+def apply_merge_patch(target: Any, patch: Any) -> Any:
+    """Applies a merge patch to an object like the Kubernetes API does.
+
+    :param target: The object that should be patched. It's not changed.
+    :param patch: The merge patch.
+    :return: The patched object.
+    """
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = apply_merge_patch(result.get(key), value)
+    return result
@@ -0,0 +1,289 @@
+"""Contains a short-lived cache of the responses of GET requests to the Kubernetes API.
+
+Repeated calls of `get` and `get_list` transfer the full objects even when nothing changed. The `ResponseCache` keeps
+the responses by address for `ttl` seconds. Fresh responses are returned without a request. Expired responses of
+objects are kept and revalidated with a list of their collection with `?fieldSelector=metadata.name=...`, which only
+gives the resource version of the object. If the resource version is unchanged, the cached response is used for `ttl`
+more seconds, otherwise the full response is requested again.
+
+Expired lists are always requested again. The resource version of a list is the version of the whole cluster state,
+which changes with every write of any resource of the same type, so on a busy cluster the revalidation of a list would
+almost always fail and only add a request. The cache is bounded by the size of the responses in bytes and evicts the least recently used
+responses. POST, DELETE and PATCH requests of the same proxy invalidate the cached responses of the collection and the
+objects they change.
+"""
+
+import collections
+import json
+import re
+import sys
+import threading
+import time
+from typing import Callable, Optional, Tuple
+from urllib.parse import quote
+
+DEFAULT_TTL = 2.0
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024
+
+# the first resource version of a response is the one of the list or object, because Kubernetes serializes the
+# metadata before the items, and the resource version before labels and annotations
+_resource_version_matcher = re.compile(r'"resourceVersion"\s*:\s*"([^"]*)"')
+
+
+def get_resource_version(text: str) -> Optional[str]:
+    """Reads the resource version of a list or object without parsing the whole JSON response.
+
+    :param text: The JSON response.
+    :return: The resource version or None if there is none.
+    """
+    match = _resource_version_matcher.search(text)
+    return match.group(1) if match else None
+
+
+def _split_resource(address: str) -> Optional[Tuple[str, Optional[str]]]:
+    """Splits the address of a resource into the address of its collection and its name.
+
+    :param address: API path without base_uri, for example "/api/v1/namespaces/lab-1".
+    :return: The collection, for example "/api/v1/namespaces", and the name, for example "lab-1". The name is None if
+             the address is a collection. None if the address is no collection or object, for example "/apis" or a
+             subresource.
+    """
+    parts = address.strip("/").split("/")
+    if parts[0] == "api":
+        prefix = 2
+    elif parts[0] == "apis":
+        prefix = 3
+    else:
+        return None
+    rest = parts[prefix:]
+    # namespaced resources are below /namespaces/{namespace}/, namespaces themselves are not namespaced
+    resource = 2 if len(rest) >= 3 and rest[0] == "namespaces" else 0
+    if len(rest) == resource + 1:
+        return address.rstrip("/"), None
+    if len(rest) == resource + 2:
+        return "/" + "/".join(parts[:prefix] + rest[:resource + 1]), rest[resource + 1]
+    return None
+
+
+def validation_address(address: str, resource_version: Optional[str]) -> Optional[str]:
+    """Gives the address of a small request that tells if a cached response is still valid.
+
+    :param address: The address of the cached response.
+    :param resource_version: The resource version of the cached response.
+    :return: The address of the validation request or None if the response can't be revalidated. Only objects are
+             revalidated, lists are not.
+    """
+    if not resource_version or "?" in address:
+        return None
+    resource = _split_resource(address)
+    if resource is None or resource[1] is None:
+        return None
+    collection, name = resource
+    return f"{collection}?fieldSelector=metadata.name%3D{quote(name)}&resourceVersion={quote(resource_version)}" \
+           f"&resourceVersionMatch=NotOlderThan"
+
+
+def validated_resource_version(address: str, text: str) -> Optional[str]:
+    """Reads the current resource version of a cached response from the response of its validation request.
+
+    :param address: The address of the cached object.
+    :param text: The JSON response of the validation request.
+    :return: The current resource version or None if the object doesn't exist or the response is invalid.
+    """
+    try:
+        obj = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(obj, dict):
+        return None
+    items = obj.get("items") or []
+    if len(items) != 1 or not isinstance(items[0], dict):
+        return None
+    return (items[0].get("metadata") or {}).get("resourceVersion")
+
+
+class CacheEntry:
+    """A cached response.
+
+    :param text: The text body of the response.
+    :param resource_version: The resource version of the list or object in the response.
+    :param expires: Time of the clock when the response needs to be revalidated.
+    :param size: Size of the response in bytes.
+    """
+
+    __slots__ = ("text", "resource_version", "expires", "size")
+
+    def __init__(self, text: str, resource_version: Optional[str], expires: float, size: int):
+        self.text = text
+        self.resource_version = resource_version
+        self.expires = expires
+        self.size = size
+
+
+class ResponseCache:
+    """LRU cache of GET responses that is bounded by bytes.
+
+    :param hits: Amount of responses that were fresh.
+    :param revalidations: Amount of expired responses that were still valid.
+    :param misses: Amount of successful responses that needed to be requested.
+    :param evictions: Amount of responses that were removed to keep the size.
+    :param generation: Increased on every invalidation. Responses that were requested before an invalidation are not
+                       cached.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL, max_bytes: int = DEFAULT_MAX_BYTES,
+                 clock: Callable[[], float] = time.monotonic):
+        """Initializes an empty response cache.
+
+        :param ttl: Seconds a response is used without revalidation.
+        :param max_bytes: Maximal size of all cached responses in bytes.
+        :param clock: Function that gives the current time in seconds. Only needed in tests.
+        """
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+        self._entries: "collections.OrderedDict[str, CacheEntry]" = collections.OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """Size of all cached responses in bytes."""
+        return self._size
+
+    @property
+    def hit_ratio(self) -> float:
+        """Share of the lookups that needed no full request. 0 if there were no lookups."""
+        lookups = self.hits + self.revalidations + self.misses
+        return (self.hits + self.revalidations) / lookups if lookups else 0.0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, address: str) -> Optional[str]:
+        """Gives a fresh cached response.
+
+        :param address: The address of the response.
+        :return: The text of the response or None if it's not cached or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is None or entry.expires <= self.clock():
+                return None
+            self._entries.move_to_end(address)
+            self.hits += 1
+            return entry.text
+
+    def get_entry(self, address: str) -> Optional[CacheEntry]:
+        """Gives a cached response even if it's expired, so it can be revalidated.
+
+        :param address: The address of the response.
+        :return: The entry or None if the response is not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(address)
+            if entry is not None:
+                self._entries.move_to_end(address)
+            return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """Tells if a response can be used without revalidation.
+
+        :param entry: The cached response.
+        :return: True if the response didn't expire.
+        """
+        return entry.expires > self.clock()
+
+    def count_hit(self) -> None:
+        """Counts a fresh response that was found by `get_entry`.
+
+        :return: None
+        """
+        with self._lock:
+            self.hits += 1
+
+    def revalidated(self, address: str, entry: CacheEntry, generation: int) -> None:
+        """Uses an expired response for `ttl` more seconds after it was revalidated.
+
+        :param address: The address of the response.
+        :param entry: The cached response.
+        :param generation: The generation before the validation request was sent.
+        :return: None
+        """
+        with self._lock:
+            self.revalidations += 1
+            if generation == self.generation and self._entries.get(address) is entry:
+                entry.expires = self.clock() + self.ttl
+
+    def put(self, address: str, text: str, generation: int) -> None:
+        """Caches a response.
+
+        :param address: The address of the response.
+        :param text: The text body of the response.
+        :param generation: The generation before the request was sent. If there was an invalidation since, the
+                           response could be outdated and is not cached.
+        :return: None
+        """
+        size = sys.getsizeof(text) + sys.getsizeof(address)
+        entry = CacheEntry(text, get_resource_version(text), 0.0, size)
+        with self._lock:
+            self.misses += 1
+            if generation != self.generation or size > self.max_bytes:
+                return
+            entry.expires = self.clock() + self.ttl
+            self._remove(address)
+            self._entries[address] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.size
+                self.evictions += 1
+
+    def invalidate(self, address: str) -> None:
+        """Removes the responses that are changed by a request to the address.
+
+        These are the collection of the address and all objects in it. For namespaces also all resources in the
+        namespace.
+
+        :param address: The address of a POST, DELETE or PATCH request.
+        :return: None
+        """
+        path = address.split("?", 1)[0]
+        resource = _split_resource(path)
+        with self._lock:
+            self.generation += 1
+            if resource is None:
+                self._clear()
+                return
+            collection, name = resource
+            namespace = f"/namespaces/{name}/" if name is not None and collection == "/api/v1/namespaces" else None
+            for key in list(self._entries):
+                key_path = key.split("?", 1)[0]
+                if key_path == collection or key_path.startswith(collection + "/") or \
+                        (namespace is not None and namespace in key_path):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        """Removes all responses.
+
+        :return: None
+        """
+        with self._lock:
+            self.generation += 1
+            self._clear()
+
+    def _clear(self) -> None:
+        """Removes all responses. Needs to be called with the lock."""
+        self._entries.clear()
+        self._size = 0
+
+    def _remove(self, address: str) -> None:
+        """Removes a response. Needs to be called with the lock."""
+        entry = self._entries.pop(address, None)
+        if entry is not None:
+            self._size -= entry.size
@@ -0,0 +1,122 @@
+"""Contains a single-flight group that lets identical concurrent calls share one call.
+
+When many users open the same page at the same time, the same GET request is sent many times within a few
+milliseconds. With a `SingleFlight` group only the first caller of a key makes the call, all callers that come while it
+is running wait for it and get the same result or exception. Callers that come after the call finished make a new
+call, so nothing is cached.
+
+Threads wait with `do`. Asyncio callers use `do_async`, which runs the call in the default executor of the event loop.
+Coroutines of the same loop share one executor job, and the executor job joins the calls of other threads, so threads
+and coroutines share calls with each other.
+"""
+
+import threading
+import weakref
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    """A running call and its result."""
+
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Group of calls where concurrent calls with the same key share one call.
+
+    :param calls: Amount of calls, including the shared ones.
+    :param shared: Amount of calls that got the result of another call.
+    """
+
+    def __init__(self):
+        """Initializes an empty single-flight group."""
+        self.calls = 0
+        self.shared = 0
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._loop_calls: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, asyncio.Future]]" = \
+            weakref.WeakKeyDictionary()
+
+    @property
+    def coalescing_ratio(self) -> float:
+        """Share of the calls that got the result of another call. 0 if there were no calls."""
+        return self.shared / self.calls if self.calls else 0.0
+
+    def do(self, key: Hashable, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Calls the function or waits for the running call with the same key.
+
+        :param key: The key of the call, for example the address of a request.
+        :param function: The function that makes the call.
+        :return: The result of the function and True if it was shared from another call.
+        :raise Exception: The exception of the function.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            call.result = function()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.event.set()
+        return call.result, False
+
+    async def do_async(self, key: Hashable, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Like `do`, but for coroutines. The function is run in the default executor of the running loop.
+
+        If the awaiting coroutine is cancelled, the call continues for the other callers.
+
+        :param key: The key of the call, for example the address of a request.
+        :param function: The function that makes the call.
+        :return: The result of the function and True if it was shared from another call.
+        :raise Exception: The exception of the function.
+        """
+        # asyncio is already imported by the caller, but it would slow down importing the library
+        import asyncio
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._loop_calls.get(loop)
+            if calls is None:
+                calls = self._loop_calls[loop] = {}
+        future = calls.get(key)
+        if future is not None:
+            with self._lock:
+                self.calls += 1
+                self.shared += 1
+            result, _ = await asyncio.shield(future)
+            return result, True
+        future = calls[key] = loop.run_in_executor(None, self.do, key, function)
+        future.add_done_callback(lambda done: calls.pop(key, None) if calls.get(key) is done else None)
+        return await asyncio.shield(future)
+
+    def forget(self) -> None:
+        """Lets the following calls start new calls instead of waiting for the running calls.
+
+        Call this after a change, so later calls don't get results that were requested before the change.
+
+        :return: None
+        """
+        with self._lock:
+            self._calls.clear()
+            loop_calls = list(self._loop_calls.values())
+        for calls in loop_calls:
+            calls.clear()
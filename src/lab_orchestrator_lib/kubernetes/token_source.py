@@ -0,0 +1,153 @@
+"""Contains the sources of the token that the Proxy uses to authenticate against the Kubernetes API.
+
+Bound service account tokens are rotated by the kubelet, so a token that was read once at the start stops working after
+some time. `FileTokenSource` keeps the token in memory and reads the file again when its modification time changed or
+shortly before the token expires. The file is not read on every request: `get_token` only compares the current time
+with the time of the next check, and the file is checked at most every `check_interval` seconds. When the API answers
+with 401 anyway, the proxy calls `refresh` and retries the request once.
+"""
+
+import base64
+import binascii
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TOKEN_FILE = "/var/run/secrets/kubernetes.io/serviceaccount/token"
+
+
+def get_token_expiry(token: Optional[str]) -> Optional[float]:
+    """Reads the expiry time of a JWT token. The signature is not verified.
+
+    :param token: The token.
+    :return: The unix time of the "exp" claim or None if the token is no JWT or has no expiry.
+    """
+    if not token:
+        return None
+    parts = token.split(".")
+    if len(parts) != 3:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(parts[1] + "=" * (-len(parts[1]) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+    exp = payload.get("exp") if isinstance(payload, dict) else None
+    return float(exp) if isinstance(exp, (int, float)) and not isinstance(exp, bool) else None
+
+
+class TokenSource(ABC):
+    """Gives the token that is added into the bearer authorization header."""
+
+    @abstractmethod
+    def get_token(self) -> Optional[str]:
+        """Gives the current token. This is called for every request, so it should not read files.
+
+        :return: The token or None if there is no token.
+        """
+        raise NotImplementedError()
+
+    def refresh(self) -> Optional[str]:
+        """Gives a new token after the API rejected the current token.
+
+        :return: The new token. If it's the same as before, the request is not retried.
+        """
+        return self.get_token()
+
+
+class StaticTokenSource(TokenSource):
+    """Gives a token that never changes."""
+
+    def __init__(self, token: Optional[str]):
+        """Initializes a static token source.
+
+        :param token: The token.
+        """
+        self.token = token
+
+    def get_token(self) -> Optional[str]:
+        return self.token
+
+
+class FileTokenSource(TokenSource):
+    """Reads the token from a file and reloads it when the file changed or the token expires."""
+
+    def __init__(self, path: str = DEFAULT_TOKEN_FILE, check_interval: float = 60, refresh_before: float = 60,
+                 clock: Callable[[], float] = time.time):
+        """Initializes a file token source and reads the token.
+
+        :param path: The file that contains the token.
+        :param check_interval: Maximal amount of seconds between two checks of the modification time of the file.
+        :param refresh_before: The file is read again if the token expires in less than this amount of seconds.
+        :param clock: Function that gives the current unix time. Only needed in tests.
+        :raise OSError: If the file can't be read.
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self.refresh_before = refresh_before
+        self.clock = clock
+        self._token: Optional[str] = None
+        self._mtime: Optional[int] = None
+        self._expires: Optional[float] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._load(self.clock())
+
+    def get_token(self) -> Optional[str]:
+        if self.clock() < self._next_check:
+            return self._token
+        with self._lock:
+            now = self.clock()
+            if now >= self._next_check:
+                self._check(now)
+        return self._token
+
+    def refresh(self) -> Optional[str]:
+        with self._lock:
+            try:
+                self._load(self.clock())
+            except OSError as e:
+                logger.warning(f"Can't read the token file {self.path}: {e}")
+        return self._token
+
+    def _check(self, now: float) -> None:
+        """Reloads the token if the file changed or the token expires soon. Needs to be called with the lock."""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            logger.warning(f"Can't read the token file {self.path}: {e}")
+            self._schedule(now)
+            return
+        expires_soon = self._expires is not None and now >= self._expires - self.refresh_before
+        if mtime != self._mtime or expires_soon:
+            try:
+                self._load(now)
+                return
+            except OSError as e:
+                logger.warning(f"Can't read the token file {self.path}: {e}")
+        self._schedule(now)
+
+    def _load(self, now: float) -> None:
+        """Reads the token from the file. Needs to be called with the lock or in the constructor."""
+        # the modification time is read first, so a change while reading is detected by the next check
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, "r") as file:
+            token = file.read().strip()
+        if token != self._token and self._token is not None:
+            logger.info(f"Reloaded the token from {self.path}.")
+        self._token = token
+        self._mtime = mtime
+        self._expires = get_token_expiry(token)
+        self._schedule(now)
+
+    def _schedule(self, now: float) -> None:
+        """Sets the time of the next check to the check interval or to shortly before the token expires."""
+        wait = self.check_interval
+        if self._expires is not None and 0 < self._expires - self.refresh_before - now < wait:
+            wait = self._expires - self.refresh_before - now
+        self._next_check = now + wait
@@ -0,0 +1,228 @@
+"""Contains the transports that send the HTTP requests of the Proxy.
+
+A transport has the functions `get`, `post`, `delete` and `patch` of the requests library, so the requests module
+itself can be used as transport. This is the default of the Proxy, but it opens a new connection for every request.
+Under bursty load, for example when many VMIs are created at once, this means many parallel HTTP/1.1 connections to the
+Kubernetes API server. The transports in this module keep their connections open:
+
+- `SessionTransport` uses a requests session with a pool of HTTP/1.1 connections.
+- `Http2Transport` uses httpx and multiplexes concurrent requests over one HTTP/2 connection. It needs the packages
+  httpx and h2: `pip install lab_orchestrator_lib[http2]`. For https, HTTP/2 is negotiated with TLS like with the
+  Kubernetes API server. Over http the transport uses pooled HTTP/1.1 connections, unless `prior_knowledge` is set:
+  then it speaks HTTP/2 without TLS (h2c), for example with the fake API server with `http2=True`.
+
+Every transport counts the connections it opened in `connections`, so it can be compared with other transports, for
+example with `benchmarks/bench_transport.py`. The latency of the single requests is measured by the request metrics of
+the proxy.
+"""
+
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+Verify = Union[bool, str]
+
+
+class Transport(ABC):
+    """Interface of the transports that send the requests of the Proxy.
+
+    The responses need the attributes `status_code` and `text` and the functions `iter_content(chunk_size)` and
+    `close()` like the responses of the requests library.
+    """
+
+    @property
+    def connections(self) -> int:
+        """Amount of connections the transport opened. 0 if the transport doesn't count them."""
+        return 0
+
+    @abstractmethod
+    def get(self, uri: str, headers: Dict[str, str], verify: Verify, stream: bool = False) -> Any:
+        """Sends a GET request.
+
+        :param uri: The full uri of the request.
+        :param headers: The headers of the request.
+        :param verify: True to check the certificate, False to not check it or the path of a ca cert file.
+        :param stream: If True, the body is read when it's iterated with `iter_content`.
+        :return: The response.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def post(self, uri: str, headers: Dict[str, str], verify: Verify, data: str) -> Any:
+        """Sends a POST request.
+
+        :param uri: The full uri of the request.
+        :param headers: The headers of the request.
+        :param verify: True to check the certificate, False to not check it or the path of a ca cert file.
+        :param data: The body of the request.
+        :return: The response.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def delete(self, uri: str, headers: Dict[str, str], verify: Verify) -> Any:
+        """Sends a DELETE request.
+
+        :param uri: The full uri of the request.
+        :param headers: The headers of the request.
+        :param verify: True to check the certificate, False to not check it or the path of a ca cert file.
+        :return: The response.
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def patch(self, uri: str, headers: Dict[str, str], verify: Verify, data: str) -> Any:
+        """Sends a PATCH request.
+
+        :param uri: The full uri of the request.
+        :param headers: The headers of the request.
+        :param verify: True to check the certificate, False to not check it or the path of a ca cert file.
+        :param data: The body of the request.
+        :return: The response.
+        """
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        """Closes the open connections.
+
+        :return: None
+        """
+
+
+class SessionTransport(Transport):
+    """Sends the requests with a requests session that keeps a pool of HTTP/1.1 connections per host."""
+
+    def __init__(self, pool_maxsize: int = 10):
+        """Initializes a session transport.
+
+        :param pool_maxsize: Maximal amount of connections that are kept open. More concurrent requests open
+                             additional connections that are closed afterwards.
+        """
+        # imported here, because requests takes longer to import than the whole library
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+    @property
+    def connections(self) -> int:
+        pools = self.adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def get(self, uri: str, headers: Dict[str, str], verify: Verify, stream: bool = False) -> Any:
+        return self.session.get(uri, headers=headers, verify=verify, stream=stream)
+
+    def post(self, uri: str, headers: Dict[str, str], verify: Verify, data: str) -> Any:
+        return self.session.post(uri, headers=headers, verify=verify, data=data)
+
+    def delete(self, uri: str, headers: Dict[str, str], verify: Verify) -> Any:
+        return self.session.delete(uri, headers=headers, verify=verify)
+
+    def patch(self, uri: str, headers: Dict[str, str], verify: Verify, data: str) -> Any:
+        return self.session.patch(uri, headers=headers, verify=verify, data=data)
+
+    def close(self) -> None:
+        self.session.close()
+
+
+class _HttpxResponse:
+    """Gives a httpx response the interface of a requests response."""
+
+    def __init__(self, response):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.http_version = response.http_version
+
+    @property
+    def text(self) -> str:
+        self.response.read()
+        return self.response.text
+
+    def iter_content(self, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        return self.response.iter_bytes(chunk_size)
+
+    def close(self) -> None:
+        self.response.close()
+
+
+class Http2Transport(Transport):
+    """Sends the requests with httpx over HTTP/2, so concurrent requests share one connection."""
+
+    def __init__(self, max_connections: int = 10, timeout: Optional[float] = 60.0, prior_knowledge: bool = False):
+        """Initializes a HTTP/2 transport. The clients are created on the first request for every value of verify.
+
+        :param max_connections: Maximal amount of open connections per client.
+        :param timeout: Seconds to wait for the connection and for every read. If None: no timeout.
+        :param prior_knowledge: If True, http uris are requested with HTTP/2 without TLS (h2c) instead of HTTP/1.1. The
+                                server needs to support it.
+        :raise ImportError: If httpx or h2 is not installed.
+        """
+        try:
+            import httpx
+            import h2  # noqa: F401 - httpx needs h2 for HTTP/2
+        except ImportError as e:
+            raise ImportError("httpx and h2 are not installed. Install them with: "
+                              "pip install lab_orchestrator_lib[http2]") from e
+        self._httpx = httpx
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.prior_knowledge = prior_knowledge
+        self._clients: Dict[Tuple[Verify, bool], Any] = {}
+        self._connections = 0
+        self._lock = threading.Lock()
+
+    @property
+    def connections(self) -> int:
+        return self._connections
+
+    def _client(self, verify: Verify, https: bool):
+        """Gives the client of a verify value. HTTP/2 is used for https or, with prior knowledge, only HTTP/2 for
+        http."""
+        key = (verify, https)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    limits = self._httpx.Limits(max_connections=self.max_connections)
+                    client = self._clients[key] = self._httpx.Client(
+                        http1=https or not self.prior_knowledge, http2=https or self.prior_knowledge, verify=verify,
+                        limits=limits, timeout=self.timeout)
+        return client
+
+    def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """Counts the opened connections. Called by httpx for the steps of every request."""
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self._connections += 1
+
+    def _request(self, method: str, uri: str, headers: Dict[str, str], verify: Verify, data: Optional[str] = None,
+                 stream: bool = False) -> _HttpxResponse:
+        """Sends a request."""
+        client = self._client(verify, uri.startswith("https:"))
+        content = data.encode("utf-8") if isinstance(data, str) else data
+        request = client.build_request(method, uri, headers=headers, content=content,
+                                       extensions={"trace": self._trace})
+        return _HttpxResponse(client.send(request, stream=stream))
+
+    def get(self, uri: str, headers: Dict[str, str], verify: Verify, stream: bool = False) -> _HttpxResponse:
+        return self._request("GET", uri, headers, verify, stream=stream)
+
+    def post(self, uri: str, headers: Dict[str, str], verify: Verify, data: str) -> _HttpxResponse:
+        return self._request("POST", uri, headers, verify, data)
+
+    def delete(self, uri: str, headers: Dict[str, str], verify: Verify) -> _HttpxResponse:
+        return self._request("DELETE", uri, headers, verify)
+
+    def patch(self, uri: str, headers: Dict[str, str], verify: Verify, data: str) -> _HttpxResponse:
+        return self._request("PATCH", uri, headers, verify, data)
+
+    def close(self) -> None:
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
@@ -0,0 +1,126 @@
+"""Contains helpers for the logging of the library.
+
+The library logs with the `logging` module to loggers below `lab_orchestrator_lib`. Log messages use %-style arguments,
+so they are only formatted if a handler needs them. Structured information is added with `extra`, for example the
+lab instance id and the namespace.
+
+Writing log records can block, for example when a handler writes to a file or to the network. `QueueLogging` moves the
+handlers to a background thread so that logging never blocks your request threads:
+
+    handler = logging.StreamHandler()
+    handler.setFormatter(StructuredFormatter())
+    queue_logging = QueueLogging(handler, level=logging.INFO).start()
+    ...
+    queue_logging.stop()
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import threading
+from typing import Any, Dict, Optional
+
+LIBRARY_LOGGER = "lab_orchestrator_lib"
+
+_STANDARD_ATTRIBUTES = set(logging.LogRecord("", logging.INFO, "", 0, "", None, None).__dict__) | {"message",
+                                                                                                  "asctime"}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Formats log records as JSON lines.
+
+    Every line contains the time, the level, the logger and the message. Attributes that were added with `extra` are
+    added as additional fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _STANDARD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full.
+
+    :param dropped: Amount of records that were dropped.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+class QueueLogging:
+    """Sends the log records of the library through a queue to handlers that run in a background thread."""
+
+    def __init__(self, *handlers: logging.Handler, logger_name: str = LIBRARY_LOGGER, queue_size: int = 10000,
+                 level: Optional[int] = None):
+        """Initializes queue logging.
+
+        :param handlers: The handlers that should write the log records. They run in the background thread.
+        :param logger_name: The logger that gets the queue handler. Default: the logger of the library.
+        :param queue_size: Maximal amount of records in the queue. If the queue is full, new records are dropped.
+        :param level: If not None, the level of the logger is set to this level.
+        """
+        self.handlers = list(handlers)
+        self.logger = logging.getLogger(logger_name)
+        self.level = level
+        self.queue: queue.Queue = queue.Queue(queue_size)
+        self.queue_handler = NonBlockingQueueHandler(self.queue)
+        self.listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self._propagate = self.logger.propagate
+
+    @property
+    def dropped(self) -> int:
+        """Amount of records that were dropped because the queue was full."""
+        return self.queue_handler.dropped
+
+    def start(self) -> 'QueueLogging':
+        """Starts the background thread and adds the queue handler to the logger.
+
+        The logger doesn't propagate records to the root logger while queue logging is running, because the handlers
+        of the root logger would run in the request thread again.
+
+        :return: self
+        """
+        if self.level is not None:
+            self.logger.setLevel(self.level)
+        self.listener.start()
+        self.logger.addHandler(self.queue_handler)
+        self._propagate = self.logger.propagate
+        self.logger.propagate = False
+        return self
+
+    def stop(self) -> None:
+        """Removes the queue handler and writes all remaining records.
+
+        :return: None
+        """
+        self.logger.removeHandler(self.queue_handler)
+        self.logger.propagate = self._propagate
+        self.listener.stop()
+
+    def __enter__(self) -> 'QueueLogging':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+        return False
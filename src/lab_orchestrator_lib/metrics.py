@@ -0,0 +1,317 @@
+"""Contains the metrics instrumentation of the library.
+
+The library reports metrics to the recorder that is set with `set_recorder`. The default recorder is a `NoopRecorder`
+that ignores everything, so metrics cost nearly nothing when they are not used. To collect metrics set a
+`PrometheusRecorder` or your own implementation of `MetricsRecorder`:
+
+    recorder = PrometheusRecorder()
+    set_recorder(recorder)
+    recorder.serve(9100)  # or use recorder.render() in your own web framework
+
+The following metrics are recorded:
+
+- `lab_orchestrator_kubernetes_requests_total`: Counter of requests to the Kubernetes API with the labels method,
+  endpoint and status. Names of namespaces and resources are replaced by placeholders in the endpoint.
+- `lab_orchestrator_kubernetes_request_duration_seconds`: Histogram of the request latency with the labels method and
+  endpoint.
+- `lab_orchestrator_kubernetes_coalesced_requests_total`: Counter of GET requests with the label endpoint that were not
+  sent, because they got the result of an identical request that was running. The coalescing ratio is this counter
+  divided by the sum of this counter and the GET requests.
+- `lab_orchestrator_kubernetes_cache_requests_total`: Counter of GET requests with the labels endpoint and result that
+  were looked up in the response cache of the proxy. The result is "hit" if the cached response was fresh,
+  "revalidated" if an object was still valid after a small validation request and "miss" if the full response was requested.
+- `lab_orchestrator_template_render_duration_seconds`: Histogram of the template engine with the labels template and
+  operation (load or dump).
+- `lab_orchestrator_adapter_call_duration_seconds`: Histogram of adapter calls with the labels adapter and method.
+- `lab_orchestrator_lab_start_step_duration_seconds`: Histogram of the steps of starting a lab with the label step.
+- `lab_orchestrator_lab_start_duration_seconds`: Histogram of the whole time that is needed to start a lab.
+"""
+
+import contextlib
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import ContextManager, Dict, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:  # pragma: no cover - http.server is only imported when the metrics are served
+    from http.server import ThreadingHTTPServer
+
+Labels = Optional[Dict[str, str]]
+
+KUBERNETES_REQUESTS = "lab_orchestrator_kubernetes_requests_total"
+KUBERNETES_REQUEST_DURATION = "lab_orchestrator_kubernetes_request_duration_seconds"
+KUBERNETES_COALESCED_REQUESTS = "lab_orchestrator_kubernetes_coalesced_requests_total"
+KUBERNETES_CACHE_REQUESTS = "lab_orchestrator_kubernetes_cache_requests_total"
+TEMPLATE_RENDER_DURATION = "lab_orchestrator_template_render_duration_seconds"
+ADAPTER_CALL_DURATION = "lab_orchestrator_adapter_call_duration_seconds"
+LAB_START_STEP_DURATION = "lab_orchestrator_lab_start_step_duration_seconds"
+LAB_START_DURATION = "lab_orchestrator_lab_start_duration_seconds"
+
+DESCRIPTIONS = {
+    KUBERNETES_REQUESTS: "Requests to the Kubernetes API.",
+    KUBERNETES_REQUEST_DURATION: "Latency of requests to the Kubernetes API in seconds.",
+    KUBERNETES_COALESCED_REQUESTS: "GET requests that got the result of an identical running request.",
+    KUBERNETES_CACHE_REQUESTS: "GET requests that were looked up in the response cache.",
+    TEMPLATE_RENDER_DURATION: "Time needed by the template engine in seconds.",
+    ADAPTER_CALL_DURATION: "Latency of database adapter calls in seconds.",
+    LAB_START_STEP_DURATION: "Time needed by the single steps of starting a lab in seconds.",
+    LAB_START_DURATION: "Time needed to start a lab in seconds.",
+}
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP_TIMER = contextlib.nullcontext()
+
+
+class MetricsRecorder(ABC):
+    """Interface of metric recorders.
+
+    :param enabled: If this is False, the library skips measuring completely.
+    """
+
+    enabled = True
+
+    @abstractmethod
+    def inc(self, name: str, labels: Labels = None, amount: float = 1.0) -> None:
+        """Increases a counter.
+
+        :param name: The name of the counter.
+        :param labels: The labels of the counter.
+        :param amount: The amount that is added to the counter.
+        :return: None
+        """
+        raise NotImplementedError()
+
+    @abstractmethod
+    def observe(self, name: str, value: float, labels: Labels = None) -> None:
+        """Adds an observation to a histogram.
+
+        :param name: The name of the histogram.
+        :param value: The observed value, for durations in seconds.
+        :param labels: The labels of the histogram.
+        :return: None
+        """
+        raise NotImplementedError()
+
+    def time(self, name: str, labels: Labels = None) -> ContextManager:
+        """Gives a context manager that observes the duration of its block in a histogram.
+
+        :param name: The name of the histogram.
+        :param labels: The labels of the histogram.
+        :return: The context manager.
+        """
+        return _Timer(self, name, labels)
+
+
+class _Timer:
+    """Context manager that observes the duration of its block."""
+
+    __slots__ = ("recorder", "name", "labels", "start")
+
+    def __init__(self, recorder: MetricsRecorder, name: str, labels: Labels):
+        self.recorder = recorder
+        self.name = name
+        self.labels = labels
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.recorder.observe(self.name, time.perf_counter() - self.start, self.labels)
+        return False
+
+
+class NoopRecorder(MetricsRecorder):
+    """Recorder that ignores all metrics. This is the default recorder."""
+
+    enabled = False
+
+    def inc(self, name: str, labels: Labels = None, amount: float = 1.0) -> None:
+        pass
+
+    def observe(self, name: str, value: float, labels: Labels = None) -> None:
+        pass
+
+    def time(self, name: str, labels: Labels = None) -> ContextManager:
+        return _NOOP_TIMER
+
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    """Cumulative histogram of one label combination."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    labels = [f'{name}="{_escape(value)}"' for name, value in key]
+    if extra:
+        labels.append(extra)
+    if not labels:
+        return ""
+    return "{" + ",".join(labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class PrometheusRecorder(MetricsRecorder):
+    """Recorder that keeps the metrics in memory and exports them in the Prometheus text format.
+
+    This recorder is thread safe.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """Initializes a prometheus recorder.
+
+        :param buckets: The upper bounds of the histogram buckets.
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(labels: Labels) -> LabelKey:
+        if not labels:
+            return ()
+        return tuple(sorted(labels.items()))
+
+    def inc(self, name: str, labels: Labels = None, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counter = self._counters.setdefault(name, {})
+            counter[key] = counter.get(key, 0.0) + amount
+
+    def observe(self, name: str, value: float, labels: Labels = None) -> None:
+        key = self._key(labels)
+        with self._lock:
+            histograms = self._histograms.setdefault(name, {})
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = _Histogram(len(self.buckets))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram.counts[i] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    def get_counter(self, name: str, labels: Labels = None) -> float:
+        """Gives the value of a counter.
+
+        :param name: The name of the counter.
+        :param labels: The labels of the counter.
+        :return: The value or 0 if the counter doesn't exist.
+        """
+        with self._lock:
+            return self._counters.get(name, {}).get(self._key(labels), 0.0)
+
+    def get_histogram_count(self, name: str, labels: Labels = None) -> int:
+        """Gives the amount of observations of a histogram.
+
+        :param name: The name of the histogram.
+        :param labels: The labels of the histogram.
+        :return: The amount of observations or 0 if the histogram doesn't exist.
+        """
+        with self._lock:
+            histogram = self._histograms.get(name, {}).get(self._key(labels))
+            return 0 if histogram is None else histogram.count
+
+    def render(self) -> str:
+        """Exports all metrics in the Prometheus text format.
+
+        :return: The metrics as text.
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name, counter in sorted(self._counters.items()):
+                self._header(lines, name, "counter")
+                for key, value in sorted(counter.items()):
+                    lines.append(f"{name}{_format_labels(key)} {_format_value(value)}")
+            for name, histograms in sorted(self._histograms.items()):
+                self._header(lines, name, "histogram")
+                for key, histogram in sorted(histograms.items()):
+                    for bound, count in zip(self.buckets, histogram.counts):
+                        le = 'le="' + _format_value(bound) + '"'
+                        lines.append(f"{name}_bucket{_format_labels(key, le)} {count}")
+                    le = 'le="+Inf"'
+                    lines.append(f"{name}_bucket{_format_labels(key, le)} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {_format_value(histogram.sum)}")
+                    lines.append(f"{name}_count{_format_labels(key)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _header(lines: List[str], name: str, metric_type: str) -> None:
+        if name in DESCRIPTIONS:
+            lines.append(f"# HELP {name} {DESCRIPTIONS[name]}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+    def serve(self, port: int = 0, host: str = "127.0.0.1") -> 'ThreadingHTTPServer':
+        """Starts an http server in a daemon thread that exports the metrics at `/metrics`.
+
+        :param port: The port of the server. 0 chooses a free port.
+        :param host: The address the server listens on.
+        :return: The server. Call `shutdown` to stop it. The port is in `server.server_address`.
+        """
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        recorder = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = recorder.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+_recorder: MetricsRecorder = NoopRecorder()
+
+
+def get_recorder() -> MetricsRecorder:
+    """Gives the recorder that is used by the library.
+
+    :return: The current recorder.
+    """
+    return _recorder
+
+
+def set_recorder(recorder: Optional[MetricsRecorder] = None) -> MetricsRecorder:
+    """Sets the recorder that is used by the library.
+
+    :param recorder: The new recorder. If None, metrics are disabled.
+    :return: The previous recorder.
+    """
+    global _recorder
+    previous = _recorder
+    _recorder = NoopRecorder() if recorder is None else recorder
+    return previous
@@ -0,0 +1,297 @@
+"""Contains a columnar collection of lab instances.
+
+Lists of lab instance objects are slow and need a lot of memory when you only want to count or filter them, for example
+in admin dashboards. `LabInstanceColumns` keeps the attributes of many lab instances in parallel columns instead. Integer
+columns are stored in `array.array` or, if NumPy is installed, in NumPy arrays. Filters, counts and joins then work on
+whole columns.
+
+The collection is also a sequence of `LabInstance` objects, so adapters can return it from `get_all` and `filter`
+without breaking code that iterates over lab instances. The objects are only created when they are accessed.
+"""
+
+from array import array
+from collections import Counter, defaultdict
+from itertools import compress
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union, overload
+
+from lab_orchestrator_lib.model.model import Identifier, LabDockerImage, LabInstance
+
+# NumPy takes longer to import than the whole package, so it's imported when the first collection is created.
+numpy: Any = None
+_numpy_imported = False
+
+Column = Union[List[Any], array, Any]
+
+
+def _import_numpy() -> bool:
+    """Imports NumPy on first use.
+
+    :return: True if NumPy is installed.
+    """
+    global numpy, _numpy_imported
+    if not _numpy_imported:
+        try:
+            import numpy as numpy_module
+            numpy = numpy_module
+        except ImportError:  # pragma: no cover - numpy is optional
+            pass
+        _numpy_imported = True
+    return numpy is not None
+
+
+def _is_int(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class LabInstanceColumns(Sequence[LabInstance]):
+    """Columnar collection of lab instances.
+
+    :param COLUMNS: Names of the columns. They are the attributes of `LabInstance`.
+    """
+
+    COLUMNS = ("primary_key", "lab_id", "user_id", "created_at", "cluster", "namespace_name")
+
+    def __init__(self, primary_key: Iterable[Identifier], lab_id: Iterable[Identifier], user_id: Iterable[Identifier],
+                 created_at: Optional[Iterable[Optional[float]]] = None,
+                 cluster: Optional[Iterable[Optional[str]]] = None,
+                 namespace_name: Optional[Iterable[Optional[str]]] = None, use_numpy: Optional[bool] = None):
+        """Initializes a columnar collection.
+
+        :param primary_key: The primary keys of the lab instances.
+        :param lab_id: The lab ids of the lab instances.
+        :param user_id: The user ids of the lab instances.
+        :param created_at: The creation times of the lab instances. None: all are None.
+        :param cluster: The clusters of the lab instances. None: all are None.
+        :param namespace_name: The namespace names of the lab instances. None: all are None.
+        :param use_numpy: If True, the columns are NumPy arrays. None: NumPy is used if it is installed.
+        :raise ValueError: If the columns have different lengths.
+        :raise ImportError: If use_numpy is True and NumPy is not installed.
+        """
+        numpy_installed = use_numpy is not False and _import_numpy()
+        if use_numpy is None:
+            use_numpy = numpy_installed
+        elif use_numpy and not numpy_installed:
+            raise ImportError("NumPy is not installed.")
+        self.use_numpy = use_numpy
+        self.primary_key = self._column(primary_key)
+        self.lab_id = self._column(lab_id)
+        self.user_id = self._column(user_id)
+        length = len(self.primary_key)
+        self.created_at = self._column([None] * length if created_at is None else created_at)
+        self.cluster = self._column([None] * length if cluster is None else cluster)
+        self.namespace_name = self._column([None] * length if namespace_name is None else namespace_name)
+        if any(len(getattr(self, name)) != length for name in self.COLUMNS):
+            raise ValueError("All columns need to have the same length.")
+
+    def _column(self, values: Iterable[Any]) -> Column:
+        """Converts values to the most compact column type."""
+        if self.use_numpy and isinstance(values, numpy.ndarray):
+            return values
+        if not self.use_numpy and isinstance(values, array):
+            return values
+        values = list(values)
+        ints = all(_is_int(value) for value in values)
+        if self.use_numpy:
+            if ints:
+                try:
+                    return numpy.array(values, dtype=numpy.int64)
+                except OverflowError:
+                    pass
+            column = numpy.empty(len(values), dtype=object)
+            column[:] = values
+            return column
+        if ints:
+            try:
+                return array("q", values)
+            except OverflowError:
+                pass
+        return values
+
+    @classmethod
+    def from_lab_instances(cls, lab_instances: Iterable[LabInstance],
+                           use_numpy: Optional[bool] = None) -> 'LabInstanceColumns':
+        """Creates a columnar collection from lab instance objects.
+
+        :param lab_instances: The lab instances.
+        :param use_numpy: See `__init__`.
+        :return: The columnar collection.
+        """
+        if isinstance(lab_instances, LabInstanceColumns):
+            return lab_instances
+        lab_instances = list(lab_instances)
+        return cls(*([getattr(lab_instance, name) for lab_instance in lab_instances] for name in cls.COLUMNS),
+                   use_numpy=use_numpy)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]], use_numpy: Optional[bool] = None) -> 'LabInstanceColumns':
+        """Creates a columnar collection from database rows.
+
+        :param rows: Tuples of (primary_key, lab_id, user_id) or of all `COLUMNS` in their order.
+        :param use_numpy: See `__init__`.
+        :return: The columnar collection.
+        """
+        columns = [list(column) for column in zip(*rows)]
+        if not columns:
+            return cls([], [], [], use_numpy=use_numpy)
+        return cls(*columns, use_numpy=use_numpy)
+
+    def __len__(self) -> int:
+        return len(self.primary_key)
+
+    @overload
+    def __getitem__(self, index: int) -> LabInstance:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> 'LabInstanceColumns':
+        ...
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._take_range(index)
+        return LabInstance.from_row(*(self._value(getattr(self, name)[index]) for name in self.COLUMNS))
+
+    def __iter__(self) -> Iterator[LabInstance]:
+        for row in zip(*(getattr(self, name) for name in self.COLUMNS)):
+            yield LabInstance.from_row(*(self._value(value) for value in row))
+
+    def __repr__(self) -> str:
+        return f"<LabInstanceColumns of {len(self)} lab instances>"
+
+    def _value(self, value: Any) -> Any:
+        """Converts NumPy scalars back to python values."""
+        if self.use_numpy and isinstance(value, numpy.generic):
+            return value.item()
+        return value
+
+    def _new(self, columns: Iterable[Column]) -> 'LabInstanceColumns':
+        return LabInstanceColumns(*columns, use_numpy=self.use_numpy)
+
+    def _take_range(self, index: slice) -> 'LabInstanceColumns':
+        return self._new(getattr(self, name)[index] for name in self.COLUMNS)
+
+    def _take(self, mask: Any) -> 'LabInstanceColumns':
+        """Gives the lab instances where the mask is True."""
+        if self.use_numpy:
+            return self._new(getattr(self, name)[mask] for name in self.COLUMNS)
+        return self._new(self._compress(getattr(self, name), mask) for name in self.COLUMNS)
+
+    @staticmethod
+    def _compress(column: Column, mask: List[bool]) -> Column:
+        if isinstance(column, array):
+            return array(column.typecode, compress(column, mask))
+        return list(compress(column, mask))
+
+    def _mask(self, name: str, value: Any) -> Any:
+        """Gives a mask that is True where the column has the value."""
+        if name not in self.COLUMNS:
+            raise AttributeError(f"{name} is not a column.")
+        column = getattr(self, name)
+        if isinstance(value, (set, frozenset, list, tuple)):
+            values = set(value)
+            if self.use_numpy and column.dtype != object and all(_is_int(item) for item in values):
+                return numpy.isin(column, list(values))
+            if self.use_numpy:
+                return numpy.fromiter((item in values for item in column), dtype=bool, count=len(column))
+            return [item in values for item in column]
+        if self.use_numpy:
+            if column.dtype == object or not _is_int(value):
+                return numpy.fromiter((item == value for item in column), dtype=bool, count=len(column))
+            return column == value
+        return [item == value for item in column]
+
+    def filter(self, **kwargs: Any) -> 'LabInstanceColumns':
+        """Filters the lab instances.
+
+        The keyword arguments are column names with a value, all of them need to match. If the value is a set, list or
+        tuple, the column needs to contain one of the values.
+
+        :param kwargs: The filters, for example `lab_id=3` or `user_id={1, 2}`.
+        :return: A new collection with the matching lab instances.
+        :raise AttributeError: If a filter is not a column.
+        """
+        if not kwargs:
+            return self
+        mask = None
+        for name, value in kwargs.items():
+            column_mask = self._mask(name, value)
+            if mask is None:
+                mask = column_mask
+            elif self.use_numpy:
+                mask = mask & column_mask
+            else:
+                mask = [a and b for a, b in zip(mask, column_mask)]
+        return self._take(mask)
+
+    def count_by(self, name: str) -> Dict[Any, int]:
+        """Counts the lab instances per value of a column.
+
+        :param name: The column, for example "lab_id" or "user_id".
+        :return: A dictionary with the values of the column as keys and the amounts as values.
+        :raise AttributeError: If the name is not a column.
+        """
+        if name not in self.COLUMNS:
+            raise AttributeError(f"{name} is not a column.")
+        column = getattr(self, name)
+        if self.use_numpy and column.dtype != object:
+            values, counts = numpy.unique(column, return_counts=True)
+            return dict(zip(values.tolist(), counts.tolist()))
+        return dict(Counter(column))
+
+    def join(self, lab_docker_images: Iterable[LabDockerImage]) -> Dict[str, Column]:
+        """Joins the lab instances with the lab docker images of their labs.
+
+        The result contains one row for every VM of every lab instance.
+
+        :param lab_docker_images: The lab docker images.
+        :return: Columns "primary_key", "lab_id", "user_id", "cluster", "namespace_name", "lab_docker_image_id",
+            "docker_image_id" and "docker_image_name".
+        """
+        lab_docker_images = list(lab_docker_images)
+        left, right = self._join_indices([image.lab_id for image in lab_docker_images])
+        result = {name: self._gather(getattr(self, name), left)
+                  for name in ("primary_key", "lab_id", "user_id", "cluster", "namespace_name")}
+        image_columns = {
+            "lab_docker_image_id": [image.primary_key for image in lab_docker_images],
+            "docker_image_id": [image.docker_image_id for image in lab_docker_images],
+            "docker_image_name": [image.docker_image_name for image in lab_docker_images],
+        }
+        for name, values in image_columns.items():
+            result[name] = self._gather(self._column(values), right)
+        return result
+
+    def _join_indices(self, image_lab_ids: List[Identifier]) -> Tuple[Any, Any]:
+        """Gives the indices of the lab instances and the lab docker images that belong together."""
+        if self.use_numpy and self.lab_id.dtype != object and all(_is_int(lab_id) for lab_id in image_lab_ids):
+            image_lab = numpy.array(image_lab_ids, dtype=numpy.int64)
+            order = numpy.argsort(image_lab, kind="stable")
+            sorted_lab = image_lab[order]
+            starts = numpy.searchsorted(sorted_lab, self.lab_id, side="left")
+            counts = numpy.searchsorted(sorted_lab, self.lab_id, side="right") - starts
+            left = numpy.repeat(numpy.arange(len(self)), counts)
+            offsets = numpy.arange(len(left)) - numpy.repeat(numpy.cumsum(counts) - counts, counts)
+            right = order[numpy.repeat(starts, counts) + offsets]
+            return left, right
+        images_by_lab: Dict[Identifier, List[int]] = defaultdict(list)
+        for index, lab_id in enumerate(image_lab_ids):
+            images_by_lab[lab_id].append(index)
+        left, right = [], []
+        for index, lab_id in enumerate(self.lab_id):
+            for image_index in images_by_lab.get(lab_id, ()):
+                left.append(index)
+                right.append(image_index)
+        return left, right
+
+    def _gather(self, column: Column, indices: Any) -> Column:
+        if self.use_numpy:
+            return column[indices]
+        if isinstance(column, array):
+            return array(column.typecode, (column[index] for index in indices))
+        return [column[index] for index in indices]
+
+    def to_lab_instances(self) -> List[LabInstance]:
+        """Converts the collection to a list of lab instance objects.
+
+        :return: The lab instances.
+        """
+        return list(self)
@@ -1,14 +1,44 @@
 """Contains the dataclasses that are used in this project."""
-from typing import Union, List
+import re
+from operator import attrgetter
+from typing import Any, Callable, Dict, Iterable, Union, List, Optional, Tuple
 
 from lab_orchestrator_lib.custom_exceptions import ValidationError
+from lab_orchestrator_lib.quantity import parse_memory_quantity, parse_cpu_quantity
 
 
 Identifier = Union[str, int]
 
 
+def _values_getter(fields: Tuple[str, ...]) -> Callable[[Any], Tuple[Any, ...]]:
+    """Gives a function that returns the values of the fields of an object as tuple."""
+    getter = attrgetter(*fields)
+    if len(fields) == 1:
+        return lambda obj: (getter(obj),)
+    return getter
+
+
 class Model:
-    """Abstract base class that is used for all classes that should be saved in a database."""
+    """Abstract base class that is used for all classes that should be saved in a database.
+
+    The models use `__slots__`, so they have no `__dict__` and need less memory. Every model has a `from_row`
+    classmethod that creates an object without validation. Use it in adapters for rows that were validated when they
+    were saved, for example when loading many rows from the database.
+
+    The attributes of a model are listed in `fields`, in the order of the parameters of `from_row`. `to_tuple`,
+    `to_dict` and `from_dict` use them to convert objects, for example to cache them or to send them to other
+    processes. The getter of the fields is created once per class.
+
+    :param fields: The names of the attributes of the model.
+    """
+
+    __slots__ = ("primary_key",)
+    fields: Tuple[str, ...] = ("primary_key",)
+    _values: Callable[[Any], Tuple[Any, ...]] = staticmethod(_values_getter(fields))
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._values = staticmethod(_values_getter(cls.fields))
 
     def __init__(self, primary_key: Identifier):
         """Initializes a model object.
@@ -20,6 +50,40 @@ class Model:
             raise ValidationError("primary key is too short.")
         self.primary_key = primary_key
 
+    def to_tuple(self) -> Tuple[Any, ...]:
+        """Gives the values of the fields.
+
+        :return: The values in the order of `fields`. They can be passed to `from_row`.
+        """
+        return self._values(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converts the object to a dictionary.
+
+        :return: A dictionary with the fields as keys.
+        """
+        return dict(zip(self.fields, self._values(self)))
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], validate: bool = False) -> 'Model':
+        """Creates an object from a dictionary that was created by `to_dict`.
+
+        :param data: A dictionary with the fields as keys. Optional fields can be missing.
+        :param validate: If True, the object is created with `__init__` and validated, else with `from_row`.
+        :return: The object.
+        :raise TypeError: If a required field is missing or an unknown field is given.
+        :raise ValidationError: If validate is True and one of the values is invalid.
+        """
+        if validate:
+            return cls(**data)
+        return cls.from_row(**data)
+
+
+# lowercase alphanumeric characters or '-', starts with an alphabetic character, ends with an alphanumeric character
+_dns_label_matcher = re.compile(r'[a-z](?:[a-z0-9-]{0,61}[a-z0-9])?')
+# lowercase alphanumeric characters, '-' or '.', starts and ends with an alphanumeric character
+_dns_subdomain_matcher = re.compile(r'[a-z0-9](?:[a-z0-9.-]{0,251}[a-z0-9])?')
+
 
 def check_dns_name(name) -> bool:
     """Checks if the name is a valid dns label.
@@ -29,24 +93,7 @@ def check_dns_name(name) -> bool:
     :param name: The name to check.
     :return: If the dns name is valid.
     """
-    alphabetic = "abcdefghijklmnopqrstuvwxyz"
-    alphanumeric = alphabetic + "1234567890"
-    allowed_chars = alphanumeric + "-"
-    if len(name) <= 0:
-        return False
-    if len(name) > 63:
-        return False
-    # contain only lowercase alphanumeric characters or '-'
-    for char in name:
-        if char not in allowed_chars:
-            return False
-    # start with an alphabetic character
-    if name[0] not in alphabetic:
-        return False
-    # end with an alphanumeric character
-    if name[len(name) - 1] not in alphanumeric:
-        return False
-    return True
+    return _dns_label_matcher.fullmatch(name) is not None
 
 
 def check_dns_subdomain_name(name) -> bool:
@@ -57,29 +104,29 @@ def check_dns_subdomain_name(name) -> bool:
     :param name: The name to check.
     :return: If the dns subdomain name is valid.
     """
-    alphabetic = "abcdefghijklmnopqrstuvwxyz"
-    alphanumeric = alphabetic + "1234567890"
-    allowed_chars = alphanumeric + "-."
-    if len(name) <= 0:
-        return False
-    if len(name) > 253:
-        return False
-    # contain only lowercase alphanumeric characters or '-' or '.'
-    for char in name:
-        if char not in allowed_chars:
-            return False
-    # start with an alphanumeric character
-    if name[0] not in alphanumeric:
-        return False
-    # end with an alphanumeric character
-    if name[len(name) - 1] not in alphanumeric:
-        return False
-    return True
+    return _dns_subdomain_matcher.fullmatch(name) is not None
+
+
+def validate_many(names: Iterable[str], subdomain: bool = False) -> List[bool]:
+    """Checks many names at once, for example the names of rows that are loaded from the database.
+
+    Every distinct name is only checked once.
+
+    :param names: The names to check.
+    :param subdomain: If True, the names are checked as dns subdomain names, else as dns labels.
+    :return: For every name if it is valid, in the order of the names.
+    """
+    fullmatch = (_dns_subdomain_matcher if subdomain else _dns_label_matcher).fullmatch
+    names = list(names)
+    valid = {name: fullmatch(name) is not None for name in set(names)}
+    return [valid[name] for name in names]
 
 
 class User(Model):
     """A User of the library."""
 
+    __slots__ = ()
+
     def __init__(self, primary_key: Identifier):
         """Initializes a user object.
 
@@ -93,6 +140,17 @@ class User(Model):
                 raise ValidationError("primary key contains illegal characters.")
         super().__init__(primary_key)
 
+    @classmethod
+    def from_row(cls, primary_key: Identifier) -> 'User':
+        """Creates a user without validation.
+
+        :param primary_key: A unique value to identify the object.
+        :return: The user.
+        """
+        obj = cls.__new__(cls)
+        obj.primary_key = primary_key
+        return obj
+
 
 class DockerImage(Model):
     """Link to a Docker Image that contains a VM image.
@@ -100,6 +158,10 @@ class DockerImage(Model):
     A docker image object is a link to a docker image that contains a VM image. This is used to create labs. If your
     image is in docker hub the link only needs to contain `username/reponame:version` and no `https://...` stuff.
     """
+
+    __slots__ = ("name", "description", "url")
+    fields = ("primary_key", "name", "description", "url")
+
     def __init__(self, primary_key: Identifier, name: str, description: str, url: str):
         """Initializes a docker image object.
 
@@ -127,6 +189,19 @@ class DockerImage(Model):
         self.description = description
         self.url = url
 
+    @classmethod
+    def from_row(cls, primary_key: Identifier, name: str, description: str, url: str) -> 'DockerImage':
+        """Creates a docker image without validation. The parameters are the same as in `__init__`.
+
+        :return: The docker image.
+        """
+        obj = cls.__new__(cls)
+        obj.primary_key = primary_key
+        obj.name = name
+        obj.description = description
+        obj.url = url
+        return obj
+
 
 class LabDockerImage(Model):
     """A Lab Docker Image is a docker image that is referenced to a lab.
@@ -134,14 +209,25 @@ class LabDockerImage(Model):
     This is needed to have multiple VMs in one lab.
     """
 
+    __slots__ = ("lab_id", "docker_image_id", "docker_image_name", "cores", "memory", "cpu_limit", "memory_limit")
+    fields = ("primary_key", "lab_id", "docker_image_id", "docker_image_name", "cores", "memory", "cpu_limit",
+              "memory_limit")
+
     def __init__(self, primary_key: Identifier, lab_id: Identifier, docker_image_id: Identifier,
-                 docker_image_name: str):
+                 docker_image_name: str, cores: Optional[int] = None, memory: Optional[str] = None,
+                 cpu_limit: Optional[str] = None, memory_limit: Optional[str] = None):
         """Initializes a lab docker image.
 
+        If the sizing of the VM is not set, the defaults of the virtual machine instance controller are used.
+
         :param primary_key: A unique value to identify the object.
         :param lab_id: Id of the lab.
         :param docker_image_id: Id of the docker image.
         :param docker_image_name: Name of the VM. (valid dns subdomain)
+        :param cores: Amount of cpu cores of the VM. (if set, min. 1)
+        :param memory: Memory that is requested by the VM, for example "512Mi". (if set, valid memory quantity)
+        :param cpu_limit: Maximum cpu usage of the VM, for example "1500m". (if set, valid cpu quantity)
+        :param memory_limit: Maximum memory usage of the VM. (if set, valid memory quantity and not less than memory)
         :raise ValidationError: if one of the parameters has an invalid value.
         """
         super().__init__(primary_key)
@@ -149,7 +235,42 @@ class LabDockerImage(Model):
         self.docker_image_id = docker_image_id
         if not check_dns_subdomain_name(docker_image_name):
             raise ValidationError("docker_image_name is not a valid dns subdomain")
+        if cores is not None and (not isinstance(cores, int) or isinstance(cores, bool) or cores <= 0):
+            raise ValidationError("cores needs to be a positive integer.")
+        try:
+            memory_bytes = parse_memory_quantity(memory) if memory is not None else None
+            memory_limit_bytes = parse_memory_quantity(memory_limit) if memory_limit is not None else None
+            cpu_limit_cores = parse_cpu_quantity(cpu_limit) if cpu_limit is not None else None
+        except ValueError as e:
+            raise ValidationError(str(e)) from e
+        if memory_bytes is not None and memory_limit_bytes is not None and memory_limit_bytes < memory_bytes:
+            raise ValidationError("memory_limit is less than memory.")
+        if cpu_limit_cores is not None and cpu_limit_cores <= 0:
+            raise ValidationError("cpu_limit needs to be positive.")
         self.docker_image_name = docker_image_name
+        self.cores = cores
+        self.memory = memory
+        self.cpu_limit = cpu_limit
+        self.memory_limit = memory_limit
+
+    @classmethod
+    def from_row(cls, primary_key: Identifier, lab_id: Identifier, docker_image_id: Identifier,
+                 docker_image_name: str, cores: Optional[int] = None, memory: Optional[str] = None,
+                 cpu_limit: Optional[str] = None, memory_limit: Optional[str] = None) -> 'LabDockerImage':
+        """Creates a lab docker image without validation. The parameters are the same as in `__init__`.
+
+        :return: The lab docker image.
+        """
+        obj = cls.__new__(cls)
+        obj.primary_key = primary_key
+        obj.lab_id = lab_id
+        obj.docker_image_id = docker_image_id
+        obj.docker_image_name = docker_image_name
+        obj.cores = cores
+        obj.memory = memory
+        obj.cpu_limit = cpu_limit
+        obj.memory_limit = memory_limit
+        return obj
 
 
 class Lab(Model):
@@ -159,13 +280,20 @@ class Lab(Model):
     to combine VMs in a scenario.
     """
 
-    def __init__(self, primary_key: Identifier, name: str, namespace_prefix: str, description: str):
+    __slots__ = ("name", "namespace_prefix", "description", "ttl", "idle_timeout")
+    fields = ("primary_key", "name", "namespace_prefix", "description", "ttl", "idle_timeout")
+
+    def __init__(self, primary_key: Identifier, name: str, namespace_prefix: str, description: str,
+                 ttl: Optional[int] = None, idle_timeout: Optional[int] = None):
         """Initializes a lab object.
 
         :param primary_key: A unique value to identify the object.
         :param name: The name of the lab. (min. 1 char, max. 32 chars)
         :param namespace_prefix: A prefix that is used in the namespace in Kubernetes where the VMs are started. (max. 32 chars and needs to be a valid dns label)
         :param description: A short description of the docker image. (min. 1 char, max. 128 chars)
+        :param ttl: Seconds after that a lab instance of this lab is deleted. None means forever. (if set, min. 1)
+        :param idle_timeout: Seconds without activity after that a lab instance of this lab is deleted. None means
+                             forever. (if set, min. 1)
         :raise ValidationError: if one of the parameters has an invalid value.
         """
         super().__init__(primary_key)
@@ -181,9 +309,31 @@ class Lab(Model):
             raise ValidationError("description is too short.")
         if len(description) > 128:
             raise ValidationError("description is longer than 128 characters.")
+        if ttl is not None and ttl <= 0:
+            raise ValidationError("ttl needs to be positive.")
+        if idle_timeout is not None and idle_timeout <= 0:
+            raise ValidationError("idle_timeout needs to be positive.")
         self.name = name
         self.namespace_prefix = namespace_prefix
         self.description = description
+        self.ttl = ttl
+        self.idle_timeout = idle_timeout
+
+    @classmethod
+    def from_row(cls, primary_key: Identifier, name: str, namespace_prefix: str, description: str,
+                 ttl: Optional[int] = None, idle_timeout: Optional[int] = None) -> 'Lab':
+        """Creates a lab without validation. The parameters are the same as in `__init__`.
+
+        :return: The lab.
+        """
+        obj = cls.__new__(cls)
+        obj.primary_key = primary_key
+        obj.name = name
+        obj.namespace_prefix = namespace_prefix
+        obj.description = description
+        obj.ttl = ttl
+        obj.idle_timeout = idle_timeout
+        return obj
 
 
 class LabInstance(Model):
@@ -193,14 +343,27 @@ class LabInstance(Model):
     a lab. When you create them by your own you're probably doing something wrong.
     """
 
-    def __init__(self, primary_key: Identifier, lab_id: Identifier, user_id: Identifier):
+    __slots__ = ("lab_id", "user_id", "created_at", "cluster", "namespace_name")
+    fields = ("primary_key", "lab_id", "user_id", "created_at", "cluster", "namespace_name")
+
+    def __init__(self, primary_key: Identifier, lab_id: Identifier, user_id: Identifier,
+                 created_at: Optional[float] = None, cluster: Optional[str] = None,
+                 namespace_name: Optional[str] = None):
         """Initializes a lab instance object.
 
         :param primary_key: A unique value to identify the object. (if string, max. 16 chars and needs to be a valid dns label)
         :param lab_id: The id of the lab that is started.
         :param user_id: The id of the user that has started the lab.
+        :param created_at: Unix timestamp of the creation of the lab instance. Used to calculate when the lab instance
+                           expires.
+        :param cluster: Name of the Kubernetes cluster the lab instance runs in. None if only one cluster is used.
+        :param namespace_name: Name of the namespace of the lab instance. It's set by the lab instance controller when
+                               the lab instance is created. None for lab instances that were saved before the namespace
+                               name was saved. (if set, max. 63 chars and needs to be a valid dns label)
         :raise ValidationError: if one of the parameters has an invalid value.
         """
+        if namespace_name is not None and (len(namespace_name) > 63 or not check_dns_name(namespace_name)):
+            raise ValidationError("namespace_name is not a valid dns label.")
         if isinstance(primary_key, str):
             if len(primary_key) > 16:
                 raise ValidationError("primary key is longer than 16 characters.")
@@ -209,6 +372,26 @@ class LabInstance(Model):
         super().__init__(primary_key)
         self.lab_id = lab_id
         self.user_id = user_id
+        self.created_at = created_at
+        self.cluster = cluster
+        self.namespace_name = namespace_name
+
+    @classmethod
+    def from_row(cls, primary_key: Identifier, lab_id: Identifier, user_id: Identifier,
+                 created_at: Optional[float] = None, cluster: Optional[str] = None,
+                 namespace_name: Optional[str] = None) -> 'LabInstance':
+        """Creates a lab instance without validation. The parameters are the same as in `__init__`.
+
+        :return: The lab instance.
+        """
+        obj = cls.__new__(cls)
+        obj.primary_key = primary_key
+        obj.lab_id = lab_id
+        obj.user_id = user_id
+        obj.created_at = created_at
+        obj.cluster = cluster
+        obj.namespace_name = namespace_name
+        return obj
 
 
 class LabInstanceKubernetes(Model):
@@ -217,8 +400,12 @@ class LabInstanceKubernetes(Model):
     Doesn't need any adapter and should not be saved in the database. This is used to return the JWT access token when
     the lab is started.
     """
+
+    __slots__ = ("lab_id", "user_id", "jwt_token", "allowed_vmis", "cluster")
+    fields = ("primary_key", "lab_id", "user_id", "jwt_token", "allowed_vmis", "cluster")
+
     def __init__(self, primary_key: Identifier, lab_id: Identifier, user_id: Identifier, jwt_token: str,
-                 allowed_vmis: List[str]):
+                 allowed_vmis: List[str], cluster: Optional[str] = None):
         """Initializes a lab instance kubernetes object.
 
         :param primary_key: A unique value to identify the object. (if string, max. 14 chars)
@@ -226,9 +413,27 @@ class LabInstanceKubernetes(Model):
         :param user_id: The id of the user that has started the lab.
         :param jwt_token: JWT token that can be used to access the VMs in this lab instance.
         :param allowed_vmis: List of VMI names that the user is allowed to open.
+        :param cluster: Name of the Kubernetes cluster the lab instance runs in. None if only one cluster is used.
         """
         super().__init__(primary_key)
         self.lab_id = lab_id
         self.user_id = user_id
         self.jwt_token = jwt_token
         self.allowed_vmis = allowed_vmis
+        self.cluster = cluster
+
+    @classmethod
+    def from_row(cls, primary_key: Identifier, lab_id: Identifier, user_id: Identifier, jwt_token: str,
+                 allowed_vmis: List[str], cluster: Optional[str] = None) -> 'LabInstanceKubernetes':
+        """Creates a lab instance kubernetes object without validation. The parameters are the same as in `__init__`.
+
+        :return: The lab instance kubernetes object.
+        """
+        obj = cls.__new__(cls)
+        obj.primary_key = primary_key
+        obj.lab_id = lab_id
+        obj.user_id = user_id
+        obj.jwt_token = jwt_token
+        obj.allowed_vmis = allowed_vmis
+        obj.cluster = cluster
+        return obj
@@ -0,0 +1,97 @@
+"""Contains functions to serialize many model objects at once.
+
+The objects are encoded as rows: a list with the `fields` of the model and one list of values per object. The field
+names are only written once and the values are read with the getter of the model class, so there is no lookup of the
+attributes per object. Decoding creates the objects with `from_row` without validation, so only decode data that you
+have encoded yourself, for example from a cache or from another process.
+
+JSON works without additional packages. The compact binary format uses msgpack, which needs to be installed:
+`pip install lab_orchestrator_lib[msgpack]`.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Type, TypeVar
+
+from lab_orchestrator_lib.model.model import Model
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - msgpack is optional
+    msgpack = None
+
+T = TypeVar("T", bound=Model)
+
+
+def to_rows(model: Type[T], objects: Iterable[T]) -> Dict[str, Any]:
+    """Converts objects of one model to rows.
+
+    :param model: The model class of the objects.
+    :param objects: The objects.
+    :return: A dictionary with the "fields" of the model and the "rows" with the values of the objects.
+    """
+    return {"fields": list(model.fields), "rows": list(map(model._values, objects))}
+
+
+def from_rows(model: Type[T], data: Dict[str, Any]) -> List[T]:
+    """Creates objects from rows that were created by `to_rows`.
+
+    :param model: The model class of the objects.
+    :param data: The dictionary with the fields and the rows.
+    :return: The objects.
+    :raise ValueError: If the fields don't match the fields of the model.
+    """
+    if tuple(data["fields"]) != model.fields:
+        raise ValueError(f"The fields {data['fields']} don't match the fields of {model.__name__}.")
+    from_row = model.from_row
+    return [from_row(*row) for row in data["rows"]]
+
+
+def encode_json(model: Type[T], objects: Iterable[T]) -> str:
+    """Encodes objects of one model to JSON.
+
+    :param model: The model class of the objects.
+    :param objects: The objects.
+    :return: The JSON string.
+    """
+    return json.dumps(to_rows(model, objects), separators=(",", ":"))
+
+
+def decode_json(model: Type[T], data: str) -> List[T]:
+    """Decodes objects that were encoded by `encode_json`.
+
+    :param model: The model class of the objects.
+    :param data: The JSON string.
+    :return: The objects.
+    :raise ValueError: If the fields don't match the fields of the model.
+    """
+    return from_rows(model, json.loads(data))
+
+
+def _require_msgpack() -> None:
+    if msgpack is None:
+        raise ImportError("msgpack is not installed. Install it with: pip install lab_orchestrator_lib[msgpack]")
+
+
+def encode_msgpack(model: Type[T], objects: Iterable[T]) -> bytes:
+    """Encodes objects of one model to msgpack.
+
+    :param model: The model class of the objects.
+    :param objects: The objects.
+    :return: The msgpack bytes.
+    :raise ImportError: If msgpack is not installed.
+    """
+    _require_msgpack()
+    return msgpack.packb(to_rows(model, objects))
+
+
+def decode_msgpack(model: Type[T], data: bytes) -> List[T]:
+    """Decodes objects that were encoded by `encode_msgpack`.
+
+    :param model: The model class of the objects.
+    :param data: The msgpack bytes.
+    :return: The objects.
+    :raise ImportError: If msgpack is not installed.
+    :raise ValueError: If the fields don't match the fields of the model.
+    """
+    _require_msgpack()
+    return from_rows(model, msgpack.unpackb(data))
@@ -0,0 +1,62 @@
+"""Contains functions to parse Kubernetes resource quantities.
+
+Definition: https://kubernetes.io/docs/reference/kubernetes-api/common-definitions/quantity/
+"""
+
+import re
+from typing import Union
+
+_quantity_matcher = re.compile(r'([0-9]+(?:\.[0-9]*)?|\.[0-9]+)([a-zA-Z]*)')
+
+_MEMORY_SUFFIXES = {
+    "": 1,
+    "k": 10 ** 3, "M": 10 ** 6, "G": 10 ** 9, "T": 10 ** 12, "P": 10 ** 15, "E": 10 ** 18,
+    "Ki": 2 ** 10, "Mi": 2 ** 20, "Gi": 2 ** 30, "Ti": 2 ** 40, "Pi": 2 ** 50, "Ei": 2 ** 60,
+}
+
+_CPU_SUFFIXES = {
+    "": 1,
+    "m": 10 ** -3,
+}
+
+Quantity = Union[str, int, float]
+
+
+def _parse(quantity: Quantity, suffixes) -> float:
+    """Parses a quantity with the given suffixes.
+
+    :param quantity: The quantity to parse.
+    :param suffixes: Dictionary that maps the allowed suffixes to their multiplier.
+    :return: The value of the quantity.
+    :raise ValueError: if the quantity is invalid.
+    """
+    if isinstance(quantity, (int, float)) and not isinstance(quantity, bool):
+        if quantity < 0:
+            raise ValueError(f"quantity {quantity} is negative.")
+        return quantity
+    if not isinstance(quantity, str):
+        raise ValueError(f"quantity {quantity!r} is not a string or number.")
+    match = _quantity_matcher.fullmatch(quantity)
+    if match is None or match.group(2) not in suffixes:
+        raise ValueError(f"quantity {quantity!r} is invalid.")
+    return float(match.group(1)) * suffixes[match.group(2)]
+
+
+def parse_memory_quantity(quantity: Quantity) -> int:
+    """Converts a memory quantity like "3G" or "512Mi" to bytes.
+
+    :param quantity: The memory quantity.
+    :return: Amount of bytes.
+    :raise ValueError: if the quantity is invalid.
+    """
+    return int(_parse(quantity, _MEMORY_SUFFIXES))
+
+
+def parse_cpu_quantity(quantity: Quantity) -> float:
+    """Converts a cpu quantity like "2" or "500m" to cores.
+
+    :param quantity: The cpu quantity.
+    :return: Amount of cores.
+    :raise ValueError: if the quantity is invalid.
+    """
+    return _parse(quantity, _CPU_SUFFIXES)
@@ -1,11 +1,13 @@
 """Contains a template engine that is used to parse yaml files."""
 
 import re
+import threading
+import time
+from functools import lru_cache
 from typing import Any, Dict, Union, TextIO, Hashable
 
-import yaml as yaml_library
-import importlib.resources as pkg_resources
 from . import templates
+from . import metrics, tracing
 
 
 _path_matcher = re.compile(r'\$\{([^}^{]+)\}')
@@ -42,10 +44,40 @@ def _path_constructor_factory(data: DataType, strict: bool):
     return path_constructor
 
 
-class _VariableLoader(yaml_library.FullLoader):
-    """Loader that is used for replacing yaml-variables."""
-    yaml_constructors = yaml_library.FullLoader.yaml_constructors.copy()
-    yaml_implicit_resolvers = yaml_library.FullLoader.yaml_implicit_resolvers.copy()
+_local = threading.local()
+
+
+def _thread_path_constructor(loader, node):
+    """Constructor that delegates to the constructor of the load call that runs in the current thread."""
+    return _local.path_constructor(loader, node)
+
+
+@lru_cache(maxsize=None)
+def _variable_loader() -> type:
+    """Creates the loader that is used for replacing yaml-variables.
+
+    The loader is created on first use, so yaml is only imported when the first template is loaded.
+
+    :return: The loader class.
+    """
+    import yaml as yaml_library
+
+    class _VariableLoader(yaml_library.FullLoader):
+        """Loader that is used for replacing yaml-variables."""
+        yaml_constructors = yaml_library.FullLoader.yaml_constructors.copy()
+        yaml_implicit_resolvers = yaml_library.FullLoader.yaml_implicit_resolvers.copy()
+
+    # registered once, because every registration adds another resolver that is checked for each scalar
+    _VariableLoader.add_implicit_resolver('!path', _path_matcher, None)
+    _VariableLoader.add_constructor('!path', _thread_path_constructor)
+    return _VariableLoader
+
+
+def __getattr__(name: str) -> Any:
+    """Gives the lazily created `_VariableLoader` as module attribute (PEP 562)."""
+    if name == "_VariableLoader":
+        return _variable_loader()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class TemplateEngine:
@@ -54,8 +86,20 @@ class TemplateEngine:
     Used to replace yaml-variables.
     """
 
-    def __init__(self, yaml_lib=yaml_library):
-        self.yaml_lib = yaml_lib
+    def __init__(self, yaml_lib=None):
+        """Initializes a template engine.
+
+        :param yaml_lib: The yaml library. If None: PyYAML, which is imported when it's used the first time.
+        """
+        self._yaml_lib = yaml_lib
+
+    @property
+    def yaml_lib(self):
+        """The yaml library."""
+        if self._yaml_lib is None:
+            import yaml as yaml_library
+            self._yaml_lib = yaml_library
+        return self._yaml_lib
 
     def load(self, yaml_str: YamlStrType, data: DataType, strict: bool = False) -> YamlType:
         """Parses a yaml string to a python object and replaces yaml-variables.
@@ -66,9 +110,24 @@ class TemplateEngine:
             the default value None will be used.
         :return: yaml object.
         """
-        _VariableLoader.add_implicit_resolver('!path', _path_matcher, None)
-        _VariableLoader.add_constructor('!path', _path_constructor_factory(data, strict))
-        p = self.yaml_lib.load(yaml_str, Loader=_VariableLoader)
+        return self._load(yaml_str, data, strict, "string")
+
+    def _load(self, yaml_str: YamlStrType, data: DataType, strict: bool, template: str) -> YamlType:
+        """Parses a yaml string, records the render time and creates a span for it.
+
+        :param template: Name of the template, used as metric label.
+        """
+        recorder = metrics.get_recorder()
+        tracer = tracing.get_tracer()
+        if not recorder.enabled and not tracer.enabled:
+            _local.path_constructor = _path_constructor_factory(data, strict)
+            return self.yaml_lib.load(yaml_str, Loader=_variable_loader())
+        with tracer.start_span("template load", {"template": template}):
+            start = time.perf_counter()
+            _local.path_constructor = _path_constructor_factory(data, strict)
+            p = self.yaml_lib.load(yaml_str, Loader=_variable_loader())
+            recorder.observe(metrics.TEMPLATE_RENDER_DURATION, time.perf_counter() - start,
+                             {"template": template, "operation": "load"})
         return p
 
     def load_template(self, template: str, data: DataType, strict: bool = False) -> YamlType:
@@ -81,8 +140,9 @@ class TemplateEngine:
         the default value None will be used.
         :return: yaml object.
         """
+        import importlib.resources as pkg_resources
         cont = pkg_resources.read_text(templates, template)
-        return self.load(cont, data, strict)
+        return self._load(cont, data, strict, template)
 
     def load_file(self, filename: str, data: DataType, strict: bool = False) -> YamlType:
         """Reads a file and parses the content as yaml to a python object and replaces yaml-variables.
@@ -94,11 +154,17 @@ class TemplateEngine:
         :return: yaml object.
         """
         with open(filename) as cont:
-            return self.load(cont, data, strict)
+            return self._load(cont, data, strict, "file")
 
     def dump(self, yaml: Union[YamlType, Any]) -> str:
         """Converts a yaml object back to a string."""
-        return self.yaml_lib.dump(yaml, Dumper=self.yaml_lib.Dumper, allow_unicode=True)
+        recorder = metrics.get_recorder()
+        tracer = tracing.get_tracer()
+        if not recorder.enabled and not tracer.enabled:
+            return self.yaml_lib.dump(yaml, Dumper=self.yaml_lib.Dumper, allow_unicode=True)
+        with tracer.start_span("template dump"), \
+                recorder.time(metrics.TEMPLATE_RENDER_DURATION, {"template": "", "operation": "dump"}):
+            return self.yaml_lib.dump(yaml, Dumper=self.yaml_lib.Dumper, allow_unicode=True)
 
     def replace_template(self, template: str, data: DataType, strict: bool = False) -> str:
         """Reads a template and replaces the variables.
@@ -0,0 +1,110 @@
+"""Contains a service that issues and caches the JWT tokens of lab instances.
+
+The tokens are created with `lab_orchestrator_lib_auth.auth.generate_auth_token`, so they can be verified with
+`verify_auth_token`. The service keeps the issued token of every lab instance until shortly before it expires and it can
+issue many tokens at once, for example when many labs are started at the same time.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Tuple, TYPE_CHECKING
+
+from lab_orchestrator_lib.model.model import Identifier
+
+if TYPE_CHECKING:  # pragma: no cover - the auth package is only needed by the callers that create the params
+    from lab_orchestrator_lib_auth.auth import LabInstanceTokenParams
+
+
+class TokenService:
+    """Issues JWT tokens for lab instances and caches them.
+
+    A cached token is given again until `refresh_before` seconds before it expires. Then a new token is issued. The
+    cache is bounded by `max_size`, the lab instances that were used least recently are removed first.
+    """
+
+    def __init__(self, secret_key: str, expires_in: int = 600, refresh_before: int = 60, max_size: int = 10000,
+                 clock: Callable[[], float] = time.time):
+        """Initializes a token service.
+
+        :param secret_key: The secret key that is used to sign the tokens.
+        :param expires_in: Amount of seconds the tokens are valid.
+        :param refresh_before: A cached token is not used anymore if it expires in less than this amount of seconds.
+        :param max_size: Maximal amount of cached tokens.
+        :param clock: Function that gives the current unix time to decide if a cached token is still used. Only needed
+                      in tests, the expiry in the tokens is always calculated from the system time.
+        :raise ValueError: If refresh_before is not less than expires_in.
+        """
+        if refresh_before >= expires_in:
+            raise ValueError("refresh_before needs to be less than expires_in.")
+        self.expires_in = expires_in
+        self.refresh_before = refresh_before
+        self.max_size = max_size
+        self.clock = clock
+        self.secret_key = secret_key
+        self._cache: "OrderedDict[Identifier, Tuple[tuple, str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _encode(self, user_id: Identifier, params: 'LabInstanceTokenParams') -> str:
+        """Creates a signed token."""
+        # imported here, because the auth package and jwt take long to import
+        from lab_orchestrator_lib_auth.auth import generate_auth_token
+        return generate_auth_token(user_id, params, self.secret_key, self.expires_in)
+
+    def _get(self, user_id: Identifier, params: 'LabInstanceTokenParams', now: float, refresh: bool) -> str:
+        """Gives the cached or a new token. Needs to be called with the lock."""
+        claims = (user_id, params.lab_id, params.namespace_name, tuple(params.allowed_vmi_names))
+        entry = self._cache.get(params.lab_instance_id)
+        if not refresh and entry is not None and entry[0] == claims and now < entry[2]:
+            self._cache.move_to_end(params.lab_instance_id)
+            return entry[1]
+        token = self._encode(user_id, params)
+        self._cache[params.lab_instance_id] = (claims, token, now + self.expires_in - self.refresh_before)
+        self._cache.move_to_end(params.lab_instance_id)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        return token
+
+    def issue(self, user_id: Identifier, params: 'LabInstanceTokenParams', refresh: bool = False) -> str:
+        """Gives a token for a lab instance.
+
+        :param user_id: Id of the user.
+        :param params: The data that is included in the token.
+        :param refresh: If True, a new token is issued even if a cached token is still valid.
+        :return: The JWT token.
+        """
+        now = self.clock()
+        with self._lock:
+            return self._get(user_id, params, now, refresh)
+
+    def issue_many(self, requests: Iterable[Tuple[Identifier, 'LabInstanceTokenParams']],
+                   refresh: bool = False) -> List[str]:
+        """Gives tokens for many lab instances at once.
+
+        :param requests: Tuples of the user id and the data that is included in the token.
+        :param refresh: If True, new tokens are issued even if cached tokens are still valid.
+        :return: The JWT tokens in the order of the requests.
+        """
+        now = self.clock()
+        with self._lock:
+            return [self._get(user_id, params, now, refresh) for user_id, params in requests]
+
+    def invalidate(self, lab_instance_id: Identifier) -> None:
+        """Removes the cached token of a lab instance, for example because it was deleted.
+
+        :param lab_instance_id: The id of the lab instance.
+        :return: None
+        """
+        with self._lock:
+            self._cache.pop(lab_instance_id, None)
+
+    def clear(self) -> None:
+        """Removes all cached tokens.
+
+        :return: None
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def __len__(self) -> int:
+        return len(self._cache)
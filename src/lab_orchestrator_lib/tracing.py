@@ -0,0 +1,298 @@
+"""Contains the tracing instrumentation of the library.
+
+The library creates spans for starting and deleting labs (`LabInstanceController.create` and
+`LabInstanceController.delete`) with child spans for every adapter call, template render and request to the Kubernetes
+API. The spans are given to the tracer that is set with `set_tracer`. The default tracer is a `NoopTracer` that
+ignores everything, so tracing costs nearly nothing when it is not used.
+
+The current span is propagated with `contextvars`, so spans that are started while another span is active become its
+children. Threads don't inherit the context automatically, use `contextvars.copy_context().run` if you need this.
+
+To analyze where the time goes, record the spans and export them to a file:
+
+    tracer = RecordingTracer()
+    set_tracer(tracer)
+    ...
+    tracer.export("trace.json")  # open in chrome://tracing, https://ui.perfetto.dev or https://speedscope.app
+    tracer.export("trace.folded", RecordingTracer.FOLDED)  # for flamegraph.pl
+
+To send the spans to OpenTelemetry, use `OpenTelemetryTracer`. This needs the package `opentelemetry-api`.
+"""
+
+import contextlib
+import json
+import os
+import random
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, ContextManager, Deque, Dict, List, Optional
+
+Attributes = Optional[Dict[str, Any]]
+
+
+class Span(ABC):
+    """Interface of spans that are given by the tracers."""
+
+    @abstractmethod
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Adds an attribute to the span.
+
+        :param key: The name of the attribute.
+        :param value: The value of the attribute.
+        :return: None
+        """
+        raise NotImplementedError()
+
+
+class Tracer(ABC):
+    """Interface of tracers.
+
+    :param enabled: If this is False, the library skips creating spans completely.
+    """
+
+    enabled = True
+
+    @abstractmethod
+    def start_span(self, name: str, attributes: Attributes = None) -> ContextManager[Span]:
+        """Starts a span that ends when the context manager is left.
+
+        The span is the child of the span that is currently active.
+
+        :param name: The name of the span.
+        :param attributes: Attributes of the span.
+        :return: A context manager that gives the span.
+        """
+        raise NotImplementedError()
+
+
+class _NoopSpan(Span, contextlib.AbstractContextManager):
+    """Span that ignores everything."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class NoopTracer(Tracer):
+    """Tracer that ignores all spans. This is the default tracer."""
+
+    enabled = False
+
+    def start_span(self, name: str, attributes: Attributes = None) -> ContextManager[Span]:
+        return _NOOP_SPAN
+
+
+_current_span: ContextVar[Optional['RecordedSpan']] = ContextVar("lab_orchestrator_current_span", default=None)
+
+
+class RecordedSpan(Span):
+    """Span of the `RecordingTracer`.
+
+    :param name: The name of the span.
+    :param trace_id: Hex id of the trace. All spans of a trace have the same trace id.
+    :param span_id: Hex id of the span.
+    :param parent_id: Hex id of the parent span or None if this is a root span.
+    :param start: Start time in seconds since the epoch.
+    :param duration: Duration in seconds. None while the span is running.
+    :param thread_id: The thread that started the span.
+    :param attributes: Attributes of the span.
+    """
+
+    def __init__(self, tracer: 'RecordingTracer', name: str, attributes: Attributes):
+        self._tracer = tracer
+        self._token = None
+        self._perf_start = 0.0
+        self.name = name
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes else {}
+        self.trace_id = ""
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id: Optional[str] = None
+        self.start = 0.0
+        self.duration: Optional[float] = None
+        self.thread_id = 0
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is None:
+            self.trace_id = f"{random.getrandbits(128):032x}"
+        else:
+            self.trace_id = parent.trace_id
+            self.parent_id = parent.span_id
+        self.thread_id = threading.get_ident()
+        self._token = _current_span.set(self)
+        self.start = time.time()
+        self._perf_start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.duration = time.perf_counter() - self._perf_start
+        if exc_val is not None:
+            self.attributes["error"] = repr(exc_val)
+        _current_span.reset(self._token)
+        self._tracer._finish(self)
+        return False
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Gives the span as dictionary.
+
+        :return: A dictionary with all attributes of the span.
+        """
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id, "parent_id": self.parent_id,
+                "start": self.start, "duration": self.duration, "thread_id": self.thread_id,
+                "attributes": self.attributes}
+
+
+class RecordingTracer(Tracer):
+    """Tracer that keeps the finished spans in memory and exports them to files.
+
+    This tracer is thread safe.
+    """
+
+    CHROME = "chrome"
+    FOLDED = "folded"
+    JSONL = "jsonl"
+
+    def __init__(self, max_spans: int = 100000):
+        """Initializes a recording tracer.
+
+        :param max_spans: Maximal amount of spans that are kept. If there are more spans, the oldest are dropped.
+        """
+        self._spans: Deque[RecordedSpan] = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def start_span(self, name: str, attributes: Attributes = None) -> ContextManager[Span]:
+        return RecordedSpan(self, name, attributes)
+
+    def _finish(self, span: RecordedSpan) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self) -> List[RecordedSpan]:
+        """The finished spans in the order they were finished."""
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self) -> None:
+        """Removes all recorded spans.
+
+        :return: None
+        """
+        with self._lock:
+            self._spans.clear()
+
+    def export(self, filename: str, file_format: str = CHROME) -> None:
+        """Writes the recorded spans to a file.
+
+        :param filename: The file to write to.
+        :param file_format: CHROME writes the trace event format that can be opened in chrome://tracing, Perfetto and
+            speedscope. FOLDED writes folded stacks with the self time in microseconds, which is the input format of
+            flamegraph.pl. JSONL writes one span per line.
+        :return: None
+        :raise ValueError: If the format is unknown.
+        """
+        spans = self.spans
+        if file_format == self.CHROME:
+            content = json.dumps({"traceEvents": self._chrome_events(spans), "displayTimeUnit": "ms"})
+        elif file_format == self.FOLDED:
+            content = "\n".join(f"{stack} {value}" for stack, value in sorted(self.folded(spans).items()))
+        elif file_format == self.JSONL:
+            content = "\n".join(json.dumps(span.to_dict(), default=str) for span in spans)
+        else:
+            raise ValueError(f"Unknown format {file_format}.")
+        with open(filename, "w") as file:
+            file.write(content + "\n")
+
+    @staticmethod
+    def _chrome_events(spans: List[RecordedSpan]) -> List[Dict[str, Any]]:
+        pid = os.getpid()
+        return [{"name": span.name, "cat": "lab_orchestrator", "ph": "X", "ts": span.start * 1e6,
+                 "dur": span.duration * 1e6, "pid": pid, "tid": span.thread_id,
+                 "args": {key: str(value) for key, value in span.attributes.items()}}
+                for span in spans]
+
+    @staticmethod
+    def folded(spans: List[RecordedSpan]) -> Dict[str, int]:
+        """Converts spans to folded stacks.
+
+        :param spans: The finished spans.
+        :return: A dictionary with stacks like "root;child" as keys and the self time in microseconds as values.
+        """
+        by_id = {span.span_id: span for span in spans}
+        children_time: Dict[str, float] = {}
+        for span in spans:
+            if span.parent_id is not None:
+                children_time[span.parent_id] = children_time.get(span.parent_id, 0.0) + span.duration
+        stacks: Dict[str, int] = {}
+        for span in spans:
+            names = [span.name]
+            parent = by_id.get(span.parent_id)
+            while parent is not None:
+                names.append(parent.name)
+                parent = by_id.get(parent.parent_id)
+            stack = ";".join(reversed(names))
+            self_time = max(0.0, span.duration - children_time.get(span.span_id, 0.0))
+            stacks[stack] = stacks.get(stack, 0) + int(self_time * 1e6)
+        return stacks
+
+
+class OpenTelemetryTracer(Tracer):
+    """Tracer that gives the spans to OpenTelemetry.
+
+    OpenTelemetry propagates the context by itself, so spans of the library become children of your spans.
+    """
+
+    def __init__(self, tracer=None):
+        """Initializes an OpenTelemetry tracer.
+
+        :param tracer: The OpenTelemetry tracer that should be used. If None, the tracer of the global tracer provider
+            is used.
+        :raise ImportError: If opentelemetry-api is not installed.
+        """
+        if tracer is None:
+            from opentelemetry import trace
+            tracer = trace.get_tracer("lab_orchestrator_lib")
+        self.tracer = tracer
+
+    def start_span(self, name: str, attributes: Attributes = None) -> ContextManager[Span]:
+        if attributes:
+            attributes = {key: value if isinstance(value, (str, bool, int, float)) else str(value)
+                          for key, value in attributes.items()}
+        return self.tracer.start_as_current_span(name, attributes=attributes)
+
+
+_tracer: Tracer = NoopTracer()
+
+
+def get_tracer() -> Tracer:
+    """Gives the tracer that is used by the library.
+
+    :return: The current tracer.
+    """
+    return _tracer
+
+
+def set_tracer(tracer: Optional[Tracer] = None) -> Tracer:
+    """Sets the tracer that is used by the library.
+
+    :param tracer: The new tracer. If None, tracing is disabled.
+    :return: The previous tracer.
+    """
+    global _tracer
+    previous = _tracer
+    _tracer = NoopTracer() if tracer is None else tracer
+    return previous
@@ -0,0 +1,159 @@
+import threading
+import unittest
+
+from lab_orchestrator_lib.controller.admission_controller import AdmissionController, AdmissionTicket
+from lab_orchestrator_lib.custom_exceptions import AdmissionError
+from lab_orchestrator_lib.model.model import LabDockerImage, LabInstance, LabInstanceKubernetes
+
+
+class LabDockerImageCtrlMock:
+    def __init__(self, labs):
+        self.labs = labs
+
+    def filter(self, lab_id):
+        return [LabDockerImage(i, lab_id, i, f"vm{i}") for i in range(self.labs[lab_id])]
+
+
+class VmiCtrlMock:
+    def get_resource_requests(self, lab_docker_image):
+        return 2, "1Gi"
+
+
+class LabInstanceCtrlMock:
+    def __init__(self):
+        self.counter = 0
+        self.created = []
+        self.deleted = []
+        self.fail = False
+        self.gate = None
+
+    def create(self, lab_id, user_id):
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise Exception("create failed")
+        self.counter += 1
+        self.created.append((lab_id, user_id))
+        return LabInstanceKubernetes(self.counter, lab_id, user_id, "token", [])
+
+    def delete(self, lab_instance):
+        self.deleted.append(lab_instance.primary_key)
+
+    def get_all(self):
+        return [LabInstance(1, 1, 1), LabInstance(2, 2, 1)]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class AdmissionControllerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.lab_instance_ctrl = LabInstanceCtrlMock()
+        self.clock = Clock()
+        # lab 1 has one VM, lab 2 has two VMs, lab 3 has five VMs
+        self.ctrl = AdmissionController(self.lab_instance_ctrl, LabDockerImageCtrlMock({1: 1, 2: 2, 3: 5}),
+                                        VmiCtrlMock(), cores=4, memory="4Gi", clock=self.clock)
+
+    def test_demand(self):
+        self.assertEqual(self.ctrl.get_lab_demand(2), (4, 2 * 2 ** 30))
+
+    def test_admit_immediately(self):
+        ticket = self.ctrl.submit(1, 1)
+        self.assertEqual(ticket.state, AdmissionTicket.ADMITTED)
+        self.assertTrue(ticket.done())
+        self.assertIsNone(ticket.position)
+        self.assertEqual(ticket.wait(0).lab_id, 1)
+        self.assertEqual(self.ctrl.used_cores, 2)
+        self.assertEqual(self.ctrl.used_memory, 2 ** 30)
+
+    def test_too_large(self):
+        with self.assertRaises(AdmissionError):
+            self.ctrl.submit(3, 1)
+
+    def test_queue_and_release(self):
+        first = self.ctrl.submit(2, "a")
+        second = self.ctrl.submit(1, "b")
+        self.assertEqual(second.state, AdmissionTicket.QUEUED)
+        self.assertEqual(second.position, 0)
+        self.assertIsNone(second.eta)
+        with self.assertRaises(TimeoutError):
+            second.wait(0)
+        self.ctrl.delete(LabInstance(first.lab_instance_kubernetes.primary_key, 2, "a"))
+        self.assertEqual(self.lab_instance_ctrl.deleted, [1])
+        self.assertEqual(second.wait(5).lab_id, 1)
+        self.assertEqual(second.state, AdmissionTicket.ADMITTED)
+        self.assertEqual(self.ctrl.used_cores, 2)
+
+    def test_release_does_not_wait_for_queued_creation(self):
+        first = self.ctrl.submit(2, "a")
+        second = self.ctrl.submit(2, "b")
+        self.lab_instance_ctrl.gate = threading.Event()
+        self.ctrl.release(first.lab_instance_kubernetes.primary_key)
+        # the creation of the queued lab instance blocks, but not the thread that released the capacity
+        self.assertFalse(second.done())
+        self.lab_instance_ctrl.gate.set()
+        self.assertEqual(second.wait(5).lab_id, 2)
+
+    def test_fairness(self):
+        self.ctrl.submit(2, "x")
+        tickets = [self.ctrl.submit(1, "a") for _ in range(3)] + [self.ctrl.submit(1, "b")]
+        self.assertEqual([ticket.position for ticket in tickets], [0, 2, 3, 1])
+        self.assertEqual(len(self.ctrl), 4)
+
+    def test_priority(self):
+        self.ctrl.submit(2, "x")
+        low = self.ctrl.submit(1, "a")
+        high = self.ctrl.submit(1, "b", priority=5)
+        self.assertEqual(high.position, 0)
+        self.assertEqual(low.position, 1)
+
+    def test_group(self):
+        self.ctrl.submit(2, "x")
+        tickets = [self.ctrl.submit(1, user, group="course") for user in ["a", "b"]] + [self.ctrl.submit(1, "c")]
+        self.assertEqual([ticket.position for ticket in tickets], [0, 2, 1])
+
+    def test_eta(self):
+        self.ctrl.submit(2, "x")
+        second = self.ctrl.submit(2, "y")
+        third = self.ctrl.submit(2, "z")
+        waiting = self.ctrl.submit(2, "w")
+        self.clock.now = 10.0
+        self.ctrl.release(1)
+        second.wait(5)
+        self.clock.now = 30.0
+        self.ctrl.release(2)
+        third.wait(5)
+        self.assertEqual(waiting.position, 0)
+        self.assertAlmostEqual(waiting.eta, 20.0)
+
+    def test_cancel(self):
+        self.ctrl.submit(2, "x")
+        ticket = self.ctrl.submit(1, "a")
+        self.assertTrue(self.ctrl.cancel(ticket))
+        self.assertFalse(self.ctrl.cancel(ticket))
+        self.assertEqual(ticket.state, AdmissionTicket.CANCELLED)
+        with self.assertRaises(AdmissionError):
+            ticket.wait(0)
+        self.assertEqual(len(self.ctrl), 0)
+
+    def test_create_fails(self):
+        self.lab_instance_ctrl.fail = True
+        ticket = self.ctrl.submit(1, 1)
+        self.assertEqual(ticket.state, AdmissionTicket.FAILED)
+        with self.assertRaises(Exception):
+            ticket.wait(0)
+        self.assertEqual(self.ctrl.used_cores, 0)
+
+    def test_rebuild(self):
+        self.ctrl.rebuild()
+        self.assertEqual(self.ctrl.used_cores, 6)
+        self.assertEqual(self.ctrl.used_memory, 3 * 2 ** 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,189 @@
+import json
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from lab_orchestrator_lib.controller.cluster_router import ClusterRouter, ConsistentHashRing, create_cluster_router
+from lab_orchestrator_lib.controller.controller_collection import create_controller_collection
+from lab_orchestrator_lib.model.model import User, DockerImage, LabDockerImage, Lab, LabInstance
+from lab_orchestrator_lib.database.memory_adapter import MemoryUserAdapter, MemoryDockerImageAdapter, \
+    MemoryLabDockerImageAdapter, MemoryLabAdapter, MemoryLabInstanceAdapter
+from tests.kubernetes.mockups import ProxyMock
+from lab_orchestrator_lib.kubernetes.api import APIRegistry
+from lab_orchestrator_lib.kubernetes.config import KubernetesConfig
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+
+
+class RecordingProxy(ProxyMock):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requests_made = []
+
+    def get(self, address: str) -> str:
+        self.requests_made.append(("GET", address))
+        return "get"
+
+    def post(self, address: str, data: str) -> str:
+        self.requests_made.append(("POST", address))
+        return "post"
+
+    def delete(self, address) -> str:
+        self.requests_made.append(("DELETE", address))
+        return "delete"
+
+
+class ConsistentHashRingTestCase(unittest.TestCase):
+    def test_get(self):
+        ring = ConsistentHashRing(["a", "b", "c"])
+        keys = [str(i) for i in range(300)]
+        nodes = {key: ring.get(key) for key in keys}
+        self.assertSetEqual(set(nodes.values()), {"a", "b", "c"})
+        # stable
+        self.assertDictEqual(nodes, {key: ConsistentHashRing(["a", "b", "c"]).get(key) for key in keys})
+
+    def test_remove(self):
+        ring = ConsistentHashRing(["a", "b", "c"])
+        keys = [str(i) for i in range(300)]
+        before = {key: ring.get(key) for key in keys}
+        ring.remove("c")
+        after = {key: ring.get(key) for key in keys}
+        for key in keys:
+            if before[key] != "c":
+                self.assertEqual(before[key], after[key])
+            else:
+                self.assertIn(after[key], ["a", "b"])
+
+    def test_empty(self):
+        with self.assertRaises(ValueError):
+            ConsistentHashRing([]).get("a")
+
+
+class ClusterRouterTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.lab_instance_adapter = MemoryLabInstanceAdapter()
+        adapters = dict(
+            user_adapter=MemoryUserAdapter([User(1), User(2), User(3)]),
+            docker_image_adapter=MemoryDockerImageAdapter([DockerImage(1, "ubuntu", "desc", "ubuntu")]),
+            lab_docker_image_adapter=MemoryLabDockerImageAdapter([LabDockerImage(1, 1, 1, "ubuntu")]),
+            lab_adapter=MemoryLabAdapter([Lab(1, "lab", "lab", "desc")]),
+            lab_instance_adapter=self.lab_instance_adapter,
+        )
+        self.proxies = {name: RecordingProxy(f"/{name}") for name in ["east", "west"]}
+        self.collections = {
+            name: create_controller_collection(registry=APIRegistry(proxy), secret_key="secret", **adapters)
+            for name, proxy in self.proxies.items()
+        }
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            ClusterRouter({})
+        with self.assertRaises(ValueError):
+            ClusterRouter(self.collections, placement="random")
+
+    def test_consistent_hash(self):
+        router = ClusterRouter(self.collections)
+        clusters = [router.create(1, user_id).cluster for user_id in [1, 2, 3, 1]]
+        self.assertEqual(clusters[0], clusters[3])
+        for lab_instance in self.lab_instance_adapter.get_all():
+            self.assertEqual(lab_instance.cluster, router.place(1, lab_instance.user_id))
+
+    def test_least_loaded(self):
+        router = ClusterRouter(self.collections, placement=ClusterRouter.LEAST_LOADED, capacities={"west": 2})
+        clusters = [router.create(1, 1).cluster for _ in range(3)]
+        self.assertEqual(sorted(clusters), ["east", "west", "west"])
+        self.assertDictEqual(router.loads, {"east": 1, "west": 2})
+        router.loads = {}
+        router.rebuild()
+        self.assertDictEqual(router.loads, {"east": 1, "west": 2})
+
+    def test_least_loaded_concurrent(self):
+        class SlowPlacementRouter(ClusterRouter):
+            def _place_locked(self, lab_id, user_id):
+                cluster = super()._place_locked(lab_id, user_id)
+                # gives other threads the chance to read the same loads
+                time.sleep(0.005)
+                return cluster
+
+        router = SlowPlacementRouter(self.collections, placement=ClusterRouter.LEAST_LOADED)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clusters = list(executor.map(lambda _: router.create(1, 1).cluster, range(16)))
+        self.assertEqual(clusters.count("east"), 8)
+        self.assertEqual(clusters.count("west"), 8)
+        self.assertDictEqual(router.loads, {"east": 8, "west": 8})
+
+    def test_routing(self):
+        router = ClusterRouter(self.collections, placement=ClusterRouter.LEAST_LOADED)
+        first = router.create(1, 1)
+        second = router.create(1, 2)
+        self.assertNotEqual(first.cluster, second.cluster)
+        lab_instance = router.get(first.primary_key)
+        self.assertEqual(lab_instance.cluster, first.cluster)
+        other = self.proxies[second.cluster]
+        other.requests_made.clear()
+        router.get_vmi_list_of_lab_instance(lab_instance)
+        router.get_vmi_of_lab_instance(lab_instance, "ubuntu")
+        router.delete(lab_instance)
+        self.assertEqual(other.requests_made, [])
+        methods = [method for method, _ in self.proxies[first.cluster].requests_made]
+        self.assertEqual(methods[-1], "DELETE")
+        self.assertIsNone(router.get(first.primary_key))
+        self.assertEqual(router.loads[first.cluster], 0)
+
+    def test_default_cluster(self):
+        router = ClusterRouter(self.collections, default_cluster="west")
+        lab_instance = LabInstance(99, 1, 1)
+        self.assertEqual(router.cluster_of(lab_instance), "west")
+        self.assertIs(router.collection_of(lab_instance), self.collections["west"])
+
+
+class FakeApiServerClusterRouterTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.servers = {name: FakeApiServer().start() for name in ["east", "west"]}
+        self.lab_instance_adapter = MemoryLabInstanceAdapter()
+        self.router = create_cluster_router(
+            {name: KubernetesConfig("token", None, "http", server.host, str(server.port), server.base_uri)
+             for name, server in self.servers.items()},
+            user_adapter=MemoryUserAdapter([User(1), User(2)]),
+            docker_image_adapter=MemoryDockerImageAdapter([DockerImage(1, "ubuntu", "desc", "ubuntu")]),
+            lab_docker_image_adapter=MemoryLabDockerImageAdapter([LabDockerImage(1, 1, 1, "ubuntu"),
+                                                                  LabDockerImage(2, 1, 1, "debian")]),
+            lab_adapter=MemoryLabAdapter([Lab(1, "lab", "lab", "desc")]),
+            lab_instance_adapter=self.lab_instance_adapter,
+            secret_key="secret",
+            placement=ClusterRouter.LEAST_LOADED,
+        )
+
+    def tearDown(self) -> None:
+        for server in self.servers.values():
+            server.stop()
+
+    def namespaces(self, cluster):
+        return {namespace["metadata"]["name"] for namespace in self.servers[cluster].get_objects("v1", "namespaces")}
+
+    def vmis(self, cluster, namespace):
+        return {vmi["metadata"]["name"]
+                for vmi in self.servers[cluster].get_objects("kubevirt.io/v1alpha3", "virtualmachineinstances",
+                                                             namespace)}
+
+    def test_resources_in_own_cluster(self):
+        created = [self.router.create(1, user_id) for user_id in [1, 2]]
+        self.assertEqual(sorted(lab_instance.cluster for lab_instance in created), ["east", "west"])
+        for lab_instance_kubernetes in created:
+            lab_instance = self.router.get(lab_instance_kubernetes.primary_key)
+            cluster = lab_instance.cluster
+            other = "west" if cluster == "east" else "east"
+            namespace = lab_instance.namespace_name
+            self.assertIn(namespace, self.namespaces(cluster))
+            self.assertNotIn(namespace, self.namespaces(other))
+            self.assertEqual(self.vmis(cluster, namespace), {"ubuntu", "debian"})
+            self.assertEqual(self.vmis(other, namespace), set())
+            vmis = json.loads(self.router.get_vmi_list_of_lab_instance(lab_instance))["items"]
+            self.assertEqual({vmi["metadata"]["name"] for vmi in vmis}, {"ubuntu", "debian"})
+        lab_instance = self.router.get(created[0].primary_key)
+        self.router.delete(lab_instance)
+        self.assertNotIn(lab_instance.namespace_name, self.namespaces(lab_instance.cluster))
+        self.assertIn(self.router.get(created[1].primary_key).namespace_name, self.namespaces(created[1].cluster))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
+import json
 import unittest
-from typing import Dict, Any
+from typing import Dict, Any, List
 
 from lab_orchestrator_lib.template_engine import TemplateEngine, DataType
 
@@ -12,8 +13,16 @@ from lab_orchestrator_lib.controller.controller import UserController, Namespace
     DockerImageController, VirtualMachineInstanceController, LabController, LabInstanceController, \
     LabDockerImageController
 
+from lab_orchestrator_lib.controller.controller_collection import create_controller_collection
+from lab_orchestrator_lib.controller.expiry_scheduler import ExpiryScheduler
 from lab_orchestrator_lib.database.adapter import UserAdapterInterface, DockerImageAdapterInterface, \
     LabAdapterInterface, LabInstanceAdapterInterface, LabDockerImageAdapterInterface
+from lab_orchestrator_lib.database.memory_adapter import MemoryUserAdapter, MemoryDockerImageAdapter, \
+    MemoryLabDockerImageAdapter, MemoryLabAdapter, MemoryLabInstanceAdapter
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+from lab_orchestrator_lib.kubernetes.patch import PATCH_APPLY
+from lab_orchestrator_lib.tracing import RecordingTracer, set_tracer
 from tests.controller.mockup import get_mocked_registry
 
 
@@ -147,6 +156,19 @@ class LabDockerImageControllerTestCase(unittest.TestCase):
         ret = ctrl.create(expected.lab_id, expected.docker_image_id, expected.docker_image_name)
         self.assertEqual(ret, expected)
 
+    def test_create_sizing(self):
+        this = self
+        expected = LabDockerImage("8", "3", "4", "url", cores=1, memory="512Mi")
+        class ExampleLabDockerImageAdapterInterface(LabDockerImageAdapterInterface):
+            def create(self, lab_id: Identifier, docker_image_id: Identifier, docker_image_name: str,
+                       **sizing) -> LabDockerImage:
+                this.assertDictEqual(sizing, {"cores": 1, "memory": "512Mi"})
+                return expected
+        ctrl = LabDockerImageController(ExampleLabDockerImageAdapterInterface())
+        ret = ctrl.create(expected.lab_id, expected.docker_image_id, expected.docker_image_name, cores=1,
+                          memory="512Mi")
+        self.assertEqual(ret, expected)
+
 
 class LabControllerTestCase(unittest.TestCase):
     def test_init(self):
@@ -169,6 +191,14 @@ class LabControllerTestCase(unittest.TestCase):
         ret = ctrl.create(expected.name, expected.namespace_prefix, expected.description)
         self.assertEqual(ret, expected)
 
+    def test_create_expiry(self):
+        ctrl = LabController(MemoryLabAdapter())
+        lab = ctrl.create("lab", "lab", "desc", ttl=3600, idle_timeout=900)
+        self.assertEqual((lab.ttl, lab.idle_timeout), (3600, 900))
+        self.assertIs(ctrl.get(lab.primary_key), lab)
+        lab = ctrl.create("lab", "lab", "desc", idle_timeout=900)
+        self.assertEqual((lab.ttl, lab.idle_timeout), (None, 900))
+
 
 class VirtualMachineInstanceControllerTestCase(unittest.TestCase):
     def setUp(self) -> None:
@@ -197,10 +227,10 @@ class VirtualMachineInstanceControllerTestCase(unittest.TestCase):
         expected_docker_image = DockerImage("10", "name", "desc", "url")
         expected_lab_docker_image = LabDockerImage("1", "8", "10", "ubuntu")
         expected_namespace = "ns1"
-        expected_template_data = {"cores": 3, "memory": "3G",
+        expected_template_data = {"cores": 3, "memory": "3G", "resource_limits": None,
                                   "vm_image": expected_docker_image.url,
                                   "vmi_name": expected_lab_docker_image.docker_image_name,
-                                  "namespace": expected_namespace}
+                                  "namespace": expected_namespace, "api_version": "kubevirt.io/v1alpha3"}
         expected_data = "template"
         expected = "success"
 
@@ -226,6 +256,8 @@ class VirtualMachineInstanceControllerTestCase(unittest.TestCase):
                 return expected_data
 
         class ExampleApi:
+            api_version = "kubevirt.io/v1alpha3"
+
             def create(self, namespace, data: str) -> str:
                 this.assertEqual(namespace, expected_namespace)
                 this.assertEqual(data, expected_data)
@@ -239,6 +271,20 @@ class VirtualMachineInstanceControllerTestCase(unittest.TestCase):
         ret = ctrl.create(expected_namespace, expected_lab_docker_image)
         self.assertEqual(ret, expected)
 
+    def test_resources(self):
+        ctrl = VirtualMachineInstanceController(
+            registry=self.registry, namespace_ctrl=NamespaceController(self.registry),
+            docker_image_ctrl=DockerImageController(DockerImageAdapterInterface()),
+            lab_docker_image_ctrl=LabDockerImageController(LabDockerImageAdapterInterface())
+        )
+        default = LabDockerImage("1", "8", "10", "ubuntu")
+        self.assertEqual(ctrl.get_resource_requests(default), (3, "3G"))
+        self.assertIsNone(ctrl.get_resource_limits(default))
+        small = LabDockerImage("1", "8", "10", "router", cores=1, memory="256Mi", cpu_limit="500m",
+                               memory_limit="512Mi")
+        self.assertEqual(ctrl.get_resource_requests(small), (1, "256Mi"))
+        self.assertDictEqual(ctrl.get_resource_limits(small), {"cpu": "500m", "memory": "512Mi"})
+
     def test_get_list_of_lab_instance(self):
         this = self
         # Input Objects
@@ -497,12 +543,16 @@ class LabInstanceControllerTestCase(unittest.TestCase):
             lab_ctrl=lab_ctrl, network_policy_ctrl=network_policy_ctrl, user_ctrl=user_ctrl, secret_key="secret",
             lab_docker_image_ctrl=lab_docker_image_ctrl
         )
-        lab_instance_kubernetes = lab_instance_ctrl.create(expected_lab_id, expected_user_id)
+        with self.assertLogs("lab_orchestrator_lib.controller.controller", level="DEBUG") as logs:
+            lab_instance_kubernetes = lab_instance_ctrl.create(expected_lab_id, expected_user_id)
         self.assertIsInstance(lab_instance_kubernetes, LabInstanceKubernetes)
         self.assertEqual(expected_lab_id, lab_instance_kubernetes.lab_id)
         self.assertEqual(expected_user_id, lab_instance_kubernetes.user_id)
         self.assertEqual(expected_lab_instance.primary_key, lab_instance_kubernetes.primary_key)
         self.assertEqual(counter, 2)
+        self.assertEqual([record.getMessage() for record in logs.records][-1],
+                         "Started lab instance 6 of lab 3 for user 5.")
+        self.assertTrue(all(record.namespace == expected_namespace_name for record in logs.records))
 
     def test_delete(self):
         this = self
@@ -555,12 +605,12 @@ class LabInstanceControllerTestCase(unittest.TestCase):
 
     def test_get_list_of_user(self):
         this = self
-        expected_lab_instance = LabInstance(2, 3, 1)
+        expected_lab_instances = [LabInstance(2, 3, 1, namespace_name="prefix-1-2")]
         expected_user = User(1)
         class ExampleLabInstanceAdapter(LabInstanceAdapterInterface):
-            def filter(self, **kwargs: Dict[str, Any]) -> LabInstance:
+            def filter(self, **kwargs: Dict[str, Any]) -> List[LabInstance]:
                 this.assertDictEqual(kwargs, {'user_id': expected_user.primary_key})
-                return expected_lab_instance
+                return expected_lab_instances
         lab_instance_adapter = ExampleLabInstanceAdapter()
         namespace_ctrl = NamespaceController(self.registry)
         lab_ctrl = LabController(LabAdapterInterface())
@@ -579,7 +629,7 @@ class LabInstanceControllerTestCase(unittest.TestCase):
             lab_docker_image_ctrl=lab_docker_image_ctrl
         )
         ret = ctrl.get_list_of_user(expected_user)
-        self.assertEqual(ret, expected_lab_instance)
+        self.assertEqual(ret, expected_lab_instances)
 
     def test_save(self):
         class ExampleLabInstanceAdapter(LabInstanceAdapterInterface):
@@ -605,3 +655,194 @@ class LabInstanceControllerTestCase(unittest.TestCase):
         lab_instance = LabInstance(8, 9, 10)
         with self.assertRaises(Exception) as e:
             lab_instance_ctrl.save(lab_instance)
+
+
+class CountingLabAdapter(MemoryLabAdapter):
+    def __init__(self, objects=()):
+        super().__init__(objects)
+        self.gets = 0
+
+    def get(self, identifier):
+        self.gets += 1
+        return super().get(identifier)
+
+
+class MemoryCollectionTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = FakeApiServer().start()
+        self.lab_adapter = CountingLabAdapter([Lab(1, "lab", "prefix", "desc")])
+        self.lab_instance_adapter = MemoryLabInstanceAdapter()
+        self.lab_docker_image_adapter = MemoryLabDockerImageAdapter([LabDockerImage(1, 1, 1, "vm")])
+        self.collection = create_controller_collection(
+            registry=APIRegistry(Proxy(self.server.base_uri, "token")),
+            user_adapter=MemoryUserAdapter([User(1)]),
+            docker_image_adapter=MemoryDockerImageAdapter([DockerImage(1, "ubuntu", "desc", "ubuntu")]),
+            lab_docker_image_adapter=self.lab_docker_image_adapter,
+            lab_adapter=self.lab_adapter,
+            lab_instance_adapter=self.lab_instance_adapter,
+            secret_key="secret",
+        )
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+
+class NamespaceNameTestCase(MemoryCollectionTestCase):
+    def test_saved_at_create(self):
+        created = self.collection.lab_instance_ctrl.create(1, 1)
+        lab_instance = self.lab_instance_adapter.get(created.primary_key)
+        self.assertEqual(lab_instance.namespace_name, f"prefix-1-{created.primary_key}")
+        self.lab_adapter.gets = 0
+        vmi_ctrl = self.collection.virtual_machine_instance_ctrl
+        vmi_ctrl.get_list_of_lab_instance(lab_instance, self.collection.lab_ctrl)
+        vmi_ctrl.get_of_lab_instance(lab_instance, "vm", self.collection.lab_ctrl)
+        self.collection.lab_instance_ctrl.delete(lab_instance)
+        self.assertEqual(self.lab_adapter.gets, 0)
+
+    def test_read_without_namespace_name(self):
+        lab_instance_ctrl = self.collection.lab_instance_ctrl
+        self.lab_instance_adapter.save(LabInstance(5, 1, 1))
+        self.lab_instance_adapter.save(LabInstance(6, 1, 1))
+        self.lab_instance_adapter.set_namespace_name = None  # reads must not write
+        lab_instances = lab_instance_ctrl.get_list_of_user(User(1))
+        self.assertEqual([lab_instance.namespace_name for lab_instance in lab_instances], ["prefix-1-5", "prefix-1-6"])
+        self.assertEqual(self.lab_adapter.gets, 1)
+        self.assertEqual(lab_instance_ctrl.get(5).namespace_name, "prefix-1-5")
+
+    def test_migrate(self):
+        self.collection.lab_instance_ctrl.create(1, 1)
+        self.lab_instance_adapter.save(LabInstance(5, 1, 1))
+        self.assertEqual(self.collection.lab_instance_ctrl.migrate_namespace_names(), 1)
+        self.assertEqual(self.lab_instance_adapter.get(5).namespace_name, "prefix-1-5")
+        self.assertEqual(self.collection.lab_instance_ctrl.migrate_namespace_names(), 0)
+
+    def test_migrate_not_implemented(self):
+        class Adapter(MemoryLabInstanceAdapter):
+            def set_namespace_name(self, identifier, namespace_name):
+                raise NotImplementedError()
+
+        self.collection.lab_instance_ctrl.adapter = Adapter([LabInstance(5, 1, 1)])
+        with self.assertRaises(NotImplementedError):
+            self.collection.lab_instance_ctrl.migrate_namespace_names()
+        created = self.collection.lab_instance_ctrl.create(1, 1)
+        lab_instance = self.collection.lab_instance_ctrl.get(created.primary_key)
+        self.assertEqual(lab_instance.namespace_name, f"prefix-1-{created.primary_key}")
+
+
+class ExpirySchedulerHookTestCase(MemoryCollectionTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.now = 1000.0
+        lab = self.collection.lab_ctrl.create("lab", "expiring", "desc", ttl=60)
+        self.lab_docker_image_adapter.create(lab.primary_key, 1, "vm")
+        self.lab_id = lab.primary_key
+        self.scheduler = ExpiryScheduler(self.collection.lab_instance_ctrl, self.collection.lab_ctrl,
+                                         clock=lambda: self.now, attach=True)
+
+    def test_attach(self):
+        self.assertIs(self.collection.lab_instance_ctrl.expiry_scheduler, self.scheduler)
+
+    def test_schedule_on_create(self):
+        created = self.collection.lab_instance_ctrl.create(self.lab_id, 1)
+        lab_instance = self.lab_instance_adapter.get(created.primary_key)
+        self.assertEqual(len(self.scheduler), 1)
+        self.assertEqual(self.scheduler.next_deadline(), lab_instance.created_at + 60)
+        # lab instances of labs without ttl and idle timeout are not scheduled
+        self.collection.lab_instance_ctrl.create(1, 1)
+        self.assertEqual(len(self.scheduler), 1)
+        self.now = lab_instance.created_at + 60
+        self.assertEqual([deleted.primary_key for deleted in self.scheduler.run_pending()], [created.primary_key])
+        self.assertIsNone(self.lab_instance_adapter.get(created.primary_key))
+        self.assertNotIn(lab_instance.namespace_name, [namespace["metadata"]["name"]
+                                                       for namespace in self.server.get_objects("v1", "namespaces")])
+
+    def test_cancel_on_delete(self):
+        created = self.collection.lab_instance_ctrl.create(self.lab_id, 1)
+        self.collection.lab_instance_ctrl.delete(self.lab_instance_adapter.get(created.primary_key))
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertIsNone(self.scheduler.next_deadline())
+
+
+class LabInstanceStatusTestCase(MemoryCollectionTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.tracer = RecordingTracer()
+        self.previous = set_tracer(self.tracer)
+
+    def tearDown(self) -> None:
+        set_tracer(self.previous)
+        super().tearDown()
+
+    def requests(self, method):
+        return [span.attributes["address"] for span in self.tracer.spans if span.name == f"kubernetes {method}"]
+
+    def test_single_request(self):
+        created = self.collection.lab_instance_ctrl.create(1, 1)
+        lab_instance = self.lab_instance_adapter.get(created.primary_key)
+        self.tracer.clear()
+        vmi_ctrl = self.collection.virtual_machine_instance_ctrl
+        self.assertIn('"vm"', vmi_ctrl.get_list_of_lab_instance(lab_instance, self.collection.lab_ctrl))
+        self.assertIn('"vm"', vmi_ctrl.get_of_lab_instance(lab_instance, "vm", self.collection.lab_ctrl))
+        self.assertEqual(len(self.requests("GET")), 2)
+        self.assertFalse(any("/api/v1/namespaces/" in address for address in self.requests("GET")))
+
+    def test_status(self):
+        created = self.collection.lab_instance_ctrl.create(1, 1)
+        lab_instance = self.lab_instance_adapter.get(created.primary_key)
+        self.tracer.clear()
+        vmi_ctrl = self.collection.virtual_machine_instance_ctrl
+        with self.tracer.start_span("root") as root:
+            status = vmi_ctrl.get_status_of_lab_instance(lab_instance, self.collection.lab_ctrl)
+        self.assertIn('"Active"', status.namespace)
+        self.assertIn('"vm"', status.virtual_machine_instances)
+        self.assertEqual(len(self.requests("GET")), 2)
+        self.assertTrue(all(span.parent_id == root.span_id for span in self.tracer.spans if span is not root))
+        self.collection.namespace_ctrl.delete(lab_instance.namespace_name)
+        status = vmi_ctrl.get_status_of_lab_instance(lab_instance, self.collection.lab_ctrl)
+        self.assertEqual(json.loads(status.namespace)["code"], 404)
+        self.assertEqual(json.loads(status.virtual_machine_instances)["items"], [])
+
+    def test_deleted_namespace(self):
+        created = self.collection.lab_instance_ctrl.create(1, 1)
+        lab_instance = self.lab_instance_adapter.get(created.primary_key)
+        self.collection.namespace_ctrl.delete(lab_instance.namespace_name)
+        # like Kubernetes, the list of a deleted namespace is empty and no error
+        vmis = self.collection.virtual_machine_instance_ctrl.get_list_of_lab_instance(lab_instance,
+                                                                                       self.collection.lab_ctrl)
+        self.assertEqual(json.loads(vmis)["items"], [])
+        vmi = self.collection.virtual_machine_instance_ctrl.get_of_lab_instance(lab_instance, "vm",
+                                                                                self.collection.lab_ctrl)
+        self.assertEqual(json.loads(vmi)["code"], 404)
+
+
+class UpdateTestCase(MemoryCollectionTestCase):
+    def test_update_vmi(self):
+        tracer = RecordingTracer()
+        previous = set_tracer(tracer)
+        try:
+            created = self.collection.lab_instance_ctrl.create(1, 1)
+            namespace = self.lab_instance_adapter.get(created.primary_key).namespace_name
+            vmi_ctrl = self.collection.virtual_machine_instance_ctrl
+            current = LabDockerImage(1, 1, 1, "vm")
+            self.assertIsNone(vmi_ctrl.update_vmi(namespace, current, current))
+            changed = LabDockerImage(1, 1, 1, "vm", cpu_limit="2")
+            patched = json.loads(vmi_ctrl.update_vmi(namespace, current, changed))
+            self.assertEqual(patched["spec"]["domain"]["resources"]["limits"], {"cpu": "2"})
+            self.assertEqual(patched["spec"]["domain"]["devices"]["disks"][0]["name"], "containerdisk")
+            applied = json.loads(vmi_ctrl.update_vmi(namespace, changed, current, patch_type=PATCH_APPLY))
+            self.assertNotIn("limits", applied["spec"]["domain"]["resources"])
+        finally:
+            set_tracer(previous)
+        patches = [span for span in tracer.spans if span.name == "kubernetes PATCH"]
+        self.assertEqual(len(patches), 2)
+
+    def test_update_namespace(self):
+        self.collection.namespace_ctrl.create("lab-1")
+        self.assertIsNone(self.collection.namespace_ctrl.update("lab-1", {"namespace": "lab-1"},
+                                                                {"namespace": "lab-1"}))
+        patched = json.loads(self.collection.namespace_ctrl.patch("lab-1", '{"metadata": {"labels": {"a": "b"}}}'))
+        self.assertEqual(patched["metadata"]["labels"], {"a": "b"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+
+from lab_orchestrator_lib.controller.expiry_scheduler import ExpiryScheduler
+from lab_orchestrator_lib.model.model import Lab, LabInstance
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class LabCtrlMock:
+    def __init__(self, labs):
+        self.labs = {lab.primary_key: lab for lab in labs}
+        self.get_all_calls = 0
+
+    def get(self, identifier):
+        return self.labs[identifier]
+
+    def get_all(self):
+        self.get_all_calls += 1
+        return list(self.labs.values())
+
+
+class LabInstanceCtrlMock:
+    def __init__(self, lab_instances=None, fail=()):
+        self.lab_instances = lab_instances or []
+        self.deleted = []
+        self.fail = set(fail)
+
+    def get_all(self):
+        return self.lab_instances
+
+    def delete(self, lab_instance):
+        if lab_instance.primary_key in self.fail:
+            raise Exception("deletion failed")
+        self.deleted.append(lab_instance.primary_key)
+
+
+class ExpirySchedulerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = Clock()
+        self.lab_ctrl = LabCtrlMock([
+            Lab(1, "ttl", "ttl", "desc", ttl=100),
+            Lab(2, "idle", "idle", "desc", idle_timeout=10),
+            Lab(3, "forever", "forever", "desc"),
+        ])
+        self.lab_instance_ctrl = LabInstanceCtrlMock()
+        self.scheduler = ExpiryScheduler(self.lab_instance_ctrl, self.lab_ctrl, clock=self.clock, batch_size=2)
+
+    def test_schedule_ttl(self):
+        deadline = self.scheduler.schedule(LabInstance(1, 1, 1, created_at=950.0))
+        self.assertEqual(deadline, 1050.0)
+        self.assertEqual(self.scheduler.next_deadline(), 1050.0)
+        self.assertListEqual(self.scheduler.run_pending(), [])
+        self.clock.now = 1050.0
+        deleted = self.scheduler.run_pending()
+        self.assertEqual([lab_instance.primary_key for lab_instance in deleted], [1])
+        self.assertEqual(self.lab_instance_ctrl.deleted, [1])
+        self.assertEqual(len(self.scheduler), 0)
+
+    def test_schedule_without_created_at(self):
+        deadline = self.scheduler.schedule(LabInstance(1, 1, 1))
+        self.assertEqual(deadline, 1100.0)
+
+    def test_no_expiry(self):
+        self.assertIsNone(self.scheduler.schedule(LabInstance(1, 3, 1)))
+        self.assertEqual(len(self.scheduler), 0)
+        self.assertIsNone(self.scheduler.next_deadline())
+
+    def test_touch(self):
+        self.scheduler.schedule(LabInstance(1, 2, 1, created_at=1000.0))
+        self.clock.now = 1008.0
+        self.assertEqual(self.scheduler.touch(1), 1018.0)
+        self.clock.now = 1012.0
+        self.assertListEqual(self.scheduler.run_pending(), [])
+        self.clock.now = 1018.0
+        self.assertEqual(len(self.scheduler.run_pending()), 1)
+        self.assertIsNone(self.scheduler.touch(1))
+
+    def test_cancel(self):
+        self.scheduler.schedule(LabInstance(1, 1, 1, created_at=1000.0))
+        self.assertTrue(self.scheduler.cancel(1))
+        self.assertFalse(self.scheduler.cancel(1))
+        self.clock.now = 2000.0
+        self.assertListEqual(self.scheduler.run_pending(), [])
+        self.assertIsNone(self.scheduler.next_deadline())
+
+    def test_batches(self):
+        for i in range(5):
+            self.scheduler.schedule(LabInstance(i, 1, 1, created_at=900.0 + i))
+        self.clock.now = 2000.0
+        self.assertEqual(len(self.scheduler.run_pending()), 2)
+        self.assertEqual(len(self.scheduler.run_pending()), 2)
+        self.assertEqual(len(self.scheduler.run_pending()), 1)
+        self.assertEqual(self.lab_instance_ctrl.deleted, [0, 1, 2, 3, 4])
+
+    def test_retry(self):
+        self.lab_instance_ctrl.fail.add(1)
+        self.scheduler.schedule(LabInstance(1, 1, 1, created_at=900.0))
+        self.assertListEqual(self.scheduler.run_pending(), [])
+        self.assertEqual(self.scheduler.next_deadline(), 1000.0 + self.scheduler.retry_delay)
+        self.lab_instance_ctrl.fail.clear()
+        self.clock.now = 1000.0 + self.scheduler.retry_delay
+        self.assertEqual(len(self.scheduler.run_pending()), 1)
+
+    def test_rebuild(self):
+        self.lab_instance_ctrl.lab_instances = [
+            LabInstance(1, 1, 1, created_at=990.0),
+            LabInstance(2, 2, 1, created_at=995.0),
+            LabInstance(3, 3, 1, created_at=995.0),
+            LabInstance(4, 99, 1, created_at=995.0),
+        ]
+        self.assertEqual(self.scheduler.rebuild(), 2)
+        self.assertEqual(self.lab_ctrl.get_all_calls, 1)
+        self.assertEqual(self.scheduler.next_deadline(), 1010.0)
+        self.clock.now = 1090.0
+        self.assertEqual([lab_instance.primary_key for lab_instance in self.scheduler.run_pending()], [2, 1])
+
+    def test_rebuild_keeps_active_lab_instances(self):
+        # the lab instance was used until the restart, but was created before its idle timeout
+        self.clock.now = 2000.0
+        self.lab_instance_ctrl.lab_instances = [LabInstance(1, 2, 1, created_at=1000.0)]
+        self.assertEqual(self.scheduler.rebuild(), 1)
+        self.assertListEqual(self.scheduler.run_pending(), [])
+        self.assertEqual(self.lab_instance_ctrl.deleted, [])
+        self.clock.now = 2005.0
+        self.assertEqual(self.scheduler.touch(1), 2015.0)
+        self.clock.now = 2015.0
+        self.assertEqual(len(self.scheduler.run_pending()), 1)
+
+    def test_rebuild_keeps_ttl(self):
+        self.clock.now = 2000.0
+        self.lab_instance_ctrl.lab_instances = [LabInstance(1, 1, 1, created_at=1000.0)]
+        self.scheduler.rebuild()
+        self.assertEqual(len(self.scheduler.run_pending()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
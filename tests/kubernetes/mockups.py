@@ -21,6 +21,10 @@ class ProxyMock(Proxy):
         self.asserted_post_data = None
         self.delete_ret = None
         self.asserted_delete_address = None
+        self.patch_ret = None
+        self.asserted_patch_address = None
+        self.asserted_patch_data = None
+        self.asserted_patch_type = None
         self.test: Union[unittest.TestCase, NoneFailsafe] = NoneFailsafe()
 
     def get(self, address: str) -> str:
@@ -36,6 +40,13 @@ class ProxyMock(Proxy):
         self.test.assertEqual(self.asserted_delete_address, address)
         return self.delete_ret
 
+    def patch(self, address: str, data: str, patch_type: str = "merge", field_manager: str = "",
+              force: bool = False) -> str:
+        self.test.assertEqual(self.asserted_patch_address, address)
+        self.test.assertEqual(self.asserted_patch_data, data)
+        self.test.assertEqual(self.asserted_patch_type, patch_type)
+        return self.patch_ret
+
 
 class RequestsMock:
     pass
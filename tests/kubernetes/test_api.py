@@ -3,6 +3,7 @@ import unittest
 from lab_orchestrator_lib.kubernetes.api import add_api_namespaced, NamespacedApi, _API_EXTENSIONS_NAMESPACED, \
     _API_EXTENSIONS_NOT_NAMESPACED, add_api_not_namespaced, NotNamespacedApi, Proxy, APIRegistry, Namespace, \
     VirtualMachineInstance, NetworkPolicy
+from lab_orchestrator_lib.kubernetes.patch import PATCH_MERGE, PATCH_STRATEGIC, PATCH_APPLY
 from tests.kubernetes.mockups import ProxyMock, RequestsMock, RequestsResponseMock
 
 
@@ -73,7 +74,7 @@ class ProxyTestCase(unittest.TestCase):
 
         def get_mock(uri, headers, verify):
             self.assertEqual(uri, test_uri)
-            self.assertDictEqual(headers, {"Authorization": f"Bearer {test_token}"})
+            self.assertDictEqual(headers, {"Authorization": f"Bearer {test_token}", "Accept-Encoding": "gzip"})
             self.assertEqual(verify, test_cacert)
             return RequestsResponseMock(response_text)
         RequestsMock.get = get_mock
@@ -125,6 +126,37 @@ class ProxyTestCase(unittest.TestCase):
         self.assertEqual(response, response_text)
 
 
+    def test_patch(self):
+        test_base_uri = "localhost:8000"
+        test_address = "/api/v1/namespaces/lab-1"
+        test_token = ""
+        test_cacert = ""
+        response_text = "response"
+        test_data = '{"metadata": {"labels": {"a": "b"}}}'
+        calls = []
+
+        def patch_mock(uri, headers, verify, data):
+            calls.append((uri, headers["Content-Type"]))
+            self.assertEqual(headers["Authorization"], f"Bearer {test_token}")
+            self.assertEqual(verify, test_cacert)
+            self.assertEqual(data, test_data)
+            return RequestsResponseMock(response_text)
+        RequestsMock.patch = patch_mock
+        proxy = Proxy(base_uri=test_base_uri, service_account_token=test_token, cacert=test_cacert,
+                      requests_lib=RequestsMock)
+        self.assertEqual(proxy.patch(test_address, test_data), response_text)
+        proxy.patch(test_address, test_data, patch_type=PATCH_STRATEGIC)
+        proxy.patch(test_address, test_data, patch_type=PATCH_APPLY, force=True)
+        self.assertEqual(calls, [
+            (test_base_uri + test_address, "application/merge-patch+json"),
+            (test_base_uri + test_address, "application/strategic-merge-patch+json"),
+            (test_base_uri + test_address + "?fieldManager=lab-orchestrator-lib&force=true",
+             "application/apply-patch+yaml"),
+        ])
+        with self.assertRaises(ValueError):
+            proxy.patch(test_address, test_data, patch_type="json")
+
+
 class APIRegistryTestCase(unittest.TestCase):
     def test_extensions(self):
         proxy = Proxy("/api", requests_lib=RequestsMock)
@@ -177,6 +209,17 @@ class NamespacedApiTestCase(unittest.TestCase):
         ret = self.api.delete(namespace, identifier)
         self.assertEqual(ret, self.proxy.delete_ret)
 
+    def test_patch(self):
+        self.proxy.patch_ret = "hallo"
+        namespace = "ns1"
+        identifier = "8"
+        data = "data"
+        self.proxy.asserted_patch_address = f"example/{namespace}/{identifier}"
+        self.proxy.asserted_patch_data = data
+        self.proxy.asserted_patch_type = PATCH_APPLY
+        ret = self.api.patch(namespace, identifier, data, patch_type=PATCH_APPLY)
+        self.assertEqual(ret, self.proxy.patch_ret)
+
 
 class ExampleNotNamespacedApi2(NotNamespacedApi):
     list_url = "example"
@@ -217,6 +260,16 @@ class NotNamespacedApiTestCase(unittest.TestCase):
         ret = self.api.delete(identifier)
         self.assertEqual(ret, self.proxy.delete_ret)
 
+    def test_patch(self):
+        self.proxy.patch_ret = "hallo"
+        identifier = "8"
+        data = "data"
+        self.proxy.asserted_patch_address = f"example/{identifier}"
+        self.proxy.asserted_patch_data = data
+        self.proxy.asserted_patch_type = PATCH_MERGE
+        ret = self.api.patch(identifier, data)
+        self.assertEqual(ret, self.proxy.patch_ret)
+
 
 class NamespaceTestCase(unittest.TestCase):
     def setUp(self) -> None:
@@ -0,0 +1,195 @@
+import json
+import os
+import tempfile
+import unittest
+
+from lab_orchestrator_lib.controller.controller_collection import create_controller_collection
+from lab_orchestrator_lib.database.memory_adapter import MemoryUserAdapter, MemoryDockerImageAdapter, \
+    MemoryLabDockerImageAdapter, MemoryLabAdapter, MemoryLabInstanceAdapter
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy, NamespacedApi, add_api_namespaced, \
+    _API_EXTENSIONS_NAMESPACED
+from lab_orchestrator_lib.kubernetes.discovery import ApiDiscovery
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+
+
+class CountingProxy(Proxy):
+    def __init__(self, base_uri):
+        super().__init__(base_uri, "token")
+        self.discovery_requests = 0
+
+    def get(self, address: str) -> str:
+        if address == "/apis":
+            self.discovery_requests += 1
+        return super().get(address)
+
+
+class ApiDiscoveryTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = FakeApiServer(api_groups={"kubevirt.io": ["v1", "v1alpha3"], "networking.k8s.io": ["v1"],
+                                                "example.com": ["v2", "v1"]}).start()
+        self.proxy = CountingProxy(self.server.base_uri)
+        self.now = 1000.0
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_file = os.path.join(self.directory.name, "discovery.json")
+
+    def tearDown(self) -> None:
+        self.server.stop()
+        self.directory.cleanup()
+
+    def discovery(self, cache_file=None, ttl=60) -> ApiDiscovery:
+        return ApiDiscovery(self.proxy, cache_file=cache_file, ttl=ttl, clock=lambda: self.now)
+
+    def test_resolve(self):
+        discovery = self.discovery()
+        registry = APIRegistry(self.proxy)
+        self.assertEqual(discovery.resolve(type(registry.virtual_machine_instance)), "kubevirt.io/v1")
+        self.assertEqual(discovery.resolve(type(registry.network_policy)), "networking.k8s.io/v1")
+        self.assertIsNone(discovery.resolve(type(registry.namespace)))
+        self.assertEqual(self.proxy.discovery_requests, 1)
+
+    def test_resolve_not_preferred(self):
+        class ExampleApi(NamespacedApi):
+            api_version = "example.com/v1"
+            api_versions = ("v1", "v0")
+            resource = "examples"
+
+        class MissingApi(NamespacedApi):
+            api_version = "missing.com/v1"
+            api_versions = ("v1",)
+            resource = "missings"
+
+        discovery = self.discovery()
+        self.assertEqual(discovery.resolve(ExampleApi), "example.com/v1")
+        with self.assertLogs("lab_orchestrator_lib.kubernetes.discovery", "WARNING"):
+            self.assertIsNone(discovery.resolve(MissingApi))
+
+    def test_ttl(self):
+        discovery = self.discovery()
+        discovery.get_groups()
+        discovery.get_groups()
+        self.assertEqual(self.proxy.discovery_requests, 1)
+        self.now += 61
+        discovery.get_groups()
+        self.assertEqual(self.proxy.discovery_requests, 2)
+        discovery.get_groups(refresh=True)
+        self.assertEqual(self.proxy.discovery_requests, 3)
+
+    def test_cache_file(self):
+        groups = self.discovery(self.cache_file).get_groups()
+        self.assertEqual(groups["kubevirt.io"].versions, ["v1", "v1alpha3"])
+        with open(self.cache_file) as file:
+            self.assertEqual(json.load(file)["base_uri"], self.server.base_uri)
+        # a restarted worker uses the cache file
+        self.assertEqual(self.discovery(self.cache_file).get_groups(), groups)
+        self.assertEqual(self.proxy.discovery_requests, 1)
+        # the cache expires with the time of the discovery, not the time it was loaded
+        self.now += 30
+        self.discovery(self.cache_file).get_groups()
+        self.now += 31
+        self.discovery(self.cache_file).get_groups()
+        self.assertEqual(self.proxy.discovery_requests, 2)
+
+    def test_cache_file_of_other_cluster(self):
+        self.discovery(self.cache_file).get_groups()
+        other = ApiDiscovery(Proxy("http://127.0.0.1:1", "token"), cache_file=self.cache_file, ttl=60,
+                             clock=lambda: self.now)
+        self.assertIsNone(other._load_cache(self.now))
+
+    def test_invalid_cache_file(self):
+        with open(self.cache_file, "w") as file:
+            file.write("{")
+        self.assertIn("kubevirt.io", self.discovery(self.cache_file).get_groups())
+        self.assertEqual(self.proxy.discovery_requests, 1)
+
+    def test_invalidate(self):
+        discovery = self.discovery(self.cache_file)
+        discovery.get_groups()
+        discovery.invalidate()
+        self.assertFalse(os.path.exists(self.cache_file))
+        discovery.get_groups()
+        self.assertEqual(self.proxy.discovery_requests, 2)
+
+    def test_failed_discovery(self):
+        self.server.fail_next(503)
+        discovery = self.discovery(self.cache_file)
+        with self.assertLogs("lab_orchestrator_lib.kubernetes.discovery", "WARNING"):
+            self.assertEqual(discovery.get_groups(), {})
+        self.assertFalse(os.path.exists(self.cache_file))
+        self.assertIn("kubevirt.io", discovery.get_groups())
+
+
+class RegistryDiscoveryTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = FakeApiServer().start()
+        self.proxy = CountingProxy(self.server.base_uri)
+        self.registry = APIRegistry(self.proxy, discovery=ApiDiscovery(self.proxy))
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_urls(self):
+        vmi = self.registry.virtual_machine_instance
+        self.assertEqual(vmi.api_version, "kubevirt.io/v1")
+        self.assertEqual(vmi.list_url, "/apis/kubevirt.io/v1/namespaces/{namespace}/virtualmachineinstances")
+        self.assertEqual(vmi.detail_url,
+                         "/apis/kubevirt.io/v1/namespaces/{namespace}/virtualmachineinstances/{identifier}")
+        namespace = self.registry.namespace
+        self.assertEqual(namespace.list_url, "/api/v1/namespaces")
+        self.registry.network_policy
+        self.registry.virtual_machine_instance
+        self.assertEqual(self.proxy.discovery_requests, 1)
+        # the defaults of the class are not changed
+        self.assertEqual(type(vmi).api_version, "kubevirt.io/v1alpha3")
+        self.assertEqual(APIRegistry(self.proxy).virtual_machine_instance.api_version, "kubevirt.io/v1alpha3")
+
+    def test_failed_discovery(self):
+        self.server.fail_next(503)
+        with self.assertLogs("lab_orchestrator_lib.kubernetes.discovery", "WARNING"):
+            self.assertEqual(self.registry.virtual_machine_instance.api_version, "kubevirt.io/v1alpha3")
+        # the failed discovery is not kept
+        self.assertEqual(self.registry.virtual_machine_instance.api_version, "kubevirt.io/v1")
+        self.registry.virtual_machine_instance
+        self.assertEqual(self.proxy.discovery_requests, 2)
+
+    def test_expired_discovery(self):
+        now = 1000.0
+        registry = APIRegistry(self.proxy, discovery=ApiDiscovery(self.proxy, ttl=60, clock=lambda: now))
+        self.assertEqual(registry.virtual_machine_instance.api_version, "kubevirt.io/v1")
+        self.server.api_groups = {"kubevirt.io": ["v1alpha3"]}
+        now = 1059.0
+        self.assertEqual(registry.virtual_machine_instance.api_version, "kubevirt.io/v1")
+        now = 1060.0
+        self.assertEqual(registry.virtual_machine_instance.api_version, "kubevirt.io/v1alpha3")
+        self.assertEqual(self.proxy.discovery_requests, 2)
+
+    def test_extension_added_later(self):
+        self.registry.virtual_machine_instance
+        try:
+            @add_api_namespaced("example_later")
+            class ExampleApi(NamespacedApi):
+                api_version = "kubevirt.io/v1alpha3"
+                api_versions = ("v1alpha3",)
+                resource = "examples"
+
+            self.assertEqual(self.registry.example_later.list_url,
+                             "/apis/kubevirt.io/v1alpha3/namespaces/{namespace}/examples")
+        finally:
+            del _API_EXTENSIONS_NAMESPACED["example_later"]
+
+    def test_create_vmi(self):
+        docker_image_adapter = MemoryDockerImageAdapter()
+        lab_docker_image_adapter = MemoryLabDockerImageAdapter()
+        collection = create_controller_collection(
+            registry=self.registry, user_adapter=MemoryUserAdapter(), docker_image_adapter=docker_image_adapter,
+            lab_docker_image_adapter=lab_docker_image_adapter, lab_adapter=MemoryLabAdapter(),
+            lab_instance_adapter=MemoryLabInstanceAdapter(), secret_key="secret")
+        docker_image = docker_image_adapter.create("ubuntu", "Ubuntu image", "ubuntu:latest")
+        lab_docker_image = lab_docker_image_adapter.create(1, docker_image.primary_key, "vm")
+        collection.namespace_ctrl.create("lab-1")
+        collection.virtual_machine_instance_ctrl.create("lab-1", lab_docker_image)
+        vmis = self.server.get_objects("kubevirt.io/v1", "virtualmachineinstances", "lab-1")
+        self.assertEqual([vmi["apiVersion"] for vmi in vmis], ["kubevirt.io/v1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
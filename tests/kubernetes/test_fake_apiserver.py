@@ -0,0 +1,188 @@
+import json
+import threading
+import time
+import unittest
+
+import requests
+
+from lab_orchestrator_lib.controller.cluster_router import ClusterRouter
+from lab_orchestrator_lib.controller.controller_collection import create_controller_collection
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+from lab_orchestrator_lib.kubernetes.patch import PATCH_STRATEGIC, PATCH_APPLY
+from lab_orchestrator_lib.model.model import User, DockerImage, LabDockerImage, Lab, LabInstance
+from lab_orchestrator_lib.database.memory_adapter import MemoryUserAdapter, MemoryDockerImageAdapter, \
+    MemoryLabDockerImageAdapter, MemoryLabAdapter, MemoryLabInstanceAdapter
+
+NAMESPACE = "kind: Namespace\napiVersion: v1\nmetadata:\n  name: {name}\n"
+VMI = "kind: VirtualMachineInstance\napiVersion: kubevirt.io/v1alpha3\nmetadata:\n  name: {name}\n"
+
+
+class FakeApiServerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = FakeApiServer().start()
+        self.registry = APIRegistry(Proxy(self.server.base_uri, "token"))
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_namespace(self):
+        created = json.loads(self.registry.namespace.create(NAMESPACE.format(name="lab-1")))
+        self.assertEqual(created["metadata"]["name"], "lab-1")
+        self.assertEqual(created["status"]["phase"], "Active")
+        got = json.loads(self.registry.namespace.get("lab-1"))
+        self.assertEqual(got["metadata"]["uid"], created["metadata"]["uid"])
+        namespaces = json.loads(self.registry.namespace.get_list())
+        self.assertEqual(namespaces["kind"], "NamespaceList")
+        self.assertEqual([item["metadata"]["name"] for item in namespaces["items"]], ["lab-1"])
+        conflict = json.loads(self.registry.namespace.create(NAMESPACE.format(name="lab-1")))
+        self.assertEqual(conflict["code"], 409)
+        self.registry.namespace.delete("lab-1")
+        not_found = json.loads(self.registry.namespace.get("lab-1"))
+        self.assertEqual(not_found["reason"], "NotFound")
+
+    def test_namespaced(self):
+        missing = json.loads(self.registry.virtual_machine_instance.create("lab-1", VMI.format(name="vm")))
+        self.assertEqual(missing["code"], 404)
+        self.registry.namespace.create(NAMESPACE.format(name="lab-1"))
+        self.registry.virtual_machine_instance.create("lab-1", VMI.format(name="vm"))
+        vmi = json.loads(self.registry.virtual_machine_instance.get("lab-1", "vm"))
+        self.assertEqual(vmi["metadata"]["namespace"], "lab-1")
+        self.assertEqual(vmi["status"]["phase"], "Running")
+        vmis = json.loads(self.registry.virtual_machine_instance.get_list("lab-1"))
+        self.assertEqual(len(vmis["items"]), 1)
+        # deleting the namespace deletes the vmi
+        self.registry.namespace.delete("lab-1")
+        self.assertEqual(self.server.get_objects("kubevirt.io/v1alpha3", "virtualmachineinstances", "lab-1"), [])
+
+    def test_patch(self):
+        self.registry.namespace.create(NAMESPACE.format(name="lab-1"))
+        created = json.loads(self.registry.namespace.get("lab-1"))
+        patched = json.loads(self.registry.namespace.patch("lab-1", '{"metadata": {"labels": {"a": "b"}}}'))
+        self.assertEqual(patched["metadata"]["labels"], {"a": "b"})
+        self.assertEqual(patched["metadata"]["uid"], created["metadata"]["uid"])
+        self.assertNotEqual(patched["metadata"]["resourceVersion"], created["metadata"]["resourceVersion"])
+        patched = json.loads(self.registry.namespace.patch("lab-1", '{"metadata": {"labels": {"a": null}}}',
+                                                           patch_type=PATCH_STRATEGIC))
+        self.assertEqual(patched["metadata"]["labels"], {})
+        self.assertEqual(json.loads(self.registry.namespace.patch("lab-2", "{}"))["code"], 404)
+
+    def test_apply(self):
+        self.registry.namespace.create(NAMESPACE.format(name="lab-1"))
+        vmi = {"kind": "VirtualMachineInstance", "apiVersion": "kubevirt.io/v1alpha3",
+               "metadata": {"name": "vm", "labels": {"a": "b"}}}
+        created = json.loads(self.registry.virtual_machine_instance.patch("lab-1", "vm", json.dumps(vmi),
+                                                                          patch_type=PATCH_APPLY))
+        self.assertEqual(created["metadata"]["namespace"], "lab-1")
+        vmi["metadata"]["labels"]["a"] = "c"
+        applied = json.loads(self.registry.virtual_machine_instance.patch("lab-1", "vm", json.dumps(vmi),
+                                                                          patch_type=PATCH_APPLY))
+        self.assertEqual(applied["metadata"]["labels"], {"a": "c"})
+        self.assertEqual(applied["status"]["phase"], "Running")
+        response = requests.patch(f"{self.server.base_uri}/api/v1/namespaces/lab-1", data="{}",
+                                  headers={"Content-Type": "application/apply-patch+yaml"})
+        self.assertEqual(response.status_code, 400)
+        response = requests.patch(f"{self.server.base_uri}/api/v1/namespaces/lab-1", data="{}",
+                                  headers={"Content-Type": "application/json-patch+json"})
+        self.assertEqual(response.status_code, 415)
+
+    def test_error_injection(self):
+        self.server.fail_next(503, 2)
+        self.assertEqual(json.loads(self.registry.namespace.get_list())["code"], 503)
+        self.assertEqual(json.loads(self.registry.namespace.get_list())["code"], 503)
+        self.assertEqual(json.loads(self.registry.namespace.get_list())["kind"], "List")
+        self.server.error_rate = 1.0
+        self.assertEqual(json.loads(self.registry.namespace.get_list())["code"], 500)
+        self.assertEqual(self.server.request_count, 4)
+
+    def test_latency(self):
+        self.server.latency = 0.05
+        start = time.perf_counter()
+        self.registry.namespace.get_list()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.05)
+
+    def test_unknown_path(self):
+        self.assertEqual(json.loads(self.server_get("/unknown"))["code"], 404)
+
+    def server_get(self, address):
+        return requests.get(self.server.base_uri + address).text
+
+    def test_watch(self):
+        self.registry.namespace.create(NAMESPACE.format(name="lab-1"))
+        resource_version = json.loads(self.registry.namespace.get_list())["metadata"]["resourceVersion"]
+
+        def change():
+            time.sleep(0.05)
+            self.registry.namespace.create(NAMESPACE.format(name="lab-2"))
+            self.registry.namespace.delete("lab-1")
+        thread = threading.Thread(target=change)
+        thread.start()
+        response = requests.get(f"{self.server.base_uri}/api/v1/namespaces?watch=true&timeoutSeconds=1"
+                                f"&resourceVersion={resource_version}", stream=True)
+        events = [json.loads(line) for line in response.iter_lines() if line]
+        thread.join()
+        self.assertEqual([(event["type"], event["object"]["metadata"]["name"]) for event in events],
+                         [("ADDED", "lab-2"), ("DELETED", "lab-1")])
+
+    def test_watch_keeps_resource_versions(self):
+        created = json.loads(self.registry.namespace.create(NAMESPACE.format(name="lab-1")))
+        deleted = json.loads(self.registry.namespace.delete("lab-1"))
+        response = requests.get(f"{self.server.base_uri}/api/v1/namespaces?watch=true&timeoutSeconds=0"
+                                f"&resourceVersion=0", stream=True)
+        events = [json.loads(line) for line in response.iter_lines() if line]
+        self.assertEqual([event["object"]["metadata"]["resourceVersion"] for event in events],
+                         [created["metadata"]["resourceVersion"], deleted["metadata"]["resourceVersion"]])
+
+    def test_watch_expired(self):
+        self.server.stop()
+        self.server = FakeApiServer(event_history=2).start()
+        registry = APIRegistry(Proxy(self.server.base_uri, "token"))
+        for i in range(3):
+            registry.namespace.create(NAMESPACE.format(name=f"lab-{i}"))
+        response = requests.get(f"{self.server.base_uri}/api/v1/namespaces?watch=true&timeoutSeconds=0"
+                                f"&resourceVersion=0")
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(response.json()["reason"], "Expired")
+        response = requests.get(f"{self.server.base_uri}/api/v1/namespaces?watch=true&timeoutSeconds=0"
+                                f"&resourceVersion=1", stream=True)
+        self.assertEqual(response.status_code, 200)
+        events = [json.loads(line) for line in response.iter_lines() if line]
+        self.assertEqual([event["object"]["metadata"]["name"] for event in events], ["lab-1", "lab-2"])
+
+
+class FakeApiServerClusterRouterTestCase(unittest.TestCase):
+    def test_multiple_clusters(self):
+        servers = {name: FakeApiServer().start() for name in ["east", "west"]}
+        try:
+            adapters = dict(
+                user_adapter=MemoryUserAdapter([User(1), User(2)]),
+                docker_image_adapter=MemoryDockerImageAdapter([DockerImage(1, "ubuntu", "desc", "ubuntu")]),
+                lab_docker_image_adapter=MemoryLabDockerImageAdapter([LabDockerImage(1, 1, 1, "ubuntu")]),
+                lab_adapter=MemoryLabAdapter([Lab(1, "lab", "lab", "desc")]),
+                lab_instance_adapter=MemoryLabInstanceAdapter(),
+            )
+            collections = {
+                name: create_controller_collection(registry=APIRegistry(Proxy(server.base_uri, "token")),
+                                                   secret_key="secret", **adapters)
+                for name, server in servers.items()
+            }
+            router = ClusterRouter(collections, placement=ClusterRouter.LEAST_LOADED)
+            first = router.create(1, 1)
+            second = router.create(1, 2)
+            for lab_instance_kubernetes in [first, second]:
+                server = servers[lab_instance_kubernetes.cluster]
+                namespaces = server.get_objects("v1", "namespaces")
+                self.assertEqual(len(namespaces), 1)
+                namespace = namespaces[0]["metadata"]["name"]
+                vmis = server.get_objects("kubevirt.io/v1alpha3", "virtualmachineinstances", namespace)
+                self.assertEqual([vmi["metadata"]["name"] for vmi in vmis], ["ubuntu"])
+            router.delete(router.get(first.primary_key))
+            self.assertEqual(servers[first.cluster].get_objects("v1", "namespaces"), [])
+            self.assertEqual(len(servers[second.cluster].get_objects("v1", "namespaces")), 1)
+        finally:
+            for server in servers.values():
+                server.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
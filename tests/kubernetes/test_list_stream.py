@@ -0,0 +1,89 @@
+import json
+import unittest
+
+from lab_orchestrator_lib.custom_exceptions import KubernetesApiError
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+from lab_orchestrator_lib.kubernetes.list_stream import iter_list_items
+
+NAMESPACE = "kind: Namespace\napiVersion: v1\nmetadata:\n  name: {name}\n  labels:\n    app: lab-orchestrator\n"
+
+
+def chunked(body: bytes, size: int):
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+class IterListItemsTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.list = {"kind": "NamespaceList", "apiVersion": "v1", "metadata": {"resourceVersion": "42"},
+                     "items": [{"metadata": {"name": f"lab-{i}", "labels": {"ä": "ö"}}, "spec": {"n": 12345}}
+                               for i in range(20)]}
+        self.body = json.dumps(self.list, ensure_ascii=False, indent=1).encode("utf-8")
+
+    def test_chunk_sizes(self):
+        for size in (1, 2, 7, 100, len(self.body)):
+            metadata = {}
+            self.assertEqual(list(iter_list_items(chunked(self.body, size), metadata)), self.list["items"])
+            self.assertEqual(metadata, {"resourceVersion": "42"})
+
+    def test_items_before_end(self):
+        read = []
+
+        def chunks():
+            for chunk in chunked(self.body, 64):
+                read.append(chunk)
+                yield chunk
+
+        items = iter_list_items(chunks())
+        self.assertEqual(next(items), self.list["items"][0])
+        self.assertLess(sum(len(chunk) for chunk in read), len(self.body) / 5)
+
+    def test_other_lists(self):
+        self.assertEqual(list(iter_list_items([b'{}'])), [])
+        self.assertEqual(list(iter_list_items([b'{"items": []}'])), [])
+        self.assertEqual(list(iter_list_items([b'{"items": null, "kind": "List"}'])), [])
+        self.assertEqual(list(iter_list_items([b'{"items": [1', b'2, 3], "metadata": {}}'])), [12, 3])
+
+    def test_invalid(self):
+        for body in (b'', b'[]', b'{"items": [{}', b'{"items": [{} {}]}', b'{"items": []', b'{"a" 1}'):
+            with self.assertRaises(ValueError, msg=body):
+                list(iter_list_items(chunked(body, 3)))
+
+
+class ProxyIterListTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = FakeApiServer(gzip_min_size=1024).start()
+        self.registry = APIRegistry(Proxy(self.server.base_uri, "token"))
+        for i in range(200):
+            self.registry.namespace.create(NAMESPACE.format(name=f"lab-{i}"))
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_iter_list(self):
+        metadata = {}
+        namespaces = list(self.registry.namespace.iter_list(metadata))
+        self.assertEqual(namespaces, json.loads(self.registry.namespace.get_list())["items"])
+        self.assertEqual([namespace["metadata"]["name"] for namespace in namespaces][:2], ["lab-0", "lab-1"])
+        self.assertIn("resourceVersion", metadata)
+        self.assertEqual(list(self.registry.network_policy.iter_list("lab-1")), [])
+
+    def test_gzip(self):
+        sent = self.server.bytes_sent
+        text = self.registry.namespace.get_list()
+        compressed = self.server.bytes_sent - sent
+        self.assertLess(compressed * 5, len(text.encode("utf-8")))
+        sent = self.server.bytes_sent
+        list(self.registry.namespace.iter_list())
+        self.assertEqual(self.server.bytes_sent - sent, compressed)
+
+    def test_error(self):
+        self.server.fail_next(500)
+        with self.assertRaises(KubernetesApiError) as context:
+            list(self.registry.namespace.iter_list())
+        self.assertEqual(context.exception.status_code, 500)
+        self.assertEqual(json.loads(context.exception.text)["kind"], "Status")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+
+from lab_orchestrator_lib.kubernetes.patch import create_merge_patch, apply_merge_patch
+
+
+class MergePatchTestCase(unittest.TestCase):
+    def test_create(self):
+        current = {"metadata": {"name": "a", "labels": {"x": "1", "y": "2"}}, "spec": {"ports": [1, 2], "cpu": 1}}
+        desired = {"metadata": {"name": "a", "labels": {"x": "1", "z": "3"}}, "spec": {"ports": [1], "cpu": 1}}
+        patch = create_merge_patch(current, desired)
+        self.assertEqual(patch, {"metadata": {"labels": {"y": None, "z": "3"}}, "spec": {"ports": [1]}})
+        self.assertEqual(apply_merge_patch(current, patch), desired)
+
+    def test_no_change(self):
+        self.assertEqual(create_merge_patch({"a": {"b": 1}}, {"a": {"b": 1}}), {})
+
+    def test_apply(self):
+        target = {"a": {"b": 1}, "c": 2}
+        self.assertEqual(apply_merge_patch(target, {"a": {"d": 3}, "c": None}), {"a": {"b": 1, "d": 3}})
+        self.assertEqual(target, {"a": {"b": 1}, "c": 2})
+        self.assertEqual(apply_merge_patch(target, {"a": 5}), {"a": 5, "c": 2})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import json
+import sys
+import unittest
+
+from lab_orchestrator_lib import metrics
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+from lab_orchestrator_lib.kubernetes.response_cache import ResponseCache, get_resource_version, validation_address, \
+    validated_resource_version
+
+NAMESPACE = "kind: Namespace\napiVersion: v1\nmetadata:\n  name: {name}\n"
+NETWORK_POLICY = "kind: NetworkPolicy\napiVersion: networking.k8s.io/v1\nmetadata:\n  name: {name}\nspec: {{}}\n"
+
+
+class ResponseCacheFunctionsTestCase(unittest.TestCase):
+    def test_get_resource_version(self):
+        text = json.dumps({"kind": "List", "metadata": {"resourceVersion": "12"},
+                           "items": [{"metadata": {"resourceVersion": "3"}}]})
+        self.assertEqual(get_resource_version(text), "12")
+        self.assertIsNone(get_resource_version('{"kind": "Status"}'))
+
+    def test_validation_address(self):
+        self.assertIsNone(validation_address("/api/v1/namespaces", "5"))
+        self.assertEqual(validation_address("/api/v1/namespaces/lab-1", "5"),
+                         "/api/v1/namespaces?fieldSelector=metadata.name%3Dlab-1&resourceVersion=5"
+                         "&resourceVersionMatch=NotOlderThan")
+        self.assertEqual(validation_address("/apis/kubevirt.io/v1/namespaces/lab-1/virtualmachineinstances/vm", "5"),
+                         "/apis/kubevirt.io/v1/namespaces/lab-1/virtualmachineinstances"
+                         "?fieldSelector=metadata.name%3Dvm&resourceVersion=5&resourceVersionMatch=NotOlderThan")
+        self.assertIsNone(validation_address("/apis", "5"))
+        self.assertIsNone(validation_address("/api/v1/namespaces?labelSelector=a", "5"))
+        self.assertIsNone(validation_address("/api/v1/namespaces", None))
+
+    def test_validated_resource_version(self):
+        text = json.dumps({"metadata": {"resourceVersion": "9"}, "items": [{"metadata": {"resourceVersion": "4"}}]})
+        self.assertEqual(validated_resource_version("/api/v1/namespaces/lab-1", text), "4")
+        self.assertIsNone(validated_resource_version("/api/v1/namespaces/lab-1",
+                                                     '{"metadata": {"resourceVersion": "9"}, "items": []}'))
+        self.assertIsNone(validated_resource_version("/api/v1/namespaces/lab-1", "not json"))
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.cache = ResponseCache(ttl=2, clock=lambda: self.now)
+
+    def test_ttl(self):
+        self.cache.put("/api/v1/namespaces", "text", self.cache.generation)
+        self.assertEqual(self.cache.get("/api/v1/namespaces"), "text")
+        self.now += 2
+        self.assertIsNone(self.cache.get("/api/v1/namespaces"))
+        entry = self.cache.get_entry("/api/v1/namespaces")
+        self.assertFalse(self.cache.is_fresh(entry))
+        self.cache.revalidated("/api/v1/namespaces", entry, self.cache.generation)
+        self.assertEqual(self.cache.get("/api/v1/namespaces"), "text")
+        self.assertEqual((self.cache.hits, self.cache.revalidations, self.cache.misses), (2, 1, 1))
+        self.assertAlmostEqual(self.cache.hit_ratio, 0.75)
+
+    def test_lru_eviction_by_bytes(self):
+        size = sys.getsizeof("a" * 100) + sys.getsizeof("/a")
+        cache = ResponseCache(max_bytes=2 * size)
+        cache.put("/a", "a" * 100, 0)
+        cache.put("/b", "b" * 100, 0)
+        cache.get("/a")
+        cache.put("/c", "c" * 100, 0)
+        self.assertEqual((cache.get("/a"), cache.get("/b")), ("a" * 100, None))
+        self.assertEqual((len(cache), cache.size, cache.evictions), (2, 2 * size, 1))
+        cache.put("/d", "d" * 1000, 0)
+        self.assertIsNone(cache.get("/d"))
+
+    def test_invalidate(self):
+        addresses = ["/api/v1/namespaces", "/api/v1/namespaces/lab-1", "/api/v1/namespaces/lab-2",
+                     "/apis/kubevirt.io/v1/namespaces/lab-1/virtualmachineinstances",
+                     "/apis/kubevirt.io/v1/namespaces/lab-2/virtualmachineinstances"]
+        for address in addresses:
+            self.cache.put(address, address, self.cache.generation)
+        self.cache.invalidate("/apis/kubevirt.io/v1/namespaces/lab-2/virtualmachineinstances")
+        self.assertIsNone(self.cache.get(addresses[4]))
+        self.assertEqual(len(self.cache), 4)
+        self.cache.invalidate("/api/v1/namespaces/lab-1")
+        self.assertEqual([address for address in addresses if self.cache.get(address)], [])
+
+    def test_no_put_after_invalidation(self):
+        generation = self.cache.generation
+        self.cache.invalidate("/api/v1/namespaces")
+        self.cache.put("/api/v1/namespaces", "old", generation)
+        self.assertIsNone(self.cache.get("/api/v1/namespaces"))
+
+
+class ProxyResponseCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.server = FakeApiServer().start()
+        self.proxy = Proxy(self.server.base_uri, "token", cache=ResponseCache(ttl=2, clock=lambda: self.now))
+        self.registry = APIRegistry(self.proxy)
+        self.other = APIRegistry(Proxy(self.server.base_uri, "token"))
+        self.other.namespace.create(NAMESPACE.format(name="lab-1"))
+        self.recorder = metrics.PrometheusRecorder()
+        self.previous = metrics.set_recorder(self.recorder)
+
+    def tearDown(self) -> None:
+        metrics.set_recorder(self.previous)
+        self.server.stop()
+
+    def requests(self, function):
+        count = self.server.request_count
+        result = function()
+        return result, self.server.request_count - count
+
+    def test_hit_and_revalidation(self):
+        first, requests = self.requests(lambda: self.registry.namespace.get("lab-1"))
+        self.assertEqual(requests, 1)
+        self.assertEqual(self.requests(lambda: self.registry.namespace.get("lab-1")), (first, 0))
+        self.now += 2
+        self.assertEqual(self.requests(lambda: self.registry.namespace.get("lab-1")), (first, 1))
+        for result in ("hit", "revalidated", "miss"):
+            self.assertGreater(self.recorder.get_counter(metrics.KUBERNETES_CACHE_REQUESTS,
+                                                         {"endpoint": "/api/v1/namespaces/{name}",
+                                                          "result": result}), 0)
+
+    def test_changed_by_other_client(self):
+        self.registry.namespace.get("lab-1")
+        self.other.namespace.patch("lab-1", '{"metadata": {"labels": {"a": "b"}}}')
+        self.assertNotIn('"labels"', self.registry.namespace.get("lab-1"))
+        self.now += 2
+        obj, requests = self.requests(lambda: self.registry.namespace.get("lab-1"))
+        self.assertEqual(json.loads(obj)["metadata"]["labels"], {"a": "b"})
+        self.assertEqual(requests, 2)
+        # the changed object was cached again
+        self.assertEqual(self.requests(lambda: self.registry.namespace.get("lab-1")), (obj, 0))
+
+    def test_lists_are_not_revalidated(self):
+        namespaces, requests = self.requests(self.registry.namespace.get_list)
+        self.assertEqual(requests, 1)
+        self.assertEqual(self.requests(self.registry.namespace.get_list), (namespaces, 0))
+        # any write changes the resource version of the list, so a revalidation would fail
+        self.other.network_policy.create("lab-1", NETWORK_POLICY.format(name="policy"))
+        self.now += 2
+        namespaces, requests = self.requests(self.registry.namespace.get_list)
+        self.assertEqual(requests, 1)
+        self.assertEqual(self.requests(self.registry.namespace.get_list), (namespaces, 0))
+        self.assertEqual(self.recorder.get_counter(metrics.KUBERNETES_CACHE_REQUESTS, {
+            "endpoint": "/api/v1/namespaces", "result": "miss"}), 2)
+
+    def test_object_revalidation_ignores_other_changes(self):
+        obj = self.registry.namespace.get("lab-1")
+        self.other.namespace.create(NAMESPACE.format(name="lab-2"))
+        self.now += 2
+        self.assertEqual(self.requests(lambda: self.registry.namespace.get("lab-1")), (obj, 1))
+
+    def test_invalidated_by_own_changes(self):
+        namespaces = self.registry.namespace.get_list()
+        policies = json.loads(self.registry.network_policy.get_list("lab-1"))
+        self.registry.network_policy.create("lab-1", NETWORK_POLICY.format(name="policy"))
+        self.assertEqual(len(json.loads(self.registry.network_policy.get_list("lab-1"))["items"]),
+                         len(policies["items"]) + 1)
+        self.assertEqual(self.requests(self.registry.namespace.get_list), (namespaces, 0))
+        self.registry.namespace.delete("lab-1")
+        self.assertEqual(json.loads(self.registry.network_policy.get_list("lab-1"))["items"], [])
+        self.assertEqual(json.loads(self.registry.namespace.get_list())["items"], [])
+
+    def test_errors_are_not_cached(self):
+        _, requests = self.requests(lambda: [self.registry.namespace.get("missing") for _ in range(2)])
+        self.assertEqual(requests, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from lab_orchestrator_lib import metrics
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+from lab_orchestrator_lib.kubernetes.single_flight import SingleFlight
+from tests.kubernetes.mockups import RequestsResponseMock
+
+NAMESPACE = "kind: Namespace\napiVersion: v1\nmetadata:\n  name: {name}\n"
+
+
+class BlockingFunction:
+    def __init__(self, result="result"):
+        self.result = result
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+class SingleFlightTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.group = SingleFlight()
+
+    def run_waiting(self, function, count, key="key"):
+        """Runs count calls in threads. The first call is running before the others start."""
+        with ThreadPoolExecutor(max_workers=count) as executor:
+            first = executor.submit(self.group.do, key, function)
+            function.started.wait(5)
+            others = [executor.submit(self.group.do, key, function) for _ in range(count - 1)]
+            while self.group.calls < count:
+                time.sleep(0.001)
+            function.release.set()
+            return [future for future in [first] + others]
+
+    def test_threads(self):
+        function = BlockingFunction()
+        futures = self.run_waiting(function, 10)
+        self.assertEqual([future.result() for future in futures], [("result", False)] + [("result", True)] * 9)
+        self.assertEqual(function.calls, 1)
+        self.assertEqual((self.group.calls, self.group.shared), (10, 9))
+        self.assertAlmostEqual(self.group.coalescing_ratio, 0.9)
+        # finished calls are not cached
+        self.assertEqual(self.group.do("key", lambda: "new"), ("new", False))
+
+    def test_exception(self):
+        function = BlockingFunction(ValueError("failed"))
+        futures = self.run_waiting(function, 3)
+        for future in futures:
+            with self.assertRaises(ValueError):
+                future.result()
+        self.assertEqual(function.calls, 1)
+
+    def test_different_keys(self):
+        self.assertEqual(self.group.do("a", lambda: 1), (1, False))
+        self.assertEqual(self.group.do("b", lambda: 2), (2, False))
+        self.assertEqual(self.group.coalescing_ratio, 0.0)
+
+    def test_forget(self):
+        function = BlockingFunction()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            first = executor.submit(self.group.do, "key", function)
+            function.started.wait(5)
+            self.group.forget()
+            self.assertEqual(self.group.do("key", lambda: "after"), ("after", False))
+            function.release.set()
+            self.assertEqual(first.result(), ("result", False))
+
+    def test_asyncio(self):
+        function = BlockingFunction()
+
+        async def main():
+            tasks = [asyncio.ensure_future(self.group.do_async("key", function)) for _ in range(10)]
+            await asyncio.get_running_loop().run_in_executor(None, function.started.wait, 5)
+            function.release.set()
+            return await asyncio.gather(*tasks)
+
+        results = asyncio.run(main())
+        self.assertEqual(sorted(shared for _, shared in results), [False] + [True] * 9)
+        self.assertEqual(function.calls, 1)
+
+    def test_asyncio_cancel(self):
+        function = BlockingFunction()
+
+        async def main():
+            first = asyncio.ensure_future(self.group.do_async("key", function))
+            second = asyncio.ensure_future(self.group.do_async("key", function))
+            await asyncio.get_running_loop().run_in_executor(None, function.started.wait, 5)
+            first.cancel()
+            function.release.set()
+            return await second
+
+        self.assertEqual(asyncio.run(main()), ("result", True))
+        self.assertEqual(function.calls, 1)
+
+    def test_threads_and_asyncio(self):
+        function = BlockingFunction()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            thread = executor.submit(self.group.do, "key", function)
+            function.started.wait(5)
+
+            async def main():
+                task = asyncio.ensure_future(self.group.do_async("key", function))
+                while self.group.calls < 2:
+                    await asyncio.sleep(0.001)
+                function.release.set()
+                return await task
+
+            self.assertEqual(asyncio.run(main()), ("result", True))
+            self.assertEqual(thread.result(), ("result", False))
+        self.assertEqual(function.calls, 1)
+
+
+class ProxySingleFlightTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = FakeApiServer(latency=0.05).start()
+        self.proxy = Proxy(self.server.base_uri, "token")
+        self.registry = APIRegistry(self.proxy)
+        self.recorder = metrics.PrometheusRecorder()
+        self.previous = metrics.set_recorder(self.recorder)
+
+    def tearDown(self) -> None:
+        metrics.set_recorder(self.previous)
+        self.server.stop()
+
+    def test_get(self):
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            lists = list(executor.map(lambda _: json.loads(self.registry.namespace.get_list()), range(20)))
+        self.assertTrue(all(namespaces["kind"] == "List" for namespaces in lists))
+        self.assertLess(self.server.request_count, 20)
+        coalesced = self.recorder.get_counter(metrics.KUBERNETES_COALESCED_REQUESTS,
+                                              {"endpoint": "/api/v1/namespaces"})
+        self.assertEqual(coalesced, 20 - self.server.request_count)
+        self.assertEqual(self.proxy.single_flight.shared, coalesced)
+
+    def test_get_async(self):
+        async def main():
+            return await asyncio.gather(*[self.proxy.get_async("/api/v1/namespaces") for _ in range(20)])
+
+        results = asyncio.run(main())
+        self.assertEqual(len(set(results)), 1)
+        self.assertLess(self.server.request_count, 20)
+
+    def test_get_after_change(self):
+        release = threading.Event()
+
+        class SlowRequests:
+            """Reads the state when a request starts, but the first get request answers late."""
+            state = "before"
+            calls = 0
+
+            @classmethod
+            def get(cls, uri, headers, verify):
+                state = cls.state
+                cls.calls += 1
+                if cls.calls == 1:
+                    release.wait(5)
+                return RequestsResponseMock(state)
+
+            @classmethod
+            def post(cls, uri, headers, verify, data):
+                cls.state = "after"
+                return RequestsResponseMock("created")
+
+        proxy = Proxy("http://localhost", "token", requests_lib=SlowRequests)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            before = executor.submit(proxy.get, "/api/v1/namespaces")
+            while SlowRequests.calls == 0:
+                time.sleep(0.001)
+            proxy.post("/api/v1/namespaces", "data")
+            threading.Timer(0.2, release.set).start()
+            self.assertEqual(proxy.get("/api/v1/namespaces"), "after")
+            self.assertEqual(before.result(), "before")
+
+    def test_disabled(self):
+        proxy = Proxy(self.server.base_uri, "token", coalesce=False)
+        self.assertIsNone(proxy.single_flight)
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            list(executor.map(lambda _: proxy.get("/api/v1/namespaces"), range(5)))
+        self.assertEqual(self.server.request_count, 5)
+        self.assertEqual(asyncio.run(proxy.get_async("/api/v1/namespaces")), proxy.get("/api/v1/namespaces"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import base64
+import json
+import os
+import tempfile
+import unittest
+
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+from lab_orchestrator_lib.kubernetes.token_source import FileTokenSource, StaticTokenSource, get_token_expiry
+
+
+def make_token(exp=None, name="token") -> str:
+    payload = {"sub": name} if exp is None else {"sub": name, "exp": exp}
+    segment = base64.urlsafe_b64encode(json.dumps(payload).encode()).rstrip(b"=").decode()
+    return f"eyJhbGciOiJSUzI1NiJ9.{segment}.signature"
+
+
+class GetTokenExpiryTestCase(unittest.TestCase):
+    def test_get_token_expiry(self):
+        self.assertEqual(get_token_expiry(make_token(1234)), 1234.0)
+        self.assertIsNone(get_token_expiry(make_token()))
+        self.assertIsNone(get_token_expiry("abc"))
+        self.assertIsNone(get_token_expiry("a.b!.c"))
+        self.assertIsNone(get_token_expiry(None))
+
+
+class FileTokenSourceTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "token")
+        self.now = 1000.0
+        self.mtime = 0
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write(self, token: str, change_mtime: bool = True) -> None:
+        with open(self.path, "w") as file:
+            file.write(token + "\n")
+        if change_mtime:
+            self.mtime += 1
+        os.utime(self.path, ns=(self.mtime * 10 ** 9, self.mtime * 10 ** 9))
+
+    def source(self, check_interval=60, refresh_before=60) -> FileTokenSource:
+        return FileTokenSource(self.path, check_interval=check_interval, refresh_before=refresh_before,
+                               clock=lambda: self.now)
+
+    def test_reload_on_mtime_change(self):
+        self.write("first")
+        source = self.source()
+        self.assertEqual(source.get_token(), "first")
+        self.write("second")
+        # the file is only checked after the check interval
+        self.assertEqual(source.get_token(), "first")
+        self.now += 60
+        self.assertEqual(source.get_token(), "second")
+
+    def test_no_file_access_between_checks(self):
+        self.write("first")
+        source = self.source()
+        os.remove(self.path)
+        self.now += 59
+        self.assertEqual(source.get_token(), "first")
+        self.now += 1
+        with self.assertLogs("lab_orchestrator_lib.kubernetes.token_source", "WARNING"):
+            self.assertEqual(source.get_token(), "first")
+
+    def test_reload_before_expiry(self):
+        self.write(make_token(self.now + 100, "first"))
+        source = self.source(check_interval=3600, refresh_before=60)
+        self.write(make_token(self.now + 3600, "second"), change_mtime=False)
+        self.now += 39
+        self.assertEqual(get_token_expiry(source.get_token()), 1100.0)
+        self.now += 1
+        self.assertEqual(get_token_expiry(source.get_token()), 4600.0)
+
+    def test_refresh(self):
+        self.write("first")
+        source = self.source()
+        self.write("second")
+        self.assertEqual(source.refresh(), "second")
+        os.remove(self.path)
+        with self.assertLogs("lab_orchestrator_lib.kubernetes.token_source", "WARNING"):
+            self.assertEqual(source.refresh(), "second")
+
+    def test_missing_file(self):
+        with self.assertRaises(OSError):
+            self.source()
+
+
+class ProxyTokenTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "token")
+        with open(self.path, "w") as file:
+            file.write("first")
+        self.server = FakeApiServer(token="first").start()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+        self.directory.cleanup()
+
+    def test_static_token(self):
+        proxy = Proxy(self.server.base_uri, "first")
+        self.assertIsInstance(proxy.token_source, StaticTokenSource)
+        self.assertEqual(proxy.service_account_token, "first")
+        self.server.token = "second"
+        namespaces = json.loads(APIRegistry(proxy).namespace.get_list())
+        self.assertEqual(namespaces["code"], 401)
+
+    def test_retry_with_refreshed_token(self):
+        proxy = Proxy(self.server.base_uri, token_source=FileTokenSource(self.path, check_interval=3600))
+        registry = APIRegistry(proxy)
+        self.assertEqual(json.loads(registry.namespace.get_list())["kind"], "List")
+        # the kubelet rotates the token
+        self.server.token = "second"
+        with open(self.path, "w") as file:
+            file.write("second")
+        requests = self.server.request_count
+        self.assertEqual(json.loads(registry.namespace.get_list())["kind"], "List")
+        self.assertEqual(self.server.request_count - requests, 2)
+        self.assertEqual(proxy.service_account_token, "second")
+        # the refreshed token is used for the next requests
+        requests = self.server.request_count
+        registry.namespace.get_list()
+        self.assertEqual(self.server.request_count - requests, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
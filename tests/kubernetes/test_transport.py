@@ -0,0 +1,204 @@
+import json
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from lab_orchestrator_lib.custom_exceptions import KubernetesApiError
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+from lab_orchestrator_lib.kubernetes.token_source import TokenSource
+from lab_orchestrator_lib.kubernetes.transport import Http2Transport, SessionTransport
+from tests.kubernetes.mockups import RequestsMock
+
+try:
+    import httpx
+    import h2
+except ImportError:  # pragma: no cover - httpx is optional
+    httpx = None
+
+NAMESPACE = "kind: Namespace\napiVersion: v1\nmetadata:\n  name: {name}\n"
+
+
+class RotatedTokenSource(TokenSource):
+    token = "old"
+
+    def get_token(self):
+        return self.token
+
+    def refresh(self):
+        self.token = "token"
+        return self.token
+
+
+class TransportTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = FakeApiServer(token="token", gzip_min_size=0).start()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def check_transport(self, transport):
+        registry = APIRegistry(Proxy(self.server.base_uri, "token", transport=transport))
+        self.assertIs(registry.proxy.transport, transport)
+        for i in range(10):
+            registry.namespace.create(NAMESPACE.format(name=f"lab-{i}"))
+        self.assertEqual(json.loads(registry.namespace.get("lab-1"))["metadata"]["name"], "lab-1")
+        self.assertEqual(len(list(registry.namespace.iter_list())), 10)
+        registry.namespace.patch("lab-1", '{"metadata": {"labels": {"a": "b"}}}')
+        self.assertEqual(json.loads(registry.namespace.delete("lab-1"))["metadata"]["labels"], {"a": "b"})
+        self.assertEqual(json.loads(registry.namespace.get("lab-1"))["code"], 404)
+
+    def test_requests_module(self):
+        registry = APIRegistry(Proxy(self.server.base_uri, "token"))
+        for _ in range(5):
+            registry.namespace.get_list()
+        self.assertEqual(self.server.connection_count, 5)
+
+    def test_session_transport(self):
+        transport = SessionTransport()
+        self.check_transport(transport)
+        self.assertEqual(self.server.connection_count, 1)
+        self.assertEqual(transport.connections, 1)
+        transport.close()
+
+    def test_session_transport_concurrent(self):
+        transport = SessionTransport(pool_maxsize=4)
+        registry = APIRegistry(Proxy(self.server.base_uri, "token", transport=transport, coalesce=False))
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(lambda _: registry.namespace.get_list(), range(40)))
+        self.assertLessEqual(self.server.connection_count, 4)
+        self.assertEqual(transport.connections, self.server.connection_count)
+        transport.close()
+
+    def test_token_retry_with_streamed_response(self):
+        transport = SessionTransport(pool_maxsize=1)
+        proxy = Proxy(self.server.base_uri, token_source=RotatedTokenSource(), transport=transport)
+        self.assertEqual(list(proxy.iter_list("/api/v1/namespaces")), [])
+        # the rejected response was closed, so its connection was used for the retry
+        self.assertEqual(self.server.connection_count, 1)
+        transport.close()
+
+    def test_iter_list_error(self):
+        proxy = Proxy(self.server.base_uri, "wrong", transport=SessionTransport())
+        with self.assertRaises(KubernetesApiError) as context:
+            list(proxy.iter_list("/api/v1/namespaces"))
+        self.assertEqual(context.exception.status_code, 401)
+        proxy.transport.close()
+
+    def test_requests_lib_and_transport(self):
+        with self.assertRaises(ValueError):
+            Proxy(self.server.base_uri, "token", requests_lib=RequestsMock, transport=SessionTransport())
+
+    @unittest.skipIf(httpx is None, "httpx and h2 are not installed.")
+    def test_http2_transport(self):
+        transport = Http2Transport()
+        self.check_transport(transport)
+        self.assertEqual(transport.connections, 1)
+        transport.close()
+
+    @unittest.skipIf(httpx is None, "httpx and h2 are not installed.")
+    def test_http2_transport_response(self):
+        registry = APIRegistry(Proxy(self.server.base_uri, "token"))
+        for i in range(3):
+            registry.namespace.create(NAMESPACE.format(name=f"lab-{i}"))
+        transport = Http2Transport()
+        uri = self.server.base_uri + "/api/v1/namespaces"
+        headers = {"Authorization": "Bearer token", "Accept-Encoding": "gzip"}
+        response = transport.get(uri, headers, True)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(response.text)["items"]), 3)
+        # the body of a streamed response is decompressed while it's iterated
+        response = transport.get(uri, headers, True, stream=True)
+        body = b"".join(response.iter_content(16))
+        response.close()
+        self.assertEqual(len(json.loads(body)["items"]), 3)
+        response = transport.get(uri, headers, True, stream=True)
+        self.assertEqual(json.loads(response.text)["kind"], "NamespaceList")
+        response.close()
+        transport.close()
+
+    @unittest.skipIf(httpx is None, "httpx and h2 are not installed.")
+    def test_http2_transport_token_retry_with_streamed_response(self):
+        transport = Http2Transport(max_connections=1)
+        proxy = Proxy(self.server.base_uri, token_source=RotatedTokenSource(), transport=transport)
+        proxy.post("/api/v1/namespaces", NAMESPACE.format(name="lab-1"))
+        proxy.token_source.token = "old"
+        self.assertEqual([namespace["metadata"]["name"] for namespace in proxy.iter_list("/api/v1/namespaces")],
+                         ["lab-1"])
+        # the rejected response was read and closed, so its connection was used for the retry
+        self.assertEqual(self.server.connection_count, 1)
+        self.assertEqual(transport.connections, 1)
+        transport.close()
+
+    @unittest.skipIf(httpx is not None, "httpx and h2 are installed.")
+    def test_http2_transport_not_installed(self):
+        with self.assertRaises(ImportError):
+            Http2Transport()
+        with self.assertRaises(ImportError):
+            FakeApiServer(http2=True)
+
+
+@unittest.skipIf(httpx is None, "httpx and h2 are not installed.")
+class Http2PriorKnowledgeTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = FakeApiServer(token="token", gzip_min_size=0, http2=True).start()
+        self.transport = Http2Transport(prior_knowledge=True)
+        self.registry = APIRegistry(Proxy(self.server.base_uri, "token", transport=self.transport, coalesce=False))
+
+    def tearDown(self) -> None:
+        self.transport.close()
+        self.server.stop()
+
+    def test_concurrent_requests(self):
+        self.registry.namespace.create(NAMESPACE.format(name="lab-1"))
+        self.server.latency = 0.1
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            namespaces = list(executor.map(lambda _: json.loads(self.registry.namespace.get("lab-1")), range(10)))
+        # the requests are answered concurrently, one after another they need one second
+        self.assertLess(time.perf_counter() - start, 0.6)
+        self.assertEqual({namespace["metadata"]["name"] for namespace in namespaces}, {"lab-1"})
+        self.assertEqual(self.transport.connections, 1)
+        self.assertEqual(self.server.connection_count, 1)
+        response = self.transport.get(self.server.base_uri + "/api/v1/namespaces/lab-1",
+                                      {"Authorization": "Bearer token"}, True)
+        self.assertEqual(response.http_version, "HTTP/2")
+        self.assertEqual(json.loads(response.text)["metadata"]["name"], "lab-1")
+
+    def test_transport(self):
+        TransportTestCase.check_transport(self, self.transport)
+        self.assertEqual(self.server.connection_count, 1)
+        # large bodies are sent in multiple frames and wait for the flow control window of the client
+        self.server.gzip_min_size = None
+        for i in range(2000):
+            self.server.objects.setdefault(("v1", "namespaces", None), {})[f"lab-{i}"] = \
+                {"kind": "Namespace", "apiVersion": "v1", "metadata": {"name": f"lab-{i}", "labels": {"a": "b" * 100}}}
+        sent = self.server.bytes_sent
+        self.assertEqual(len(json.loads(self.registry.namespace.get_list())["items"]), 2000)
+        self.assertGreater(self.server.bytes_sent - sent, 4 * 65535)
+        self.assertEqual(len(list(self.registry.namespace.iter_list())), 2000)
+
+    def test_errors(self):
+        self.assertEqual(json.loads(Proxy(self.server.base_uri, "wrong", transport=self.transport).get(
+            "/api/v1/namespaces/lab-1"))["code"], 401)
+        self.server.fail_next(500)
+        self.assertEqual(json.loads(self.registry.namespace.get("lab-1"))["code"], 500)
+
+    def test_watch(self):
+        created = json.loads(self.registry.namespace.create(NAMESPACE.format(name="lab-1")))
+        response = self.transport.get(self.server.base_uri + "/api/v1/namespaces?watch=true&timeoutSeconds=0"
+                                      "&resourceVersion=0", {"Authorization": "Bearer token"}, True, stream=True)
+        events = [json.loads(line) for line in b"".join(response.iter_content()).splitlines()]
+        response.close()
+        self.assertEqual([(event["type"], event["object"]["metadata"]["resourceVersion"]) for event in events],
+                         [("ADDED", created["metadata"]["resourceVersion"])])
+
+    def test_http1_clients(self):
+        registry = APIRegistry(Proxy(self.server.base_uri, "token"))
+        registry.namespace.create(NAMESPACE.format(name="lab-1"))
+        self.assertEqual(json.loads(self.registry.namespace.get("lab-1"))["metadata"]["name"], "lab-1")
+
+
+if __name__ == '__main__':
+    unittest.main()
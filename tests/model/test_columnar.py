@@ -0,0 +1,105 @@
+import unittest
+from array import array
+
+from lab_orchestrator_lib.controller.controller_collection import create_controller_collection
+from lab_orchestrator_lib.database.memory_adapter import MemoryUserAdapter, MemoryDockerImageAdapter, \
+    MemoryLabDockerImageAdapter, MemoryLabAdapter, MemoryLabInstanceAdapter
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy
+from lab_orchestrator_lib.model.columnar import LabInstanceColumns
+from lab_orchestrator_lib.model.model import LabInstance, LabDockerImage
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class LabInstanceColumnsTestCase(unittest.TestCase):
+    use_numpy = False
+
+    def setUp(self) -> None:
+        self.lab_instances = [LabInstance(1, 1, 1), LabInstance(2, 1, 2), LabInstance(3, 2, 1),
+                              LabInstance(4, 3, 3, cluster="east")]
+        self.columns = LabInstanceColumns.from_lab_instances(self.lab_instances, use_numpy=self.use_numpy)
+
+    def assertLabInstance(self, lab_instance, expected):
+        self.assertEqual([getattr(lab_instance, name) for name in LabInstanceColumns.COLUMNS],
+                         [getattr(expected, name) for name in LabInstanceColumns.COLUMNS])
+
+    def assertLabInstances(self, lab_instances, primary_keys):
+        self.assertEqual([lab_instance.primary_key for lab_instance in lab_instances], primary_keys)
+
+    def test_sequence(self):
+        self.assertEqual(len(self.columns), 4)
+        self.assertLabInstance(self.columns[2], self.lab_instances[2])
+        self.assertEqual(self.columns[-1].cluster, "east")
+        self.assertIs(type(self.columns[0].primary_key), int)
+        for lab_instance, expected in zip(self.columns.to_lab_instances(), self.lab_instances):
+            self.assertLabInstance(lab_instance, expected)
+        self.assertLabInstances(self.columns[1:3], [2, 3])
+        self.assertIsInstance(self.columns[1:3], LabInstanceColumns)
+        self.assertIs(LabInstanceColumns.from_lab_instances(self.columns), self.columns)
+
+    def test_compact_columns(self):
+        if self.use_numpy:
+            self.assertEqual(self.columns.lab_id.dtype, numpy.int64)
+        else:
+            self.assertIsInstance(self.columns.lab_id, array)
+
+    def test_filter(self):
+        self.assertLabInstances(self.columns.filter(lab_id=1), [1, 2])
+        self.assertLabInstances(self.columns.filter(lab_id=1, user_id=1), [1])
+        self.assertLabInstances(self.columns.filter(user_id={1, 3}), [1, 3, 4])
+        self.assertLabInstances(self.columns.filter(cluster="east"), [4])
+        self.assertLabInstances(self.columns.filter(lab_id=5), [])
+        self.assertIs(self.columns.filter(), self.columns)
+        with self.assertRaises(AttributeError):
+            self.columns.filter(name="x")
+
+    def test_count_by(self):
+        self.assertEqual(self.columns.count_by("lab_id"), {1: 2, 2: 1, 3: 1})
+        self.assertEqual(self.columns.count_by("cluster"), {None: 3, "east": 1})
+
+    def test_join(self):
+        images = [LabDockerImage(10, 1, 5, "a"), LabDockerImage(11, 1, 6, "b"), LabDockerImage(12, 2, 5, "c")]
+        joined = self.columns.join(images)
+        rows = sorted(zip(list(joined["primary_key"]), list(joined["docker_image_name"])))
+        self.assertEqual(rows, [(1, "a"), (1, "b"), (2, "a"), (2, "b"), (3, "c")])
+        self.assertEqual(sorted(int(value) for value in joined["lab_docker_image_id"]), [10, 10, 11, 11, 12])
+
+    def test_from_rows(self):
+        columns = LabInstanceColumns.from_rows([(1, 2, 3), (4, 5, 6)], use_numpy=self.use_numpy)
+        self.assertLabInstance(columns[1], LabInstance(4, 5, 6))
+        self.assertEqual(len(LabInstanceColumns.from_rows([], use_numpy=self.use_numpy)), 0)
+
+    def test_different_lengths(self):
+        with self.assertRaises(ValueError):
+            LabInstanceColumns([1, 2], [1], [1, 2], use_numpy=self.use_numpy)
+
+    def test_string_ids(self):
+        columns = LabInstanceColumns(["a", "b"], ["x", "y"], ["u", "u"], use_numpy=self.use_numpy)
+        self.assertLabInstances(columns.filter(lab_id="y"), ["b"])
+        self.assertEqual(columns.count_by("user_id"), {"u": 2})
+
+    def test_controller(self):
+        collection = create_controller_collection(
+            registry=APIRegistry(Proxy("http://localhost", "token")),
+            user_adapter=MemoryUserAdapter(),
+            docker_image_adapter=MemoryDockerImageAdapter(),
+            lab_docker_image_adapter=MemoryLabDockerImageAdapter(),
+            lab_adapter=MemoryLabAdapter(),
+            lab_instance_adapter=MemoryLabInstanceAdapter(self.lab_instances, columnar=True),
+            secret_key="secret",
+        )
+        self.assertIsInstance(collection.lab_instance_ctrl.get_all(), LabInstanceColumns)
+        self.assertLabInstances(collection.lab_instance_ctrl.get_columns(), [1, 2, 3, 4])
+        self.assertLabInstances(collection.lab_instance_ctrl.get_columns(user_id=1), [1, 3])
+
+
+@unittest.skipIf(numpy is None, "NumPy is not installed.")
+class NumpyLabInstanceColumnsTestCase(LabInstanceColumnsTestCase):
+    use_numpy = True
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,8 @@ import unittest
 
 from lab_orchestrator_lib.custom_exceptions import ValidationError
 
-from lab_orchestrator_lib.model.model import check_dns_name, User, DockerImage, Model, LabDockerImage, Lab, LabInstance
+from lab_orchestrator_lib.model.model import check_dns_name, check_dns_subdomain_name, validate_many, User, DockerImage, Model, LabDockerImage, Lab, LabInstance, \
+    LabInstanceKubernetes
 
 dns_tests = [
     ("abc", True), ("a/b", False), ("aäb", False),
@@ -10,7 +11,7 @@ dns_tests = [
     ("def.", False), (".def", False), ("d.ef", False),
     ("Abv", False), ("aBc", False), ("abC", False),
     ("8ab", False), ("ab8", True), ("a8b", True),
-    ("", False), ("a", True), ("a" * 64, False), ("a" * 63, True)
+    ("", False), ("a", True), ("a" * 64, False), ("a" * 63, True), ("abc\n", False)
 ]
 
 
@@ -27,15 +28,22 @@ dns_subdomain_tests = [
     ("def.", False), (".def", False), ("d.ef", True),
     ("Abv", False), ("aBc", False), ("abC", False),
     ("8ab", True), ("ab8", True), ("a8b", True),
-    ("", False), ("a", True), ("a" * 254, False), ("a" * 253, True)
+    ("", False), ("a", True), ("a" * 254, False), ("a" * 253, True), ("abc\n", False)
 ]
 
 
 class CheckDnsSubdomainTestCase(unittest.TestCase):
     def test_dns(self):
-        for name, expected in dns_tests:
-            print(name, expected)
-            self.assertEqual(check_dns_name(name), expected)
+        for name, expected in dns_subdomain_tests:
+            self.assertEqual(check_dns_subdomain_name(name), expected)
+
+
+class ValidateManyTestCase(unittest.TestCase):
+    def test_validate_many(self):
+        names = [name for name, _ in dns_tests] * 2
+        self.assertEqual(validate_many(names), [expected for _, expected in dns_tests] * 2)
+        names = [name for name, _ in dns_subdomain_tests]
+        self.assertEqual(validate_many(iter(names), subdomain=True), [expected for _, expected in dns_subdomain_tests])
 
 
 class ModelTestCase(unittest.TestCase):
@@ -119,6 +127,21 @@ class LabDockerImageTestCase(unittest.TestCase):
                 with self.assertRaises(ValidationError):
                     LabDockerImage(1, 1, 1, name)
 
+    def test_sizing(self):
+        tests = [
+            ({}, True), ({"cores": 1, "memory": "512Mi"}, True), ({"cpu_limit": "500m", "memory_limit": "1G"}, True),
+            ({"memory": "1Gi", "memory_limit": "2Gi"}, True), ({"cores": 0}, False), ({"cores": "2"}, False),
+            ({"memory": "lots"}, False), ({"memory": "2Gi", "memory_limit": "1Gi"}, False),
+            ({"cpu_limit": "0"}, False), ({"cpu_limit": "1X"}, False)
+        ]
+        for sizing, expected in tests:
+            print(sizing, expected)
+            if expected:
+                self.assertIsInstance(LabDockerImage(1, 1, 1, "vm", **sizing), LabDockerImage)
+            else:
+                with self.assertRaises(ValidationError):
+                    LabDockerImage(1, 1, 1, "vm", **sizing)
+
 
 class LabTestCase(unittest.TestCase):
     def test_name(self):
@@ -162,6 +185,21 @@ class LabTestCase(unittest.TestCase):
                 with self.assertRaises(ValidationError):
                     Lab(1, name, "a", "desc")
 
+    def test_expiry(self):
+        tests = [
+            (None, True), (1, True), (3600, True), (0, False), (-5, False)
+        ]
+        for value, expected in tests:
+            print(value, expected)
+            if expected:
+                self.assertEqual(Lab(1, "a", "a", "desc", ttl=value).ttl, value)
+                self.assertEqual(Lab(1, "a", "a", "desc", idle_timeout=value).idle_timeout, value)
+            else:
+                with self.assertRaises(ValidationError):
+                    Lab(1, "a", "a", "desc", ttl=value)
+                with self.assertRaises(ValidationError):
+                    Lab(1, "a", "a", "desc", idle_timeout=value)
+
 
 class LabInstanceTestCase(unittest.TestCase):
     def test_pk(self):
@@ -181,3 +219,30 @@ class LabInstanceTestCase(unittest.TestCase):
                 with self.assertRaises(ValidationError):
                     LabInstance(name, 1, 1)
 
+
+class FromRowTestCase(unittest.TestCase):
+    def test_from_row(self):
+        cases = [
+            (User, (1,)),
+            (DockerImage, (1, "ubuntu", "desc", "ubuntu:latest")),
+            (LabDockerImage, (1, 2, 3, "vm", 2, "1Gi", "2", "2Gi")),
+            (Lab, (1, "lab", "lab", "desc", 3600, 600)),
+            (LabInstance, (1, 2, 3, 1000.0, "east")),
+            (LabInstanceKubernetes, (1, 2, 3, "token", ["vm"], "east")),
+        ]
+        for cls, args in cases:
+            validated = cls(*args)
+            trusted = cls.from_row(*args)
+            self.assertIsInstance(trusted, cls)
+            self.assertFalse(hasattr(trusted, "__dict__"))
+            for slot in ["primary_key"] + list(cls.__slots__):
+                self.assertEqual(getattr(trusted, slot), getattr(validated, slot))
+
+    def test_from_row_defaults(self):
+        lab_instance = LabInstance.from_row(1, 2, 3)
+        self.assertIsNone(lab_instance.created_at)
+        self.assertIsNone(lab_instance.cluster)
+
+    def test_from_row_skips_validation(self):
+        lab = Lab.from_row(1, "", "Invalid Prefix", "desc")
+        self.assertEqual(lab.namespace_prefix, "Invalid Prefix")
@@ -0,0 +1,73 @@
+import unittest
+
+from lab_orchestrator_lib.custom_exceptions import ValidationError
+from lab_orchestrator_lib.model.model import User, DockerImage, LabDockerImage, Lab, LabInstance, \
+    LabInstanceKubernetes
+from lab_orchestrator_lib.model.serialization import to_rows, from_rows, encode_json, decode_json, \
+    encode_msgpack, decode_msgpack
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+OBJECTS = [
+    User(1),
+    DockerImage(1, "ubuntu", "desc", "ubuntu:latest"),
+    LabDockerImage(1, 2, 3, "vm", cores=2, memory="1Gi"),
+    Lab(1, "lab", "lab", "desc", ttl=60),
+    LabInstance(1, 2, 3, created_at=1.5, cluster="east", namespace_name="lab-3-1"),
+    LabInstanceKubernetes(1, 2, 3, "token", ["vm1", "vm2"]),
+]
+
+
+class ModelSerializationTestCase(unittest.TestCase):
+    def test_to_dict(self):
+        self.assertEqual(User(1).to_dict(), {"primary_key": 1})
+        self.assertEqual(LabInstance(1, 2, 3).to_dict(),
+                         {"primary_key": 1, "lab_id": 2, "user_id": 3, "created_at": None, "cluster": None,
+                          "namespace_name": None})
+        self.assertEqual(User(1).to_tuple(), (1,))
+
+    def test_round_trip(self):
+        for obj in OBJECTS:
+            with self.subTest(model=type(obj).__name__):
+                self.assertEqual(type(obj).from_dict(obj.to_dict()).to_dict(), obj.to_dict())
+                self.assertEqual(type(obj).from_row(*obj.to_tuple()).to_tuple(), obj.to_tuple())
+
+    def test_from_dict(self):
+        lab = Lab.from_dict({"primary_key": 1, "name": "lab", "namespace_prefix": "lab", "description": "desc"})
+        self.assertIsNone(lab.ttl)
+        with self.assertRaises(TypeError):
+            Lab.from_dict({"primary_key": 1})
+        with self.assertRaises(ValidationError):
+            Lab.from_dict({"primary_key": 1, "name": "lab", "namespace_prefix": "Lab", "description": "desc"},
+                          validate=True)
+
+    def test_json(self):
+        for obj in OBJECTS:
+            model = type(obj)
+            with self.subTest(model=model.__name__):
+                decoded = decode_json(model, encode_json(model, [obj, obj]))
+                self.assertEqual([o.to_dict() for o in decoded], [obj.to_dict(), obj.to_dict()])
+
+    def test_wrong_fields(self):
+        with self.assertRaises(ValueError):
+            from_rows(User, to_rows(LabInstance, [LabInstance(1, 2, 3)]))
+
+    @unittest.skipIf(msgpack is None, "msgpack is not installed.")
+    def test_msgpack(self):
+        for obj in OBJECTS:
+            model = type(obj)
+            with self.subTest(model=model.__name__):
+                decoded = decode_msgpack(model, encode_msgpack(model, [obj]))
+                self.assertEqual(decoded[0].to_dict(), obj.to_dict())
+
+    @unittest.skipIf(msgpack is not None, "msgpack is installed.")
+    def test_msgpack_missing(self):
+        with self.assertRaises(ImportError):
+            encode_msgpack(User, [User(1)])
+
+
+if __name__ == '__main__':
+    unittest.main()
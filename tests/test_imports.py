@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+LAZY_MODULES = ("requests", "yaml", "lab_orchestrator_lib_auth", "jwt", "numpy", "http.server", "httpx")
+
+
+def loaded_modules(code: str) -> list:
+    """Runs code in a new interpreter and gives the lazy modules that were imported."""
+    script = f"import json, sys\n{code}\nprint(json.dumps([name for name in {LAZY_MODULES!r} if name in sys.modules]))"
+    env = dict(os.environ, PYTHONPATH=SRC)
+    output = subprocess.run([sys.executable, "-c", script], check=True, stdout=subprocess.PIPE, env=env).stdout
+    return json.loads(output)
+
+
+class LazyImportTestCase(unittest.TestCase):
+    def test_import_controllers(self):
+        self.assertEqual(loaded_modules("import lab_orchestrator_lib.controller.controller_collection"), [])
+
+    def test_import_kubernetes_config(self):
+        self.assertEqual(loaded_modules("import lab_orchestrator_lib.kubernetes.config"), [])
+
+    def test_imported_on_use(self):
+        code = ("from lab_orchestrator_lib.kubernetes.api import Proxy\n"
+                "from lab_orchestrator_lib.template_engine import TemplateEngine\n"
+                "Proxy('http://localhost', 'token')\n"
+                "TemplateEngine().load('a: 1', {})")
+        self.assertEqual(loaded_modules(code), ["requests", "yaml"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import json
+import logging
+import queue
+import threading
+import unittest
+
+from lab_orchestrator_lib.log import StructuredFormatter, NonBlockingQueueHandler, QueueLogging
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.records.append(record)
+        self.threads.add(threading.get_ident())
+
+
+class StructuredFormatterTestCase(unittest.TestCase):
+    def test_format(self):
+        record = logging.LogRecord("lab_orchestrator_lib.controller", logging.INFO, __file__, 1, "Started %s.",
+                                   (3,), None)
+        record.lab_instance_id = 3
+        entry = json.loads(StructuredFormatter().format(record))
+        self.assertEqual(entry["message"], "Started 3.")
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["logger"], "lab_orchestrator_lib.controller")
+        self.assertEqual(entry["lab_instance_id"], 3)
+        self.assertNotIn("args", entry)
+
+
+class QueueLoggingTestCase(unittest.TestCase):
+    def test_queue_logging(self):
+        handler = ListHandler()
+        logger = logging.getLogger("lab_orchestrator_lib.test")
+        with QueueLogging(handler, level=logging.DEBUG) as queue_logging:
+            logger.debug("Created %s.", "lab-1", extra={"namespace": "lab-1"})
+        self.assertEqual(len(handler.records), 1)
+        self.assertEqual(handler.records[0].getMessage(), "Created lab-1.")
+        self.assertEqual(handler.records[0].namespace, "lab-1")
+        self.assertNotIn(threading.get_ident(), handler.threads)
+        self.assertNotIn(queue_logging.queue_handler, logging.getLogger("lab_orchestrator_lib").handlers)
+        self.assertTrue(logging.getLogger("lab_orchestrator_lib").propagate)
+        logging.getLogger("lab_orchestrator_lib").setLevel(logging.NOTSET)
+
+    def test_drop(self):
+        handler = NonBlockingQueueHandler(queue.Queue(1))
+        record = logging.LogRecord("test", logging.INFO, __file__, 1, "message", None, None)
+        handler.handle(record)
+        handler.handle(record)
+        self.assertEqual(handler.dropped, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
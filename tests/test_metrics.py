@@ -0,0 +1,121 @@
+import unittest
+import urllib.request
+
+from lab_orchestrator_lib import metrics
+from lab_orchestrator_lib.controller.controller_collection import create_controller_collection
+from lab_orchestrator_lib.database.memory_adapter import MemoryUserAdapter, MemoryDockerImageAdapter, \
+    MemoryLabDockerImageAdapter, MemoryLabAdapter, MemoryLabInstanceAdapter
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy, _endpoint_label
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+from lab_orchestrator_lib.metrics import PrometheusRecorder, NoopRecorder, set_recorder, get_recorder
+from lab_orchestrator_lib.model.model import User, DockerImage, LabDockerImage, Lab
+
+
+class PrometheusRecorderTestCase(unittest.TestCase):
+    def test_counter(self):
+        recorder = PrometheusRecorder()
+        recorder.inc("requests", {"method": "GET"})
+        recorder.inc("requests", {"method": "GET"}, 2)
+        self.assertEqual(recorder.get_counter("requests", {"method": "GET"}), 3)
+        self.assertEqual(recorder.get_counter("requests", {"method": "POST"}), 0)
+
+    def test_histogram(self):
+        recorder = PrometheusRecorder(buckets=[0.1, 1])
+        recorder.observe("duration", 0.05, {"step": "a"})
+        recorder.observe("duration", 0.5, {"step": "a"})
+        with recorder.time("duration", {"step": "a"}):
+            pass
+        self.assertEqual(recorder.get_histogram_count("duration", {"step": "a"}), 3)
+        text = recorder.render()
+        self.assertIn("# TYPE duration histogram", text)
+        self.assertIn('duration_bucket{step="a",le="0.1"} 2', text)
+        self.assertIn('duration_bucket{step="a",le="1.0"} 3', text)
+        self.assertIn('duration_bucket{step="a",le="+Inf"} 3', text)
+        self.assertIn('duration_count{step="a"} 3', text)
+
+    def test_render(self):
+        recorder = PrometheusRecorder()
+        recorder.inc(metrics.KUBERNETES_REQUESTS, {"endpoint": 'a"b'})
+        text = recorder.render()
+        self.assertIn(f"# HELP {metrics.KUBERNETES_REQUESTS} ", text)
+        self.assertIn(f"# TYPE {metrics.KUBERNETES_REQUESTS} counter", text)
+        self.assertIn(f'{metrics.KUBERNETES_REQUESTS}{{endpoint="a\\"b"}} 1.0', text)
+
+    def test_serve(self):
+        recorder = PrometheusRecorder()
+        recorder.inc("requests")
+        server = recorder.serve()
+        try:
+            host, port = server.server_address
+            with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+                self.assertIn("requests 1.0", response.read().decode())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class RecorderTestCase(unittest.TestCase):
+    def test_default(self):
+        self.assertIsInstance(get_recorder(), NoopRecorder)
+        self.assertFalse(get_recorder().enabled)
+
+    def test_set_recorder(self):
+        recorder = PrometheusRecorder()
+        previous = set_recorder(recorder)
+        try:
+            self.assertIs(get_recorder(), recorder)
+        finally:
+            set_recorder(previous)
+        set_recorder(None)
+        self.assertIsInstance(get_recorder(), NoopRecorder)
+
+    def test_endpoint_label(self):
+        self.assertEqual(_endpoint_label("/api/v1/namespaces"), "/api/v1/namespaces")
+        self.assertEqual(_endpoint_label("/api/v1/namespaces/lab-1-2"), "/api/v1/namespaces/{name}")
+        self.assertEqual(_endpoint_label("/apis/kubevirt.io/v1alpha3/namespaces/lab-1/virtualmachineinstances/"),
+                         "/apis/kubevirt.io/v1alpha3/namespaces/{namespace}/virtualmachineinstances")
+        self.assertEqual(_endpoint_label("/apis/kubevirt.io/v1alpha3/namespaces/lab-1/virtualmachineinstances/vm"),
+                         "/apis/kubevirt.io/v1alpha3/namespaces/{namespace}/virtualmachineinstances/{name}")
+
+
+class InstrumentationTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.recorder = PrometheusRecorder()
+        self.previous = set_recorder(self.recorder)
+        self.server = FakeApiServer().start()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+        set_recorder(self.previous)
+
+    def test_lab_start(self):
+        collection = create_controller_collection(
+            registry=APIRegistry(Proxy(self.server.base_uri, "token")),
+            user_adapter=MemoryUserAdapter([User(1)]),
+            docker_image_adapter=MemoryDockerImageAdapter([DockerImage(1, "ubuntu", "desc", "ubuntu")]),
+            lab_docker_image_adapter=MemoryLabDockerImageAdapter([LabDockerImage(1, 1, 1, "a"),
+                                                                  LabDockerImage(2, 1, 1, "b")]),
+            lab_adapter=MemoryLabAdapter([Lab(1, "lab", "lab", "desc")]),
+            lab_instance_adapter=MemoryLabInstanceAdapter(),
+            secret_key="secret",
+        )
+        collection.lab_instance_ctrl.create(1, 1)
+        self.assertEqual(self.recorder.get_counter(metrics.KUBERNETES_REQUESTS, {
+            "method": "POST", "endpoint": "/api/v1/namespaces", "status": "201"}), 1)
+        self.assertEqual(self.recorder.get_histogram_count(metrics.KUBERNETES_REQUEST_DURATION, {
+            "method": "POST",
+            "endpoint": "/apis/kubevirt.io/v1alpha3/namespaces/{namespace}/virtualmachineinstances"}), 2)
+        self.assertEqual(self.recorder.get_histogram_count(metrics.TEMPLATE_RENDER_DURATION, {
+            "template": "vmi_template.yaml", "operation": "load"}), 2)
+        self.assertEqual(self.recorder.get_histogram_count(metrics.ADAPTER_CALL_DURATION, {
+            "adapter": "MemoryLabInstanceAdapter", "method": "create"}), 1)
+        self.assertEqual(self.recorder.get_histogram_count(metrics.ADAPTER_CALL_DURATION, {
+            "adapter": "MemoryUserAdapter", "method": "get"}), 1)
+        for step, count in [("lab_instance", 1), ("namespace", 1), ("network_policy", 1), ("vmi", 2), ("token", 1)]:
+            self.assertEqual(self.recorder.get_histogram_count(metrics.LAB_START_STEP_DURATION, {"step": step}),
+                             count)
+        self.assertEqual(self.recorder.get_histogram_count(metrics.LAB_START_DURATION), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from lab_orchestrator_lib.quantity import parse_memory_quantity, parse_cpu_quantity
+
+
+class QuantityTestCase(unittest.TestCase):
+    def test_memory(self):
+        tests = [
+            ("3G", 3 * 10 ** 9), ("512Mi", 512 * 2 ** 20), ("1.5Gi", int(1.5 * 2 ** 30)), ("100", 100),
+            (1024, 1024), ("1k", 1000)
+        ]
+        for quantity, expected in tests:
+            self.assertEqual(parse_memory_quantity(quantity), expected)
+
+    def test_memory_invalid(self):
+        for quantity in ["", "G", "3X", "-1G", "3 G", "1m", -5, None, True]:
+            with self.assertRaises(ValueError):
+                parse_memory_quantity(quantity)
+
+    def test_cpu(self):
+        tests = [("2", 2), ("500m", 0.5), (3, 3), ("0.25", 0.25)]
+        for quantity, expected in tests:
+            self.assertAlmostEqual(parse_cpu_quantity(quantity), expected)
+
+    def test_cpu_invalid(self):
+        for quantity in ["", "m", "2G", "-1"]:
+            with self.assertRaises(ValueError):
+                parse_cpu_quantity(quantity)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,10 @@
 import unittest
 import pathlib
+from concurrent.futures import ThreadPoolExecutor
+
 import yaml as yaml_lib
 
-from lab_orchestrator_lib.template_engine import TemplateEngine
+from lab_orchestrator_lib.template_engine import TemplateEngine, _VariableLoader
 
 CURRENT_DIR = pathlib.Path(__file__).parent.resolve()
 
@@ -69,6 +71,21 @@ class TemplateEngineTestCase(unittest.TestCase):
         expected = "apiVersion: v1\nkind: Namespace\nmetadata:\n  name: lab-1\n"
         self.assertEqual(yaml, expected)
 
+    def test_load_doesnt_add_resolvers(self):
+        engine = TemplateEngine()
+        engine.load("hallo: ${drei}", {"drei": 3})
+        resolvers = sum(len(value) for value in _VariableLoader.yaml_implicit_resolvers.values())
+        for i in range(10):
+            engine.load("hallo: ${drei}", {"drei": i})
+        self.assertEqual(sum(len(value) for value in _VariableLoader.yaml_implicit_resolvers.values()), resolvers)
+
+    def test_load_threads(self):
+        engine = TemplateEngine()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda i: engine.load("- ${eins}\n- ${eins}\n- ${eins}", {"eins": i}),
+                                         range(200)))
+        self.assertEqual(results, [[i, i, i] for i in range(200)])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,122 @@
+import time
+import unittest
+
+from lab_orchestrator_lib_auth.auth import LabInstanceTokenParams, verify_auth_token, decode_auth_token
+
+from lab_orchestrator_lib.controller.controller_collection import create_controller_collection
+from lab_orchestrator_lib.database.memory_adapter import MemoryUserAdapter, MemoryDockerImageAdapter, \
+    MemoryLabDockerImageAdapter, MemoryLabAdapter, MemoryLabInstanceAdapter
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+from lab_orchestrator_lib.model.model import User, DockerImage, LabDockerImage, Lab
+from lab_orchestrator_lib.token_service import TokenService
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def params(lab_instance_id=1, allowed_vmi_names=None):
+    return LabInstanceTokenParams(2, lab_instance_id, f"lab-3-{lab_instance_id}", allowed_vmi_names or ["vm1"])
+
+
+class TokenServiceTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.clock = Clock()
+        self.service = TokenService("secret", expires_in=600, refresh_before=60, clock=self.clock)
+
+    def test_valid_token(self):
+        self.clock.now = time.time()
+        token = self.service.issue(3, params())
+        data = verify_auth_token(token, "vm1", "secret")
+        self.assertEqual(data, params())
+        self.assertIsNone(verify_auth_token(token, "vm2", "secret"))
+        self.assertIsNone(decode_auth_token(token, "other"))
+
+    def test_cache(self):
+        token = self.service.issue(3, params())
+        self.clock.now += 500
+        self.assertEqual(self.service.issue(3, params()), token)
+        self.clock.now += 41
+        self.assertNotEqual(self.service.issue(3, params()), token)
+
+    def test_refresh(self):
+        token = self.service.issue(3, params())
+        self.clock.now += 1
+        self.assertNotEqual(self.service.issue(3, params(), refresh=True), token)
+
+    def test_changed_claims(self):
+        token = self.service.issue(3, params())
+        self.assertNotEqual(self.service.issue(3, params(allowed_vmi_names=["vm1", "vm2"])), token)
+
+    def test_invalidate(self):
+        token = self.service.issue(3, params())
+        self.clock.now += 1
+        self.service.invalidate(1)
+        self.assertNotEqual(self.service.issue(3, params()), token)
+        self.service.clear()
+        self.assertEqual(len(self.service), 0)
+
+    def test_max_size(self):
+        service = TokenService("secret", max_size=2, clock=self.clock)
+        for lab_instance_id in [1, 2, 3]:
+            service.issue(3, params(lab_instance_id))
+        self.assertEqual(len(service), 2)
+
+    def test_issue_many(self):
+        tokens = self.service.issue_many([(3, params(1)), (4, params(2))])
+        self.assertEqual(len(set(tokens)), 2)
+        self.assertEqual(self.service.issue(4, params(2)), tokens[1])
+
+    def test_invalid_refresh_before(self):
+        with self.assertRaises(ValueError):
+            TokenService("secret", expires_in=60, refresh_before=60)
+
+
+class LabInstanceControllerTokenTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.server = FakeApiServer().start()
+        self.collection = create_controller_collection(
+            registry=APIRegistry(Proxy(self.server.base_uri, "token")),
+            user_adapter=MemoryUserAdapter([User(1), User(2)]),
+            docker_image_adapter=MemoryDockerImageAdapter([DockerImage(1, "ubuntu", "desc", "ubuntu")]),
+            lab_docker_image_adapter=MemoryLabDockerImageAdapter([LabDockerImage(1, 1, 1, "a"),
+                                                                  LabDockerImage(2, 1, 1, "b")]),
+            lab_adapter=MemoryLabAdapter([Lab(1, "lab", "lab", "desc")]),
+            lab_instance_adapter=MemoryLabInstanceAdapter(),
+            secret_key="secret",
+        )
+
+    def tearDown(self) -> None:
+        self.server.stop()
+
+    def test_get_token(self):
+        ctrl = self.collection.lab_instance_ctrl
+        created = ctrl.create(1, 1)
+        lab_instance = ctrl.get(created.primary_key)
+        token = ctrl.get_token(lab_instance)
+        self.assertEqual(token.jwt_token, created.jwt_token)
+        self.assertEqual(token.allowed_vmis, ["a", "b"])
+        data = verify_auth_token(ctrl.get_token(lab_instance, refresh=True).jwt_token, "b", "secret")
+        self.assertEqual(data.namespace_name, f"lab-1-{lab_instance.primary_key}")
+
+    def test_get_tokens(self):
+        ctrl = self.collection.lab_instance_ctrl
+        created = [ctrl.create(1, 1), ctrl.create(1, 2)]
+        tokens = ctrl.get_tokens(ctrl.get_all())
+        self.assertEqual([token.jwt_token for token in tokens], [lab.jwt_token for lab in created])
+        self.assertEqual([token.user_id for token in tokens], [1, 2])
+
+    def test_delete(self):
+        ctrl = self.collection.lab_instance_ctrl
+        created = ctrl.create(1, 1)
+        ctrl.delete(ctrl.get(created.primary_key))
+        self.assertEqual(len(ctrl.token_service), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
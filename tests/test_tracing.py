@@ -0,0 +1,133 @@
+import contextlib
+import json
+import os
+import tempfile
+import unittest
+
+from lab_orchestrator_lib.controller.controller_collection import create_controller_collection
+from lab_orchestrator_lib.database.memory_adapter import MemoryUserAdapter, MemoryDockerImageAdapter, \
+    MemoryLabDockerImageAdapter, MemoryLabAdapter, MemoryLabInstanceAdapter
+from lab_orchestrator_lib.kubernetes.api import APIRegistry, Proxy
+from lab_orchestrator_lib.kubernetes.fake_apiserver import FakeApiServer
+from lab_orchestrator_lib.model.model import User, DockerImage, LabDockerImage, Lab
+from lab_orchestrator_lib.tracing import RecordingTracer, NoopTracer, OpenTelemetryTracer, set_tracer, get_tracer
+
+
+class RecordingTracerTestCase(unittest.TestCase):
+    def test_nesting(self):
+        tracer = RecordingTracer()
+        with tracer.start_span("root", {"a": 1}) as root:
+            with tracer.start_span("child") as child:
+                child.set_attribute("b", 2)
+        with tracer.start_span("other") as other:
+            pass
+        self.assertEqual([span.name for span in tracer.spans], ["child", "root", "other"])
+        self.assertIsNone(root.parent_id)
+        self.assertEqual(child.parent_id, root.span_id)
+        self.assertEqual(child.trace_id, root.trace_id)
+        self.assertNotEqual(other.trace_id, root.trace_id)
+        self.assertEqual(root.attributes, {"a": 1})
+        self.assertEqual(child.attributes, {"b": 2})
+        self.assertGreaterEqual(root.duration, child.duration)
+
+    def test_error(self):
+        tracer = RecordingTracer()
+        with self.assertRaises(KeyError):
+            with tracer.start_span("root"):
+                raise KeyError("x")
+        self.assertEqual(tracer.spans[0].attributes["error"], "KeyError('x')")
+
+    def test_max_spans(self):
+        tracer = RecordingTracer(max_spans=2)
+        for name in ["a", "b", "c"]:
+            with tracer.start_span(name):
+                pass
+        self.assertEqual([span.name for span in tracer.spans], ["b", "c"])
+        tracer.clear()
+        self.assertEqual(tracer.spans, [])
+
+    def test_export(self):
+        tracer = RecordingTracer()
+        with tracer.start_span("root"):
+            with tracer.start_span("child"):
+                pass
+        with tempfile.TemporaryDirectory() as directory:
+            chrome = os.path.join(directory, "trace.json")
+            tracer.export(chrome)
+            with open(chrome) as file:
+                events = json.load(file)["traceEvents"]
+            self.assertEqual([event["name"] for event in events], ["child", "root"])
+            self.assertEqual(events[0]["ph"], "X")
+            folded = os.path.join(directory, "trace.folded")
+            tracer.export(folded, RecordingTracer.FOLDED)
+            with open(folded) as file:
+                stacks = [line.rsplit(" ", 1)[0] for line in file.read().splitlines()]
+            self.assertEqual(stacks, ["root", "root;child"])
+            jsonl = os.path.join(directory, "trace.jsonl")
+            tracer.export(jsonl, RecordingTracer.JSONL)
+            with open(jsonl) as file:
+                self.assertEqual(len(file.read().splitlines()), 2)
+            with self.assertRaises(ValueError):
+                tracer.export(jsonl, "unknown")
+
+
+class TracerTestCase(unittest.TestCase):
+    def test_default(self):
+        self.assertIsInstance(get_tracer(), NoopTracer)
+        with get_tracer().start_span("root") as span:
+            span.set_attribute("a", 1)
+
+    def test_open_telemetry(self):
+        started = []
+
+        class OtelTracerMock:
+            @contextlib.contextmanager
+            def start_as_current_span(self, name, attributes=None):
+                started.append((name, attributes))
+                yield None
+
+        tracer = OpenTelemetryTracer(OtelTracerMock())
+        with tracer.start_span("root", {"id": 1, "name": None}):
+            pass
+        self.assertEqual(started, [("root", {"id": 1, "name": "None"})])
+
+
+class InstrumentationTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tracer = RecordingTracer()
+        self.previous = set_tracer(self.tracer)
+        self.server = FakeApiServer().start()
+
+    def tearDown(self) -> None:
+        self.server.stop()
+        set_tracer(self.previous)
+
+    def test_lab_start(self):
+        collection = create_controller_collection(
+            registry=APIRegistry(Proxy(self.server.base_uri, "token")),
+            user_adapter=MemoryUserAdapter([User(1)]),
+            docker_image_adapter=MemoryDockerImageAdapter([DockerImage(1, "ubuntu", "desc", "ubuntu")]),
+            lab_docker_image_adapter=MemoryLabDockerImageAdapter([LabDockerImage(1, 1, 1, "a")]),
+            lab_adapter=MemoryLabAdapter([Lab(1, "lab", "lab", "desc")]),
+            lab_instance_adapter=MemoryLabInstanceAdapter(),
+            secret_key="secret",
+        )
+        lab_instance = collection.lab_instance_ctrl.create(1, 1)
+        spans = self.tracer.spans
+        root = spans[-1]
+        self.assertEqual(root.name, "LabInstanceController.create")
+        self.assertIsNone(root.parent_id)
+        self.assertEqual(root.attributes["lab_instance_id"], lab_instance.primary_key)
+        children = [span.name for span in spans if span.parent_id == root.span_id]
+        self.assertIn("adapter create", children)
+        self.assertEqual(children.count("template load"), 3)
+        self.assertEqual(children.count("kubernetes POST"), 3)
+        self.tracer.clear()
+        collection.lab_instance_ctrl.delete(collection.lab_instance_ctrl.get(lab_instance.primary_key))
+        spans = self.tracer.spans
+        self.assertEqual(spans[-1].name, "LabInstanceController.delete")
+        self.assertIn("kubernetes DELETE", [span.name for span in spans if span.parent_id == spans[-1].span_id])
+
+
+if __name__ == '__main__':
+    unittest.main()